@@ -1,18 +1,13 @@
 import re
 import subprocess
+from datetime import datetime
 from pathlib import Path
 
-import pandas as pd
 import streamlit as st
 
-from src.models.models import (
-    Config,
-    LayoutConfig,
-    LLMSettings,
-    LoggingConfig,
-    SearchCriteria,
-)
-from src.utils.constants import CANDIDATE_COLUMNS, CSS_FILE
+from src.core.scopes import format_scopes
+from src.models.models import LayoutConfig
+from src.utils.constants import CANDIDATE_COLUMNS, CSS_FILE, DATA_DIR
 from src.utils.io_utils import (
     load_config,
     load_layout_config,
@@ -36,6 +31,174 @@ else:
     st.warning("CSSファイルが見つかりません。")
 
 
+@st.cache_resource(max_entries=4, show_spinner="結果を読み込んでいます...")
+def load_results_table(csv_path: str, mtime_ns: int):
+    """結果を読み込む。パスと更新時刻をキーにキャッシュし、再描画のたびに読み込まない"""
+    from src.core.results import ResultsTable
+
+    return ResultsTable.from_csv(Path(csv_path))
+
+
+def range_slider(table, label: str, col: str, step: float = 1.0):
+    """列の最小値〜最大値のスライダーを表示する。全範囲が選択されていれば None"""
+    bounds = table.value_range(col)
+    if bounds is None or bounds[0] == bounds[1]:
+        return None
+    low, high = int(bounds[0]), int(bounds[1])
+    selected = st.slider(label, min_value=low, max_value=high, value=(low, high))
+    return None if selected == (low, high) else selected
+
+
+@st.cache_resource(max_entries=8, show_spinner="差分を計算しています...")
+def load_run_diff(base_dir: str, other_dir: str, mtimes: tuple[int, int]):
+    """2つの実行の差分。結果ファイルの更新時刻をキーにキャッシュする"""
+    from src.core.diff import diff_runs
+
+    return diff_runs(Path(base_dir), Path(other_dir))
+
+
+@st.cache_resource(max_entries=4, show_spinner="引用ネットワークを配置しています...")
+def load_graph(run_dir: str, mtimes: tuple[int, int]):
+    """実行の引用ネットワーク。結果と引用関係の更新時刻をキーにキャッシュする"""
+    from src.core.graph import load_citation_graph
+
+    return load_citation_graph(Path(run_dir))
+
+
+def start_pipeline() -> dict:
+    """main.py をバックグラウンドで起動し、進捗イベントの出力先を返す"""
+    from src.utils.events import EventTail
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    events_path = DATA_DIR / "events" / f"{timestamp}.jsonl"
+    events_path.parent.mkdir(parents=True, exist_ok=True)
+    log_path = events_path.with_suffix(".log")
+    # 標準出力はパイプではなくファイルに書き出し、画面の描画をブロックしない
+    with open(log_path, "w", encoding="utf-8") as log_file:
+        process = subprocess.Popen(
+            ["uv", "run", "main.py", "--events-file", str(events_path)],
+            stdout=log_file,
+            stderr=subprocess.STDOUT,
+        )
+    return {"process": process, "tail": EventTail(events_path), "log_path": log_path}
+
+
+def read_log_tail(log_path: Path, max_bytes: int = 8192) -> str:
+    """ログファイルの末尾のみを読み込む"""
+    if not log_path.exists():
+        return ""
+    with open(log_path, "rb") as f:
+        f.seek(0, 2)
+        size = f.tell()
+        f.seek(max(0, size - max_bytes))
+        return f.read().decode("utf-8", errors="replace")
+
+
+def format_eta(eta_s) -> str:
+    if eta_s is None:
+        return "-"
+    minutes, seconds = divmod(int(eta_s), 60)
+    return f"{minutes}分{seconds:02d}秒"
+
+
+@st.fragment(run_every=2)
+def render_pipeline_progress() -> None:
+    """進捗イベントを差分で読み込み、段階ごとの進捗とスループットを表示する"""
+    import pandas as pd
+
+    pipeline = st.session_state.pipeline
+    tail = pipeline["tail"]
+    tail.poll()
+    returncode = pipeline["process"].poll()
+
+    if tail.run.get("run_dir"):
+        st.caption(f"実行ディレクトリ: {tail.run['run_dir']}")
+    for stage in tail.stages.values():
+        if stage.get("total"):
+            done, total = stage["done"], stage["total"]
+            rate = stage.get("rate") or 0
+            eta = format_eta(stage.get("eta_s"))
+            st.progress(
+                min(1.0, done / total),
+                text=f"{stage['stage']}: {done}/{total} ({rate:.1f} 件/秒, 残り {eta})",
+            )
+        else:
+            label = "完了" if stage.get("state") == "done" else "実行中"
+            st.write(f"{stage['stage']}: {label}")
+
+    if tail.throughput:
+        st.caption("スループット (件/秒)")
+        chart_df = pd.DataFrame(tail.throughput)
+        chart_df["time"] = pd.to_datetime(chart_df["ts"], unit="s")
+        st.line_chart(
+            chart_df.pivot_table(index="time", columns="stage", values="rate")
+        )
+
+    for message in list(tail.messages)[-5:]:
+        text = f"[{message['logger']}] {message['message']}"
+        if message["level"] in ("ERROR", "CRITICAL"):
+            st.error(text)
+        else:
+            st.warning(text)
+
+    with st.expander("ログ (末尾)", expanded=False):
+        st.code(read_log_tail(pipeline["log_path"]))
+
+    if returncode is None:
+        return
+    if returncode == 0 and tail.run.get("status") == "budget_exhausted":
+        st.warning("予算の上限に達したため、パイプラインを中断しました。")
+    elif returncode == 0:
+        st.success("パイプラインが正常に終了しました！")
+    else:
+        st.error(f"パイプラインが終了コード {returncode} で失敗しました。")
+
+
+def render_run_overview(records) -> None:
+    """カタログの実行一覧と合計を表示する"""
+    from src.core.catalog import summarize_runs
+
+    summary = summarize_runs(records)
+    cols = st.columns(4)
+    cols[0].metric("実行数", f"{summary['runs']} ({summary['completed']} 完了)")
+    cols[1].metric("論文数 (合計)", f"{summary['papers_total']:,}")
+    cols[2].metric("トークン数 (合計)", f"{summary['total_tokens']:,}")
+    cols[3].metric("概算コスト (合計)", f"${summary['cost_usd']:.2f}")
+    with st.expander("📋 実行一覧", expanded=False):
+        st.dataframe(
+            [
+                {
+                    "run_id": r.run_id,
+                    "status": r.status,
+                    "papers": r.papers_total,
+                    "mean_score": r.mean_score,
+                    "duration_min": round((r.duration_s or 0) / 60, 1),
+                    "tokens": r.total_tokens,
+                    "cost_usd": r.cost_usd,
+                    "keywords": ", ".join(r.keywords),
+                    "config_hash": r.config_hash,
+                }
+                for r in records
+            ],
+            hide_index=True,
+        )
+
+
+def render_run_summary(record) -> None:
+    """選択した実行のイテレーション別件数とスコア分布を表示する"""
+    import pandas as pd
+
+    cols = st.columns(2)
+    with cols[0]:
+        st.caption("イテレーションごとのスクリーニング件数")
+        if record.papers_per_iteration:
+            st.bar_chart(pd.Series(record.papers_per_iteration, name="papers"))
+    with cols[1]:
+        st.caption("関連度スコアの分布")
+        if record.score_histogram:
+            st.bar_chart(pd.Series(record.score_histogram, name="papers"))
+
+
 def main():
     st.title("📚 論文レビュー・パイプライン ダッシュボード")
     st.markdown("設定の編集と自動リサーチレビュー・パイプラインの実行が可能です。")
@@ -49,7 +212,14 @@ def main():
 
     # Sidebar for navigation
     st.sidebar.header("ナビゲーション")
-    menu_options = {"⚙️ 設定": "config", "🚀 実行": "exec", "📊 結果": "results"}
+    menu_options = {
+        "⚙️ 設定": "config",
+        "🚀 実行": "exec",
+        "📊 結果": "results",
+        "🔎 検索": "search",
+        "🆚 比較": "diff",
+        "🕸️ 引用ネットワーク": "graph",
+    }
     selection = st.sidebar.radio("移動先", list(menu_options.keys()))
     mode = menu_options[selection]
 
@@ -70,11 +240,21 @@ def main():
                 value="\n".join(config.search_criteria.keywords),
                 height=100,
             )
-            nl_query = st.text_area(
-                "自然言語クエリ (スコアリング用)",
-                value=config.search_criteria.natural_language_query,
-                height=50,
-            )
+            nl_query = config.search_criteria.natural_language_query
+            if isinstance(nl_query, list):
+                st.text_area(
+                    "自然言語クエリ (スコアリング用)",
+                    value=format_scopes(nl_query),
+                    height=100,
+                    disabled=True,
+                    help="複数のスコープは config.yml で編集します。",
+                )
+            else:
+                nl_query = st.text_area(
+                    "自然言語クエリ (スコアリング用)",
+                    value=nl_query,
+                    height=50,
+                )
 
             doi_help = "例: 10.1145/3639148 (10.から始まる形式)"
             seed_dois_raw = st.text_area(
@@ -171,6 +351,18 @@ def main():
                     min_value=1,
                     max_value=20,
                 )
+                cascade = st.checkbox(
+                    "2段階スクリーニング (安価なモデルで足切り)",
+                    value=config.llm_settings.cascade,
+                    help="境界付近以上のスコアの論文のみ、上のモデルで判定します。",
+                )
+                extraction_enabled = st.checkbox(
+                    "しきい値以上の論文から手法・結果を抽出する",
+                    value=config.extraction.enabled,
+                    help=(
+                        "抽出する項目は config.yml の extraction.fields で設定します。"
+                    ),
+                )
             with adv2:
                 st.markdown("**ロギング設定**")
                 log_level = st.selectbox(
@@ -199,26 +391,40 @@ def main():
                 )
 
         # Update config object for saving
-        updated_config = Config(
-            project_name=project_name,
-            llm_settings=LLMSettings(
-                model_screening=model_screening, max_screening_workers=max_workers
-            ),
-            logging=LoggingConfig(level=log_level),
-            search_criteria=SearchCriteria(
-                keywords=[k.strip() for k in keywords.split("\n") if k.strip()],
-                natural_language_query=nl_query,
-                seed_paper_dois=seed_dois,
-                keyword_search_limit=keyword_limit,
-                max_related_papers=max_related,
-                snowball_from_keywords_limit=snowball_limit,
-                min_citations=min_citations,
-                year_range=list(year_range),
-                screening_threshold=screening_threshold,
-                iterations=iterations,
-                top_n_for_snowball=top_n_snowball,
-                max_retries=max_retries,
-            ),
+        # UI で編集しない項目 (並列数やプロファイル設定など) は既存の値を引き継ぐ
+        updated_config = config.model_copy(
+            update={
+                "project_name": project_name,
+                "llm_settings": config.llm_settings.model_copy(
+                    update={
+                        "model_screening": model_screening,
+                        "max_screening_workers": max_workers,
+                        "cascade": cascade,
+                    }
+                ),
+                "logging": config.logging.model_copy(update={"level": log_level}),
+                "extraction": config.extraction.model_copy(
+                    update={"enabled": extraction_enabled}
+                ),
+                "search_criteria": config.search_criteria.model_copy(
+                    update={
+                        "keywords": [
+                            k.strip() for k in keywords.split("\n") if k.strip()
+                        ],
+                        "natural_language_query": nl_query,
+                        "seed_paper_dois": seed_dois,
+                        "keyword_search_limit": keyword_limit,
+                        "max_related_papers": max_related,
+                        "snowball_from_keywords_limit": snowball_limit,
+                        "min_citations": min_citations,
+                        "year_range": list(year_range),
+                        "screening_threshold": screening_threshold,
+                        "iterations": iterations,
+                        "top_n_for_snowball": top_n_snowball,
+                        "max_retries": max_retries,
+                    }
+                ),
+            }
         )
 
         if st.button("💾 設定を保存"):
@@ -230,36 +436,19 @@ def main():
         st.header("🚀 パイプライン実行")
         st.info(f"現在のプロジェクト: **{config.project_name}**")
 
-        if st.button("🚀 パイプライン実行開始"):
-            st.info("パイプライン実行を開始しています...")
-
-            log_area = st.empty()
-            full_log = ""
+        pipeline = st.session_state.get("pipeline")
+        running = pipeline is not None and pipeline["process"].poll() is None
+        if st.button("🚀 パイプライン実行開始", disabled=running):
+            st.session_state.pipeline = start_pipeline()
+            st.info("パイプライン実行を開始しました。実行中も他の画面を操作できます。")
 
-            process = subprocess.Popen(
-                ["uv", "run", "main.py"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,
-            )
-
-            while True:
-                line = process.stdout.readline()
-                if not line and process.poll() is not None:
-                    break
-                if line:
-                    full_log += line
-                    log_area.code(full_log)
-
-            if process.returncode == 0:
-                st.success("パイプラインが正常に終了しました！")
-            else:
-                st.error(
-                    f"パイプラインが終了コード {process.returncode} で失敗しました。"
-                )
+        if "pipeline" in st.session_state:
+            render_pipeline_progress()
 
     elif mode == "results":
+        from src.core.catalog import RunCatalog
+        from src.core.results import ResultsQuery, results_cache_key
+
         # Results Viewer
         st.header("📊 実行結果")
 
@@ -307,75 +496,111 @@ def main():
         project_name = config.project_name
         data_dir = Path("data")
         if data_dir.exists():
-            # Match directories like "YYYYMMDD_HHMMSS_{project_name}"
-            # The pattern expects exactly 8 digits, underscore, 6 digits, underscore, and project_name
-            pattern = re.compile(rf"^\d{{8}}_\d{{6}}_{re.escape(project_name)}$")
-
-            runs = sorted(
-                [d for d in data_dir.iterdir() if d.is_dir() and pattern.match(d.name)],
-                reverse=True
-            )
-            if runs:
-                selected_run = st.selectbox(
+            catalog = RunCatalog()
+            # カタログ未登録の実行 (導入前の実行等) はセッションの初回のみ取り込む
+            if not st.session_state.get("catalog_synced"):
+                catalog.sync(data_dir)
+                st.session_state.catalog_synced = True
+
+            search_col, refresh_col = st.columns([4, 1])
+            with search_col:
+                search = st.text_input("実行を検索 (実行ID・キーワード)")
+            with refresh_col:
+                if st.button("🔄 カタログを更新"):
+                    added = catalog.sync(data_dir)
+                    st.toast(f"{added} 件の実行をカタログに追加しました。")
+
+            records = catalog.list_runs(project=project_name, search=search or None)
+            if records:
+                render_run_overview(records)
+                selected = st.selectbox(
                     "結果を表示する実行を選択してください",
-                    runs,
-                    format_func=lambda x: x.name,
+                    records,
+                    format_func=lambda r: f"{r.run_id} ({r.status})",
                 )
+                selected_run = Path(selected.run_dir)
+                render_run_summary(selected)
 
                 final_csv = selected_run / "final" / "final_review_matrix.csv"
                 if final_csv.exists():
                     st.subheader(f"{selected_run.name} の結果")
 
-                    df = pd.read_csv(final_csv)
-
-                    # Ensure numeric columns are displayed as integers
-                    for col in ["year", "citationCount"]:
-                        if col in df.columns:
-                            df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int64")
-
-                    # Display options
-                    wrap_text = st.checkbox(
-                        "テキストを折り返して全体を表示 (st.table)", value=True
-                    )
+                    table = load_results_table(*results_cache_key(final_csv))
 
-                    cols_to_display = df.columns.tolist()  # default all
+                    # Filters
+                    filter_cols = st.columns(3)
+                    with filter_cols[0]:
+                        score_range = range_slider(
+                            table, "関連度スコア", "relevance_score"
+                        )
+                    with filter_cols[1]:
+                        year_range = range_slider(table, "出版年", "year")
+                    with filter_cols[2]:
+                        citation_range = range_slider(
+                            table, "被引用数", "citationCount"
+                        )
 
-                    # Filter columns based on settings
+                    # Column projection
                     essential_cols = layout_config.ui_settings.essential_columns
-                    filtered_cols = [col for col in essential_cols if col in df.columns]
-                    if filtered_cols:
-                        cols_to_display = filtered_cols
-                    else:
+                    default_cols = [c for c in essential_cols if c in table.columns]
+                    if not default_cols:
                         st.warning(
                             "表示対象の列がデータに含まれていません。すべての列を表示します。"
                         )
+                        default_cols = table.columns
+                    cols_to_display = st.multiselect(
+                        "表示する列", options=table.columns, default=default_cols
+                    )
 
-                    display_df = df[cols_to_display]
+                    sort_col1, sort_col2, sort_col3 = st.columns([2, 1, 1])
+                    with sort_col1:
+                        sort_by = st.selectbox(
+                            "並べ替え",
+                            table.columns,
+                            index=table.columns.index("relevance_score")
+                            if "relevance_score" in table.columns
+                            else 0,
+                        )
+                    with sort_col2:
+                        ascending = st.checkbox("昇順", value=False)
+                    with sort_col3:
+                        # Display options
+                        wrap_text = st.checkbox(
+                            "テキストを折り返して全体を表示 (st.table)", value=True
+                        )
 
-                    if wrap_text:
-                        # Pagination for st.table
-                        items_per_page = layout_config.ui_settings.items_per_page
-                        total_items = len(display_df)
-                        total_pages = (total_items - 1) // items_per_page + 1
-
-                        if total_pages > 1:
-                            page_number = st.number_input(
-                                "ページ番号",
-                                min_value=1,
-                                max_value=total_pages,
-                                value=1,
+                    query = ResultsQuery(
+                        score_range=score_range,
+                        year_range=year_range,
+                        citation_range=citation_range,
+                        sort_by=sort_by,
+                        ascending=ascending,
+                        columns=cols_to_display or None,
+                        page_size=layout_config.ui_settings.items_per_page,
+                    )
+                    # 総件数を得るため、まず1ページ目を取得してからページ番号を決める
+                    result_page = table.query(query)
+                    if result_page.total_pages > 1:
+                        page_number = st.number_input(
+                            "ページ番号",
+                            min_value=1,
+                            max_value=result_page.total_pages,
+                            value=1,
+                        )
+                        if page_number != 1:
+                            result_page = table.query(
+                                query.model_copy(update={"page": page_number})
                             )
-                            start_idx = (page_number - 1) * items_per_page
-                            end_idx = min(start_idx + items_per_page, total_items)
 
-                            st.write(
-                                f"全 {total_items} 件中 {start_idx + 1} - {end_idx} 件目を表示"
-                            )
-                            st.table(display_df.iloc[start_idx:end_idx])
-                        else:
-                            st.table(display_df)
+                    st.write(
+                        f"全 {len(table)} 件中 {result_page.total} 件が条件に一致 "
+                        f"({result_page.start} - {result_page.end} 件目を表示)"
+                    )
+                    # 表示するページの行のみを描画する
+                    if wrap_text:
+                        st.table(result_page.rows)
                     else:
-                        st.dataframe(display_df)
+                        st.dataframe(result_page.rows)
 
                     # Download button
                     with open(final_csv, "rb") as f:
@@ -394,6 +619,212 @@ def main():
                 f"プロジェクト {project_name} のデータディレクトリが見つかりません。"
             )
 
+    elif mode == "search":
+        from src.core.catalog import RunCatalog
+        from src.core.search import SearchIndex
+
+        st.header("🔎 論文検索")
+        st.caption(
+            "すべての実行でスクリーニングした論文を、タイトル・アブストラクト・"
+            "要約・判定理由から検索します (BM25)。"
+        )
+
+        index = SearchIndex()
+        # 未登録の実行 (導入前の実行等) はセッションの初回のみ取り込む
+        if not st.session_state.get("search_index_synced"):
+            catalog = RunCatalog()
+            catalog.sync(DATA_DIR)
+            index.sync([Path(r.run_dir) for r in catalog.list_runs()])
+            st.session_state.search_index_synced = True
+
+        query_col, limit_col = st.columns([4, 1])
+        with query_col:
+            query = st.text_input("検索語", placeholder="例: 強化学習 reward shaping")
+        with limit_col:
+            limit = st.number_input("表示件数", min_value=1, max_value=200, value=20)
+
+        if query:
+            hits = index.search(query, limit=int(limit))
+            st.write(f"{len(hits)} 件 (索引済み: {len(index):,} 件)")
+            for hit in hits:
+                score = hit.relevance_score
+                score_text = "-" if score is None else f"{score:g}"
+                with st.container(border=True):
+                    st.markdown(
+                        f"**{hit.title}** ({hit.year or '-'}) — スコア {score_text}"
+                    )
+                    if hit.summary:
+                        st.write(hit.summary)
+                    link = hit.url or (f"https://doi.org/{hit.doi}" if hit.doi else "")
+                    st.caption(f"{link}  実行: {hit.run_id}")
+
+    elif mode == "diff":
+        from src.core.catalog import RunCatalog
+        from src.core.diff import align_runs
+
+        st.header("🆚 実行の比較")
+        st.caption(
+            "同じプロジェクトの実行を DOI で突き合わせ、"
+            "論文の増減とスコアの変化を表示します。"
+        )
+
+        records = [
+            r
+            for r in RunCatalog().list_runs(project=config.project_name)
+            if (Path(r.run_dir) / "final" / "final_review_matrix.csv").exists()
+        ]
+        if len(records) < 2:
+            st.info("比較できる実行が2つ以上ありません。")
+            return
+
+        run_ids = [r.run_id for r in records]
+        selected = st.multiselect(
+            "比較する実行 (最も古い実行を基準にします)",
+            run_ids,
+            default=run_ids[:2],
+        )
+        if len(selected) < 2:
+            st.info("実行を2つ以上選択してください。")
+            return
+
+        run_dirs = sorted(
+            (Path(r.run_dir) for r in records if r.run_id in selected),
+            key=lambda d: d.name,
+        )
+        base_dir = run_dirs[0]
+
+        diffs = []
+        try:
+            for other_dir in run_dirs[1:]:
+                mtimes = tuple(
+                    (d / "final" / "final_review_matrix.csv").stat().st_mtime_ns
+                    for d in (base_dir, other_dir)
+                )
+                diffs.append(load_run_diff(str(base_dir), str(other_dir), mtimes))
+        except ValueError as e:
+            st.error(f"実行を比較できません: {e}")
+            return
+
+        st.dataframe([d.summary() for d in diffs], hide_index=True)
+
+        diff = diffs[0]
+        if len(diffs) > 1:
+            other_run = st.selectbox("詳細を表示する実行", [d.other_run for d in diffs])
+            diff = next(d for d in diffs if d.other_run == other_run)
+
+        summary = diff.summary()
+        cols = st.columns(4)
+        cols[0].metric("追加", summary["added"])
+        cols[1].metric("削除", summary["removed"])
+        cols[2].metric("スコア変化", f"{summary['changed']} / {summary['common']}")
+        rho = summary["spearman"]
+        cols[3].metric("順位相関 (Spearman)", "-" if rho is None else f"{rho:.3f}")
+
+        tab_changed, tab_added, tab_removed, tab_all = st.tabs(
+            ["スコア変化", "追加された論文", "削除された論文", "全実行のスコア"]
+        )
+        with tab_changed:
+            st.dataframe(diff.changed.head(500))
+            if len(diff.common):
+                st.scatter_chart(diff.common, x="score_base", y="score_other")
+        with tab_added:
+            st.dataframe(diff.added.head(500))
+        with tab_removed:
+            st.dataframe(diff.removed.head(500))
+        with tab_all:
+            try:
+                st.dataframe(align_runs(run_dirs).head(1000))
+            except ValueError as e:
+                st.error(f"実行を比較できません: {e}")
+
+    elif mode == "graph":
+        import pydeck as pdk
+
+        from src.core.catalog import RunCatalog
+        from src.core.graph import EDGES_FILE_NAME
+
+        st.header("🕸️ 引用ネットワーク")
+        st.caption(
+            "最終結果の論文間の引用関係を表示します。"
+            "色は関連度スコア、配置は実行終了時に計算したものを使います。"
+        )
+
+        records = [
+            r
+            for r in RunCatalog().list_runs(project=config.project_name)
+            if (Path(r.run_dir) / "final" / "final_review_matrix.csv").exists()
+        ]
+        if not records:
+            st.info("このプロジェクトの実行結果はまだありません。")
+            return
+        run_id = st.selectbox("実行", [r.run_id for r in records])
+        run_dir = Path(next(r.run_dir for r in records if r.run_id == run_id))
+        edges_path = run_dir / "interim" / EDGES_FILE_NAME
+        if not edges_path.exists():
+            st.info("この実行には引用関係の記録がありません。")
+            return
+
+        mtimes = (
+            (run_dir / "final" / "final_review_matrix.csv").stat().st_mtime_ns,
+            edges_path.stat().st_mtime_ns,
+        )
+        graph = load_graph(str(run_dir), mtimes)
+
+        node_col, edge_col = st.columns(2)
+        with node_col:
+            upper = max(100, len(graph.nodes))
+            max_nodes = st.slider(
+                "表示する論文数の上限", 100, upper, min(2000, upper), 100
+            )
+        with edge_col:
+            upper = max(100, len(graph.edges))
+            max_edges = st.slider(
+                "表示する引用関係の上限", 100, upper, min(5000, upper), 100
+            )
+        shown = graph.decimate(max_nodes, max_edges)
+        st.write(
+            f"論文 {len(shown.nodes):,} / {len(graph.nodes):,} 件、"
+            f"引用関係 {len(shown.edges):,} / {len(graph.edges):,} 件を表示"
+        )
+
+        # スコア (0〜10 程度) を青→赤の色に変換する
+        if "relevance_score" in shown.nodes.columns:
+            score = shown.nodes["relevance_score"].fillna(0).clip(0, 10) / 10
+        else:
+            st.warning("この実行の結果には関連度スコアの列がありません。")
+            score = 0.0
+        nodes = shown.nodes.assign(score=score)
+        nodes["r"] = (nodes["score"] * 255).astype(int)
+        nodes["b"] = 255 - nodes["r"]
+        layers = [
+            pdk.Layer(
+                "LineLayer",
+                shown.edge_segments(),
+                get_source_position="[sx, sy]",
+                get_target_position="[tx, ty]",
+                get_color=[150, 150, 150, 60],
+                get_width=1,
+            ),
+            pdk.Layer(
+                "ScatterplotLayer",
+                nodes,
+                get_position="[x, y]",
+                get_fill_color="[r, 80, b, 200]",
+                get_radius=0.004,
+                radius_min_pixels=2,
+                pickable=True,
+            ),
+        ]
+        st.pydeck_chart(
+            pdk.Deck(
+                layers=layers,
+                views=[pdk.View(type="OrthographicView", controller=True)],
+                initial_view_state=pdk.ViewState(target=[0, 0, 0], zoom=8),
+                map_style=None,
+                tooltip={"text": "{title}\n{year} / スコア {relevance_score}"},
+            )
+        )
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,287 @@
+"""Gemini の Batch API (ファイル入力) 互換のローカルサーバー
+
+GeminiBatchClient (google-genai) が使う API のみを実装する: ファイルの
+アップロード (resumable)、models/{model}:batchGenerateContent によるジョブの作成、
+batches/{id} の状態の取得、結果ファイルのダウンロード。ジョブは作成から
+job_latency_s 秒後に完了し、各リクエストには応答スキーマ (responseJsonSchema)
+に従う決定的な応答を返す (FakeBackend と同じく、整数の項目はプロンプトのハッシュ
+から 0〜10 の値)。error_rate の割合のリクエストはエラーの行になる。
+
+使い方:
+    uv run python -m benchmarks.gemini_batch_mock --port 8766 --job-latency 30
+    # config.yml の llm_settings.batch に enabled: true と
+    # base_url: http://127.0.0.1:8766 を指定して main.py を実行する
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+API_VERSION = "v1beta"
+
+
+def fake_response(request: dict[str, Any]) -> dict[str, Any]:
+    """GenerateContentRequest に対する決定的な GenerateContentResponse"""
+    prompt = "".join(
+        part.get("text", "")
+        for content in request.get("contents", [])
+        for part in content.get("parts", [])
+    )
+    config = request.get("generationConfig") or {}
+    schema = config.get("responseJsonSchema") or {}
+    seed = zlib.crc32(prompt.encode("utf-8"))
+    values: dict[str, Any] = {}
+    for i, (name, prop) in enumerate(schema.get("properties", {}).items()):
+        if prop.get("type") == "integer":
+            values[name] = (seed >> i) % 11
+        else:
+            values[name] = f"Fake {name}"
+    text = json.dumps(values, ensure_ascii=False)
+    prompt_tokens = max(1, len(prompt) // 4)
+    output_tokens = len(text) // 4
+    return {
+        "candidates": [
+            {
+                "content": {"role": "model", "parts": [{"text": text}]},
+                "finishReason": "STOP",
+            }
+        ],
+        "usageMetadata": {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": output_tokens,
+            "totalTokenCount": prompt_tokens + output_tokens,
+        },
+    }
+
+
+class MockBatchServer(ThreadingHTTPServer):
+    """ファイルとジョブをメモリに保持する Batch API 互換サーバー"""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        job_latency_s: float = 1.0,
+        error_rate: float = 0.0,
+        fail_jobs: bool = False,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: int = 0,
+    ):
+        super().__init__((host, port), _Handler)
+        self.job_latency_s = job_latency_s
+        self.error_rate = error_rate
+        # True の場合、ジョブは結果を返さずに失敗する
+        self.fail_jobs = fail_jobs
+        self.files: dict[str, bytes] = {}
+        self.jobs: dict[str, dict[str, Any]] = {}
+        self.stats: Counter[str] = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> threading.Thread:
+        """別スレッドで配信を始める"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def new_id(self, prefix: str) -> str:
+        with self._lock:
+            self._next_id += 1
+            self.stats[prefix] += 1
+            return f"{prefix}/mock-{self._next_id}"
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def job_resource(self, name: str) -> dict[str, Any]:
+        """ジョブの状態 (経過時間で進め、完了時に結果ファイルを作る)"""
+        with self._lock:
+            job = self.jobs[name]
+            elapsed = time.monotonic() - job["created"]
+            if job["state"] in ("BATCH_STATE_PENDING", "BATCH_STATE_RUNNING"):
+                if elapsed >= self.job_latency_s:
+                    job["state"] = (
+                        "BATCH_STATE_FAILED"
+                        if self.fail_jobs
+                        else "BATCH_STATE_SUCCEEDED"
+                    )
+                    if not self.fail_jobs:
+                        job["output"] = self._run(job)
+                elif elapsed >= self.job_latency_s / 2:
+                    job["state"] = "BATCH_STATE_RUNNING"
+        metadata: dict[str, Any] = {
+            "name": name,
+            "model": job["model"],
+            "displayName": job["display_name"],
+            "state": job["state"],
+        }
+        resource: dict[str, Any] = {"name": name, "metadata": metadata}
+        if "output" in job:
+            metadata["output"] = {"responsesFile": job["output"]}
+            resource["done"] = True
+        if job["state"] == "BATCH_STATE_FAILED":
+            resource["done"] = True
+            resource["error"] = {"code": 13, "message": "Mock batch job failed"}
+        return resource
+
+    def _run(self, job: dict[str, Any]) -> str:
+        """入力ファイルの各行に応答し、結果ファイルの名前を返す (ロック内で呼ぶ)"""
+        lines = []
+        for line in self.files[job["src"]].decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if self._rng.random() < self.error_rate:
+                result = {
+                    "key": record.get("key"),
+                    "error": {"code": 500, "message": "Mock internal error"},
+                }
+            else:
+                result = {
+                    "key": record.get("key"),
+                    "response": fake_response(record.get("request", {})),
+                }
+            lines.append(json.dumps(result, ensure_ascii=False))
+        self._next_id += 1
+        name = f"files/mock-output-{self._next_id}"
+        self.files[name] = ("\n".join(lines) + "\n").encode("utf-8")
+        return name
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: MockBatchServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        command = self.headers.get("X-Goog-Upload-Command", "")
+
+        if url.path == f"/upload/{API_VERSION}/files" and command == "start":
+            upload_id = self.server.new_id("uploads").split("/")[-1]
+            upload_url = f"{self.server.base_url}{url.path}?upload_id={upload_id}"
+            self._send(200, {}, {"X-Goog-Upload-URL": upload_url})
+        elif url.path == f"/upload/{API_VERSION}/files" and "finalize" in command:
+            name = "files/" + parse_qs(url.query)["upload_id"][0]
+            self.server.files[name] = body
+            resource = {
+                "name": name,
+                "mimeType": "jsonl",
+                "sizeBytes": str(len(body)),
+                "state": "ACTIVE",
+            }
+            self._send(200, {"file": resource}, {"X-Goog-Upload-Status": "final"})
+        elif url.path.endswith(":batchGenerateContent"):
+            model = url.path.split("/")[-1].removesuffix(":batchGenerateContent")
+            batch = json.loads(body)["batch"]
+            src = batch["inputConfig"]["fileName"]
+            if src not in self.server.files:
+                self._send(404, {"error": {"code": 404, "message": f"{src} not found"}})
+                return
+            name = self.server.new_id("batches")
+            self.server.jobs[name] = {
+                "model": f"models/{model}",
+                "display_name": batch.get("displayName", ""),
+                "src": src,
+                "state": "BATCH_STATE_PENDING",
+                "created": time.monotonic(),
+            }
+            self._send(200, self.server.job_resource(name))
+        else:
+            self._send(404, {"error": {"code": 404, "message": "Not found"}})
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        path = url.path.removeprefix("/download")
+        if path.startswith(f"/{API_VERSION}/batches/"):
+            name = path.removeprefix(f"/{API_VERSION}/")
+            if name not in self.server.jobs:
+                self._send(
+                    404, {"error": {"code": 404, "message": f"{name} not found"}}
+                )
+                return
+            self.server.count("polls")
+            self._send(200, self.server.job_resource(name))
+        elif path.startswith(f"/{API_VERSION}/files/") and path.endswith(":download"):
+            name = path.removeprefix(f"/{API_VERSION}/").removesuffix(":download")
+            content = self.server.files.get(name)
+            if content is None:
+                self._send(
+                    404, {"error": {"code": 404, "message": f"{name} not found"}}
+                )
+                return
+            self.server.count("downloads")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+        else:
+            self._send(404, {"error": {"code": 404, "message": "Not found"}})
+
+    def _send(
+        self, status: int, body: dict[str, Any], headers: dict[str, str] | None = None
+    ) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument(
+        "--job-latency", type=float, default=30.0, help="ジョブの所要時間 (秒)"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="エラーを返すリクエストの割合"
+    )
+    parser.add_argument(
+        "--fail-jobs", action="store_true", help="すべてのジョブを失敗させる"
+    )
+    args = parser.parse_args(argv)
+
+    server = MockBatchServer(
+        job_latency_s=args.job_latency,
+        error_rate=args.error_rate,
+        fail_jobs=args.fail_jobs,
+        host=args.host,
+        port=args.port,
+    )
+    print(f"Serving at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Server stats: {dict(server.stats)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
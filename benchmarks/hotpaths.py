@@ -0,0 +1,324 @@
+"""パイプラインのホットパスのスループットとピークメモリを合成データで計測する
+
+使い方:
+    uv run python -m benchmarks.hotpaths                      # 1k/10k/100k を計測
+    uv run python -m benchmarks.hotpaths --sizes 1000         # 件数を指定
+    uv run python -m benchmarks.hotpaths --update-baseline    # 基準値を更新
+
+基準値 (baselines.json) と比べてスループットが throughput 許容率を超えて低下した
+場合、またはピークメモリが peak_mb 許容率を超えて増加した場合は終了コード 1 を返す。
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable
+from unittest.mock import patch
+
+BASELINES_PATH = Path(__file__).resolve().parent / "baselines.json"
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+# 基準値からの許容変化率。スループットは実行環境による揺れが大きいため緩めにする
+DEFAULT_TOLERANCE = {"throughput": 0.5, "peak_mb": 0.25}
+# 小さな件数でピークメモリが僅かに揺れても失敗しないよう、常に許容する増加量 (MB)
+PEAK_MB_SLACK = 1.0
+# 抄録が欠けている論文の割合 (ArXiv での補完の対象)
+MISSING_ABSTRACT_RATE = 0.1
+
+
+# 合成の抄録に使う単語
+WORDS = (
+    "retrieval augmented generation language model dense sparse index query "
+    "document passage ranking evaluation benchmark latency memory graph citation "
+    "embedding transformer attention dataset survey method result"
+).split()
+
+
+@dataclass
+class BenchResult:
+    name: str
+    size: int
+    seconds: float
+    throughput: float  # 1秒あたりの論文数
+    peak_mb: float
+
+
+def make_papers(n: int, seed: int = 0) -> list[dict[str, Any]]:
+    """S2 の応答と同じ形式の論文を n 件作る (DOI の重複・欠損、抄録の欠損を含む)"""
+    rng = random.Random(seed)
+    papers = []
+    for i in range(n):
+        # 約5%は DOI なし、約5%は既出の DOI (重複)
+        r = rng.random()
+        if r < 0.05:
+            external_ids = {"ArXiv": f"2101.{i:05d}"}
+        elif r < 0.10 and i > 0:
+            external_ids = {"DOI": f"10.1000/{rng.randrange(i)}"}
+        else:
+            external_ids = {"DOI": f"10.1000/{i}"}
+        papers.append(
+            {
+                "paperId": f"{i:040x}",
+                "title": f"Synthetic paper {i} on retrieval augmented generation",
+                "year": rng.randint(2010, 2025),
+                "citationCount": rng.randint(0, 500),
+                "abstract": (
+                    ""
+                    if rng.random() < MISSING_ABSTRACT_RATE
+                    else " ".join(rng.choices(WORDS, k=120))
+                ),
+                "externalIds": external_ids,
+                "url": f"https://www.semanticscholar.org/paper/{i:040x}",
+                "openAccessPdf": None,
+            }
+        )
+    return papers
+
+
+def _fake_arxiv(client: Any, query: str) -> list[Any]:
+    """ArXiv の代わりにタイトルが一致する結果を即座に返す"""
+    title = query.split('"')[1]
+    return [SimpleNamespace(title=title, summary="Abstract from ArXiv")]
+
+
+def bench_process_papers(n: int) -> Callable[[], Any]:
+    from src.core.collector import S2Collector
+
+    papers = make_papers(n)
+    collector = S2Collector()
+
+    def run():
+        with (
+            patch("src.core.collector._search_arxiv", _fake_arxiv),
+            patch("src.core.collector.time.sleep"),
+        ):
+            return collector.process_papers(papers, set(), 0, [2000, 2030])
+
+    return run
+
+
+def bench_arxiv_fill(n: int) -> Callable[[], Any]:
+    """抄録が欠けている論文への ArXiv の結果の書き戻し"""
+    import pandas as pd
+
+    from src.core.collector import S2Collector
+
+    df = pd.DataFrame(make_papers(n))
+    df["doi"] = df["externalIds"].map(lambda x: x.get("DOI"))
+    collector = S2Collector()
+
+    def run():
+        with (
+            patch("src.core.collector._search_arxiv", _fake_arxiv),
+            patch("src.core.collector.time.sleep"),
+        ):
+            return collector._fill_missing_abstracts_with_arxiv(df.copy())
+
+    return run
+
+
+def bench_screen_papers(n: int) -> Callable[[], Any]:
+    import pandas as pd
+
+    from src.core.llm import FakeBackend
+    from src.core.screener import PaperScreener
+
+    df = pd.DataFrame(make_papers(n)).assign(abstract="A short abstract.")
+    # レイテンシ 0 の LLM (スクリーニングのディスパッチのオーバーヘッドを測る)
+    screener = PaperScreener("key", "model", max_workers=5, backend=FakeBackend())
+
+    def run():
+        return screener.screen_papers(df, "retrieval augmented generation")
+
+    return run
+
+
+def bench_snowball_selection(n: int) -> Callable[[], Any]:
+    import pandas as pd
+
+    from src.core.collector import S2Collector
+
+    rng = random.Random(0)
+    df = pd.DataFrame(
+        {
+            "doi": [f"10.1000/{i}" for i in range(n)],
+            "relevance_score": [rng.randint(0, 10) for _ in range(n)],
+        }
+    )
+    collector = S2Collector()
+    collector.get_related_papers = lambda doi, limit=-1: []
+
+    def run():
+        return collector.get_snowball_candidates(df, top_n=5, threshold=7)
+
+    return run
+
+
+def bench_pipeline(n: int) -> Callable[[], Any]:
+    """main.run_pipeline (収集・スクリーニング・保存) を S2・LLM のスタブで実行する"""
+    from main import run_pipeline
+    from src.models.models import Config
+
+    papers = make_papers(n)
+    config = Config(
+        project_name="bench",
+        search_criteria={"keywords": ["rag"], "iterations": 1, "min_citations": 0},
+        llm_settings={
+            "model_screening": "fake",
+            "max_screening_workers": 5,
+            "backend": {"type": "fake"},
+        },
+    )
+
+    def run():
+        with (
+            tempfile.TemporaryDirectory() as tmp,
+            patch("main.S2Collector.collect_initial", return_value=papers),
+            patch("src.core.collector._search_arxiv", _fake_arxiv),
+            patch("src.core.collector.time.sleep"),
+        ):
+            run_dir = Path(tmp)
+            for sub in ["raw", "interim", "final"]:
+                (run_dir / sub).mkdir()
+            run_pipeline(config, run_dir, ["key"])
+
+    return run
+
+
+BENCHMARKS: dict[str, Callable[[int], Callable[[], Any]]] = {
+    "process_papers": bench_process_papers,
+    "arxiv_fill": bench_arxiv_fill,
+    "screen_papers": bench_screen_papers,
+    "snowball_selection": bench_snowball_selection,
+    "pipeline": bench_pipeline,
+}
+
+
+def run_benchmark(name: str, size: int, repeat: int = 3) -> BenchResult:
+    """準備 (合成データの生成) を除いた処理時間の最良値とピークメモリを計測する
+
+    ピークメモリは tracemalloc で別に1回計測する (計測中は処理が遅くなるため)。
+    """
+    import logging
+
+    logging.disable(logging.INFO)
+    try:
+        run = BENCHMARKS[name](size)
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - start)
+
+        tracemalloc.start()
+        try:
+            run()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    finally:
+        logging.disable(logging.NOTSET)
+    return BenchResult(
+        name=name,
+        size=size,
+        seconds=round(best, 6),
+        throughput=round(size / best, 1),
+        peak_mb=round(peak / 1024 / 1024, 3),
+    )
+
+
+def load_baselines(path: Path = BASELINES_PATH) -> dict[str, Any]:
+    if not path.exists():
+        return {"tolerance": DEFAULT_TOLERANCE, "results": {}}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_baselines(
+    results: list[BenchResult], path: Path = BASELINES_PATH
+) -> dict[str, Any]:
+    """計測結果で基準値を更新する (計測しなかったベンチマーク・件数の値は残す)"""
+    baselines = load_baselines(path)
+    for r in results:
+        baselines["results"].setdefault(r.name, {})[str(r.size)] = {
+            "throughput": r.throughput,
+            "peak_mb": r.peak_mb,
+        }
+    path.write_text(json.dumps(baselines, indent=2) + "\n", encoding="utf-8")
+    return baselines
+
+
+def find_regressions(
+    results: list[BenchResult], baselines: dict[str, Any]
+) -> list[str]:
+    """基準値から許容範囲を超えて悪化した指標を返す (基準値のない結果は判定しない)"""
+    tolerance = {**DEFAULT_TOLERANCE, **baselines.get("tolerance", {})}
+    regressions = []
+    for r in results:
+        base = baselines.get("results", {}).get(r.name, {}).get(str(r.size))
+        if base is None:
+            continue
+        min_throughput = base["throughput"] * (1 - tolerance["throughput"])
+        if r.throughput < min_throughput:
+            regressions.append(
+                f"{r.name}[{r.size}] throughput {r.throughput:.0f}/s "
+                f"< {min_throughput:.0f}/s (baseline {base['throughput']:.0f}/s)"
+            )
+        max_peak = max(
+            base["peak_mb"] * (1 + tolerance["peak_mb"]),
+            base["peak_mb"] + PEAK_MB_SLACK,
+        )
+        if r.peak_mb > max_peak:
+            regressions.append(
+                f"{r.name}[{r.size}] peak memory {r.peak_mb:.1f} MB "
+                f"> {max_peak:.1f} MB (baseline {base['peak_mb']:.1f} MB)"
+            )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--json", type=Path, help="計測結果を JSON で書き出す")
+    args = parser.parse_args(argv)
+    # プログレスバーの描画を計測に含めない (tqdm の読み込み前に設定する)
+    os.environ.setdefault("TQDM_DISABLE", "1")
+
+    results = []
+    for name in args.only or BENCHMARKS:
+        for size in args.sizes:
+            # 大きな件数では1回の処理に時間がかかるため、繰り返しを減らす
+            repeat = args.repeat if size <= 10_000 else 1
+            r = run_benchmark(name, size, repeat=repeat)
+            results.append(r)
+            print(
+                f"{r.name:<20} {r.size:>8} {r.seconds:10.3f} s "
+                f"{r.throughput:12.0f} /s {r.peak_mb:10.1f} MB"
+            )
+
+    if args.json:
+        args.json.write_text(
+            json.dumps([asdict(r) for r in results], indent=2), encoding="utf-8"
+        )
+    if args.update_baseline:
+        save_baselines(results)
+        print(f"Updated {BASELINES_PATH}")
+        return 0
+
+    regressions = find_regressions(results, load_baselines())
+    for message in regressions:
+        print(f"REGRESSION: {message}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,486 @@
+"""合成の引用グラフを Semantic Scholar Graph API 互換のローカルサーバーで配信する
+
+S2Collector が使う API (paper/search、paper/DOI:{doi} と references / citations の
+項目指定) のみを実装する。429 (Retry-After 付き)・5xx の連続発生・応答遅延・
+途中で切れる応答を確率的に発生させ、リトライ・バックオフとパイプライン全体の
+スループットを負荷下で計測できる。
+
+使い方:
+    uv run python -m benchmarks.s2_mock --papers 1000000 --port 8765 \\
+        --rate-limit 0.05 --retry-after 1 --error-burst 0.01 --latency-ms 50
+    S2_API_URL=http://127.0.0.1:8765/graph/v1 uv run main.py
+
+    # サーバーを起動して S2Collector で負荷をかけ、リトライ数などを表示する
+    uv run python -m benchmarks.s2_mock --papers 100000 --exercise 200
+
+    # S2AG のバルクデータと同じ形式のシャードを書き出す (src.core.s2_store の入力)
+    uv run python -m benchmarks.s2_mock --papers 100000 --write-bulk data/s2_bulk
+"""
+
+import argparse
+import gzip
+import json
+import math
+import random
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+
+API_PREFIX = "/graph/v1"
+DOI_PREFIX = "10.5555/syn."
+
+_WORDS = (
+    "retrieval augmented generation language model dense sparse index query "
+    "document passage ranking evaluation benchmark latency memory graph citation "
+    "embedding transformer attention dataset survey method scalable efficient "
+    "neural learning contrastive knowledge reasoning multilingual robust"
+).split()
+
+
+class SyntheticGraph:
+    """スケールフリーな引用グラフ (論文 i は自分より古い論文のみを引用する)
+
+    論文 i の参考文献は floor(i * u^skew) (u は一様乱数) で選ぶ。skew が大きいほど
+    古い論文に引用が集中し、被引用数はべき分布に従う (skew=2 で指数はおよそ 3)。
+    タイトル・抄録は論文番号から決定的に生成するため、保持するのは年と引用関係の
+    配列のみで、100万件でも数百 MB に収まる。
+    """
+
+    def __init__(
+        self,
+        n_papers: int,
+        refs_per_paper: int = 10,
+        skew: float = 2.0,
+        year_range: tuple[int, int] = (1990, 2025),
+        missing_abstract_rate: float = 0.05,
+        seed: int = 0,
+    ):
+        self.n_papers = n_papers
+        self.seed = seed
+        self.missing_abstract_rate = missing_abstract_rate
+        rng = np.random.default_rng(seed)
+
+        # 参考文献 (CSR 形式)。最初の論文は何も引用しない
+        citing = np.repeat(np.arange(1, n_papers, dtype=np.int64), refs_per_paper)
+        cited = (citing * rng.random(len(citing)) ** skew).astype(np.int64)
+        # 論文ごとに並べ替え、同じ論文への重複した引用を除く
+        # (np.unique より行ごとのソートの方が大幅に速い)
+        rows = cited.reshape(-1, refs_per_paper)
+        rows.sort(axis=1)
+        keep = np.ones(rows.shape, dtype=bool)
+        keep[:, 1:] = rows[:, 1:] != rows[:, :-1]
+        citing, cited = citing[keep.ravel()], cited[keep.ravel()]
+        self.ref_indptr = np.searchsorted(citing, np.arange(n_papers + 1))
+        self.ref_indices = cited.astype(np.int32)
+
+        # 被引用 (参考文献の逆引き)。(被引用, 引用元) の組をキーにしてソートする
+        reverse = np.sort(cited * n_papers + citing)
+        self.cite_indices = (reverse % n_papers).astype(np.int32)
+        self.cite_indptr = np.searchsorted(reverse // n_papers, np.arange(n_papers + 1))
+        self.citation_counts = np.diff(self.cite_indptr)
+
+        # 番号が大きいほど新しい論文とする
+        span = year_range[1] - year_range[0]
+        jitter = rng.integers(-1, 2, n_papers)
+        years = year_range[0] + np.arange(n_papers) * (span + 1) // n_papers + jitter
+        self.years = np.clip(years, *year_range).astype(np.int16)
+        # 検索結果を被引用数で重み付けして選ぶための累積分布
+        weights = np.log1p(self.citation_counts) + 1.0
+        self.search_cdf = np.cumsum(weights) / weights.sum()
+
+    @staticmethod
+    def doi(i: int) -> str:
+        return f"{DOI_PREFIX}{i}"
+
+    def index_of(self, doi: str) -> int | None:
+        if not doi.lower().startswith(DOI_PREFIX):
+            return None
+        try:
+            i = int(doi[len(DOI_PREFIX) :])
+        except ValueError:
+            return None
+        return i if 0 <= i < self.n_papers else None
+
+    def references(self, i: int) -> np.ndarray:
+        return self.ref_indices[self.ref_indptr[i] : self.ref_indptr[i + 1]]
+
+    def citations(self, i: int) -> np.ndarray:
+        return self.cite_indices[self.cite_indptr[i] : self.cite_indptr[i + 1]]
+
+    def paper(self, i: int, fields: list[str]) -> dict[str, Any]:
+        """S2 の応答と同じ形式で、指定された項目のみを返す"""
+        rng = random.Random(self.seed * 1_000_003 + i)
+        title_words = rng.choices(_WORDS, k=rng.randint(5, 10))
+        values: dict[str, Any] = {
+            "paperId": f"{zlib.crc32(str(i).encode()):08x}{i:032x}",
+            "title": " ".join(title_words).capitalize(),
+            "year": int(self.years[i]),
+            "citationCount": int(self.citation_counts[i]),
+            "referenceCount": int(self.ref_indptr[i + 1] - self.ref_indptr[i]),
+            "externalIds": {"DOI": self.doi(i)},
+            "url": f"https://example.org/synthetic/{i}",
+            "openAccessPdf": None,
+        }
+        if "abstract" in fields:
+            values["abstract"] = (
+                None
+                if rng.random() < self.missing_abstract_rate
+                else " ".join(rng.choices(_WORDS, k=rng.randint(80, 200)))
+            )
+        return {"paperId": values["paperId"]} | {
+            f: values[f] for f in fields if f in values
+        }
+
+    def search(self, query: str, limit: int) -> tuple[int, list[int]]:
+        """クエリから決定的に選んだ論文 (被引用数の多い論文ほど選ばれやすい)"""
+        total = max(1, self.n_papers // 10)
+        rng = np.random.default_rng(zlib.crc32(query.encode("utf-8")) + self.seed)
+        picks = np.searchsorted(self.search_cdf, rng.random(min(limit, total) * 2))
+        picks = list(dict.fromkeys(int(p) for p in picks))[:limit]
+        return total, picks
+
+
+@dataclass
+class FaultConfig:
+    """注入する障害の設定 (確率はリクエストごと)"""
+
+    rate_limit: float = 0.0  # 429 を返す確率
+    retry_after_s: float = 1.0  # 429 の Retry-After (秒)
+    error_burst: float = 0.0  # 5xx の連続発生が始まる確率
+    burst_length: int = 5  # 連続して 5xx を返すリクエスト数
+    latency_ms: float = 0.0  # 応答遅延の中央値 (対数正規分布)
+    latency_sigma: float = 0.5
+    truncate: float = 0.0  # 応答の途中で接続を切る確率
+
+
+class MockS2Server(ThreadingHTTPServer):
+    """SyntheticGraph を配信する S2 互換サーバー (stats に応答の状態を集計する)"""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        graph: SyntheticGraph,
+        faults: FaultConfig | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: int = 0,
+    ):
+        super().__init__((host, port), _Handler)
+        self.graph = graph
+        self.faults = faults or FaultConfig()
+        self.stats: Counter[str] = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._burst_remaining = 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    def start(self) -> threading.Thread:
+        """別スレッドで配信を始める"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def draw_fault(self) -> tuple[str | None, float]:
+        """このリクエストに注入する障害 (なければ None) と遅延 (秒) を決める"""
+        f = self.faults
+        with self._lock:
+            delay = 0.0
+            if f.latency_ms > 0:
+                delay = (
+                    f.latency_ms / 1000 * math.exp(self._rng.gauss(0, f.latency_sigma))
+                )
+            if self._burst_remaining > 0:
+                self._burst_remaining -= 1
+                return "server_error", delay
+            r = self._rng.random()
+            if r < f.rate_limit:
+                return "rate_limit", delay
+            r -= f.rate_limit
+            if r < f.error_burst:
+                self._burst_remaining = max(0, f.burst_length - 1)
+                return "server_error", delay
+            r -= f.error_burst
+            if r < f.truncate:
+                return "truncate", delay
+        return None, delay
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: MockS2Server
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        fault, delay = self.server.draw_fault()
+        if delay:
+            time.sleep(delay)
+        if fault == "rate_limit":
+            retry_after = self.server.faults.retry_after_s
+            return self._send(
+                429,
+                {"message": "Too Many Requests"},
+                {"Retry-After": f"{retry_after:g}"},
+                stat="429",
+            )
+        if fault == "server_error":
+            return self._send(503, {"message": "Service Unavailable"}, stat="5xx")
+
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        path = unquote(url.path)
+        if path == f"{API_PREFIX}/paper/search":
+            status, body = 200, self._search(params)
+        elif path.startswith(f"{API_PREFIX}/paper/DOI:"):
+            status, body = self._paper(path[len(f"{API_PREFIX}/paper/DOI:") :], params)
+        else:
+            status, body = 404, {"error": f"Unknown endpoint: {path}"}
+        self._send(status, body, truncate=fault == "truncate")
+
+    def _search(self, params: dict[str, str]) -> dict[str, Any]:
+        graph = self.server.graph
+        limit = min(int(params.get("limit", 10)), 100)
+        fields = _split_fields(params.get("fields", "title"))[0]
+        total, picks = graph.search(params.get("query", ""), limit)
+        return {
+            "total": total,
+            "offset": 0,
+            "data": [graph.paper(i, fields) for i in picks],
+        }
+
+    def _paper(self, doi: str, params: dict[str, str]) -> tuple[int, dict[str, Any]]:
+        graph = self.server.graph
+        i = graph.index_of(doi)
+        if i is None:
+            return 404, {"error": "Paper not found"}
+        fields, nested = _split_fields(params.get("fields", "title"))
+        body = graph.paper(i, fields)
+        for kind, sub in nested.items():
+            related = (
+                graph.references(i) if kind == "references" else graph.citations(i)
+            )
+            body[kind] = [graph.paper(int(j), sub) for j in related]
+        return 200, body
+
+    def _send(
+        self,
+        status: int,
+        body: dict[str, Any],
+        headers: dict[str, str] | None = None,
+        truncate: bool = False,
+        stat: str | None = None,
+    ) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if truncate:
+            # Content-Length より短い応答を返して接続を切る
+            self.wfile.write(payload[: len(payload) // 2])
+            self.close_connection = True
+            self.server.count("truncated")
+            return
+        self.wfile.write(payload)
+        self.server.count(stat or str(status))
+
+
+def _split_fields(fields: str) -> tuple[list[str], dict[str, list[str]]]:
+    """fields 引数 (例: title,references.title) を論文と references 等の項目に分ける"""
+    plain: list[str] = []
+    nested: dict[str, list[str]] = {}
+    for field in filter(None, fields.split(",")):
+        kind, _, sub = field.partition(".")
+        if sub and kind in ("references", "citations"):
+            nested.setdefault(kind, []).append(sub)
+        else:
+            plain.append(field)
+    return plain, nested
+
+
+def corpus_id(i: int) -> int:
+    """論文番号に対応するバルクデータの corpusid (0 を避ける)"""
+    return i + 1
+
+
+def write_bulk_shards(
+    graph: SyntheticGraph, out_dir: Path, n_shards: int = 2
+) -> dict[str, list[Path]]:
+    """合成グラフを S2AG のバルクデータ (papers・abstracts・citations) の形式で書き出す
+
+    各データセットを n_shards 個の JSONL.gz に分割する。戻り値はデータセット名
+    ごとのシャードのパス。
+    """
+    fields = ["title", "year", "citationCount", "referenceCount", "abstract"]
+    shards: dict[str, list[Path]] = {}
+    for name in ("papers", "abstracts", "citations"):
+        (out_dir / name).mkdir(parents=True, exist_ok=True)
+        shards[name] = [
+            out_dir / name / f"{name}-part{k:03d}.jsonl.gz" for k in range(n_shards)
+        ]
+
+    bounds = np.linspace(0, graph.n_papers, n_shards + 1).astype(int)
+    for k in range(n_shards):
+        with (
+            gzip.open(shards["papers"][k], "wt", encoding="utf-8") as papers,
+            gzip.open(shards["abstracts"][k], "wt", encoding="utf-8") as abstracts,
+            gzip.open(shards["citations"][k], "wt", encoding="utf-8") as citations,
+        ):
+            for i in range(bounds[k], bounds[k + 1]):
+                p = graph.paper(i, fields)
+                record = {
+                    "corpusid": corpus_id(i),
+                    "externalids": {"DOI": graph.doi(i), "CorpusId": corpus_id(i)},
+                    "url": f"https://example.org/synthetic/{i}",
+                    "title": p["title"],
+                    "year": p["year"],
+                    "publicationdate": f"{p['year']}-06-01",
+                    "citationcount": p["citationCount"],
+                    "referencecount": p["referenceCount"],
+                }
+                papers.write(json.dumps(record) + "\n")
+                if p["abstract"] is not None:
+                    abstract = {
+                        "corpusid": corpus_id(i),
+                        "abstract": p["abstract"],
+                        "openaccessinfo": {"url": None},
+                    }
+                    abstracts.write(json.dumps(abstract) + "\n")
+                for j in graph.references(i):
+                    edge = {
+                        "citingcorpusid": corpus_id(i),
+                        "citedcorpusid": corpus_id(int(j)),
+                    }
+                    citations.write(json.dumps(edge) + "\n")
+    return shards
+
+
+def exercise(base_url: str, graph: SyntheticGraph, n: int) -> dict[str, float]:
+    """S2Collector で n 件の論文の参考文献・被引用を取得し、所要時間等を返す"""
+    from src.core.collector import S2Collector
+    from src.utils.metrics import init_metrics
+
+    metrics = init_metrics(None)
+    collector = S2Collector(base_url=base_url, min_backoff_s=0.1, max_backoff_s=5)
+    rng = random.Random(0)
+    start = time.perf_counter()
+    related = 0
+    for _ in range(n):
+        doi = graph.doi(rng.randrange(graph.n_papers))
+        related += len(collector.get_related_papers(doi))
+    elapsed = time.perf_counter() - start
+    return {
+        "papers": n,
+        "related": related,
+        "seconds": round(elapsed, 3),
+        "papers_per_s": round(n / elapsed, 1),
+        "requests": metrics.counters["s2.requests"],
+        "retries": metrics.counters["s2.retries"],
+        "backoff_s": round(metrics.counters["s2.backoff_s"], 3),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--papers", type=int, default=100_000)
+    parser.add_argument("--refs-per-paper", type=int, default=10)
+    parser.add_argument("--skew", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate-limit", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--error-burst", type=float, default=0.0)
+    parser.add_argument("--burst-length", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--truncate", type=float, default=0.0)
+    parser.add_argument(
+        "--exercise",
+        type=int,
+        metavar="N",
+        help="起動後に N 件の論文を S2Collector で取得して結果を表示し、終了する",
+    )
+    parser.add_argument(
+        "--write-bulk",
+        type=Path,
+        metavar="DIR",
+        help="サーバーを起動せず、S2AG のバルクデータ形式のシャードを書き出す",
+    )
+    parser.add_argument("--shards", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    graph = SyntheticGraph(
+        args.papers,
+        refs_per_paper=args.refs_per_paper,
+        skew=args.skew,
+        seed=args.seed,
+    )
+    print(
+        f"Generated {graph.n_papers} papers and {len(graph.ref_indices)} citations "
+        f"in {time.perf_counter() - start:.1f} s "
+        f"(max citations {graph.citation_counts.max()})"
+    )
+    if args.write_bulk:
+        shards = write_bulk_shards(graph, args.write_bulk, n_shards=args.shards)
+        print(
+            f"Wrote {sum(len(v) for v in shards.values())} shards to {args.write_bulk}"
+        )
+        return 0
+
+    faults = FaultConfig(
+        rate_limit=args.rate_limit,
+        retry_after_s=args.retry_after,
+        error_burst=args.error_burst,
+        burst_length=args.burst_length,
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        truncate=args.truncate,
+    )
+    server = MockS2Server(graph, faults, host=args.host, port=args.port)
+    print(f"Serving at {server.base_url}")
+
+    if args.exercise:
+        server.start()
+        try:
+            print(json.dumps(exercise(server.base_url, graph, args.exercise)))
+            print(f"Server responses: {dict(server.stats)}")
+        finally:
+            server.shutdown()
+            server.server_close()
+        return 0
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Server responses: {dict(server.stats)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
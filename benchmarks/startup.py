@@ -0,0 +1,102 @@
+"""CLI とダッシュボード各ビューの起動時間を `python -X importtime` で計測する
+
+使い方:
+    uv run python -m benchmarks.startup
+"""
+
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# 各エントリーポイントが起動時に読み込むモジュール。
+# ダッシュボードは streamlit 本体を除いた、アプリ側の依存のみを対象とする。
+STARTUP_TARGETS: dict[str, list[str]] = {
+    "cli": ["main"],
+    "dashboard_config": [
+        "src.models.models",
+        "src.utils.constants",
+        "src.utils.io_utils",
+    ],
+    "dashboard_results": [
+        "src.models.models",
+        "src.utils.constants",
+        "src.utils.io_utils",
+        "src.core.results",
+        "pandas",
+    ],
+}
+
+# 起動時間の許容上限 (ミリ秒)。-X importtime の self 時間の合計で判定する。
+STARTUP_BUDGETS_MS: dict[str, float] = {
+    "cli": 600.0,
+    "dashboard_config": 500.0,
+    "dashboard_results": 2000.0,
+}
+
+# 起動時に読み込まれてはならない重い依存 (初回使用時まで遅延させる)
+FORBIDDEN_AT_STARTUP: dict[str, list[str]] = {
+    "cli": ["pandas", "google.genai", "arxiv", "tqdm", "requests"],
+    "dashboard_config": ["pandas", "google.genai", "arxiv", "tqdm", "requests"],
+    "dashboard_results": ["google.genai", "arxiv"],
+}
+
+
+@dataclass
+class StartupReport:
+    target: str
+    total_ms: float
+    modules: dict[str, float] = field(default_factory=dict)
+
+    def slowest(self, n: int = 10) -> list[tuple[str, float]]:
+        """self 時間の大きいモジュールを返す"""
+        return sorted(self.modules.items(), key=lambda x: x[1], reverse=True)[:n]
+
+
+def parse_importtime(stderr: str) -> dict[str, float]:
+    """-X importtime の出力をモジュール名 -> self 時間 (ms) の辞書に変換する"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:") :].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            # ヘッダー行 ("self [us] | cumulative | imported package") を除外
+            continue
+        modules[parts[2].strip()] = int(parts[0]) / 1000
+    return modules
+
+
+def measure_startup(target: str) -> StartupReport:
+    """新しいインタプリタでターゲットのモジュールを読み込み、起動時間を計測する"""
+    statements = "; ".join(f"import {m}" for m in STARTUP_TARGETS[target])
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statements],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = parse_importtime(proc.stderr)
+    return StartupReport(target=target, total_ms=sum(modules.values()), modules=modules)
+
+
+def main() -> int:
+    over_budget = False
+    for target in STARTUP_TARGETS:
+        report = measure_startup(target)
+        budget = STARTUP_BUDGETS_MS[target]
+        status = "OK" if report.total_ms <= budget else "OVER BUDGET"
+        over_budget |= report.total_ms > budget
+        print(
+            f"{target:<20} {report.total_ms:8.1f} ms (budget {budget:.0f} ms) {status}"
+        )
+        for name, ms in report.slowest(5):
+            print(f"    {ms:8.1f} ms  {name}")
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,39 +1,289 @@
+import argparse
+import json
 import logging
 import os
 import sys
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-import pandas as pd
-
+from src.core.batch import BatchScreener
 from src.core.collector import S2Collector
+from src.core.scopes import snowball_scores
 from src.core.screener import PaperScreener
+from src.core.sharding import ShardedScreener
+from src.core.usage import (
+    summarize_cascade,
+    summarize_prompts,
+    summarize_usage,
+    top_cost_papers,
+)
+from src.models.models import Config
+from src.utils.cassette import CASSETTE_FILE_NAME, get_cassette, init_cassette
 from src.utils.constants import APP_LOGGER_NAME
-from src.utils.io_utils import create_run_directory, load_config
-from src.utils.logging_config import setup_logging
+from src.utils.events import EVENTS_FILE_NAME, EventLogHandler, init_events
+from src.utils.io_utils import (
+    create_run_directory,
+    load_config,
+    load_run_state,
+    save_config,
+    save_run_state,
+)
+from src.utils.logging_config import add_log_handler, setup_logging
+from src.utils.metrics import get_metrics, init_metrics
+
+if TYPE_CHECKING:
+    from src.core.refresh import RefreshBaseline
 
 logger = logging.getLogger(f"{APP_LOGGER_NAME}.main")
 
+# --resume で未判定の論文から再開できる実行状態 (run_state.json の status)
+RESUMABLE_STATUSES = {"budget_exhausted", "batch_running"}
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Review paper pipeline")
+    parser.add_argument(
+        "--resume",
+        type=Path,
+        metavar="RUN_DIR",
+        help="予算超過などで中断した実行ディレクトリから再開する",
+    )
+    parser.add_argument(
+        "--refresh",
+        type=Path,
+        metavar="RUN_DIR",
+        help="前回の実行以降に出版・引用された論文のみを判定し、最終結果を更新する",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="実行せずに API 呼び出し数・トークン数・所要時間を見積もる",
+    )
+    parser.add_argument(
+        "--events-file",
+        type=Path,
+        metavar="PATH",
+        help="進捗イベントの出力先 (既定: <実行ディレクトリ>/events.jsonl)",
+    )
+    parser.add_argument(
+        "--search",
+        metavar="QUERY",
+        help="過去にスクリーニングした論文を全文検索する (BM25)",
+    )
+    parser.add_argument("--limit", type=int, default=20, help="--search で表示する件数")
+    parser.add_argument(
+        "--extract",
+        type=Path,
+        metavar="RUN_DIR",
+        help="実行済みの最終結果から構造化抽出のみを行う (中断した抽出の再開にも使う)",
+    )
+    parser.add_argument(
+        "--record",
+        action="store_true",
+        help="S2・ArXiv・Gemini との通信を実行ディレクトリの cassette.jsonl に記録する",
+    )
+    parser.add_argument(
+        "--replay",
+        type=Path,
+        metavar="CASSETTE",
+        help="記録した通信 (cassette.jsonl または実行ディレクトリ) を再生して実行する",
+    )
+    parser.add_argument(
+        "--replay-speed",
+        type=float,
+        default=1.0,
+        metavar="X",
+        help="再生速度の倍率 (既定: 1 = 記録時と同じ、0 = 待たずに応答する)",
+    )
+    return parser.parse_args(argv)
+
+
+def load_resumable_state(run_dir: Path) -> dict | None:
+    """--resume で再開できる実行状態 (再開できない場合はエラーを記録して None)
+
+    予算超過・バッチジョブの完了待ちで停止し、未判定の論文を残した実行のみ
+    再開できる。完了した実行等を同じディレクトリでやり直すと、結果を上書きし
+    LLM の費用も再び掛かるため実行しない。
+    """
+    state = load_run_state(run_dir)
+    status = (state or {}).get("status")
+    if status in RESUMABLE_STATUSES and "pending_file" in state:
+        return state
+    logger.error(
+        f"Cannot resume {run_dir}: run status is {status or 'missing'}, "
+        f"expected one of {sorted(RESUMABLE_STATUSES)}. "
+        "Start a new run instead."
+    )
+    return None
+
+
+def make_collector(config: Config) -> S2Collector:
+    """設定に応じて S2 の API、またはバルクデータのストアから収集する Collector"""
+    criteria = config.search_criteria
+    if criteria.s2_store:
+        from src.core.s2_store import OfflineS2Collector
+
+        return OfflineS2Collector(Path(criteria.s2_store))
+    return S2Collector(max_retries=criteria.max_retries)
+
+
+def dry_run(config: Config) -> int:
+    """実行計画を見積もって表示する。予算を超える場合は終了コード 2 を返す"""
+    from src.core.planner import RunPlanner, format_plan, load_history
+
+    collector = make_collector(config)
+    history = load_history(project_name=config.project_name)
+    plan = RunPlanner(collector, history=history).plan(config)
+    print(f"Dry run for project: {config.project_name}")
+    print(format_plan(plan))
+    return 2 if plan.over_budget else 0
+
+
+def search(query: str, limit: int) -> int:
+    """全実行のスクリーニング済み論文を検索して表示する"""
+    from src.core.catalog import RunCatalog
+    from src.core.search import SearchIndex, format_hits
+
+    catalog = RunCatalog()
+    catalog.sync()
+    index = SearchIndex()
+    index.sync([Path(r.run_dir) for r in catalog.list_runs()])
+    print(format_hits(index.search(query, limit=limit)))
+    return 0
+
+
+def main(argv: list[str] | None = None):
+    args = parse_args(argv)
+
+    if args.dry_run:
+        return dry_run(load_config())
+    if args.search:
+        return search(args.search, args.limit)
 
-def main():
     # 1. 初期設定
-    config = load_config()
-    run_dir = create_run_directory(config.project_name)
-    setup_logging(run_dir, level=config.logging.level)
+    baseline_dir = None
+    if args.resume or args.extract:
+        run_dir = args.resume or args.extract
+        config = load_config(run_dir / "config.yml")
+        if args.resume:
+            # 差分更新の実行を再開する場合は、同じ前回の実行を起点にする
+            previous_run = (load_run_state(run_dir) or {}).get("previous_run")
+            baseline_dir = Path(previous_run) if previous_run else None
+    elif args.refresh:
+        # 前回と同じ探索条件で差分を判定する
+        baseline_dir = args.refresh
+        config = load_config(baseline_dir / "config.yml")
+        run_dir = create_run_directory(config.project_name)
+        save_config(config, run_dir / "config.yml")
+    else:
+        config = load_config()
+        run_dir = create_run_directory(config.project_name)
+    setup_logging(
+        run_dir,
+        level=config.logging.level,
+        fmt=config.logging.format,
+        run_id=run_dir.name,
+        debug_interval_s=config.logging.debug_interval_s,
+    )
 
     logger.info(f"Starting pipeline for project: {config.project_name}")
     logger.info(f"Data will be saved in: {run_dir}")
+    if args.resume and load_resumable_state(run_dir) is None:
+        return 1
 
     # ~/.env から Gemini API Key を読み込む
     from dotenv import load_dotenv
 
     env_path = Path.home() / ".env"
     load_dotenv(dotenv_path=env_path)
-    google_key = os.getenv("GOOGLE_API_KEY") or ""
+    # カンマ区切りで複数のキーを指定でき、シャード並列時はワーカーに分配される
+    google_keys = [
+        k.strip() for k in (os.getenv("GOOGLE_API_KEY") or "").split(",") if k.strip()
+    ]
+
+    if args.replay:
+        cassette_path = args.replay
+        if cassette_path.is_dir():
+            cassette_path = cassette_path / CASSETTE_FILE_NAME
+        init_cassette(cassette_path, mode="replay", speed=args.replay_speed)
+        # 再生時は API に接続しないため、キーがなくても実行できる
+        google_keys = google_keys or ["replay"]
+    elif args.record:
+        init_cassette(run_dir / CASSETTE_FILE_NAME, mode="record")
+    if config.llm_settings.backend.type != "gemini":
+        # ローカル・フェイクのバックエンドは Gemini のキーを使わない
+        google_keys = google_keys or ["unused"]
 
-    if not google_key:
+    if not google_keys:
         logger.error("GOOGLE_API_KEY is missing. Please set it in ~/.env")
         return
 
+    if args.extract:
+        run_extraction(config, run_dir, google_keys[0])
+        return 0
+
+    metrics = init_metrics(run_dir, profile_stages=config.logging.profile_stages)
+    events = init_events(args.events_file or run_dir / EVENTS_FILE_NAME)
+    metrics.add_listener(events.on_span)
+    add_log_handler(EventLogHandler(events))
+    events.emit(
+        "run_start",
+        project=config.project_name,
+        run_dir=str(run_dir),
+        iterations=config.search_criteria.iterations,
+    )
+
+    status = "failed"
+    exit_code = 1
+    try:
+        with metrics.span("pipeline", project=config.project_name):
+            baseline = None
+            if baseline_dir:
+                from src.core.refresh import load_baseline
+
+                baseline = load_baseline(baseline_dir, config)
+            exit_code = run_pipeline(
+                config,
+                run_dir,
+                google_keys,
+                resume=bool(args.resume),
+                baseline=baseline,
+            )
+        status = (load_run_state(run_dir) or {}).get("status", "completed")
+    finally:
+        precompute_citation_layout(run_dir)
+        metrics.write_summary()
+        record_in_catalog(run_dir, config)
+        index_for_search(run_dir)
+        precompute_run_diff(run_dir, config)
+        events.emit("run_end", status=status)
+    return exit_code
+
+
+def run_pipeline(
+    config: Config,
+    run_dir: Path,
+    google_keys: list[str],
+    resume: bool = False,
+    baseline: "RefreshBaseline | None" = None,
+) -> int:
+    """収集・スクリーニング・スノーボールを繰り返し、最終結果を保存する
+
+    baseline を指定すると差分更新となり、前回の実行以降の候補のみを判定して
+    前回の最終結果に統合する。resume で再開できる状態がない場合は何もせずに
+    1 を返す。
+    """
+    import pandas as pd
+
+    from src.core.refresh import collect_delta, merge_final, save_refresh_info
+
+    metrics = get_metrics()
+
+    # 予算超過等で中断したイテレーションの未判定論文から再開する
+    state = load_resumable_state(run_dir) if resume else None
+    if resume and state is None:
+        return 1
+
     # --- Iterative Pipeline ---
     all_papers_df = pd.DataFrame()
     processed_dois = set()
@@ -41,89 +291,294 @@ def main():
     # 1. Initial Collection
     keywords = config.search_criteria.keywords
     nl_query = config.search_criteria.natural_language_query or " ".join(keywords)
-    logger.info(f"Initial search for keywords: {keywords}")
 
-    collector = S2Collector(max_retries=config.search_criteria.max_retries)
-    screener = PaperScreener(
-        api_key=google_key,
-        model_name=config.llm_settings.model_screening,
-        max_workers=config.llm_settings.max_screening_workers,
-    )
+    collector = make_collector(config)
+    llm = config.llm_settings
+    # LLM バックエンドと2段階スクリーニングの設定 (cascade が無効なら後者は空)
+    screener_options: dict = {
+        "backend": llm.backend,
+        "max_abstract_tokens": llm.max_abstract_tokens,
+    }
+    if llm.cascade:
+        screener_options.update(
+            triage_model=llm.model_triage,
+            threshold=config.search_criteria.screening_threshold,
+            cascade_margin=llm.cascade_margin,
+        )
+    if llm.active_learning.enabled:
+        screener_options.update(
+            active_learning=llm.active_learning,
+            threshold=config.search_criteria.screening_threshold,
+        )
+    use_batch = llm.batch.enabled
+    if use_batch and get_cassette() is not None:
+        # Batch API の呼び出しはカセットに記録しないため、記録・再生時は逐次判定する
+        logger.warning("Batch screening is disabled while recording or replaying.")
+        use_batch = False
+    if use_batch and llm.backend.type != "gemini":
+        # Batch API は Gemini のみのため、他のバックエンドでは論文ごとに判定する
+        logger.warning(
+            "Batch screening requires the gemini backend; screening with the "
+            f"{llm.backend.type} backend instead."
+        )
+        use_batch = False
+    use_shards = config.llm_settings.screening_processes > 1
+    if use_shards and get_cassette() is not None:
+        # カセットはプロセス内で共有するため、記録・再生時は単一プロセスで判定する
+        logger.warning("Sharded screening is disabled while recording or replaying.")
+        use_shards = False
+    if use_batch:
+        if llm.cascade:
+            logger.warning("Cascade screening is not applied in batch mode.")
+        if llm.active_learning.enabled:
+            logger.warning("Active learning is not applied in batch mode.")
+        screener = BatchScreener(
+            api_key=google_keys[0],
+            model_name=llm.model_screening,
+            work_dir=run_dir / "interim" / "batch",
+            poll_interval_s=llm.batch.poll_interval_s,
+            base_url=llm.batch.base_url,
+            budget=config.budget,
+            max_abstract_tokens=llm.max_abstract_tokens,
+        )
+    elif use_shards:
+        if screener_options.pop("active_learning", None) is not None:
+            # 分類器はプロセスごとに学習が分かれるため、シャード並列では使わない
+            logger.warning("Active learning is not applied to sharded screening.")
+        screener = ShardedScreener(
+            api_keys=google_keys,
+            model_name=config.llm_settings.model_screening,
+            work_dir=run_dir / "interim" / "shards",
+            num_processes=config.llm_settings.screening_processes,
+            shard_size=config.llm_settings.screening_shard_size,
+            max_workers=config.llm_settings.max_screening_workers,
+            log_dir=run_dir,
+            log_level=config.logging.level,
+            log_format=config.logging.format,
+            budget=config.budget,
+            screener_options=screener_options,
+        )
+    else:
+        screener = PaperScreener(
+            api_key=google_keys[0],
+            model_name=config.llm_settings.model_screening,
+            max_workers=config.llm_settings.max_screening_workers,
+            budget=config.budget,
+            **screener_options,
+        )
 
     # イテレーション管理
     next_candidates = []  # 次回の検索候補（raw dict list）
+    start_iteration = 1
+    resumed_df = None  # 再開時に判定する未処理の論文
 
-    # 初回候補の取得
-    next_candidates = collector.collect_initial(
-        keywords=keywords,
-        seed_dois=config.search_criteria.seed_paper_dois,
-        limit=config.search_criteria.keyword_search_limit,
-    )
-
-    for i in range(config.search_criteria.iterations):
-        iteration_num = i + 1
+    if state:
+        # 予算超過で中断したイテレーションの未判定論文から再開する
+        start_iteration = state["iteration"]
+        interim_csv_path = run_dir / "interim" / "screened_papers_cumulative.csv"
+        if interim_csv_path.exists():
+            all_papers_df = pd.read_csv(interim_csv_path)
+            processed_dois = set(all_papers_df["doi"].dropna().unique())
+        if baseline is not None:
+            processed_dois |= baseline.known_dois
+        resumed_df = pd.read_pickle(run_dir / "interim" / state["pending_file"])
+        learner = getattr(screener, "learner", None)
+        if learner is not None and not all_papers_df.empty:
+            # 中断前の判定結果から分類器を学習し直す
+            learner.observe_frame(all_papers_df)
         logger.info(
-            f"--- Iteration {iteration_num}/{config.search_criteria.iterations} ---"
+            f"Resuming iteration {start_iteration} with "
+            f"{len(resumed_df)} unscreened papers"
         )
+    else:
+        if baseline is not None:
+            # 差分更新: 判定済みの論文を除き、前回以降の新しい候補のみを集める
+            logger.info(f"Refreshing {baseline.run_dir} since {baseline.since}")
+            processed_dois = set(baseline.known_dois)
+            next_candidates = collect_delta(collector, config, baseline)
+            save_citation_edges(run_dir, collector.pop_citation_edges())
+        else:
+            logger.info(f"Initial search for keywords: {keywords}")
 
-        # 処理 & フィルタリング
-        df_new = collector.process_papers(
-            papers=next_candidates,
-            exclude_dois=processed_dois,
-            min_citations=config.search_criteria.min_citations,
-            year_range=config.search_criteria.year_range,
-        )
+            # 初回候補の取得
+            with metrics.span("collect_initial") as span:
+                next_candidates = collector.collect_initial(
+                    keywords=keywords,
+                    seed_dois=config.search_criteria.seed_paper_dois,
+                    limit=config.search_criteria.keyword_search_limit,
+                )
+                span.set(rows_out=len(next_candidates))
+
+    usage_by_iteration = []
+    budget_exhausted = False
+    # 差分更新の実行を再開できるよう、起点とした実行を状態に残す
+    refresh_state = {"previous_run": str(baseline.run_dir)} if baseline else {}
 
-        if df_new.empty:
-            logger.info("No new papers to screen in this iteration.")
-            break
+    try:
+        for iteration_num in range(
+            start_iteration, config.search_criteria.iterations + 1
+        ):
+            logger.info(
+                f"--- Iteration {iteration_num}/{config.search_criteria.iterations} ---"
+            )
 
-        # --- Save Raw Data (Iterative) ---
-        raw_csv_path = run_dir / "raw" / f"collected_papers_iter_{iteration_num}.csv"
-        df_new.to_csv(raw_csv_path, index=False, encoding="utf-8-sig")
-        logger.info(f"Saved raw papers for iteration {iteration_num} to {raw_csv_path}")
+            if resumed_df is not None:
+                df_new, resumed_df = resumed_df, None
+            else:
+                # 処理 & フィルタリング
+                with metrics.span(
+                    "process_papers",
+                    iteration=iteration_num,
+                    rows_in=len(next_candidates),
+                ) as span:
+                    df_new = collector.process_papers(
+                        papers=next_candidates,
+                        exclude_dois=processed_dois,
+                        min_citations=config.search_criteria.min_citations,
+                        year_range=config.search_criteria.year_range,
+                    )
+                    span.set(rows_out=len(df_new))
 
-        # 2. Scoring & Summarization
-        logger.info(f"Scoring {len(df_new)} new papers...")
-        df_scored = screener.screen_papers(df_new, nl_query)
+                if df_new.empty:
+                    logger.info("No new papers to screen in this iteration.")
+                    break
 
-        # 既読リスト更新
-        new_dois = set(df_scored["doi"].dropna().unique())
-        processed_dois.update(new_dois)
+                df_new["iteration"] = iteration_num
 
-        # 全体リストに結合
-        all_papers_df = pd.concat([all_papers_df, df_scored], ignore_index=True)
+                # --- Save Raw Data (Iterative) ---
+                raw_csv_path = (
+                    run_dir / "raw" / f"collected_papers_iter_{iteration_num}.csv"
+                )
+                df_new.to_csv(raw_csv_path, index=False, encoding="utf-8-sig")
+                logger.info(
+                    f"Saved raw papers for iteration {iteration_num} to {raw_csv_path}"
+                )
 
-        # --- Save Interim Data (Cumulative) ---
-        interim_csv_path = run_dir / "interim" / "screened_papers_cumulative.csv"
-        all_papers_df.to_csv(interim_csv_path, index=False, encoding="utf-8-sig")
-        logger.info(f"Saved cumulative screened papers to {interim_csv_path}")
-
-        # 3. Snowball Search (Next iteration seeds)
-        if iteration_num < config.search_criteria.iterations:
-            top_n = config.search_criteria.top_n_for_snowball
-            logger.info(f"Collecting snowball candidates from top {top_n} papers...")
-            next_candidates = collector.get_snowball_candidates(
-                df_scored,
-                top_n,
-                related_limit=config.search_criteria.max_related_papers,
-                threshold=config.search_criteria.screening_threshold,
-            )
+            # 2. Scoring & Summarization
+            if use_batch:
+                # ジョブの完了前に終了しても --resume で同じジョブの結果を
+                # 取り込めるよう、判定する論文を再開用の状態として保存しておく
+                pending_file = f"pending_papers_iter_{iteration_num}.pkl"
+                df_new.to_pickle(run_dir / "interim" / pending_file)
+                save_run_state(
+                    run_dir,
+                    {
+                        "status": "batch_running",
+                        "iteration": iteration_num,
+                        "pending_file": pending_file,
+                        **refresh_state,
+                    },
+                )
+            logger.info(f"Scoring {len(df_new)} new papers...")
+            df_scored = screener.screen_papers(df_new, nl_query)
+
+            # 既読リスト更新
+            new_dois = set(df_scored["doi"].dropna().unique())
+            processed_dois.update(new_dois)
+
+            # 全体リストに結合
+            all_papers_df = pd.concat([all_papers_df, df_scored], ignore_index=True)
+
+            # --- Save Interim Data (Cumulative) ---
+            interim_csv_path = run_dir / "interim" / "screened_papers_cumulative.csv"
+            all_papers_df.to_csv(interim_csv_path, index=False, encoding="utf-8-sig")
+            logger.info(f"Saved cumulative screened papers to {interim_csv_path}")
+
+            # --- Save LLM Usage (Per Iteration) ---
+            usage = summarize_usage(df_scored, config.budget)
+            usage_by_iteration.append({"iteration": iteration_num, **usage})
+            save_usage_by_iteration(run_dir, usage_by_iteration)
             logger.info(
-                f"Found {len(next_candidates)} potential papers for next iteration."
+                f"Iteration {iteration_num} LLM usage: {usage['total_tokens']} tokens, "
+                f"${usage['cost_usd']:.4f}"
             )
-        else:
-            next_candidates = []  # Loop ends
 
-    if all_papers_df.empty:
+            # --- Budget Check ---
+            pending_df = screener.pending_df
+            if pending_df is not None and not pending_df.empty:
+                pending_file = f"pending_papers_iter_{iteration_num}.pkl"
+                pending_df.to_pickle(run_dir / "interim" / pending_file)
+                save_run_state(
+                    run_dir,
+                    {
+                        "status": "budget_exhausted",
+                        "iteration": iteration_num,
+                        "pending_file": pending_file,
+                        **refresh_state,
+                    },
+                )
+                logger.warning(
+                    f"Stopped screening at iteration {iteration_num} because the LLM "
+                    f"budget was reached. Resume with: "
+                    f"uv run main.py --resume {run_dir}"
+                )
+                budget_exhausted = True
+                break
+
+            # 3. Snowball Search (Next iteration seeds)
+            if iteration_num < config.search_criteria.iterations:
+                top_n = config.search_criteria.top_n_for_snowball
+                # 再開したイテレーションでも、中断前に判定した論文をシードの対象に含める
+                df_iteration = all_papers_df[
+                    all_papers_df["iteration"] == iteration_num
+                ]
+                criteria = config.search_criteria
+                if (
+                    isinstance(criteria.natural_language_query, list)
+                    and criteria.snowball_scope_mode == "per_scope"
+                ):
+                    # スコープごとのしきい値を満たす論文をシードに含める
+                    df_iteration = df_iteration.assign(
+                        relevance_score=snowball_scores(
+                            df_iteration,
+                            criteria.natural_language_query,
+                            criteria.screening_threshold,
+                        )
+                    )
+                logger.info(
+                    f"Collecting snowball candidates from top {top_n} papers..."
+                )
+                with metrics.span(
+                    "snowball", iteration=iteration_num, rows_in=len(df_iteration)
+                ) as span:
+                    next_candidates = collector.get_snowball_candidates(
+                        df_iteration,
+                        top_n,
+                        related_limit=config.search_criteria.max_related_papers,
+                        threshold=config.search_criteria.screening_threshold,
+                    )
+                    span.set(rows_out=len(next_candidates))
+                save_citation_edges(run_dir, collector.pop_citation_edges())
+                logger.info(
+                    f"Found {len(next_candidates)} potential papers for next iteration."
+                )
+            else:
+                next_candidates = []  # Loop ends
+    finally:
+        # 判定が終わったら、バックエンドが作ったコンテキストキャッシュ等を解放する
+        screener.close()
+
+    if not budget_exhausted:
+        save_run_state(run_dir, {"status": "completed", **refresh_state})
+
+    if all_papers_df.empty and baseline is None:
         logger.warning("No papers collected throughout iterations. Exiting.")
-        return
+        return 0
 
     # 4. Sorting and Saving
-    # 同一論文が複数イテレーションで現れる可能性（スコアが変わる可能性）を考慮し、最高スコアを残す
-    final_df = all_papers_df.sort_values(
-        by="relevance_score", ascending=False
-    ).drop_duplicates(subset=["doi"])
+    if baseline is not None:
+        # 差分更新: 前回の最終結果に今回判定した論文を統合した新しい版を保存する
+        final_df = merge_final(baseline, all_papers_df)
+        info = save_refresh_info(run_dir, baseline, all_papers_df, len(final_df))
+        logger.info(
+            f"Refresh v{info['version']}: screened {info['papers_screened']} new "
+            f"papers, {info['papers_total']} papers in total."
+        )
+    else:
+        # 同一論文が複数イテレーションで現れる可能性（スコアが変わる可能性）を考慮し、最高スコアを残す
+        final_df = all_papers_df.sort_values(
+            by="relevance_score", ascending=False
+        ).drop_duplicates(subset=["doi"])
 
     # --- Saving Final Results ---
     final_data_csv = run_dir / "final" / "final_review_matrix.csv"
@@ -131,12 +586,200 @@ def main():
 
     # 関連度スコアでソートして保存
     final_df.to_csv(final_data_csv, index=False, encoding="utf-8-sig")
+    if not all_papers_df.empty:
+        learner = getattr(screener, "learner", None)
+        save_usage_summary(
+            run_dir,
+            all_papers_df,
+            config,
+            partial=budget_exhausted,
+            active_learning=learner.report() if learner is not None else None,
+        )
     logger.info(f"Process complete! Saved {len(final_df)} papers.")
 
+    # 5. Full Text (Optional)
+    if config.fulltext.enabled:
+        run_fulltext(config, run_dir)
+
+    # 6. Structured Extraction (Phase 3)
+    if config.extraction.enabled:
+        run_extraction(config, run_dir, google_keys[0])
+    return 0
+
+
+def run_fulltext(config: Config, run_dir: Path) -> None:
+    """しきい値以上の論文のオープンアクセス PDF を取得し、本文を抽出する
+
+    PDF と本文は data/pdf_store/ に内容のハッシュで保存し、最終結果には
+    pdf_sha256 列として記録する。
+    """
+    import pandas as pd
+
+    from src.core.fulltext import FullTextFetcher
+
+    final_data_csv = run_dir / "final" / "final_review_matrix.csv"
+    final_df = pd.read_csv(final_data_csv)
+    target = final_df["relevance_score"] >= config.search_criteria.screening_threshold
+
+    fetcher = FullTextFetcher(config.fulltext)
+    digests = fetcher.fetch(final_df[target])
+    fetcher.extract_texts(list(digests.values()))
+    final_df["pdf_sha256"] = final_df["doi"].map(digests)
+    final_df.to_csv(final_data_csv, index=False, encoding="utf-8-sig")
+    logger.info(f"Stored PDFs for {len(digests)} of {target.sum()} papers.")
+
+
+def run_extraction(config: Config, run_dir: Path, api_key: str) -> None:
+    """しきい値以上の論文から手法・結果などを抽出し、最終結果の列に追加する
+
+    抽出結果はキャッシュされるため、中断後に再実行すると未抽出の論文のみを処理する。
+    """
+    import pandas as pd
+
+    from src.core.extractor import PaperExtractor
+
+    final_data_csv = run_dir / "final" / "final_review_matrix.csv"
+    final_df = pd.read_csv(final_data_csv)
+    settings = config.extraction
+    threshold = config.search_criteria.screening_threshold
+    target = final_df["relevance_score"] >= threshold
+    logger.info(f"Extracting structured fields for {target.sum()} papers...")
+
+    extractor = PaperExtractor(
+        api_key=api_key,
+        model_name=settings.model or config.llm_settings.model_screening,
+        settings=settings,
+        budget=config.budget,
+        backend=config.llm_settings.backend,
+    )
+    extracted = extractor.extract_papers(final_df[target])
+    fields = list(settings.fields)
+    final_df = final_df.drop(columns=fields, errors="ignore")
+    final_df = pd.concat(
+        [final_df, extracted[fields].set_axis(final_df.index[target])], axis=1
+    )
+    final_df.to_csv(final_data_csv, index=False, encoding="utf-8-sig")
+    logger.info(
+        f"Extraction LLM usage: {extractor.usage.total_tokens} tokens, "
+        f"${extractor.usage.cost_usd:.4f}"
+    )
+
+
+def save_citation_edges(run_dir: Path, edges: list[tuple[str, str]]) -> None:
+    """スノーボールで得た引用関係を interim/citation_edges.csv に追記する"""
+    from src.core.graph import append_edges
+
+    append_edges(run_dir, edges)
+
+
+def record_in_catalog(run_dir: Path, config: Config) -> None:
+    """実行の概要を実行カタログに登録する (失敗しても実行結果には影響させない)"""
+    from src.core.catalog import RunCatalog, build_run_record
+
+    try:
+        RunCatalog().record(build_run_record(run_dir, config))
+    except Exception as e:
+        logger.warning(f"Failed to record run in catalog: {e}")
+
+
+def index_for_search(run_dir: Path) -> None:
+    """実行の最終結果を全文検索インデックスに追加する"""
+    from src.core.search import SearchIndex
+
+    try:
+        SearchIndex().add_run(run_dir, force=True)
+    except Exception as e:
+        logger.warning(f"Failed to add run to search index: {e}")
+
+
+def precompute_run_diff(run_dir: Path, config: Config) -> None:
+    """同じプロジェクトの直前の実行との差分を計算し、キャッシュしておく"""
+    from src.core.catalog import RunCatalog
+    from src.core.diff import precompute_diff_with_previous
+
+    try:
+        records = RunCatalog().list_runs(project=config.project_name)
+        precompute_diff_with_previous(run_dir, [Path(r.run_dir) for r in records])
+    except Exception as e:
+        logger.warning(f"Failed to precompute diff with the previous run: {e}")
+
+
+def precompute_citation_layout(run_dir: Path) -> None:
+    """引用ネットワークのレイアウトを計算し、キャッシュしておく"""
+    from src.core.graph import load_citation_graph
+
+    try:
+        with get_metrics().span("citation_layout"):
+            load_citation_graph(run_dir)
+    except Exception as e:
+        logger.warning(f"Failed to precompute citation layout: {e}")
+
+
+def save_usage_by_iteration(run_dir: Path, usage_by_iteration: list[dict]) -> None:
+    """イテレーションごとの LLM 使用量を interim/llm_usage.csv に保存する"""
+    import pandas as pd
+
+    path = run_dir / "interim" / "llm_usage.csv"
+    new_df = pd.DataFrame(usage_by_iteration)
+    if path.exists():
+        # 再開時は中断前のイテレーションの記録を残す
+        old_df = pd.read_csv(path)
+        old_df = old_df[~old_df["iteration"].isin(new_df["iteration"])]
+        new_df = pd.concat([old_df, new_df], ignore_index=True)
+    new_df.to_csv(path, index=False, encoding="utf-8-sig")
+
+
+def save_usage_summary(
+    run_dir: Path,
+    all_papers_df,
+    config: Config,
+    partial: bool,
+    active_learning: dict | None = None,
+) -> None:
+    """実行全体の LLM 使用量と高コストの論文を final/llm_usage_summary.json に保存
+
+    active_learning には分類器の報告 (ActiveLearner.report) を渡す。
+    """
+    summary = {
+        "partial": partial,
+        "total": summarize_usage(all_papers_df, config.budget),
+        "budget": config.budget.model_dump(),
+        "top_cost_papers": top_cost_papers(all_papers_df),
+    }
+    cascade = summarize_cascade(all_papers_df, config.budget)
+    if cascade is not None:
+        summary["cascade"] = cascade
+    prompts = summarize_prompts(all_papers_df)
+    if prompts is not None:
+        summary["prompts"] = prompts
+        logger.info(
+            f"Prompt size: mean ~{prompts['prompt_est_tokens_mean']} tokens "
+            f"(p95 {prompts['prompt_est_tokens_p95']}), "
+            f"{prompts['truncated_papers']} abstracts truncated "
+            f"(-{prompts['truncated_tokens']} tokens), "
+            f"{prompts['cached_tokens']} tokens served from cache"
+        )
+    if active_learning is not None:
+        summary["active_learning"] = active_learning
+        logger.info(
+            f"Active learning: {active_learning['calls_avoided']} LLM calls avoided, "
+            f"estimated recall loss {active_learning['estimated_recall_loss']:.1%} "
+            f"(~{active_learning['estimated_missed_positives']} relevant papers)"
+        )
+    path = run_dir / "final" / "llm_usage_summary.json"
+    path.write_text(
+        json.dumps(summary, ensure_ascii=False, indent=2, default=str),
+        encoding="utf-8",
+    )
+    logger.info(
+        f"Total LLM usage: {summary['total']['total_tokens']} tokens, "
+        f"${summary['total']['cost_usd']:.4f}"
+    )
+
 
 if __name__ == "__main__":
     try:
-        main()
+        sys.exit(main())
     except Exception as e:
         logger.exception(f"Fatal error during pipeline execution: {e}")
         sys.exit(1)
@@ -0,0 +1,267 @@
+"""LLM の判定結果から学習し、明らかに不採用の論文の LLM 呼び出しを省く分類器
+
+タイトルと抄録の単語・2単語の組をハッシュで固定長の疎ベクトルにし、
+ロジスティック回帰 (AdaGrad) を判定結果が届くたびに1件ずつ更新する。
+ラベルは relevance_score が threshold 以上かどうか。
+
+論文の一部 (holdout_fraction、DOI のハッシュで決める) は常に LLM で判定し、
+学習には使わずに較正に使う。較正用の採用論文のうち target_recall 以上を
+LLM に回せる確率のしきい値を求め、それ未満と予測した論文は LLM を呼ばずに
+不採用とする。較正用の論文は省略の対象にしないため、見積もった再現率の
+低下は偏りのない標本に基づく。
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import zlib
+from typing import TYPE_CHECKING, Any
+
+from src.models.models import ActiveLearningSettings
+from src.utils.constants import APP_LOGGER_NAME
+from src.utils.metrics import get_metrics
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+logger = logging.getLogger(f"{APP_LOGGER_NAME}.active_learning")
+
+SKIPPED_REASON = "Skipped by classifier"
+# LLM の判定ではないため、分類器の学習に使わない結果の理由
+UNLABELED_REASONS = frozenset(
+    {
+        SKIPPED_REASON,
+        "LLM Error occurred",
+        "LLM returned invalid response",
+        "Sharded screening failed",
+    }
+)
+
+_WORD = re.compile(r"\w+")
+
+
+def featurize(
+    title: str, abstract: str, n_features: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """単語と2単語の組のハッシュ (添字) と、対数の出現回数を L2 正規化した値を返す
+
+    タイトルは抄録より重視するため2回数える。
+    """
+    import numpy as np
+
+    words = _WORD.findall(f"{title} {title} {abstract}".lower())
+    tokens = words + [f"{a} {b}" for a, b in zip(words, words[1:], strict=False)]
+    if not tokens:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    hashes = np.fromiter(
+        (zlib.crc32(token.encode("utf-8")) for token in tokens),
+        dtype=np.int64,
+        count=len(tokens),
+    )
+    indices, counts = np.unique(hashes % n_features, return_counts=True)
+    values = 1.0 + np.log(counts)
+    return indices, values / np.linalg.norm(values)
+
+
+class OnlineLogistic:
+    """疎な入力を1件ずつ学習するロジスティック回帰 (AdaGrad・L2 正則化)"""
+
+    def __init__(self, n_features: int, learning_rate: float = 0.5, l2: float = 1e-6):
+        import numpy as np
+
+        self.weights = np.zeros(n_features)
+        self.bias = 0.0
+        self.learning_rate = learning_rate
+        self.l2 = l2
+        self._grad_sq = np.full(n_features, 1e-8)
+        self._bias_grad_sq = 1e-8
+
+    def predict(self, x: tuple[np.ndarray, np.ndarray]) -> float:
+        import numpy as np
+
+        indices, values = x
+        z = float(self.weights[indices] @ values) + self.bias
+        return float(1.0 / (1.0 + np.exp(-np.clip(z, -30, 30))))
+
+    def update(self, x: tuple[np.ndarray, np.ndarray], y: float, weight: float = 1.0):
+        import numpy as np
+
+        indices, values = x
+        error = (self.predict(x) - y) * weight
+        grad = error * values + self.l2 * self.weights[indices]
+        self._grad_sq[indices] += grad**2
+        self.weights[indices] -= (
+            self.learning_rate * grad / np.sqrt(self._grad_sq[indices])
+        )
+        self._bias_grad_sq += error**2
+        self.bias -= self.learning_rate * error / np.sqrt(self._bias_grad_sq)
+
+
+class ActiveLearner:
+    """判定結果から学習し、較正が目標の再現率を満たした後は不採用の予測を省略する
+
+    スクリーニングのワーカースレッドから呼び出されるため、状態の更新は排他する。
+    """
+
+    def __init__(self, settings: ActiveLearningSettings, threshold: int):
+        self.settings = settings
+        self.threshold = threshold
+        self.model = OnlineLogistic(settings.n_features)
+        self._lock = threading.Lock()
+        self._holdout: list[tuple[tuple[np.ndarray, np.ndarray], int]] = []
+        self._seen: set[str] = set()
+        self.n_train = 0
+        self.n_train_positive = 0
+        self._since_calibration = 0
+        # 省略に使う確率のしきい値 (None の間は省略しない)
+        self.skip_below: float | None = None
+        self.holdout_recall: float | None = None
+        # 較正用の論文のうち、しきい値未満と予測した論文の採用率
+        # (省略した論文に含まれる採用論文の割合の見積もり)
+        self._miss_rate = 0.0
+        self.skipped = 0
+
+    def _key(self, row: pd.Series) -> str:
+        doi = row.get("doi")
+        return doi if isinstance(doi, str) and doi else str(row.get("title", ""))
+
+    def is_holdout(self, row: pd.Series) -> bool:
+        """較正用の論文かどうか (常に LLM で判定する)"""
+        bucket = zlib.crc32(f"holdout:{self._key(row)}".encode()) % 10_000
+        return bucket < self.settings.holdout_fraction * 10_000
+
+    def _features(self, row: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+        title = row.get("title")
+        abstract = row.get("abstract")
+        return featurize(
+            title if isinstance(title, str) else "",
+            abstract if isinstance(abstract, str) else "",
+            self.settings.n_features,
+        )
+
+    def predict(self, row: pd.Series) -> float:
+        """採用 (relevance_score >= threshold) となる確率"""
+        x = self._features(row)
+        with self._lock:
+            return self.model.predict(x)
+
+    def should_skip(self, row: pd.Series) -> tuple[bool, float | None]:
+        """LLM を呼ばずに不採用とするかどうかと、予測した確率 (学習前は None)"""
+        if self.n_train == 0:
+            return False, None
+        prob = self.predict(row)
+        with self._lock:
+            skip = (
+                self.skip_below is not None
+                and prob < self.skip_below
+                and not self.is_holdout(row)
+            )
+            if skip:
+                self.skipped += 1
+        if skip:
+            get_metrics().incr("classifier.skipped")
+        return skip, prob
+
+    def observe(self, row: pd.Series, score: int) -> None:
+        """LLM の判定結果を学習 (較正用の論文は較正) に加える"""
+        x = self._features(row)
+        y = int(score >= self.threshold)
+        with self._lock:
+            key = self._key(row)
+            if key in self._seen:
+                return
+            self._seen.add(key)
+            if self.is_holdout(row):
+                self._holdout.append((x, y))
+            else:
+                # 採用論文は少ないため、不採用との比で重みを付ける (最大10倍)
+                self.n_train += 1
+                self.n_train_positive += y
+                negatives = self.n_train - self.n_train_positive
+                weight = (
+                    min(10.0, max(1.0, negatives / self.n_train_positive)) if y else 1.0
+                )
+                self.model.update(x, y, weight)
+            self._since_calibration += 1
+            if self._since_calibration >= self.settings.calibrate_every:
+                self._calibrate()
+
+    def observe_frame(self, df: pd.DataFrame) -> None:
+        """判定済みの結果 (再開時の中断前の論文等) をまとめて学習する
+
+        分類器が省略した論文は学習せず、省略した件数にのみ数える。LLM の呼び出しに
+        失敗した論文等 (UNLABELED_REASONS) も学習しない。
+        """
+        if df.empty or "relevance_score" not in df.columns:
+            return
+        reasons = df.get("relevance_reason")
+        for i, row in df.iterrows():
+            reason = reasons[i] if reasons is not None else None
+            if reason == SKIPPED_REASON:
+                with self._lock:
+                    self.skipped += 1
+            if reason in UNLABELED_REASONS:
+                continue
+            if isinstance(row.get("abstract"), str) and row.get("abstract"):
+                self.observe(row, int(row["relevance_score"]))
+        with self._lock:
+            self._calibrate()
+
+    def _calibrate(self) -> None:
+        """較正用の採用論文の target_recall 以上を残すしきい値を求める
+
+        self._lock を取得した状態で呼び出すこと。
+        """
+        import numpy as np
+
+        self._since_calibration = 0
+        s = self.settings
+        positives = [x for x, y in self._holdout if y]
+        if self.n_train < s.min_labels or len(positives) < s.min_holdout_positives:
+            self.skip_below = None
+            return
+        probs = np.array([self.model.predict(x) for x, _ in self._holdout])
+        labels = np.array([y for _, y in self._holdout])
+        pos_probs = probs[labels == 1]
+        # この値以上の採用論文が target_recall 以上になる最大のしきい値
+        cut = float(np.quantile(pos_probs, 1 - s.target_recall, method="lower"))
+        below = probs < cut
+        self.holdout_recall = float((pos_probs >= cut).mean())
+        self._miss_rate = float(labels[below].mean()) if below.any() else 0.0
+        was_active = self.skip_below is not None
+        # 省略できる論文がなければ無効のままにする
+        self.skip_below = cut if below.any() else None
+        if self.skip_below is not None and not was_active:
+            logger.info(
+                f"Classifier enabled after {self.n_train} labels: skipping papers "
+                f"with p < {cut:.3f} (held-out recall {self.holdout_recall:.3f})"
+            )
+
+    def report(self) -> dict[str, Any]:
+        """省略した呼び出し数と、見積もった再現率の低下"""
+        with self._lock:
+            holdout_positives = sum(y for _, y in self._holdout)
+            return {
+                "active": self.skip_below is not None,
+                "labels_train": self.n_train,
+                "labels_holdout": len(self._holdout),
+                "holdout_positives": holdout_positives,
+                "skip_below": (
+                    round(self.skip_below, 4) if self.skip_below is not None else None
+                ),
+                "calls_avoided": self.skipped,
+                "holdout_recall": (
+                    round(self.holdout_recall, 4)
+                    if self.holdout_recall is not None
+                    else None
+                ),
+                "estimated_recall_loss": (
+                    round(1 - self.holdout_recall, 4)
+                    if self.holdout_recall is not None and self.skipped
+                    else 0.0
+                ),
+                "estimated_missed_positives": round(self.skipped * self._miss_rate, 2),
+            }
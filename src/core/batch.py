@@ -0,0 +1,398 @@
+"""Gemini の Batch API でスクリーニングを行う (夜間の大規模な判定用)
+
+判定待ちの論文のプロンプトを1つのリクエストファイル (JSONL) に書き出して
+アップロードし、ジョブの完了を待って結果ファイルを1行ずつ読み込む。
+
+リクエストファイルは内容のハッシュで名前を付け、アップロードしたファイル名・
+ジョブ名・状態を同じハッシュのチェックポイント (job_<hash>.json) に保存する。
+ジョブの実行中にプロセスが終了しても、同じ論文を再度判定すれば (main.py では
+--resume)、ジョブを投入し直さずに完了を待って結果を取り込む。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple, Protocol
+
+from pydantic import ValidationError
+
+from src.core.llm import BaseBackend, Generation
+from src.core.prompts import BuiltPrompt
+from src.core.screener import EMPTY_USAGE, PaperScreener
+from src.core.usage import estimate_cost
+from src.models.models import BudgetSettings, ResearchScope
+from src.utils.constants import APP_LOGGER_NAME
+from src.utils.io_utils import ProgressTracker
+from src.utils.metrics import get_metrics
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from pydantic import BaseModel
+
+logger = logging.getLogger(f"{APP_LOGGER_NAME}.batch")
+
+SUCCEEDED = "JOB_STATE_SUCCEEDED"
+# ジョブが結果を返さずに終了したことを表す状態
+FAILED_STATES = {"JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
+# 予算の確認に使う1件あたりの応答トークン数の見積もり (ドライランの既定値と同じ)
+EST_OUTPUT_TOKENS = 120
+
+
+class BatchJobError(RuntimeError):
+    """バッチジョブが失敗・取り消し・期限切れで終了した"""
+
+
+class BatchStatus(NamedTuple):
+    state: str
+    result_file: str | None
+    error: str | None
+
+
+class BatchResult(NamedTuple):
+    """結果ファイルの1行 (応答がない場合 text は None、error にその理由)"""
+
+    key: str
+    text: str | None
+    usage: dict[str, int]
+    error: str | None
+
+
+class BatchClient(Protocol):
+    """Batch API の呼び出し口 (ファイルのアップロード・ジョブの作成と状態の確認)"""
+
+    def upload(self, path: Path) -> str: ...
+
+    def create(self, model: str, file_name: str, display_name: str) -> str: ...
+
+    def get(self, job_name: str) -> BatchStatus: ...
+
+    def download(self, file_name: str, dest: Path) -> None: ...
+
+
+class GeminiBatchClient:
+    """google-genai の Batch API (base_url でローカルの代替サーバーにも接続できる)"""
+
+    def __init__(self, api_key: str, base_url: str | None = None):
+        from google import genai
+
+        http_options = {"base_url": base_url} if base_url else None
+        self.client = genai.Client(api_key=api_key, http_options=http_options)
+
+    def upload(self, path: Path) -> str:
+        uploaded = self.client.files.upload(
+            file=str(path), config={"mime_type": "jsonl", "display_name": path.name}
+        )
+        return uploaded.name
+
+    def create(self, model: str, file_name: str, display_name: str) -> str:
+        job = self.client.batches.create(
+            model=model, src=file_name, config={"display_name": display_name}
+        )
+        return job.name
+
+    def get(self, job_name: str) -> BatchStatus:
+        job = self.client.batches.get(name=job_name)
+        return BatchStatus(
+            state=job.state.name if job.state else "JOB_STATE_UNSPECIFIED",
+            result_file=job.dest.file_name if job.dest else None,
+            error=job.error.message if job.error else None,
+        )
+
+    def download(self, file_name: str, dest: Path) -> None:
+        # 途中で終了しても不完全な結果ファイルが残らないよう、書き終えてから置き換える
+        part = dest.with_name(dest.name + ".part")
+        part.write_bytes(self.client.files.download(file=file_name))
+        part.replace(dest)
+
+
+class _NoBackend(BaseBackend):
+    """BatchScreener は論文ごとに LLM を呼ばないため、バックエンドを作らない"""
+
+    def generate(self, model: str, prompt: str, schema: type[BaseModel]) -> Generation:
+        raise RuntimeError("BatchScreener screens papers through the Batch API")
+
+
+def request_line(key: str, prompt: str, schema: type[BaseModel]) -> dict[str, Any]:
+    """リクエストファイルの1行 (GenerateContentRequest と照合用のキー)"""
+    return {
+        "key": key,
+        "request": {
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+            "generationConfig": {
+                "responseMimeType": "application/json",
+                "responseJsonSchema": schema.model_json_schema(),
+            },
+        },
+    }
+
+
+def iter_results(path: Path) -> Iterator[BatchResult]:
+    """結果ファイルを1行ずつ読み込む (ファイル全体をメモリに載せない)"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            metadata = response.get("usageMetadata") or {}
+            prompt_tokens = int(metadata.get("promptTokenCount") or 0)
+            output_tokens = int(metadata.get("candidatesTokenCount") or 0)
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": int(metadata.get("totalTokenCount") or 0)
+                or prompt_tokens + output_tokens,
+            }
+            text = None
+            error = (record.get("error") or record.get("status") or {}).get("message")
+            try:
+                parts = response["candidates"][0]["content"]["parts"]
+                text = "".join(part.get("text", "") for part in parts)
+            except (KeyError, IndexError, TypeError):
+                error = error or "No candidates in response"
+            yield BatchResult(str(record.get("key")), text, usage, error)
+
+
+class BatchScreener(PaperScreener):
+    """Batch API でスクリーニングする (プロンプトと結果の列は PaperScreener と同じ)
+
+    応答の待ち時間を問わない大規模な判定向け。2段階スクリーニングは行わない。
+    投入したジョブは途中で止められないため、プロンプトの見積もりトークン数で
+    残りの予算に収まる件数のみを投入し、残りは pending_df に残す。
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model_name: str,
+        work_dir: Path,
+        poll_interval_s: float = 60.0,
+        base_url: str | None = None,
+        budget: BudgetSettings | None = None,
+        client: BatchClient | None = None,
+        max_abstract_tokens: int | None = None,
+    ):
+        super().__init__(
+            api_key,
+            model_name,
+            budget=budget,
+            backend=_NoBackend(),
+            max_abstract_tokens=max_abstract_tokens,
+        )
+        self.work_dir = Path(work_dir)
+        self.poll_interval_s = poll_interval_s
+        self.client = client or GeminiBatchClient(api_key, base_url=base_url)
+
+    def screen_papers(
+        self,
+        df: pd.DataFrame,
+        research_scope: str | list[ResearchScope],
+        on_result: Callable[[pd.Series, dict], None] | None = None,
+    ) -> pd.DataFrame:
+        import pandas as pd
+
+        df = df.reset_index(drop=True)
+        if self.usage.exhausted():
+            logger.warning(
+                f"LLM budget exhausted. {len(df)} papers were left unscreened."
+            )
+            self.pending_df = df
+            return df.iloc[:0]
+        self.pending_df = df.iloc[:0]
+
+        metrics = get_metrics()
+        results: list[dict[str, Any]] = []
+        requests = []
+        prompts: dict[int, BuiltPrompt] = {}
+        schema = None
+        # 投入するリクエストの見積もりトークン数 (入力, 出力)
+        planned = [0, 0]
+        for i, row in df.iterrows():
+            title = row.get("title", "No Title")
+            abstract = row.get("abstract", "")
+            if not isinstance(abstract, str) or not abstract:
+                logger.warning(
+                    f"Skipping screening for {title} due to missing abstract"
+                )
+                results.append(
+                    {
+                        "relevance_score": 0,
+                        "relevance_reason": "No abstract available",
+                        "summary": "",
+                        **EMPTY_USAGE,
+                    }
+                )
+                continue
+            prompt, schema = self._screening_prompt(title, abstract, research_scope)
+            if not self._fits_budget(
+                planned[0] + prompt.est_tokens, planned[1] + EST_OUTPUT_TOKENS
+            ):
+                # 以降の論文は投入せず、再開時に判定する
+                self.pending_df = df.iloc[i:].reset_index(drop=True)
+                df = df.iloc[:i]
+                logger.warning(
+                    f"LLM budget allows {len(requests)} batch requests. "
+                    f"{len(self.pending_df)} papers were left unscreened."
+                )
+                break
+            planned[0] += prompt.est_tokens
+            planned[1] += EST_OUTPUT_TOKENS
+            prompts[i] = prompt
+            requests.append((str(i), prompt.text))
+            results.append({})
+
+        with metrics.span("batch_screening", rows_in=len(df)) as span:
+            if requests:
+                result_path = self._run_job(requests, schema)
+                progress = ProgressTracker(
+                    total=len(requests), prefix="Batch results", stage="screening"
+                )
+                for item in iter_results(result_path):
+                    i = int(item.key)
+                    results[i] = self._batch_result(
+                        item, prompts[i], schema, research_scope, df.at[i, "title"]
+                    )
+                    progress.update()
+                progress.close()
+            span.set(rows_out=len(df))
+
+        for i, result in enumerate(results):
+            if not result:
+                # 結果ファイルに含まれなかったリクエスト
+                results[i] = self._screening_result(
+                    None, EMPTY_USAGE, research_scope, df.at[i, "title"]
+                )
+            if on_result is not None:
+                on_result(df.iloc[i], results[i])
+
+        return pd.concat([df, pd.DataFrame(results)], axis=1)
+
+    def _fits_budget(self, prompt_tokens: int, output_tokens: int) -> bool:
+        """見積もりのトークン数を使っても残りの予算に収まるかどうか"""
+        budget = self.usage.budget
+        if (
+            budget.max_total_tokens is not None
+            and self.usage.total_tokens + prompt_tokens + output_tokens
+            > budget.max_total_tokens
+        ):
+            return False
+        if (
+            budget.max_cost_usd is not None
+            and self.usage.cost_usd
+            + estimate_cost(prompt_tokens, output_tokens, budget)
+            > budget.max_cost_usd
+        ):
+            return False
+        return True
+
+    def _batch_result(
+        self,
+        item: BatchResult,
+        prompt: BuiltPrompt,
+        schema: type[BaseModel],
+        research_scope: str | list[ResearchScope],
+        title: str,
+    ) -> dict[str, Any]:
+        """結果ファイルの1行を PaperScreener と同じ形式の結果にする"""
+        metrics = get_metrics()
+        metrics.incr("llm.calls")
+        metrics.incr("llm.prompt_tokens", item.usage["prompt_tokens"])
+        metrics.incr("llm.output_tokens", item.usage["output_tokens"])
+        self.usage.add(item.usage["prompt_tokens"], item.usage["output_tokens"])
+        parsed = None
+        if item.text is not None:
+            try:
+                parsed = schema.model_validate_json(item.text)
+            except ValidationError as e:
+                logger.debug(f"Invalid structured output for {title}: {e}")
+        if item.error:
+            metrics.incr("llm.errors")
+            logger.debug(f"Batch request failed for {title}: {item.error}")
+        usage = {
+            **EMPTY_USAGE,
+            **item.usage,
+            "prompt_est_tokens": prompt.est_tokens,
+            "abstract_truncated_tokens": prompt.truncated_tokens,
+        }
+        return self._screening_result(parsed, usage, research_scope, title)
+
+    def _run_job(
+        self, requests: list[tuple[str, str]], schema: type[BaseModel]
+    ) -> Path:
+        """リクエストファイルを投入してジョブの完了を待ち、結果ファイルのパスを返す
+
+        同じ内容のジョブのチェックポイントがあれば、投入済みの段階から再開する。
+        """
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        part = self.work_dir / "requests.jsonl.part"
+        digest = hashlib.sha256(self.model_name.encode("utf-8"))
+        with open(part, "w", encoding="utf-8") as f:
+            for key, prompt in requests:
+                line = json.dumps(request_line(key, prompt, schema), ensure_ascii=False)
+                digest.update(line.encode("utf-8"))
+                f.write(line + "\n")
+        job_id = digest.hexdigest()[:16]
+        request_path = self.work_dir / f"requests_{job_id}.jsonl"
+        part.replace(request_path)
+        result_path = self.work_dir / f"results_{job_id}.jsonl"
+        checkpoint_path = self.work_dir / f"job_{job_id}.json"
+
+        if result_path.exists():
+            logger.info(f"Using downloaded batch results {result_path.name}")
+            return result_path
+        state: dict[str, Any] = {"model": self.model_name, "requests": len(requests)}
+        if checkpoint_path.exists():
+            state = json.loads(checkpoint_path.read_text(encoding="utf-8"))
+
+        metrics = get_metrics()
+        if "job" in state:
+            logger.info(f"Resuming batch job {state['job']} ({state.get('state')})")
+        else:
+            if "file" not in state:
+                state["file"] = self.client.upload(request_path)
+                _save_checkpoint(checkpoint_path, state)
+            state["job"] = self.client.create(
+                self.model_name, state["file"], request_path.stem
+            )
+            state["submitted_at"] = time.time()
+            _save_checkpoint(checkpoint_path, state)
+            metrics.incr("batch.jobs")
+            logger.info(
+                f"Submitted batch job {state['job']} with {len(requests)} requests"
+            )
+
+        while True:
+            status = self.client.get(state["job"])
+            if status.state != state.get("state"):
+                state["state"] = status.state
+                _save_checkpoint(checkpoint_path, state)
+                logger.info(f"Batch job {state['job']}: {status.state}")
+            if status.state == SUCCEEDED:
+                break
+            if status.state in FAILED_STATES:
+                # 再実行でアップロードから投入し直せるよう、ジョブの記録を消す
+                failed = state.pop("job")
+                state.pop("file", None)
+                _save_checkpoint(checkpoint_path, state)
+                raise BatchJobError(
+                    f"Batch job {failed} ended with {status.state}: {status.error}"
+                )
+            metrics.incr("batch.wait_s", self.poll_interval_s)
+            time.sleep(self.poll_interval_s)
+
+        self.client.download(status.result_file, result_path)
+        state["result_file"] = result_path.name
+        _save_checkpoint(checkpoint_path, state)
+        return result_path
+
+
+def _save_checkpoint(path: Path, state: dict[str, Any]) -> None:
+    """チェックポイントを書き換える (途中で終了しても壊れないよう置き換えで保存する)"""
+    part = path.with_name(path.name + ".part")
+    part.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding="utf-8")
+    part.replace(path)
@@ -0,0 +1,278 @@
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator
+
+from pydantic import BaseModel, Field
+
+from src.models.models import Config
+from src.utils.constants import APP_LOGGER_NAME, DATA_DIR
+from src.utils.io_utils import load_config, load_run_state
+from src.utils.metrics import METRICS_FILE_NAME
+
+logger = logging.getLogger(f"{APP_LOGGER_NAME}.catalog")
+
+CATALOG_PATH = DATA_DIR / "run_catalog.sqlite"
+# 実行ディレクトリ名 "YYYYMMDD_HHMMSS_{project_name}"
+RUN_DIR_PATTERN = re.compile(r"^(\d{8}_\d{6})_(.+)$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    project TEXT NOT NULL,
+    run_dir TEXT NOT NULL,
+    started_at TEXT,
+    recorded_at TEXT NOT NULL,
+    status TEXT NOT NULL,
+    config_hash TEXT,
+    keywords TEXT,
+    papers_total INTEGER NOT NULL,
+    papers_per_iteration TEXT NOT NULL,
+    score_histogram TEXT NOT NULL,
+    mean_score REAL,
+    duration_s REAL,
+    llm_calls INTEGER NOT NULL,
+    total_tokens INTEGER NOT NULL,
+    cost_usd REAL NOT NULL,
+    s2_requests INTEGER NOT NULL,
+    arxiv_requests INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_project ON runs (project, started_at);
+"""
+# JSON 文字列として保存する列
+_JSON_COLUMNS = ("keywords", "papers_per_iteration", "score_histogram")
+
+
+class RunRecord(BaseModel):
+    """カタログに登録する1回分の実行の概要"""
+
+    run_id: str
+    project: str
+    run_dir: str
+    started_at: str | None = None
+    recorded_at: str
+    status: str
+    config_hash: str | None = None
+    keywords: list[str] = Field(default_factory=list)
+    papers_total: int = 0
+    papers_per_iteration: dict[str, int] = Field(default_factory=dict)
+    score_histogram: dict[str, int] = Field(default_factory=dict)
+    mean_score: float | None = None
+    duration_s: float | None = None
+    llm_calls: int = 0
+    total_tokens: int = 0
+    cost_usd: float = 0.0
+    s2_requests: int = 0
+    arxiv_requests: int = 0
+
+
+def config_hash(config: Config) -> str:
+    """探索条件の同一性を判定するための設定のハッシュ (project_name は除く)"""
+    data = config.model_dump(exclude={"project_name"})
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _read_metrics_summary(run_dir: Path) -> dict[str, Any]:
+    path = run_dir / METRICS_FILE_NAME
+    summary: dict[str, Any] = {}
+    if not path.exists():
+        return summary
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("type") == "summary":
+                summary = record
+    return summary
+
+
+def build_run_record(run_dir: Path, config: Config | None = None) -> RunRecord:
+    """実行ディレクトリの成果物 (設定・結果 CSV・metrics.jsonl) から概要を作成する"""
+    import pandas as pd
+
+    match = RUN_DIR_PATTERN.match(run_dir.name)
+    started_at = None
+    if match:
+        started_at = datetime.strptime(match.group(1), "%Y%m%d_%H%M%S").isoformat()
+    if config is None and (run_dir / "config.yml").exists():
+        try:
+            config = load_config(run_dir / "config.yml")
+        except Exception as e:
+            logger.warning(f"Failed to load config for {run_dir}: {e}")
+    if config is not None:
+        project = config.project_name
+    else:
+        project = match.group(2) if match else run_dir.name
+
+    state = load_run_state(run_dir) or {}
+    record = RunRecord(
+        run_id=run_dir.name,
+        project=project,
+        run_dir=str(run_dir),
+        started_at=started_at,
+        recorded_at=datetime.now().isoformat(timespec="seconds"),
+        # run_state.json がなければ実行中、またはクラッシュした実行
+        status=state.get("status", "incomplete"),
+        config_hash=config_hash(config) if config else None,
+        keywords=config.search_criteria.keywords if config else [],
+    )
+
+    # イテレーションごとの件数は重複除去前の累積結果から、スコアは最終結果から集計する
+    cumulative_csv = run_dir / "interim" / "screened_papers_cumulative.csv"
+    if cumulative_csv.exists():
+        df = pd.read_csv(cumulative_csv, usecols=lambda c: c == "iteration")
+        if "iteration" in df.columns:
+            counts = df["iteration"].dropna().astype(int).value_counts().sort_index()
+            record.papers_per_iteration = {str(k): int(v) for k, v in counts.items()}
+    final_csv = run_dir / "final" / "final_review_matrix.csv"
+    if final_csv.exists():
+        df = pd.read_csv(final_csv, usecols=lambda c: c == "relevance_score")
+        record.papers_total = len(df)
+        if "relevance_score" in df.columns:
+            scores = pd.to_numeric(df["relevance_score"], errors="coerce").dropna()
+            histogram = scores.astype(int).value_counts().sort_index()
+            record.score_histogram = {str(k): int(v) for k, v in histogram.items()}
+            record.mean_score = round(float(scores.mean()), 3) if len(scores) else None
+
+    summary = _read_metrics_summary(run_dir)
+    totals = summary.get("totals", {})
+    for stage in summary.get("stages", []):
+        if stage.get("stage") == "pipeline":
+            record.duration_s = round(stage["duration_s"], 3)
+    record.llm_calls = int(totals.get("llm.calls", 0))
+    record.total_tokens = int(
+        totals.get("llm.prompt_tokens", 0) + totals.get("llm.output_tokens", 0)
+    )
+    record.s2_requests = int(totals.get("s2.requests", 0))
+    record.arxiv_requests = int(totals.get("arxiv.requests", 0))
+
+    usage_path = run_dir / "final" / "llm_usage_summary.json"
+    if usage_path.exists():
+        usage = json.loads(usage_path.read_text(encoding="utf-8")).get("total", {})
+        record.cost_usd = float(usage.get("cost_usd", 0.0))
+        record.total_tokens = int(usage.get("total_tokens", record.total_tokens))
+    return record
+
+
+class RunCatalog:
+    """実行の概要を SQLite に蓄積し、data/ を走査せずに実行を一覧できるようにする
+
+    各実行は終了時に `record` で自身を登録する。カタログ導入前の実行や、
+    別環境からコピーした実行は `sync` で未登録のディレクトリのみ追加できる。
+    """
+
+    def __init__(self, path: Path = CATALOG_PATH):
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:  # 正常終了時に commit、例外時に rollback
+                yield conn
+        finally:
+            conn.close()
+
+    def record(self, record: RunRecord) -> None:
+        """実行を登録する (同じ run_id があれば上書き)"""
+        row = record.model_dump()
+        for col in _JSON_COLUMNS:
+            row[col] = json.dumps(row[col], ensure_ascii=False)
+        columns = ", ".join(row)
+        placeholders = ", ".join(f":{c}" for c in row)
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO runs ({columns}) VALUES ({placeholders})", row
+            )
+        logger.info(f"Recorded run {record.run_id} in catalog {self.path}")
+
+    def run_ids(self, exclude_status: str | None = None) -> set[str]:
+        query, params = "SELECT run_id FROM runs", []
+        if exclude_status:
+            query += " WHERE status != ?"
+            params.append(exclude_status)
+        with self._connect() as conn:
+            return {row["run_id"] for row in conn.execute(query, params)}
+
+    def sync(self, data_dir: Path = DATA_DIR) -> int:
+        """カタログに未登録の実行ディレクトリを追加し、追加件数を返す
+
+        前回の同期時に実行中だった (incomplete の) 実行は登録し直す。
+        """
+        if not data_dir.exists():
+            return 0
+        known = self.run_ids(exclude_status="incomplete")
+        added = 0
+        for run_dir in sorted(data_dir.iterdir()):
+            if (
+                not run_dir.is_dir()
+                or run_dir.name in known
+                or not RUN_DIR_PATTERN.match(run_dir.name)
+            ):
+                continue
+            try:
+                self.record(build_run_record(run_dir))
+                added += 1
+            except Exception as e:
+                logger.warning(f"Failed to index {run_dir}: {e}")
+        return added
+
+    def list_runs(
+        self, project: str | None = None, search: str | None = None
+    ) -> list[RunRecord]:
+        """新しい順に実行を返す
+
+        search は実行ID・プロジェクト名・キーワードに対する部分一致で絞り込む。
+        """
+        query = "SELECT * FROM runs"
+        conditions, params = [], []
+        if project:
+            conditions.append("project = ?")
+            params.append(project)
+        if search:
+            conditions.append("(run_id LIKE ? OR project LIKE ? OR keywords LIKE ?)")
+            params += [f"%{search}%"] * 3
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY started_at DESC, run_id DESC"
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [self._to_record(row) for row in rows]
+
+    def get(self, run_id: str) -> RunRecord | None:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+        return self._to_record(row) if row else None
+
+    @staticmethod
+    def _to_record(row: sqlite3.Row) -> RunRecord:
+        data = dict(row)
+        for col in _JSON_COLUMNS:
+            data[col] = json.loads(data[col]) if data[col] else None
+        return RunRecord(**{k: v for k, v in data.items() if v is not None})
+
+
+def summarize_runs(records: list[RunRecord]) -> dict[str, Any]:
+    """実行一覧の合計 (件数・論文数・トークン数・コスト・所要時間)"""
+    return {
+        "runs": len(records),
+        "completed": sum(r.status == "completed" for r in records),
+        "papers_total": sum(r.papers_total for r in records),
+        "total_tokens": sum(r.total_tokens for r in records),
+        "cost_usd": round(sum(r.cost_usd for r in records), 6),
+        "duration_s": round(sum(r.duration_s or 0.0 for r in records), 3),
+    }
@@ -1,31 +1,94 @@
+from __future__ import annotations
+
 import logging
+import os
 import time
-from typing import Any
-
-import arxiv
-import pandas as pd
-import requests
-from tenacity import Retrying, retry_if_exception, stop_after_attempt, wait_exponential
-from tqdm import tqdm
-
+from datetime import date
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any
+
+from src.utils.cassette import (
+    decode_http_response,
+    encode_http_response,
+    get_cassette,
+)
 from src.utils.constants import APP_LOGGER_NAME
+from src.utils.io_utils import ProgressTracker
+from src.utils.metrics import get_metrics
+
+# 重いライブラリ (pandas, requests, arxiv, tenacity, tqdm) は初回使用時に読み込む
+if TYPE_CHECKING:
+    import pandas as pd
 
 logger = logging.getLogger(f"{APP_LOGGER_NAME}.collector")
 
 S2_API_URL = "https://api.semanticscholar.org/graph/v1"
+# 論文ごとに取得する項目 (openAccessPdf は全文取得の段階で使う)
+PAPER_FIELDS = [
+    "title",
+    "year",
+    "citationCount",
+    "abstract",
+    "externalIds",
+    "url",
+    "openAccessPdf",
+]
 
 
 def is_retryable_s2_error(exception: Exception) -> bool:
     """Semantic Scholar API のリトライ対象エラーかどうかを判定する"""
+    import requests
+
     if isinstance(exception, requests.exceptions.HTTPError):
         # 429 (Rate Limit) と 5xx (Server Error) をリトライ対象にする
         status_code = exception.response.status_code
         if status_code == 429 or status_code >= 500:
             return True
+    # 接続の切断や途中で切れた応答もリトライする
+    if isinstance(
+        exception,
+        (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError),
+    ):
+        return True
     return False
 
 
+def retry_after_seconds(exception: BaseException | None) -> float | None:
+    """429 等の応答の Retry-After ヘッダー (秒数) を返す。なければ None"""
+    import requests
+
+    if not isinstance(exception, requests.exceptions.HTTPError):
+        return None
+    headers = getattr(exception.response, "headers", None) or {}
+    value = headers.get("Retry-After")
+    if not isinstance(value, str):
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        # HTTP 日付形式は扱わず、指数バックオフにする
+        return None
+
+
+def wait_retry_after(fallback, max_wait: float):
+    """Retry-After があればその秒数 (max_wait まで)、なければ fallback で待つ"""
+
+    def wait(retry_state) -> float:
+        retry_after = retry_after_seconds(retry_state.outcome.exception())
+        if retry_after is not None:
+            return min(retry_after, max_wait)
+        return fallback(retry_state)
+
+    return wait
+
+
 def log_retry_attempt(retry_state):
+    import requests
+
+    metrics = get_metrics()
+    metrics.incr("s2.retries")
+    metrics.incr("s2.backoff_s", retry_state.next_action.sleep)
+
     exception = retry_state.outcome.exception()
     status_code = "N/A"
     error_type = "Unknown Error"
@@ -47,48 +110,134 @@ def log_retry_attempt(retry_state):
     )
 
 
+def _paper_doi(paper: dict[str, Any]) -> str | None:
+    external_ids = paper.get("externalIds")
+    return external_ids.get("DOI") if isinstance(external_ids, dict) else None
+
+
 class S2Collector:
-    def __init__(self, max_retries: int = 10):
+    def __init__(
+        self,
+        max_retries: int = 10,
+        base_url: str | None = None,
+        min_backoff_s: float = 5,
+        max_backoff_s: float = 120,
+    ):
         self.headers = {}
         self.max_retries = max_retries
+        # 環境変数 S2_API_URL で接続先を変更できる (ローカルのモックサーバー等)
+        self.base_url = (base_url or os.getenv("S2_API_URL") or S2_API_URL).rstrip("/")
+        self.min_backoff_s = min_backoff_s
+        self.max_backoff_s = max_backoff_s
+        # スノーボールで取得した引用関係 (引用元 DOI, 引用先 DOI)
+        self.citation_edges: list[tuple[str, str]] = []
+
+    def pop_citation_edges(self) -> list[tuple[str, str]]:
+        """前回の呼び出し以降に記録した引用関係を返し、記録を空にする"""
+        edges, self.citation_edges = self.citation_edges, []
+        return edges
 
     def _get(self, endpoint: str, params: dict[str, Any]) -> dict[str, Any]:
-        url = f"{S2_API_URL}/{endpoint}"
+        from tenacity import (
+            Retrying,
+            retry_if_exception,
+            stop_after_attempt,
+            wait_exponential,
+        )
+
+        url = f"{self.base_url}/{endpoint}"
+        backoff = wait_exponential(
+            multiplier=2, min=self.min_backoff_s, max=self.max_backoff_s
+        )
 
         for attempt in Retrying(
             stop=stop_after_attempt(self.max_retries),
-            wait=wait_exponential(multiplier=2, min=5, max=120),
+            wait=wait_retry_after(backoff, self.max_backoff_s),
             retry=retry_if_exception(is_retryable_s2_error),
             before_sleep=log_retry_attempt,
             reraise=True,
         ):
             with attempt:
-                response = requests.get(
-                    url, params=params, headers=self.headers, timeout=30
-                )
+                metrics = get_metrics()
+                metrics.incr("s2.requests")
+                response = self._request(url, params)
+                if isinstance(response.content, bytes):
+                    metrics.incr("s2.bytes", len(response.content))
                 response.raise_for_status()
                 return response.json()
 
+    def _request(self, url: str, params: dict[str, Any]):
+        """S2 への HTTP リクエスト。カセットが有効なら応答を記録・再生する"""
+        import requests
+
+        def send():
+            return requests.get(url, params=params, headers=self.headers, timeout=30)
+
+        cassette = get_cassette()
+        if cassette is None:
+            return send()
+        return cassette.call(
+            "s2",
+            {"url": url, "params": params},
+            send,
+            encode_http_response,
+            decode_http_response,
+        )
+
     def search_by_keywords(
-        self, keywords: list[str], limit: int = 100
+        self, keywords: list[str], limit: int = 100, published_since: date | None = None
     ) -> list[dict[str, Any]]:
-        """キーワード検索を実行する"""
+        """キーワード検索を実行する (published_since 以降の出版に限定できる)"""
         query = " ".join(keywords)
         logger.info(f"Searching papers for keywords: {query}")
         params = {
             "query": query,
             "limit": limit,
-            "fields": "title,year,citationCount,abstract,externalIds,url",
+            "fields": ",".join(PAPER_FIELDS),
         }
+        if published_since is not None:
+            params["publicationDateOrYear"] = f"{published_since.isoformat()}:"
         data = self._get("paper/search", params)
         return data.get("data", [])
 
+    def count_keyword_results(self, keywords: list[str]) -> int | None:
+        """キーワード検索のヒット件数のみを取得する (見積もり用の軽量リクエスト)
+
+        S2 に接続できない場合は None を返す。
+        """
+        import requests
+
+        params = {"query": " ".join(keywords), "limit": 1, "fields": "paperId"}
+        try:
+            data = self._get("paper/search", params)
+        except requests.RequestException as e:
+            logger.warning(f"Failed to count search results for {keywords}: {e}")
+            return None
+        return int(data.get("total") or 0)
+
+    def get_paper_counts(self, doi: str) -> dict[str, int] | None:
+        """論文の被引用数と参考文献数のみを取得する (見積もり用の軽量リクエスト)"""
+        try:
+            data = self._get(
+                f"paper/DOI:{doi}", {"fields": "citationCount,referenceCount"}
+            )
+        except Exception as e:
+            logger.warning(f"Failed to get citation counts for DOI {doi}: {e}")
+            return None
+        return {
+            "citationCount": int(data.get("citationCount") or 0),
+            "referenceCount": int(data.get("referenceCount") or 0),
+        }
+
     def get_related_papers(self, doi: str, limit: int = -1) -> list[dict[str, Any]]:
         """特定の論文の参考文献と引用文献を取得する"""
         logger.info(f"Getting references and citations for DOI: {doi} (Limit: {limit})")
         params = {
-            "fields": "references.title,references.year,references.citationCount,references.abstract,references.externalIds,references.url,"
-            "citations.title,citations.year,citations.citationCount,citations.abstract,citations.externalIds,citations.url"
+            "fields": ",".join(
+                f"{kind}.{field}"
+                for kind in ("references", "citations")
+                for field in PAPER_FIELDS
+            )
         }
         try:
             data = self._get(f"paper/DOI:{doi}", params)
@@ -96,6 +245,14 @@ class S2Collector:
             citations = data.get("citations") or []
             related = references + citations
 
+            # 件数の制限前の全ての引用関係を記録する (引用ネットワークの表示用)
+            for paper in references:
+                if cited := _paper_doi(paper):
+                    self.citation_edges.append((doi, cited))
+            for paper in citations:
+                if citing := _paper_doi(paper):
+                    self.citation_edges.append((citing, doi))
+
             if limit != -1 and len(related) > limit:
                 logger.info(f"Limiting related papers from {len(related)} to {limit}")
                 related = related[:limit]
@@ -105,6 +262,20 @@ class S2Collector:
             logger.error(f"Failed to get related papers for DOI {doi}: {e}")
             return []
 
+    def get_citing_papers(self, doi: str) -> list[dict[str, Any]]:
+        """論文を引用している論文のみを取得する (差分更新で新しい被引用を探す)"""
+        params = {"fields": ",".join(f"citations.{field}" for field in PAPER_FIELDS)}
+        try:
+            data = self._get(f"paper/DOI:{doi}", params)
+        except Exception as e:
+            logger.error(f"Failed to get citations for DOI {doi}: {e}")
+            return []
+        citations = data.get("citations") or []
+        for paper in citations:
+            if citing := _paper_doi(paper):
+                self.citation_edges.append((citing, doi))
+        return citations
+
     def get_papers_by_dois(self, dois: list[str]) -> list[dict[str, Any]]:
         """複数のDOIから論文情報を一括取得する"""
         if not dois:
@@ -116,7 +287,7 @@ class S2Collector:
         # or use batch API if available. For now, one by one is safer for rate limits with our retry logic.
         for doi in dois:
             try:
-                params = {"fields": "title,year,citationCount,abstract,externalIds,url"}
+                params = {"fields": ",".join(PAPER_FIELDS)}
                 data = self._get(f"paper/DOI:{doi}", params)
                 if data:
                     results.append(data)
@@ -193,6 +364,8 @@ class S2Collector:
         year_range: list[int],
     ) -> pd.DataFrame:
         """収集したRawデータをDataFrame化し、フィルタリング・補完を行う"""
+        import pandas as pd
+
         if not papers:
             return pd.DataFrame()
 
@@ -267,33 +440,71 @@ class S2Collector:
         logger.info(
             f"Attempting to fill missing abstracts for {missing_count} papers using ArXiv API..."
         )
+        import arxiv
+
         client = arxiv.Client()
+        cassette = get_cassette()
+        metrics = get_metrics()
+        filled = 0
+
+        with metrics.span("arxiv_fill", rows_in=int(missing_count)) as span:
+            progress = ProgressTracker(
+                total=int(missing_count),
+                prefix="Filling abstracts from ArXiv",
+                stage="arxiv_fill",
+            )
+            for idx, row in df[missing_mask].iterrows():
+                title = row["title"]
+                doi = row.get("doi")
+                query = f'ti:"{title}"'
+                if doi:
+                    query += f" OR id:{doi}"
+
+                try:
+                    metrics.incr("arxiv.requests")
+                    results = _search_arxiv(client, query)
+                    if results:
+                        best_match = results[0]
+                        if (
+                            title.lower() in best_match.title.lower()
+                            or best_match.title.lower() in title.lower()
+                        ):
+                            df.at[idx, "abstract"] = best_match.summary
+                            filled += 1
+                            # ループ内のログは DEBUG とする
+                            # (同じ箇所からの連続出力は間引かれる)
+                            logger.debug(f"Filled abstract for: {title}")
+                    if cassette is None:
+                        time.sleep(1)
+                    else:
+                        cassette.pause(1)
+                    metrics.incr("arxiv.sleep_s", 1)
+                except Exception as e:
+                    metrics.incr("arxiv.errors")
+                    logger.warning(
+                        f"Failed to fetch abstract from ArXiv for {title}: {e}"
+                    )
+                progress.update()
+            progress.close()
+            span.set(rows_out=filled)
 
-        # イテレーション部分をtqdmでラップしてプログレスバー化
-        for idx, row in tqdm(
-            df[missing_mask].iterrows(),
-            total=missing_count,
-            desc="Filling abstracts from ArXiv",
-        ):
-            title = row["title"]
-            doi = row.get("doi")
-            query = f'ti:"{title}"'
-            if doi:
-                query += f" OR id:{doi}"
+        return df
 
-            search = arxiv.Search(query=query, max_results=1)
-            try:
-                results = list(client.results(search))
-                if results:
-                    best_match = results[0]
-                    if (
-                        title.lower() in best_match.title.lower()
-                        or best_match.title.lower() in title.lower()
-                    ):
-                        df.at[idx, "abstract"] = best_match.summary
-                        # logger.info(f"Filled abstract for: {title}")  # ループ内ログは抑制
-                time.sleep(1)
-            except Exception as e:
-                logger.warning(f"Failed to fetch abstract from ArXiv for {title}: {e}")
 
-        return df
+def _search_arxiv(client: Any, query: str) -> list[Any]:
+    """ArXiv を検索して最上位の結果を返す。カセットが有効なら結果を記録・再生する"""
+    import arxiv
+
+    def search() -> list[Any]:
+        return list(client.results(arxiv.Search(query=query, max_results=1)))
+
+    cassette = get_cassette()
+    if cassette is None:
+        return search()
+    return cassette.call(
+        "arxiv",
+        {"query": query},
+        search,
+        lambda results: [{"title": r.title, "summary": r.summary} for r in results],
+        lambda values: [SimpleNamespace(**value) for value in values],
+    )
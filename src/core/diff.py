@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import logging
+import pickle
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from src.core.results import load_results_frame
+from src.utils.constants import APP_LOGGER_NAME, DATA_DIR
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(f"{APP_LOGGER_NAME}.diff")
+
+DIFF_CACHE_DIR = DATA_DIR / "diffs"
+# 突き合わせに使うキー列の候補 (先にあるものを優先する)
+KEY_COLUMNS = ["doi", "paperId"]
+# 差分の表に含める列
+DIFF_COLUMNS = ["title", "year", "citationCount", "relevance_score"]
+# キャッシュの形式を変えたら更新する
+DIFF_CACHE_VERSION = 1
+
+
+def _final_csv(run_dir: Path) -> Path:
+    return run_dir / "final" / "final_review_matrix.csv"
+
+
+def _require_score(df: pd.DataFrame, run: str) -> None:
+    """スコアを比較できない結果 (古い・途中の結果で列がない) なら ValueError"""
+    if "relevance_score" not in df.columns:
+        raise ValueError(
+            f"Results of run {run or '(unnamed)'} have no relevance_score column"
+        )
+
+
+def _keyed(df: pd.DataFrame) -> pd.DataFrame:
+    """突き合わせ用のキー列 `_key` を付与し、キーごとに最高スコアの1行に絞る"""
+    import pandas as pd
+
+    key = pd.Series(pd.NA, index=df.index, dtype="string")
+    for col in KEY_COLUMNS:
+        if col in df.columns:
+            # DOI は大文字・小文字を区別しない
+            key = key.fillna(df[col].astype("string").str.strip().str.lower())
+    columns = [c for c in DIFF_COLUMNS if c in df.columns]
+    keyed = df[columns].assign(_key=key).dropna(subset=["_key"])
+    if "relevance_score" in keyed.columns:
+        keyed = keyed.sort_values("relevance_score", ascending=False)
+    return keyed.drop_duplicates(subset=["_key"]).set_index("_key")
+
+
+def spearman(a: pd.Series, b: pd.Series) -> float | None:
+    """順位相関係数 (同順位は平均順位)。scipy に依存しないよう順位の相関で求める"""
+    import numpy as np
+
+    mask = a.notna() & b.notna()
+    if mask.sum() < 2:
+        return None
+    rank_a = a[mask].rank().to_numpy(dtype=float)
+    rank_b = b[mask].rank().to_numpy(dtype=float)
+    if rank_a.std() == 0 or rank_b.std() == 0:
+        return None
+    return float(np.corrcoef(rank_a, rank_b)[0, 1])
+
+
+class RunDiff:
+    """2つの実行の最終結果を DOI で突き合わせた差分"""
+
+    def __init__(
+        self,
+        base_run: str,
+        other_run: str,
+        added: pd.DataFrame,
+        removed: pd.DataFrame,
+        common: pd.DataFrame,
+    ):
+        self.base_run = base_run
+        self.other_run = other_run
+        self.added = added
+        self.removed = removed
+        # 両方の実行に含まれる論文 (score_base, score_other, score_delta 列を持つ)
+        self.common = common
+
+    @classmethod
+    def compute(
+        cls, base_df: pd.DataFrame, other_df: pd.DataFrame, base_run="", other_run=""
+    ) -> RunDiff:
+        _require_score(base_df, base_run)
+        _require_score(other_df, other_run)
+        base = _keyed(base_df)
+        other = _keyed(other_df)
+        # インデックス同士の結合はハッシュ結合で行われる
+        added = other.loc[other.index.difference(base.index, sort=False)]
+        removed = base.loc[base.index.difference(other.index, sort=False)]
+        common = other.join(
+            base[["relevance_score"]].rename(columns={"relevance_score": "score_base"}),
+            how="inner",
+        ).rename(columns={"relevance_score": "score_other"})
+        common["score_delta"] = common["score_other"] - common["score_base"]
+        common = common.sort_values("score_delta", key=abs, ascending=False)
+        sort_desc = {"by": "relevance_score", "ascending": False}
+        return cls(
+            base_run,
+            other_run,
+            added.sort_values(**sort_desc),
+            removed.sort_values(**sort_desc),
+            common,
+        )
+
+    @property
+    def changed(self) -> pd.DataFrame:
+        """スコアが変化した論文 (変化の大きい順)"""
+        return self.common[self.common["score_delta"].fillna(0) != 0]
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "base_run": self.base_run,
+            "other_run": self.other_run,
+            "added": len(self.added),
+            "removed": len(self.removed),
+            "common": len(self.common),
+            "changed": len(self.changed),
+            "mean_delta": (
+                round(float(self.common["score_delta"].mean()), 3)
+                if len(self.common)
+                else None
+            ),
+            "spearman": spearman(self.common["score_base"], self.common["score_other"]),
+        }
+
+
+def _cache_path(base_dir: Path, other_dir: Path, cache_dir: Path) -> Path:
+    return cache_dir / f"{base_dir.name}__{other_dir.name}.pkl"
+
+
+def _cache_key(base_dir: Path, other_dir: Path) -> tuple[int, int, int]:
+    return (
+        DIFF_CACHE_VERSION,
+        _final_csv(base_dir).stat().st_mtime_ns,
+        _final_csv(other_dir).stat().st_mtime_ns,
+    )
+
+
+def diff_runs(
+    base_dir: Path, other_dir: Path, cache_dir: Path = DIFF_CACHE_DIR
+) -> RunDiff:
+    """2つの実行の差分を返す。結果 CSV が変わっていなければキャッシュを使う"""
+    cache_path = _cache_path(base_dir, other_dir, cache_dir)
+    key = _cache_key(base_dir, other_dir)
+    if cache_path.exists():
+        try:
+            with open(cache_path, "rb") as f:
+                cached = pickle.load(f)
+            if cached["key"] == key:
+                return cached["diff"]
+        except (OSError, EOFError, KeyError, pickle.UnpicklingError) as e:
+            logger.warning(f"Ignoring unreadable diff cache {cache_path}: {e}")
+
+    diff = RunDiff.compute(
+        load_results_frame(_final_csv(base_dir)),
+        load_results_frame(_final_csv(other_dir)),
+        base_run=base_dir.name,
+        other_run=other_dir.name,
+    )
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        with open(cache_path, "wb") as f:
+            pickle.dump({"key": key, "diff": diff}, f)
+    except OSError as e:
+        logger.warning(f"Failed to write diff cache {cache_path}: {e}")
+    return diff
+
+
+def align_runs(run_dirs: list[Path]) -> pd.DataFrame:
+    """複数の実行のスコアを DOI で揃えた表 (行: 論文、列: 実行) を返す"""
+    import pandas as pd
+
+    scores = []
+    titles = []
+    for run_dir in run_dirs:
+        df = load_results_frame(_final_csv(run_dir))
+        _require_score(df, run_dir.name)
+        keyed = _keyed(df)
+        scores.append(keyed["relevance_score"].rename(run_dir.name))
+        if "title" in keyed.columns:
+            titles.append(keyed["title"])
+    aligned = pd.concat(scores, axis=1, join="outer")
+    if titles:
+        # タイトルは最初に現れた実行のものを使う
+        title = pd.concat(titles).groupby(level=0).first()
+        aligned.insert(0, "title", title.reindex(aligned.index))
+    return aligned
+
+
+def precompute_diff_with_previous(
+    run_dir: Path, previous_dirs: list[Path], cache_dir: Path = DIFF_CACHE_DIR
+) -> RunDiff | None:
+    """直前の実行との差分を計算し、ダッシュボードで即座に表示できるようキャッシュする"""
+    if not _final_csv(run_dir).exists():
+        return None
+    candidates = [
+        d for d in previous_dirs if d.name < run_dir.name and _final_csv(d).exists()
+    ]
+    if not candidates:
+        return None
+    previous = max(candidates, key=lambda d: d.name)
+    return diff_runs(previous, run_dir, cache_dir=cache_dir)
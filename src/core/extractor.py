@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterator
+
+from pydantic import BaseModel, Field, create_model
+
+from src.core.llm import LLMBackend, create_backend
+from src.core.usage import UsageTracker
+from src.models.models import BudgetSettings, ExtractionSettings, LLMBackendSettings
+from src.utils.constants import APP_LOGGER_NAME, DATA_DIR
+from src.utils.io_utils import ProgressTracker, get_prompt
+from src.utils.metrics import get_metrics
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(f"{APP_LOGGER_NAME}.extractor")
+
+EXTRACTION_CACHE_PATH = DATA_DIR / "extraction_cache.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS extractions (
+    cache_key TEXT PRIMARY KEY,
+    doi TEXT,
+    model TEXT NOT NULL,
+    schema_hash TEXT NOT NULL,
+    result TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    created_at TEXT NOT NULL
+);
+"""
+
+
+def build_extraction_model(fields: dict[str, str]) -> type[BaseModel]:
+    """設定の項目名と説明から LLM の応答スキーマ (Pydantic モデル) を作る"""
+    return create_model(
+        "ExtractionResult",
+        **{name: (str, Field(description=desc)) for name, desc in fields.items()},
+    )
+
+
+def schema_hash(fields: dict[str, str]) -> str:
+    """抽出項目の同一性を判定するハッシュ (項目や説明を変えたら抽出し直す)"""
+    payload = json.dumps(fields, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def extraction_key(title: str, abstract: str, model: str, schema: str) -> str:
+    """論文の内容・モデル・スキーマから決まるキャッシュキー
+
+    DOI ではなく入力そのもので識別するため、ArXiv で抄録が補完された場合などは
+    抽出し直す。
+    """
+    payload = "\x1f".join([model, schema, title, abstract])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ExtractionCache:
+    """抽出結果のキャッシュ (SQLite)
+
+    結果は1件ごとにコミットするため、中断した抽出を再実行すると未抽出の論文のみを
+    処理する。キャッシュは実行をまたいで共有し、同じ論文を繰り返し抽出しない。
+    """
+
+    def __init__(self, path: Path = EXTRACTION_CACHE_PATH):
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:  # 正常終了時に commit、例外時に rollback
+                yield conn
+        finally:
+            conn.close()
+
+    def get_many(self, keys: list[str]) -> dict[str, dict[str, Any]]:
+        found: dict[str, dict[str, Any]] = {}
+        with self._connect() as conn:
+            # SQLite のパラメータ数の上限を超えないよう分割して問い合わせる
+            for i in range(0, len(keys), 500):
+                chunk = keys[i : i + 500]
+                rows = conn.execute(
+                    "SELECT cache_key, result FROM extractions WHERE cache_key IN"
+                    f" ({', '.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for row in rows:
+                    found[row["cache_key"]] = json.loads(row["result"])
+        return found
+
+    def put(
+        self,
+        key: str,
+        doi: str | None,
+        model: str,
+        schema: str,
+        result: dict[str, Any],
+        usage: dict[str, int],
+    ) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO extractions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    doi,
+                    model,
+                    schema,
+                    json.dumps(result, ensure_ascii=False),
+                    usage["prompt_tokens"],
+                    usage["output_tokens"],
+                    datetime.now().isoformat(timespec="seconds"),
+                ),
+            )
+
+    def __len__(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM extractions").fetchone()[0]
+
+
+class PaperExtractor:
+    """最終結果の論文から、設定した項目 (手法・結果など) を LLM で抽出する"""
+
+    def __init__(
+        self,
+        api_key: str,
+        model_name: str,
+        settings: ExtractionSettings | None = None,
+        budget: BudgetSettings | None = None,
+        cache: ExtractionCache | None = None,
+        backend: LLMBackend | LLMBackendSettings | None = None,
+    ):
+        if backend is None or isinstance(backend, LLMBackendSettings):
+            backend = create_backend(backend, api_key)
+        self.backend = backend
+        self.model_name = model_name
+        self.settings = settings or ExtractionSettings()
+        self.prompt_template = get_prompt("extraction")
+        self.response_model = build_extraction_model(self.settings.fields)
+        self.schema = schema_hash(self.settings.fields)
+        self.cache = cache if cache is not None else ExtractionCache()
+        self.usage = UsageTracker(budget)
+
+    def extract_papers(self, df: pd.DataFrame) -> pd.DataFrame:
+        """論文ごとに抽出項目の列を追加した DataFrame を返す
+
+        キャッシュ済みの論文は LLM を呼び出さない。論文は batch_size 件ずつ並列に
+        処理し、予算に達した場合は以降のバッチを投入せず、未抽出の列は空欄のまま返す。
+        """
+        import pandas as pd
+
+        fields = list(self.settings.fields)
+        df = df.reset_index(drop=True)
+        records = df.to_dict(orient="records")
+        keys = [
+            extraction_key(
+                _text(row.get("title")),
+                _text(row.get("abstract")),
+                self.model_name,
+                self.schema,
+            )
+            for row in records
+        ]
+        results: dict[str, dict[str, Any]] = self.cache.get_many(keys)
+        todo = [
+            i
+            for i, key in enumerate(keys)
+            if key not in results and _text(records[i].get("abstract"))
+        ]
+        logger.info(
+            f"Extracting {len(todo)} papers "
+            f"({len(df) - len(todo)} cached or without abstract)"
+        )
+
+        metrics = get_metrics()
+        progress = ProgressTracker(
+            total=len(todo), prefix="Extracting", stage="extraction"
+        )
+
+        def process(i: int) -> None:
+            row = records[i]
+            title = _text(row.get("title"))
+            try:
+                metrics.incr("llm.calls")
+                start = time.perf_counter()
+                parsed, usage = self._call_llm(title, _text(row.get("abstract")))
+                metrics.incr("llm.latency_s", time.perf_counter() - start)
+                metrics.incr("llm.prompt_tokens", usage["prompt_tokens"])
+                metrics.incr("llm.output_tokens", usage["output_tokens"])
+                self.usage.add(usage["prompt_tokens"], usage["output_tokens"])
+                if parsed is None:
+                    metrics.incr("llm.invalid_responses")
+                    logger.warning(f"LLM returned None for extraction of {title}")
+                else:
+                    result = parsed.model_dump()
+                    self.cache.put(
+                        keys[i],
+                        _text(row.get("doi")) or None,
+                        self.model_name,
+                        self.schema,
+                        result,
+                        usage,
+                    )
+                    results[keys[i]] = result
+            except Exception:
+                metrics.incr("llm.errors")
+                logger.exception(f"Error extracting paper {title}")
+            progress.update()
+
+        batch_size = max(1, self.settings.batch_size)
+        with (
+            metrics.span("extraction", rows_in=len(todo)) as span,
+            ThreadPoolExecutor(max_workers=self.settings.max_workers) as executor,
+        ):
+            for start in range(0, len(todo), batch_size):
+                if self.usage.exhausted():
+                    logger.warning(
+                        f"LLM budget exhausted during extraction. "
+                        f"{len(todo) - start} papers were left unextracted."
+                    )
+                    break
+                list(executor.map(process, todo[start : start + batch_size]))
+            span.set(rows_out=sum(keys[i] in results for i in todo))
+        progress.close()
+
+        extracted = pd.DataFrame([results.get(key, {}) for key in keys], columns=fields)
+        return pd.concat([df.drop(columns=fields, errors="ignore"), extracted], axis=1)
+
+    def _call_llm(
+        self, title: str, abstract: str
+    ) -> tuple[BaseModel | None, dict[str, int]]:
+        """LLM を呼び出し、抽出結果とトークン使用量を返す"""
+        prompt = self.prompt_template.format(title=title, abstract=abstract)
+
+        return self.backend.generate(self.model_name, prompt, self.response_model)
+
+
+def _text(value: Any) -> str:
+    """欠損値 (NaN) を空文字列として扱う"""
+    return value if isinstance(value, str) else ""
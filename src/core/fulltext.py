@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+import ast
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterator
+
+from src.models.models import FullTextSettings
+from src.utils.constants import APP_LOGGER_NAME, DATA_DIR
+from src.utils.io_utils import ProgressTracker
+from src.utils.metrics import get_metrics
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(f"{APP_LOGGER_NAME}.fulltext")
+
+PDF_STORE_DIR = DATA_DIR / "pdf_store"
+# ダウンロード時に一度に読み込むバイト数
+CHUNK_SIZE = 1 << 16
+PDF_MAGIC = b"%PDF-"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    doi TEXT PRIMARY KEY,
+    url TEXT,
+    digest TEXT,
+    status TEXT NOT NULL,
+    fetched_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sources_digest ON sources (digest);
+"""
+
+
+def _as_dict(value: Any) -> dict[str, Any]:
+    """CSV を経由して文字列になった辞書 (externalIds 等) を辞書に戻す"""
+    if isinstance(value, dict):
+        return value
+    if isinstance(value, str) and value.startswith("{"):
+        try:
+            parsed = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return {}
+        return parsed if isinstance(parsed, dict) else {}
+    return {}
+
+
+def pdf_urls(paper: dict[str, Any], arxiv_pdf_url: str) -> list[str]:
+    """論文の PDF の候補 URL (S2 のオープンアクセス PDF、ArXiv の順)"""
+    urls = []
+    open_access = _as_dict(paper.get("openAccessPdf")).get("url")
+    if open_access:
+        urls.append(open_access)
+    arxiv_id = _as_dict(paper.get("externalIds")).get("ArXiv")
+    if arxiv_id:
+        urls.append(arxiv_pdf_url.format(arxiv_id=arxiv_id))
+    return list(dict.fromkeys(urls))
+
+
+class PdfStore:
+    """PDF と抽出した本文を内容のハッシュ (SHA-256) で保存するストア
+
+    同じ PDF は異なる DOI・URL から取得しても1つのファイルとして保存する。
+    DOI ごとの取得結果 (成功・失敗) は index.sqlite に記録し、再取得を避ける。
+    """
+
+    def __init__(self, root: Path = PDF_STORE_DIR):
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.root / "index.sqlite", timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:  # 正常終了時に commit、例外時に rollback
+                yield conn
+        finally:
+            conn.close()
+
+    def pdf_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / f"{digest}.pdf"
+
+    def text_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / f"{digest}.txt"
+
+    def add_file(self, tmp_path: Path, digest: str) -> Path:
+        """一時ファイルをストアに移動する (既にあれば一時ファイルを削除する)"""
+        path = self.pdf_path(digest)
+        if path.exists():
+            tmp_path.unlink()
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, path)
+        return path
+
+    def record(self, doi: str, url: str | None, digest: str | None, status: str):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?)",
+                (
+                    doi,
+                    url,
+                    digest,
+                    status,
+                    datetime.now().isoformat(timespec="seconds"),
+                ),
+            )
+
+    def lookup(self, dois: list[str]) -> dict[str, sqlite3.Row]:
+        found = {}
+        with self._connect() as conn:
+            for i in range(0, len(dois), 500):
+                chunk = dois[i : i + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT * FROM sources WHERE doi IN ({placeholders})", chunk
+                ).fetchall()
+                found.update({row["doi"]: row for row in rows})
+        return found
+
+    def read_text(self, digest: str) -> str | None:
+        path = self.text_path(digest)
+        return path.read_text(encoding="utf-8") if path.exists() else None
+
+
+def _extract_text(pdf_path: str, text_path: str, max_pages: int) -> int:
+    """PDF の本文を1ページずつ抽出してファイルに書き出し、文字数を返す
+
+    プロセスプールのワーカーで実行する。ページを読み込むたびに書き出すため、
+    メモリ使用量はページ数によらず一定に収まる。
+    """
+    from pypdf import PdfReader
+
+    reader = PdfReader(pdf_path)
+    chars = 0
+    tmp_path = f"{text_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for i, page in enumerate(reader.pages):
+            if i >= max_pages:
+                break
+            text = page.extract_text() or ""
+            f.write(text)
+            f.write("\n\f\n")  # ページ区切り
+            chars += len(text)
+    os.replace(tmp_path, text_path)
+    return chars
+
+
+class FullTextFetcher:
+    """オープンアクセス PDF の並列ダウンロードと本文抽出"""
+
+    def __init__(
+        self,
+        settings: FullTextSettings | None = None,
+        store: PdfStore | None = None,
+    ):
+        self.settings = settings or FullTextSettings()
+        self.store = store if store is not None else PdfStore()
+
+    def _download(self, url: str) -> str | None:
+        """PDF をストリーミングで取得し、ハッシュを計算しながら一時ファイルに書く"""
+        import requests
+
+        metrics = get_metrics()
+        max_bytes = int(self.settings.max_pdf_mb * 1024 * 1024)
+        metrics.incr("pdf.requests")
+        with requests.get(url, stream=True, timeout=self.settings.timeout_s) as r:
+            r.raise_for_status()
+            sha = hashlib.sha256()
+            size = 0
+            fd, tmp = tempfile.mkstemp(dir=self.store.root, suffix=".part")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                        if size == 0 and not chunk.startswith(PDF_MAGIC):
+                            logger.debug(f"Not a PDF: {url}")
+                            return None
+                        size += len(chunk)
+                        if size > max_bytes:
+                            logger.debug(f"PDF larger than the limit: {url}")
+                            return None
+                        sha.update(chunk)
+                        f.write(chunk)
+                if size == 0:
+                    return None
+                metrics.incr("pdf.bytes", size)
+                digest = sha.hexdigest()
+                self.store.add_file(Path(tmp), digest)
+                return digest
+            finally:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+
+    def _fetch_one(self, doi: str, urls: list[str]) -> str | None:
+        """候補 URL を順に試す。通信エラーで取得できなかった場合は次回に再試行する"""
+        status = "unavailable"
+        for url in urls:
+            try:
+                digest = self._download(url)
+            except Exception as e:
+                get_metrics().incr("pdf.errors")
+                logger.debug(f"Failed to download {url}: {e}")
+                status = "error"
+                continue
+            if digest:
+                self.store.record(doi, url, digest, "ok")
+                return digest
+        self.store.record(doi, urls[0] if urls else None, None, status)
+        return None
+
+    def fetch(self, df: pd.DataFrame) -> dict[str, str]:
+        """論文の PDF を取得し、DOI から PDF のハッシュへの対応を返す
+
+        取得済みの DOI と、PDF が公開されていなかった DOI は再取得しない。
+        """
+        papers = {
+            str(row["doi"]): pdf_urls(row, self.settings.arxiv_pdf_url)
+            for row in df.to_dict(orient="records")
+            if isinstance(row.get("doi"), str)
+        }
+        known = {
+            doi: row
+            for doi, row in self.store.lookup(list(papers)).items()
+            if row["status"] != "error"
+        }
+        digests = {
+            doi: row["digest"]
+            for doi, row in known.items()
+            if row["digest"] is not None
+        }
+        todo = {doi: urls for doi, urls in papers.items() if doi not in known and urls}
+        logger.info(
+            f"Downloading PDFs for {len(todo)} papers "
+            f"({len(digests)} already stored, "
+            f"{sum(not urls for urls in papers.values())} without open-access PDF)"
+        )
+
+        metrics = get_metrics()
+        progress = ProgressTracker(
+            total=len(todo), prefix="Downloading PDFs", stage="pdf_download"
+        )
+
+        def process(item: tuple[str, list[str]]) -> tuple[str, str | None]:
+            digest = self._fetch_one(*item)
+            progress.update()
+            return item[0], digest
+
+        with (
+            metrics.span("pdf_download", rows_in=len(todo)) as span,
+            ThreadPoolExecutor(max_workers=self.settings.max_downloads) as executor,
+        ):
+            for doi, digest in executor.map(process, todo.items()):
+                if digest:
+                    digests[doi] = digest
+            span.set(rows_out=sum(doi in digests for doi in todo))
+        progress.close()
+        return digests
+
+    def extract_texts(self, digests: list[str]) -> dict[str, int]:
+        """本文が未抽出の PDF からプロセスプールで本文を抽出し、文字数を返す
+
+        pypdf (任意の依存関係) がなければ抽出を行わない。
+        """
+        try:
+            import pypdf  # noqa: F401
+        except ImportError:
+            logger.warning("pypdf is not installed; skipping PDF text extraction.")
+            return {}
+
+        todo = sorted({d for d in digests if not self.store.text_path(d).exists()})
+        chars: dict[str, int] = {}
+        metrics = get_metrics()
+        progress = ProgressTracker(
+            total=len(todo), prefix="Extracting PDF text", stage="pdf_text"
+        )
+        with (
+            metrics.span("pdf_text", rows_in=len(todo)) as span,
+            ProcessPoolExecutor(max_workers=self.settings.text_processes) as executor,
+        ):
+            futures = {
+                digest: executor.submit(
+                    _extract_text,
+                    str(self.store.pdf_path(digest)),
+                    str(self.store.text_path(digest)),
+                    self.settings.max_pages,
+                )
+                for digest in todo
+            }
+            for digest, future in futures.items():
+                try:
+                    chars[digest] = future.result()
+                except Exception as e:
+                    metrics.incr("pdf.text_errors")
+                    logger.warning(f"Failed to extract text from {digest}: {e}")
+                progress.update()
+            span.set(rows_out=len(chars))
+        progress.close()
+        return chars
@@ -0,0 +1,325 @@
+from __future__ import annotations
+
+import logging
+import pickle
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from src.utils.constants import APP_LOGGER_NAME
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+logger = logging.getLogger(f"{APP_LOGGER_NAME}.graph")
+
+EDGES_FILE_NAME = "citation_edges.csv"
+LAYOUT_FILE_NAME = "citation_layout.pkl"
+# レイアウトの計算方法を変えたら更新する (キャッシュを無効化するため)
+LAYOUT_VERSION = 1
+NODE_COLUMNS = ["doi", "title", "year", "citationCount", "relevance_score"]
+
+
+def append_edges(run_dir: Path, edges: list[tuple[str, str]]) -> None:
+    """引用関係 (citing, cited) を interim/citation_edges.csv に追記する"""
+    if not edges:
+        return
+    path = run_dir / "interim" / EDGES_FILE_NAME
+    write_header = not path.exists()
+    with open(path, "a", encoding="utf-8", newline="") as f:
+        if write_header:
+            f.write("citing,cited\n")
+        for citing, cited in edges:
+            f.write(f"{_csv_field(citing)},{_csv_field(cited)}\n")
+
+
+def _csv_field(value: str) -> str:
+    if any(c in value for c in ',"\n'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def build_citation_graph(run_dir: Path) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """最終結果の論文をノード、その間の引用関係をエッジとする部分グラフを作る
+
+    ノードは DOI (小文字) で識別し、エッジは両端が最終結果に含まれるもののみ残す。
+    返すエッジは (source, target) をノードの行番号で表す。
+    """
+    import pandas as pd
+
+    from src.core.results import load_results_frame
+
+    final = load_results_frame(run_dir / "final" / "final_review_matrix.csv")
+    columns = [c for c in NODE_COLUMNS if c in final.columns]
+    nodes = final[columns].dropna(subset=["doi"]).copy()
+    nodes["doi"] = nodes["doi"].astype(str).str.strip().str.lower()
+    nodes = nodes.drop_duplicates(subset=["doi"]).reset_index(drop=True)
+
+    edges_path = run_dir / "interim" / EDGES_FILE_NAME
+    if not edges_path.exists() or nodes.empty:
+        return nodes, pd.DataFrame({"source": [], "target": []}, dtype="int64")
+
+    raw = pd.read_csv(edges_path, dtype=str).dropna()
+    index = pd.Series(nodes.index, index=nodes["doi"])
+    # DOI から行番号への変換はハッシュ表の参照で行う
+    source = raw["citing"].str.strip().str.lower().map(index)
+    target = raw["cited"].str.strip().str.lower().map(index)
+    edges = pd.DataFrame({"source": source, "target": target}).dropna()
+    edges = edges.astype("int64")
+    edges = edges[edges["source"] != edges["target"]].drop_duplicates()
+    return nodes, edges.reset_index(drop=True)
+
+
+def _components(n: int, src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    """連結成分のラベル (無向グラフとして扱う)。ラベル伝播をベクトル演算で行う"""
+    import numpy as np
+
+    labels = np.arange(n)
+    while True:
+        # 各エッジの両端を小さい方のラベルに揃え、変化がなくなるまで繰り返す
+        low = np.minimum(labels[src], labels[dst])
+        new = labels.copy()
+        np.minimum.at(new, src, low)
+        np.minimum.at(new, dst, low)
+        # ラベルの付け替えを伝播させる (ポインタジャンプ)
+        new = new[new]
+        if np.array_equal(new, labels):
+            return labels
+        labels = new
+
+
+def _scatter_add(index: np.ndarray, values: np.ndarray, n: int) -> np.ndarray:
+    """values の各行を index の位置に加算した (n, 2) 配列 (np.add.at より高速)"""
+    import numpy as np
+
+    return np.stack(
+        [np.bincount(index, weights=values[:, c], minlength=n) for c in range(2)],
+        axis=1,
+    )
+
+
+def _spectral(n: int, src: np.ndarray, dst: np.ndarray, rng) -> np.ndarray:
+    """正規化隣接行列の第2・第3固有ベクトルを直交反復法で求める (疎行列積のみ)"""
+    import numpy as np
+
+    degree = np.bincount(src, minlength=n) + np.bincount(dst, minlength=n) + 1.0
+    inv_sqrt = 1.0 / np.sqrt(degree)
+    # 自明な固有ベクトル (次数の平方根に比例) を除外する
+    trivial = np.sqrt(degree)
+    trivial /= np.linalg.norm(trivial)
+
+    def matvec(x: np.ndarray) -> np.ndarray:
+        # (I + D^-1/2 (A + I) D^-1/2) / 2 を掛ける (固有値を非負にずらす)
+        y = x * inv_sqrt[:, None]
+        ay = y + _scatter_add(src, y[dst], n) + _scatter_add(dst, y[src], n)
+        return (x + ay * inv_sqrt[:, None]) / 2
+
+    x = rng.normal(size=(n, 2))
+    for _ in range(100):
+        x = matvec(x)
+        x -= np.outer(trivial, trivial @ x)
+        x, _ = np.linalg.qr(x)
+    return x * inv_sqrt[:, None]
+
+
+def _refine(pos: np.ndarray, src: np.ndarray, dst: np.ndarray, rng, iterations=50):
+    """力学モデル (Fruchterman-Reingold) で配置を整える
+
+    反発力は全ノード対ではなく、ランダムに選んだノードとの間でのみ計算する
+    (負例サンプリング)。1回の反復の計算量はノード数とエッジ数に比例する。
+    """
+    import numpy as np
+
+    n = len(pos)
+    samples = min(8, n - 1)
+    k = 1.0 / np.sqrt(n)
+    for t in range(iterations):
+        delta = pos[src] - pos[dst]
+        dist = np.linalg.norm(delta, axis=1, keepdims=True) + 1e-9
+        pull = delta * dist / k
+        disp = _scatter_add(dst, pull, n) - _scatter_add(src, pull, n)
+
+        others = rng.integers(0, n, size=(n, samples))
+        delta = pos[:, None, :] - pos[others]
+        dist2 = (delta**2).sum(axis=2, keepdims=True) + 1e-9
+        disp += (delta * (k * k / dist2)).sum(axis=1) * ((n - 1) / samples)
+
+        step = 0.1 * (1 - t / iterations) + 1e-3
+        length = np.linalg.norm(disp, axis=1, keepdims=True) + 1e-9
+        pos = pos + disp / length * np.minimum(length, step)
+    return pos
+
+
+def _normalize(pos: np.ndarray) -> np.ndarray:
+    """中心を原点に、最大半径を1に揃える"""
+    import numpy as np
+
+    pos = pos - pos.mean(axis=0)
+    radius = np.abs(pos).max()
+    return pos / radius if radius > 0 else pos
+
+
+def compute_layout(n: int, edges: pd.DataFrame, seed: int = 0) -> np.ndarray:
+    """ノードの2次元座標を計算する
+
+    連結成分ごとにスペクトル配置を初期値として力学モデルで整え、成分を大きい順に
+    格子状に並べる。引用関係のない論文は外周の格子にまとめて配置する。
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    pos = np.zeros((n, 2))
+    if n == 0:
+        return pos
+    src = edges["source"].to_numpy()
+    dst = edges["target"].to_numpy()
+    labels = _components(n, src, dst)
+
+    unique, counts = np.unique(labels, return_counts=True)
+    # ノードとエッジを連結成分ごとにまとめ、成分内での通し番号を振る
+    node_order = np.argsort(labels, kind="stable")
+    starts = np.searchsorted(labels[node_order], unique)
+    local = np.empty(n, dtype=int)
+    local[node_order] = np.arange(n) - np.repeat(starts, counts)
+    edge_labels = labels[src]
+    edge_order = np.argsort(edge_labels, kind="stable")
+    edge_starts = np.searchsorted(edge_labels[edge_order], unique)
+    edge_ends = np.searchsorted(edge_labels[edge_order], unique, side="right")
+    isolated = np.flatnonzero(np.isin(labels, unique[counts == 1]))
+
+    # 連結成分の配置 (面積がノード数に比例するよう半径を決める)
+    cursor_x, cursor_y, row_height = 0.0, 0.0, 0.0
+    row_width = max(4.0, np.sqrt(n) / 4)
+    for i in np.argsort(-counts, kind="stable"):
+        if counts[i] == 1:
+            break
+        members = node_order[starts[i] : starts[i] + counts[i]]
+        component_edges = edge_order[edge_starts[i] : edge_ends[i]]
+        c_src, c_dst = local[src[component_edges]], local[dst[component_edges]]
+        if len(members) <= 3:
+            sub = rng.normal(size=(len(members), 2))
+        else:
+            sub = _spectral(len(members), c_src, c_dst, rng)
+            sub = _refine(_normalize(sub), c_src, c_dst, rng)
+        radius = np.sqrt(len(members)) / 4 + 0.25
+        if cursor_x + 2 * radius > row_width and cursor_x > 0:
+            cursor_x, cursor_y = 0.0, cursor_y - row_height
+            row_height = 0.0
+        pos[members] = _normalize(sub) * radius + [cursor_x + radius, cursor_y - radius]
+        cursor_x += 2 * radius
+        row_height = max(row_height, 2 * radius)
+
+    # 孤立した論文は連結成分の下に格子状に並べる
+    if len(isolated):
+        top = cursor_y - row_height - 0.5
+        cols = int(np.ceil(np.sqrt(len(isolated)) * 2))
+        spacing = row_width / max(cols, 1)
+        idx = np.arange(len(isolated))
+        pos[isolated, 0] = (idx % cols) * spacing
+        pos[isolated, 1] = top - (idx // cols) * spacing
+    return _normalize(pos)
+
+
+class CitationGraph:
+    """レイアウト済みの引用ネットワーク (ノードに x, y 列を持つ)"""
+
+    def __init__(self, nodes: pd.DataFrame, edges: pd.DataFrame):
+        self.nodes = nodes
+        self.edges = edges
+
+    def decimate(self, max_nodes: int, max_edges: int) -> CitationGraph:
+        """表示用に間引く (詳細度の調整)
+
+        ノードは関連度スコアと次数の高い順に max_nodes 件を残し、エッジは両端が
+        残ったもののうち、両端のスコアの合計が高い順に max_edges 件を残す。
+        """
+        import numpy as np
+
+        nodes, edges = self.nodes, self.edges
+        if len(nodes) > max_nodes:
+            degree = np.bincount(
+                np.concatenate([edges["source"], edges["target"]]),
+                minlength=len(nodes),
+            )
+            score = nodes.get("relevance_score", 0)
+            priority = np.asarray(score, dtype=float) * 1000 + degree
+            keep = np.argsort(-np.nan_to_num(priority, nan=-1), kind="stable")
+            keep = np.sort(keep[:max_nodes])
+            mask = np.zeros(len(nodes), dtype=bool)
+            mask[keep] = True
+            edges = edges[mask[edges["source"]] & mask[edges["target"]]]
+            nodes = nodes.iloc[keep]
+        if len(edges) > max_edges:
+            # スコアのない古い結果では、エッジは元の順に残す
+            score = (
+                self.nodes["relevance_score"].to_numpy(dtype=float, na_value=0)
+                if "relevance_score" in self.nodes.columns
+                else np.zeros(len(self.nodes))
+            )
+            weight = score[edges["source"]] + score[edges["target"]]
+            edges = edges.iloc[np.argsort(-weight, kind="stable")[:max_edges]]
+        return CitationGraph(nodes, edges)
+
+    def edge_segments(self) -> pd.DataFrame:
+        """エッジの両端の座標 (sx, sy, tx, ty 列、描画用)"""
+        import pandas as pd
+
+        src = self.edges["source"].to_numpy()
+        dst = self.edges["target"].to_numpy()
+        x = self.nodes["x"]
+        y = self.nodes["y"]
+        return pd.DataFrame(
+            {
+                "sx": x.loc[src].to_numpy(),
+                "sy": y.loc[src].to_numpy(),
+                "tx": x.loc[dst].to_numpy(),
+                "ty": y.loc[dst].to_numpy(),
+            }
+        )
+
+
+def _layout_key(run_dir: Path) -> tuple[int, int, int]:
+    final_csv = run_dir / "final" / "final_review_matrix.csv"
+    edges_path = run_dir / "interim" / EDGES_FILE_NAME
+    return (
+        LAYOUT_VERSION,
+        final_csv.stat().st_mtime_ns,
+        edges_path.stat().st_mtime_ns if edges_path.exists() else 0,
+    )
+
+
+def load_citation_graph(run_dir: Path, compute: bool = True) -> CitationGraph | None:
+    """実行の引用ネットワークを返す
+
+    レイアウトは interim/citation_layout.pkl にキャッシュし、結果や引用関係が
+    更新されていなければ再計算しない。compute=False ならキャッシュのみを使う。
+    """
+    final_csv = run_dir / "final" / "final_review_matrix.csv"
+    if not final_csv.exists():
+        return None
+    cache_path = run_dir / "interim" / LAYOUT_FILE_NAME
+    key = _layout_key(run_dir)
+    if cache_path.exists():
+        try:
+            with open(cache_path, "rb") as f:
+                cached = pickle.load(f)
+            if cached["key"] == key:
+                return CitationGraph(cached["nodes"], cached["edges"])
+        except (OSError, EOFError, KeyError, pickle.UnpicklingError) as e:
+            logger.warning(f"Ignoring unreadable layout cache {cache_path}: {e}")
+    if not compute:
+        return None
+
+    nodes, edges = build_citation_graph(run_dir)
+    pos = compute_layout(len(nodes), edges)
+    nodes = nodes.assign(x=pos[:, 0], y=pos[:, 1])
+    logger.info(
+        f"Computed citation layout for {len(nodes)} papers and {len(edges)} edges"
+    )
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_path, "wb") as f:
+            pickle.dump({"key": key, "nodes": nodes, "edges": edges}, f)
+    except OSError as e:
+        logger.warning(f"Failed to write layout cache {cache_path}: {e}")
+    return CitationGraph(nodes, edges)
@@ -0,0 +1,341 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, NamedTuple, Protocol
+
+from pydantic import BaseModel, ValidationError
+
+from src.core.prompts import estimate_tokens
+from src.core.usage import extract_usage
+from src.models.models import LLMBackendSettings
+from src.utils.cassette import gemini_client
+from src.utils.constants import APP_LOGGER_NAME
+
+logger = logging.getLogger(f"{APP_LOGGER_NAME}.llm")
+
+
+class Generation(NamedTuple):
+    """構造化出力の結果。応答がスキーマに合わない場合 parsed は None"""
+
+    parsed: BaseModel | None
+    usage: dict[str, int]
+
+
+class LLMBackend(Protocol):
+    """PaperScreener 等が使う LLM の呼び出し口
+
+    generate は応答スキーマ (Pydantic モデル) に従う構造化出力を返す。
+    generate_with_prefix は全ての呼び出しで共通の前半 (prefix) を分けて受け取り、
+    バックエンドが対応していればコンテキストキャッシュで前半の再送を省く。
+    generate_batch は複数のプロンプトをまとめて処理し、入力と同じ順で結果を返す。
+    agenerate は asyncio から呼び出すための非同期版。
+    close は実行の終わりに呼び出し、バックエンドが作ったリソースを解放する。
+    """
+
+    def generate(
+        self, model: str, prompt: str, schema: type[BaseModel]
+    ) -> Generation: ...
+
+    def generate_with_prefix(
+        self, model: str, prefix: str, prompt: str, schema: type[BaseModel]
+    ) -> Generation: ...
+
+    def generate_batch(
+        self, model: str, prompts: list[str], schema: type[BaseModel]
+    ) -> list[Generation]: ...
+
+    async def agenerate(
+        self, model: str, prompt: str, schema: type[BaseModel]
+    ) -> Generation: ...
+
+    def close(self) -> None: ...
+
+
+class BaseBackend(ABC):
+    """generate のみを実装すれば、バッチ・非同期版はスレッドで実行する
+
+    generate は抽象メソッドのため、実装していないバックエンドは生成時に失敗する。
+
+    generate_with_prefix は既定では前半と後半を連結して generate を呼ぶ (前半が
+    先頭に来るため、接頭辞キャッシュを持つサーバーではそのまま再利用される)。
+    """
+
+    batch_concurrency = 8
+
+    @abstractmethod
+    def generate(
+        self, model: str, prompt: str, schema: type[BaseModel]
+    ) -> Generation: ...
+
+    def generate_with_prefix(
+        self, model: str, prefix: str, prompt: str, schema: type[BaseModel]
+    ) -> Generation:
+        return self.generate(model, prefix + prompt, schema)
+
+    def generate_batch(
+        self, model: str, prompts: list[str], schema: type[BaseModel]
+    ) -> list[Generation]:
+        with ThreadPoolExecutor(max_workers=self.batch_concurrency) as executor:
+            return list(
+                executor.map(lambda p: self.generate(model, p, schema), prompts)
+            )
+
+    async def agenerate(
+        self, model: str, prompt: str, schema: type[BaseModel]
+    ) -> Generation:
+        return await asyncio.to_thread(self.generate, model, prompt, schema)
+
+    def close(self) -> None:  # noqa: B027
+        """既定では解放するリソースがない"""
+
+
+class GeminiBackend(BaseBackend):
+    """Gemini API (記録・再生が有効ならカセット経由で呼び出す)
+
+    context_cache が有効で、前半の見積もりトークン数が cache_min_tokens 以上の
+    場合は、前半をモデルごとに1回だけキャッシュ (caches.create) し、以降の
+    呼び出しでは後半のみを送る。キャッシュを作れない・期限切れの場合は全文を送る。
+    作成したキャッシュは close で削除する。
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        batch_concurrency: int = 8,
+        context_cache: bool = True,
+        cache_min_tokens: int = 1024,
+        cache_ttl_s: int = 3600,
+    ):
+        self.client = gemini_client(api_key)
+        self.batch_concurrency = batch_concurrency
+        # 記録・再生用のクライアントはキャッシュの API を持たない
+        self.context_cache = context_cache and hasattr(self.client, "caches")
+        self.cache_min_tokens = cache_min_tokens
+        self.cache_ttl_s = cache_ttl_s
+        # (モデル, 前半のハッシュ) -> キャッシュ名 (作成に失敗した場合は None)
+        self._caches: dict[tuple[str, str], str | None] = {}
+        self._cache_lock = threading.Lock()
+
+    def generate(self, model: str, prompt: str, schema: type[BaseModel]) -> Generation:
+        return self._generate(model, prompt, schema)
+
+    def generate_with_prefix(
+        self, model: str, prefix: str, prompt: str, schema: type[BaseModel]
+    ) -> Generation:
+        if not self.context_cache or estimate_tokens(prefix) < self.cache_min_tokens:
+            return self._generate(model, prefix + prompt, schema)
+        key = (model, hashlib.sha256(prefix.encode("utf-8")).hexdigest())
+        cache_name = self._cache(key, prefix)
+        if cache_name is None:
+            return self._generate(model, prefix + prompt, schema)
+        try:
+            return self._generate(model, prompt, schema, cache_name)
+        except Exception as e:
+            # 期限切れ・削除済みの場合のみ作り直す (レート制限等はそのまま送出する)
+            if not _is_cache_miss(e):
+                raise
+            logger.warning(f"Cached content {cache_name} failed ({e}); sending in full")
+            with self._cache_lock:
+                self._caches.pop(key, None)
+            return self._generate(model, prefix + prompt, schema)
+
+    def _generate(
+        self,
+        model: str,
+        prompt: str,
+        schema: type[BaseModel],
+        cache_name: str | None = None,
+    ) -> Generation:
+        config: dict[str, Any] = {
+            "response_mime_type": "application/json",
+            "response_schema": schema,
+        }
+        if cache_name is not None:
+            config["cached_content"] = cache_name
+        response = self.client.models.generate_content(
+            model=model, contents=prompt, config=config
+        )
+        usage = extract_usage(response)
+        if cache_name is not None:
+            metadata = getattr(response, "usage_metadata", None)
+            cached = getattr(metadata, "cached_content_token_count", None)
+            usage["cached_tokens"] = cached if isinstance(cached, int) else 0
+        return Generation(response.parsed, usage)
+
+    def _cache(self, key: tuple[str, str], prefix: str) -> str | None:
+        """前半のキャッシュ名を返す (未作成なら作る。並列の呼び出しでも1回だけ作る)"""
+        with self._cache_lock:
+            if key in self._caches:
+                return self._caches[key]
+            try:
+                cache = self.client.caches.create(
+                    model=key[0],
+                    config={
+                        "contents": [prefix],
+                        "ttl": f"{self.cache_ttl_s}s",
+                        "display_name": f"prefix-{key[1][:12]}",
+                    },
+                )
+                self._caches[key] = cache.name
+                logger.info(f"Created context cache {cache.name} for {key[0]}")
+            except Exception as e:
+                logger.warning(f"Context caching is unavailable for {key[0]}: {e}")
+                self._caches[key] = None
+            return self._caches[key]
+
+    def close(self) -> None:
+        """作成したキャッシュを削除する (期限切れを待たずに保存料金を止める)"""
+        with self._cache_lock:
+            names = [name for name in self._caches.values() if name is not None]
+            self._caches.clear()
+        for name in names:
+            try:
+                self.client.caches.delete(name=name)
+                logger.info(f"Deleted context cache {name}")
+            except Exception as e:
+                logger.warning(f"Failed to delete context cache {name}: {e}")
+
+
+def _is_cache_miss(error: Exception) -> bool:
+    """キャッシュが見つからない・期限切れのエラーかどうか"""
+    from google.genai import errors
+
+    if not isinstance(error, errors.ClientError) or error.code not in (400, 403, 404):
+        return False
+    return "cache" in f"{error.status} {error.message}".lower()
+
+
+class LocalBackend(BaseBackend):
+    """OpenAI 互換の Chat Completions API (自前のサーバーで動かすモデル)
+
+    応答は response_format の JSON Schema で構造化を指定する。スキーマに合わない
+    応答は parsed=None とする (Gemini で parsed が None の場合と同じ扱い)。
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str | None = None,
+        timeout_s: float = 120.0,
+        batch_concurrency: int = 8,
+    ):
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self.timeout_s = timeout_s
+        self.batch_concurrency = batch_concurrency
+
+    def generate(self, model: str, prompt: str, schema: type[BaseModel]) -> Generation:
+        import requests
+
+        payload = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": schema.__name__,
+                    "schema": schema.model_json_schema(),
+                    "strict": True,
+                },
+            },
+        }
+        response = requests.post(
+            self.url, json=payload, headers=self.headers, timeout=self.timeout_s
+        )
+        response.raise_for_status()
+        data = response.json()
+        usage = data.get("usage") or {}
+        prompt_tokens = int(usage.get("prompt_tokens") or 0)
+        output_tokens = int(usage.get("completion_tokens") or 0)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": int(usage.get("total_tokens") or 0)
+            or prompt_tokens + output_tokens,
+        }
+        try:
+            content = data["choices"][0]["message"]["content"]
+            parsed = schema.model_validate_json(content)
+        except (KeyError, IndexError, TypeError, ValidationError) as e:
+            logger.debug(f"Invalid structured output from {self.url}: {e}")
+            parsed = None
+        return Generation(parsed, usage)
+
+
+class FakeBackend(BaseBackend):
+    """プロンプトから決定的に応答を作るバックエンド (負荷試験・オフライン実行用)
+
+    整数の項目にはプロンプトのハッシュから 0〜10 の値を、文字列の項目には固定の
+    文を入れる。latency_ms だけ待ってから返す。generate_batch はバッチ全体で1回分
+    だけ待つ (まとめて推論するサーバーを想定)。
+    """
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_s = latency_ms / 1000
+
+    def _build(self, prompt: str, schema: type[BaseModel]) -> Generation:
+        seed = zlib.crc32(prompt.encode("utf-8"))
+        values: dict[str, Any] = {}
+        for i, (name, field) in enumerate(schema.model_fields.items()):
+            if field.annotation is int:
+                values[name] = (seed >> i) % 11
+            else:
+                values[name] = f"Fake {name}"
+        prompt_tokens = max(1, len(prompt) // 4)
+        output_tokens = len(json.dumps(values)) // 4
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": prompt_tokens + output_tokens,
+        }
+        return Generation(schema.model_validate(values), usage)
+
+    def generate(self, model: str, prompt: str, schema: type[BaseModel]) -> Generation:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        return self._build(prompt, schema)
+
+    def generate_batch(
+        self, model: str, prompts: list[str], schema: type[BaseModel]
+    ) -> list[Generation]:
+        if self.latency_s and prompts:
+            time.sleep(self.latency_s)
+        return [self._build(prompt, schema) for prompt in prompts]
+
+    async def agenerate(
+        self, model: str, prompt: str, schema: type[BaseModel]
+    ) -> Generation:
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        return self._build(prompt, schema)
+
+
+def create_backend(
+    settings: LLMBackendSettings | None, api_key: str | None = None
+) -> LLMBackend:
+    """設定 (llm_settings.backend) に応じたバックエンドを作る"""
+    settings = settings or LLMBackendSettings()
+    if settings.type == "local":
+        return LocalBackend(
+            settings.base_url,
+            api_key=settings.api_key,
+            timeout_s=settings.timeout_s,
+            batch_concurrency=settings.batch_concurrency,
+        )
+    if settings.type == "fake":
+        return FakeBackend(latency_ms=settings.fake_latency_ms)
+    return GeminiBackend(
+        api_key or "",
+        batch_concurrency=settings.batch_concurrency,
+        context_cache=settings.context_cache,
+        cache_min_tokens=settings.cache_min_tokens,
+        cache_ttl_s=settings.cache_ttl_s,
+    )
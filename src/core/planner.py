@@ -0,0 +1,391 @@
+import json
+import logging
+import math
+import time
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel, Field
+
+from src.core.collector import S2Collector
+from src.core.usage import estimate_cost
+from src.models.models import Config
+from src.utils.constants import APP_LOGGER_NAME, DATA_DIR
+from src.utils.metrics import METRICS_FILE_NAME
+
+logger = logging.getLogger(f"{APP_LOGGER_NAME}.planner")
+
+PLANNER_CACHE_FILE = DATA_DIR / "planner_cache.json"
+# キャッシュした件数の有効期間 (秒)。検索のヒット数や被引用数は日々増えるため
+PLANNER_CACHE_TTL_S = 7 * 24 * 3600
+
+
+class HistoricalRates(BaseModel):
+    """過去の実行から推定した比率・レイテンシ (履歴がない場合は既定値)"""
+
+    runs: int = 0
+    pass_rate: float = 0.5  # process_papers の通過率
+    missing_abstract_rate: float = 0.3  # ArXiv 補完の対象になる割合
+    above_threshold_rate: float = 0.2  # しきい値以上のスコアの割合
+    related_per_seed: float = 50.0  # スノーボール1件あたりの関連論文数
+    s2_latency_s: float = 1.5
+    arxiv_latency_s: float = 1.0
+    llm_latency_s: float = 2.0
+    prompt_tokens_per_call: float = 450.0
+    output_tokens_per_call: float = 120.0
+
+
+class IterationEstimate(BaseModel):
+    iteration: int
+    candidates: int
+    screened: int
+    snowball_seeds: int
+    s2_requests: int
+    arxiv_requests: int
+    llm_calls: int
+
+
+class RunPlan(BaseModel):
+    iterations: list[IterationEstimate] = Field(default_factory=list)
+    s2_requests: int = 0
+    arxiv_requests: int = 0
+    llm_calls: int = 0
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+    wall_time_s: float = 0.0
+    history: HistoricalRates = Field(default_factory=HistoricalRates)
+    warnings: list[str] = Field(default_factory=list)
+    # S2 から取得できず、上限値や過去の実行の値で代用した項目
+    unknown: list[str] = Field(default_factory=list)
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.output_tokens
+
+    @property
+    def over_budget(self) -> bool:
+        return bool(self.warnings)
+
+
+def load_history(
+    data_dir: Path = DATA_DIR, project_name: str | None = None
+) -> HistoricalRates:
+    """過去の実行の metrics.jsonl と最終結果から比率・レイテンシを集計する"""
+    rates = HistoricalRates()
+    if not data_dir.exists():
+        return rates
+
+    totals: dict[str, float] = {}
+    stage_rows: dict[str, dict[str, float]] = {}
+    scores_total = scores_above = 0
+    runs = 0
+
+    for run_dir in sorted(data_dir.iterdir()):
+        metrics_path = run_dir / METRICS_FILE_NAME
+        if not run_dir.is_dir() or not metrics_path.exists():
+            continue
+        if project_name and not run_dir.name.endswith(f"_{project_name}"):
+            continue
+        summary = _read_summary(metrics_path)
+        if summary is None:
+            continue
+        runs += 1
+        for key, value in summary.get("totals", {}).items():
+            totals[key] = totals.get(key, 0) + value
+        for stage in summary.get("stages", []):
+            rows = stage_rows.setdefault(stage["stage"], {})
+            for key in ("rows_in", "rows_out", "duration_s"):
+                rows[key] = rows.get(key, 0) + (stage.get(key) or 0)
+            for key, value in stage.get("counters", {}).items():
+                rows[key] = rows.get(key, 0) + value
+        above, total = _score_distribution(run_dir)
+        scores_above += above
+        scores_total += total
+
+    if runs == 0:
+        return rates
+
+    rates.runs = runs
+    process = stage_rows.get("process_papers", {})
+    if process.get("rows_in"):
+        rates.pass_rate = process.get("rows_out", 0) / process["rows_in"]
+        arxiv_rows = stage_rows.get("arxiv_fill", {}).get("rows_in", 0)
+        rates.missing_abstract_rate = arxiv_rows / process["rows_in"]
+    if scores_total:
+        rates.above_threshold_rate = scores_above / scores_total
+    snowball = stage_rows.get("snowball", {})
+    if snowball.get("s2.requests"):
+        rates.related_per_seed = snowball.get("rows_out", 0) / snowball["s2.requests"]
+    if totals.get("s2.requests"):
+        # バックオフによる待機時間も含めた1リクエストあたりの実効時間
+        s2_time = sum(
+            stage_rows.get(name, {}).get("duration_s", 0)
+            for name in ("collect_initial", "snowball")
+        )
+        if s2_time:
+            rates.s2_latency_s = s2_time / totals["s2.requests"]
+    if totals.get("arxiv.requests"):
+        arxiv_time = stage_rows.get("arxiv_fill", {}).get("duration_s", 0)
+        sleep_time = totals.get("arxiv.sleep_s", 0)
+        rates.arxiv_latency_s = (
+            max(0.0, arxiv_time - sleep_time) / totals["arxiv.requests"]
+        )
+    if totals.get("llm.calls"):
+        calls = totals["llm.calls"]
+        rates.llm_latency_s = totals.get("llm.latency_s", 0) / calls
+        if totals.get("llm.prompt_tokens"):
+            rates.prompt_tokens_per_call = totals["llm.prompt_tokens"] / calls
+            rates.output_tokens_per_call = totals.get("llm.output_tokens", 0) / calls
+    return rates
+
+
+def _read_summary(metrics_path: Path) -> dict[str, Any] | None:
+    summary = None
+    with open(metrics_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("type") == "summary":
+                summary = record
+    return summary
+
+
+def _score_distribution(run_dir: Path) -> tuple[int, int]:
+    """最終結果のうち、実行時のしきい値以上のスコアの件数と全件数を返す"""
+    import pandas as pd
+
+    from src.utils.io_utils import load_config
+
+    final_csv = run_dir / "final" / "final_review_matrix.csv"
+    config_path = run_dir / "config.yml"
+    if not final_csv.exists() or not config_path.exists():
+        return 0, 0
+    try:
+        threshold = load_config(config_path).search_criteria.screening_threshold
+        scores = pd.read_csv(final_csv, usecols=["relevance_score"])["relevance_score"]
+    except Exception as e:
+        logger.warning(f"Skipping history from {run_dir}: {e}")
+        return 0, 0
+    return int((scores >= threshold).sum()), len(scores)
+
+
+class RunPlanner:
+    """実行前に API 呼び出し数・トークン数・所要時間を見積もる (ドライラン)
+
+    S2 へは件数のみを取得する軽量なリクエスト (検索ヒット数、Seed 論文の
+    被引用・参考文献数) だけを送り、結果は planner_cache.json に cache_ttl_s 秒の間
+    保存して再利用する。S2 に接続できない項目は不明として見積もりを続ける。
+    """
+
+    def __init__(
+        self,
+        collector: S2Collector,
+        history: HistoricalRates | None = None,
+        cache_path: Path = PLANNER_CACHE_FILE,
+        cache_ttl_s: float = PLANNER_CACHE_TTL_S,
+    ):
+        self.collector = collector
+        self.history = history or HistoricalRates()
+        self.cache_path = cache_path
+        self.cache_ttl_s = cache_ttl_s
+        self._cache = self._load_cache()
+
+    def _load_cache(self) -> dict[str, Any]:
+        if self.cache_path.exists():
+            try:
+                return json.loads(self.cache_path.read_text(encoding="utf-8"))
+            except json.JSONDecodeError:
+                logger.warning(f"Ignoring corrupt planner cache: {self.cache_path}")
+        return {}
+
+    def _save_cache(self) -> None:
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self.cache_path.write_text(
+            json.dumps(self._cache, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+
+    def _cached(self, key: str) -> int | None:
+        """有効期間内のキャッシュの値 (ない・期限切れ・旧形式なら None)"""
+        entry = self._cache.get(key)
+        if not isinstance(entry, dict):
+            return None
+        if time.time() - entry.get("fetched_at", 0) > self.cache_ttl_s:
+            return None
+        return entry.get("value")
+
+    def _store(self, key: str, value: int) -> int:
+        self._cache[key] = {"value": value, "fetched_at": time.time()}
+        return value
+
+    def _probe_keyword_total(self, keywords: list[str]) -> int | None:
+        key = "search:" + " ".join(keywords)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        total = self.collector.count_keyword_results(keywords)
+        return None if total is None else self._store(key, total)
+
+    def _probe_related_count(self, doi: str) -> int | None:
+        key = f"related:{doi}"
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        counts = self.collector.get_paper_counts(doi)
+        if counts is None:
+            return None
+        return self._store(key, counts["citationCount"] + counts["referenceCount"])
+
+    def plan(self, config: Config) -> RunPlan:
+        criteria = config.search_criteria
+        rates = self.history
+        plan = RunPlan(history=rates)
+
+        # --- 軽量プローブ ---
+        keyword_hits = 0
+        if criteria.keywords:
+            total = self._probe_keyword_total(criteria.keywords)
+            if total is None:
+                # 件数が分からない場合は上限まで集まるものとして見積もる
+                plan.unknown.append(
+                    "S2 search total (assumed keyword_search_limit "
+                    f"{criteria.keyword_search_limit:,})"
+                )
+                total = criteria.keyword_search_limit
+            keyword_hits = min(total, criteria.keyword_search_limit)
+        related_counts = [
+            c
+            for c in (self._probe_related_count(d) for d in criteria.seed_paper_dois)
+            if c is not None
+        ]
+        self._save_cache()
+        if len(related_counts) < len(criteria.seed_paper_dois):
+            plan.unknown.append(
+                f"citation counts for "
+                f"{len(criteria.seed_paper_dois) - len(related_counts)} seed papers"
+            )
+
+        related_per_seed = (
+            sum(related_counts) / len(related_counts)
+            if related_counts
+            else rates.related_per_seed
+        )
+        if criteria.max_related_papers != -1:
+            related_per_seed = min(related_per_seed, criteria.max_related_papers)
+
+        # --- イテレーションごとの展開 ---
+        candidates = keyword_hits + len(criteria.seed_paper_dois)
+        initial_requests = (1 if criteria.keywords else 0) + len(
+            criteria.seed_paper_dois
+        )
+        for iteration in range(1, criteria.iterations + 1):
+            screened = math.ceil(candidates * rates.pass_rate)
+            arxiv_requests = math.ceil(candidates * rates.missing_abstract_rate)
+            seeds = 0
+            if iteration < criteria.iterations and screened:
+                seeds = min(
+                    screened,
+                    max(
+                        criteria.top_n_for_snowball,
+                        math.ceil(screened * rates.above_threshold_rate),
+                    ),
+                )
+            s2_requests = (initial_requests if iteration == 1 else 0) + seeds
+            plan.iterations.append(
+                IterationEstimate(
+                    iteration=iteration,
+                    candidates=candidates,
+                    screened=screened,
+                    snowball_seeds=seeds,
+                    s2_requests=s2_requests,
+                    arxiv_requests=arxiv_requests,
+                    llm_calls=screened,
+                )
+            )
+            if screened == 0:
+                break
+            candidates = math.ceil(seeds * related_per_seed)
+
+        # --- 合計と所要時間 ---
+        plan.s2_requests = sum(it.s2_requests for it in plan.iterations)
+        plan.arxiv_requests = sum(it.arxiv_requests for it in plan.iterations)
+        plan.llm_calls = sum(it.llm_calls for it in plan.iterations)
+        plan.prompt_tokens = round(plan.llm_calls * rates.prompt_tokens_per_call)
+        plan.output_tokens = round(plan.llm_calls * rates.output_tokens_per_call)
+        plan.cost_usd = estimate_cost(
+            plan.prompt_tokens, plan.output_tokens, config.budget
+        )
+
+        llm_parallelism = config.llm_settings.max_screening_workers * max(
+            1, config.llm_settings.screening_processes
+        )
+        plan.wall_time_s = (
+            plan.s2_requests * rates.s2_latency_s
+            # ArXiv は1件ごとに1秒の待機を挟む
+            + plan.arxiv_requests * (rates.arxiv_latency_s + 1.0)
+            + plan.llm_calls * rates.llm_latency_s / llm_parallelism
+        )
+
+        plan.warnings = check_budget(plan, config)
+        return plan
+
+
+def check_budget(plan: RunPlan, config: Config) -> list[str]:
+    """見積もりが設定された予算を超える場合の警告メッセージを返す"""
+    budget = config.budget
+    warnings = []
+    if (
+        budget.max_total_tokens is not None
+        and plan.total_tokens > budget.max_total_tokens
+    ):
+        warnings.append(
+            f"Estimated tokens {plan.total_tokens:,} exceed max_total_tokens "
+            f"{budget.max_total_tokens:,}"
+        )
+    if budget.max_cost_usd is not None and plan.cost_usd > budget.max_cost_usd:
+        warnings.append(
+            f"Estimated cost ${plan.cost_usd:.2f} exceeds max_cost_usd "
+            f"${budget.max_cost_usd:.2f}"
+        )
+    if (
+        budget.max_wall_time_minutes is not None
+        and plan.wall_time_s > budget.max_wall_time_minutes * 60
+    ):
+        warnings.append(
+            f"Estimated wall time {plan.wall_time_s / 60:.1f} min exceeds "
+            f"max_wall_time_minutes {budget.max_wall_time_minutes:.1f}"
+        )
+    return warnings
+
+
+def format_plan(plan: RunPlan) -> str:
+    """見積もり結果を表形式の文字列にする"""
+    header = (
+        f"{'iter':>4}{'candidates':>12}{'screened':>10}{'seeds':>7}"
+        f"{'S2 req':>8}{'ArXiv':>7}{'LLM':>7}"
+    )
+    lines = [header, "-" * len(header)]
+    for it in plan.iterations:
+        lines.append(
+            f"{it.iteration:>4}{it.candidates:>12,}{it.screened:>10,}"
+            f"{it.snowball_seeds:>7,}{it.s2_requests:>8,}{it.arxiv_requests:>7,}"
+            f"{it.llm_calls:>7,}"
+        )
+    lines += [
+        "-" * len(header),
+        f"S2 requests:    {plan.s2_requests:,}",
+        f"ArXiv requests: {plan.arxiv_requests:,}",
+        f"LLM calls:      {plan.llm_calls:,}",
+        f"Tokens:         {plan.total_tokens:,} "
+        f"(prompt {plan.prompt_tokens:,} / output {plan.output_tokens:,})",
+        f"Estimated cost: ${plan.cost_usd:.4f}",
+        f"Wall time:      {plan.wall_time_s / 60:.1f} min",
+        f"History:        {plan.history.runs} previous runs",
+    ]
+    for item in plan.unknown:
+        lines.append(f"UNKNOWN: {item}")
+    for warning in plan.warnings:
+        lines.append(f"WARNING: {warning}")
+    return "\n".join(lines)
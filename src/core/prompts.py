@@ -0,0 +1,109 @@
+"""スクリーニングのプロンプトの組み立て (抄録の正規化・切り詰めと前半の分離)
+
+テンプレートは論文によらない前半 (研究スコープ・指示) と論文ごとの後半
+("# Paper Information:" 以降) に分けて組み立てる。前半は全ての呼び出しで同じ
+文字列になるため、バックエンドのコンテキストキャッシュ (または OpenAI 互換
+サーバーの接頭辞キャッシュ) で再送を省ける。
+
+トークン数は API を呼ばずに文字数から見積もる (英文は約4文字、日本語等は
+1文字で1トークン)。
+"""
+
+from __future__ import annotations
+
+import html
+import math
+import re
+from typing import NamedTuple
+
+# テンプレートの論文ごとの部分の見出し (これ以降を後半とする)
+PAPER_SECTION = "# Paper Information:"
+# 切り詰めた抄録の末尾に付ける印
+TRUNCATION_MARK = " [...]"
+
+_WIDE_CHARS = re.compile(r"[\u3000-\u9fff\uac00-\ud7af\uff00-\uffef]")
+_JATS_TITLE = re.compile(r"<jats:title>.*?</jats:title>", re.IGNORECASE | re.DOTALL)
+_TAGS = re.compile(r"<[^>]+>")
+_SPACES = re.compile(r"\s+")
+_LABEL = re.compile(r"^(abstract|summary)\s*[:.\-—]\s*", re.IGNORECASE)
+_SENTENCE_END = re.compile(r"[.!?](?=\s)|[。！？]")
+
+
+class BuiltPrompt(NamedTuple):
+    """組み立てたプロンプト (prefix + suffix が送信する全文)"""
+
+    prefix: str
+    suffix: str
+    est_tokens: int
+    # 切り詰めで削った抄録の見積もりトークン数 (切り詰めなければ 0)
+    truncated_tokens: int
+
+    @property
+    def text(self) -> str:
+        return self.prefix + self.suffix
+
+
+def estimate_tokens(text: str) -> int:
+    """文字数からトークン数を見積もる (日本語・中国語・韓国語は1文字1トークン)"""
+    wide = len(_WIDE_CHARS.findall(text))
+    return wide + math.ceil((len(text) - wide) / 4)
+
+
+def normalize_text(text: str) -> str:
+    """抄録の HTML・JATS のタグ、文字参照、"Abstract:" の見出し、余分な空白を除く"""
+    text = _JATS_TITLE.sub(" ", text)
+    text = html.unescape(_TAGS.sub(" ", text))
+    text = _SPACES.sub(" ", text).strip()
+    return _LABEL.sub("", text)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> tuple[str, int]:
+    """見積もりトークン数が max_tokens 以下になるよう末尾を削り、削った量とともに返す
+
+    切り詰める位置は、なるべく文の区切り (なければ空白) に合わせる。
+    """
+    total = estimate_tokens(text)
+    if total <= max_tokens:
+        return text, 0
+    budget = max(0, max_tokens - estimate_tokens(TRUNCATION_MARK))
+    # 見積もりが budget に収まる最長の接頭辞を二分探索する
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(text[:mid]) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    head = text[:lo]
+    # 末尾の2割以内に文の区切りがあればそこで切る
+    ends = [m.end() for m in _SENTENCE_END.finditer(head)]
+    if ends and ends[-1] >= lo * 0.8:
+        head = head[: ends[-1]]
+    elif " " in head[int(lo * 0.8) :]:
+        head = head[: head.rindex(" ")]
+    head = head.rstrip() + TRUNCATION_MARK
+    return head, total - estimate_tokens(head)
+
+
+def build_prompt(
+    template: str,
+    title: str,
+    abstract: str,
+    max_abstract_tokens: int | None = None,
+    **scope_fields: str,
+) -> BuiltPrompt:
+    """テンプレートから前半 (scope_fields のみを埋める) と後半 (論文) を組み立てる
+
+    テンプレートに PAPER_SECTION がない場合は全体を後半とする。
+    """
+    head, section, tail = template.partition(PAPER_SECTION)
+    if not section:
+        head, tail = "", template
+    abstract = normalize_text(abstract)
+    truncated = 0
+    if max_abstract_tokens is not None:
+        abstract, truncated = truncate_to_tokens(abstract, max_abstract_tokens)
+    fields = {**scope_fields, "title": normalize_text(title), "abstract": abstract}
+    prefix = head.format(**scope_fields)
+    suffix = (section + tail).format(**fields)
+    return BuiltPrompt(prefix, suffix, estimate_tokens(prefix + suffix), truncated)
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from src.core.catalog import RUN_DIR_PATTERN
+from src.core.scopes import snowball_scores
+from src.utils.constants import APP_LOGGER_NAME
+from src.utils.metrics import get_metrics
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from src.core.collector import S2Collector
+    from src.models.models import Config
+
+logger = logging.getLogger(f"{APP_LOGGER_NAME}.refresh")
+
+REFRESH_FILE_NAME = "refresh.json"
+
+
+@dataclass
+class RefreshBaseline:
+    """差分更新の起点とする前回の実行の最終結果"""
+
+    run_dir: Path
+    # 前回の実行の開始日 (この日以降に出版・引用された論文を探す)
+    since: date
+    final_df: pd.DataFrame
+    # 前回までに判定済みの DOI (採否を問わず再判定しない)
+    known_dois: set[str]
+    # 採用された論文の DOI と前回の被引用数 (新しい被引用を探す対象)
+    citation_counts: dict[str, int] = field(default_factory=dict)
+    # 前回の最終結果のバージョン (初回の実行は 1)
+    version: int = 1
+
+
+def run_started_on(run_dir: Path) -> date:
+    """実行ディレクトリ名の日時から開始日を求める (名前が異なる場合は結果の更新日)"""
+    match = RUN_DIR_PATTERN.match(run_dir.name)
+    if match:
+        return datetime.strptime(match.group(1), "%Y%m%d_%H%M%S").date()
+    final_csv = run_dir / "final" / "final_review_matrix.csv"
+    return datetime.fromtimestamp(final_csv.stat().st_mtime).date()
+
+
+def load_baseline(run_dir: Path, config: Config) -> RefreshBaseline:
+    """前回の実行の最終結果から、判定済みの DOI と採用論文の被引用数を読み込む
+
+    最終結果には不採用の論文も含まれるため、判定済みの DOI は最終結果から求める。
+    差分更新を繰り返した場合も、最終結果は前回までの全ての論文を引き継いでいる。
+    """
+    import pandas as pd
+
+    final_df = pd.read_csv(run_dir / "final" / "final_review_matrix.csv")
+    known_dois = set(final_df["doi"].dropna())
+
+    criteria = config.search_criteria
+    scores = final_df["relevance_score"]
+    if (
+        isinstance(criteria.natural_language_query, list)
+        and criteria.snowball_scope_mode == "per_scope"
+    ):
+        scores = snowball_scores(
+            final_df, criteria.natural_language_query, criteria.screening_threshold
+        )
+    included = final_df[scores >= criteria.screening_threshold].dropna(subset=["doi"])
+    if "citationCount" in included.columns:
+        counts = pd.to_numeric(included["citationCount"], errors="coerce").fillna(0)
+    else:
+        counts = pd.Series(0, index=included.index)
+    counts = counts.astype(int).tolist()
+    citation_counts = dict(zip(included["doi"], counts, strict=True))
+
+    previous = load_refresh_info(run_dir)
+    return RefreshBaseline(
+        run_dir=run_dir,
+        since=run_started_on(run_dir),
+        final_df=final_df,
+        known_dois=known_dois,
+        citation_counts=citation_counts,
+        version=previous.get("version", 1),
+    )
+
+
+def collect_delta(
+    collector: S2Collector, config: Config, baseline: RefreshBaseline
+) -> list[dict[str, Any]]:
+    """前回の実行以降に現れた候補論文を集める
+
+    - キーワード検索: 前回の開始日以降に出版された論文のみを検索する
+    - 新しい被引用: 採用論文の被引用数を軽量なリクエストで確認し、増えた論文に
+      ついてのみ引用している論文を取得する (出版年が前回の開始年より前の論文は除く)
+
+    判定済みの DOI は process_papers で除外するため、ここでは絞り込まない。
+    """
+    metrics = get_metrics()
+    criteria = config.search_criteria
+    candidates: list[dict[str, Any]] = []
+
+    with metrics.span("refresh_search") as span:
+        if criteria.keywords:
+            hits = collector.search_by_keywords(
+                criteria.keywords,
+                limit=criteria.keyword_search_limit,
+                published_since=baseline.since,
+            )
+            candidates.extend(hits)
+            span.set(rows_out=len(hits))
+            logger.info(f"Found {len(hits)} keyword hits since {baseline.since}.")
+
+    with metrics.span(
+        "refresh_citations", rows_in=len(baseline.citation_counts)
+    ) as span:
+        grown = []
+        for doi, previous_count in baseline.citation_counts.items():
+            counts = collector.get_paper_counts(doi)
+            if counts is not None and counts["citationCount"] > previous_count:
+                grown.append(doi)
+        citing = []
+        for doi in grown:
+            citing.extend(
+                paper
+                for paper in collector.get_citing_papers(doi)
+                if (paper.get("year") or 0) >= baseline.since.year
+            )
+        candidates.extend(citing)
+        span.set(rows_out=len(citing), grown=len(grown))
+        logger.info(
+            f"{len(grown)} of {len(baseline.citation_counts)} included papers "
+            f"gained citations; found {len(citing)} recent citing papers."
+        )
+
+    return candidates
+
+
+def merge_final(baseline: RefreshBaseline, delta_df: pd.DataFrame) -> pd.DataFrame:
+    """前回の最終結果に今回判定した論文を加え、関連度スコアの順に並べる"""
+    import pandas as pd
+
+    merged = pd.concat([baseline.final_df, delta_df], ignore_index=True)
+    return merged.sort_values(by="relevance_score", ascending=False).drop_duplicates(
+        subset=["doi"]
+    )
+
+
+def load_refresh_info(run_dir: Path) -> dict[str, Any]:
+    """差分更新の記録 (final/refresh.json) を読み込む (差分更新でない実行は空)"""
+    path = run_dir / "final" / REFRESH_FILE_NAME
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_refresh_info(
+    run_dir: Path, baseline: RefreshBaseline, delta_df: pd.DataFrame, total: int
+) -> dict[str, Any]:
+    """前回の実行・バージョン・差分の件数を final/refresh.json に保存する"""
+    screened = int(delta_df["doi"].nunique()) if not delta_df.empty else 0
+    info = {
+        "previous_run": str(baseline.run_dir),
+        "version": baseline.version + 1,
+        "since": baseline.since.isoformat(),
+        "papers_previous": len(baseline.final_df),
+        "papers_screened": screened,
+        "papers_total": total,
+    }
+    path = run_dir / "final" / REFRESH_FILE_NAME
+    path.write_text(json.dumps(info, ensure_ascii=False, indent=2), encoding="utf-8")
+    return info
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import logging
+import math
+import pickle
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from pydantic import BaseModel, Field
+
+from src.utils.constants import APP_LOGGER_NAME
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+logger = logging.getLogger(f"{APP_LOGGER_NAME}.results")
+
+# 整数として表示し、範囲フィルタの対象とする列
+INTEGER_COLUMNS = ["year", "citationCount"]
+# 範囲フィルタの対象となる列 (ResultsQuery のフィールド名 → データの列名)
+RANGE_FILTERS = {
+    "score_range": "relevance_score",
+    "year_range": "year",
+    "citation_range": "citationCount",
+}
+COLUMNAR_CACHE_SUFFIX = ".columns.pkl"
+
+
+class ResultsQuery(BaseModel):
+    """結果ビューの絞り込み・並べ替え・ページ指定"""
+
+    score_range: tuple[float, float] | None = None
+    year_range: tuple[float, float] | None = None
+    citation_range: tuple[float, float] | None = None
+    sort_by: str | None = "relevance_score"
+    ascending: bool = False
+    columns: list[str] | None = None
+    page: int = Field(default=1, ge=1)
+    page_size: int = Field(default=20, ge=1)
+
+
+class ResultsPage:
+    """クエリ結果のうち、表示する1ページ分のみを持つ"""
+
+    def __init__(self, rows: pd.DataFrame, total: int, page: int, page_size: int):
+        self.rows = rows
+        self.total = total
+        self.page = page
+        self.page_size = page_size
+
+    @property
+    def total_pages(self) -> int:
+        return max(1, math.ceil(self.total / self.page_size))
+
+    @property
+    def start(self) -> int:
+        """表示中の先頭行の番号 (1始まり、0件の場合は0)"""
+        return (self.page - 1) * self.page_size + 1 if self.total else 0
+
+    @property
+    def end(self) -> int:
+        return min(self.page * self.page_size, self.total)
+
+
+class ResultsTable:
+    """最終結果 CSV の列指向コピーに対する絞り込み・並べ替え・ページングを行う
+
+    数値列は欠損を NaN とした float の配列として保持し、フィルタは配列の比較で、
+    並べ替えは列ごとに一度だけ計算した順序を使い回して行う。
+    DataFrame として組み立てるのは表示するページの行のみ。
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        import numpy as np
+        import pandas as pd
+
+        self.df = df.reset_index(drop=True)
+        self.columns: list[str] = self.df.columns.tolist()
+        self._numeric: dict[str, np.ndarray] = {}
+        for col in self.columns:
+            if pd.api.types.is_numeric_dtype(self.df[col]):
+                self._numeric[col] = self.df[col].to_numpy(
+                    dtype="float64", na_value=np.nan
+                )
+        self._orders: dict[tuple[str, bool], np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    @classmethod
+    def from_csv(cls, csv_path: Path) -> ResultsTable:
+        """CSV を読み込む。列指向コピーが CSV より新しければそちらを使う"""
+        return cls(load_results_frame(csv_path))
+
+    def value_range(self, col: str) -> tuple[float, float] | None:
+        """スライダーの範囲に使う列の最小値・最大値 (数値列でなければ None)"""
+        import numpy as np
+
+        values = self._numeric.get(col)
+        if values is None or np.isnan(values).all():
+            return None
+        return float(np.nanmin(values)), float(np.nanmax(values))
+
+    def _order(self, col: str, ascending: bool) -> np.ndarray:
+        """列の並び順 (欠損は末尾) を計算し、キャッシュする"""
+        import numpy as np
+
+        key = (col, ascending)
+        if key not in self._orders:
+            if col in self._numeric:
+                values = self._numeric[col]
+                keys = values if ascending else -values
+                # NaN は argsort で末尾に並ぶ
+                order = np.argsort(keys, kind="stable")
+            else:
+                order = (
+                    self.df[col]
+                    .astype("string")
+                    .sort_values(ascending=ascending, na_position="last")
+                    .index.to_numpy()
+                )
+            self._orders[key] = order
+        return self._orders[key]
+
+    def _mask(self, query: ResultsQuery) -> np.ndarray | None:
+        mask = None
+        for field, col in RANGE_FILTERS.items():
+            bounds = getattr(query, field)
+            if bounds is None or col not in self._numeric:
+                continue
+            values = self._numeric[col]
+            # NaN との比較は False になるため、欠損値は除外される
+            col_mask = (values >= bounds[0]) & (values <= bounds[1])
+            mask = col_mask if mask is None else mask & col_mask
+        return mask
+
+    def query(self, query: ResultsQuery) -> ResultsPage:
+        import numpy as np
+
+        mask = self._mask(query)
+        if query.sort_by in self.columns:
+            indices = self._order(query.sort_by, query.ascending)
+            if mask is not None:
+                indices = indices[mask[indices]]
+        elif mask is not None:
+            indices = np.flatnonzero(mask)
+        else:
+            indices = np.arange(len(self.df))
+
+        total = len(indices)
+        page_size = query.page_size
+        last_page = max(1, math.ceil(total / page_size))
+        page = min(query.page, last_page)
+        page_indices = indices[(page - 1) * page_size : page * page_size]
+
+        columns = [c for c in (query.columns or self.columns) if c in self.columns]
+        rows = self.df.iloc[page_indices][columns or self.columns]
+        return ResultsPage(rows, total=total, page=page, page_size=page_size)
+
+
+def _coerce_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    import pandas as pd
+
+    for col in INTEGER_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int64")
+    if "relevance_score" in df.columns:
+        df["relevance_score"] = pd.to_numeric(df["relevance_score"], errors="coerce")
+    return df
+
+
+def load_results_frame(csv_path: Path) -> pd.DataFrame:
+    """結果 CSV を型変換済みの DataFrame として読み込む
+
+    初回読み込み時に型変換済みの列指向コピー (`<csv>.columns.pkl`) を保存し、
+    CSV が更新されていなければ次回以降はコピーから読み込む。
+    """
+    import pandas as pd
+
+    cache_path = csv_path.with_name(csv_path.name + COLUMNAR_CACHE_SUFFIX)
+    if (
+        cache_path.exists()
+        and cache_path.stat().st_mtime_ns >= csv_path.stat().st_mtime_ns
+    ):
+        try:
+            return pd.read_pickle(cache_path)
+        except (OSError, EOFError, pickle.UnpicklingError) as e:
+            logger.warning(f"Ignoring unreadable results cache {cache_path}: {e}")
+
+    df = _coerce_dtypes(pd.read_csv(csv_path))
+    try:
+        df.to_pickle(cache_path)
+    except OSError as e:
+        logger.warning(f"Failed to write results cache {cache_path}: {e}")
+    return df
+
+
+def results_cache_key(csv_path: Path) -> tuple[str, int]:
+    """ダッシュボードのキャッシュキー (パスと更新時刻)"""
+    return str(csv_path), csv_path.stat().st_mtime_ns
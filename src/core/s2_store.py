@@ -0,0 +1,461 @@
+"""Semantic Scholar のバルクデータセット (S2AG) から作るオフラインの論文ストア
+
+papers・abstracts・citations の各データセット (JSONL.gz のシャード) を順に読み込み、
+論文のメタデータを SQLite (DOI の索引と FTS5 の全文索引付き) に、引用グラフを
+CSR 形式の NumPy 配列 (.npy、メモリマップで読み込む) に保存する。
+OfflineS2Collector は S2Collector と同じメソッドでこのストアに問い合わせる。
+
+使い方:
+    uv run python -m src.core.s2_store --papers papers/*.jsonl.gz \\
+        --abstracts abstracts/*.jsonl.gz --citations citations/*.jsonl.gz
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import logging
+import re
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable, Iterator
+
+from src.core.collector import S2Collector
+from src.utils.constants import APP_LOGGER_NAME, DATA_DIR
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+logger = logging.getLogger(f"{APP_LOGGER_NAME}.s2_store")
+
+S2_STORE_DIR = DATA_DIR / "s2_store"
+# 引用グラフの CSR 配列のファイル名
+GRAPH_FILES = ("ids", "ref_indptr", "ref_indices", "cite_indptr", "cite_indices")
+# SQLite の IN 句に渡す値の上限
+_SQL_CHUNK = 900
+# 検索語の区切り (unicode61 と同じく、文字・数字以外で区切る)
+_WORD_RE = re.compile(r"[^\W_]+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    corpusid INTEGER PRIMARY KEY,
+    doi TEXT,
+    arxiv TEXT,
+    title TEXT,
+    year INTEGER,
+    publicationdate TEXT,
+    citationcount INTEGER,
+    referencecount INTEGER,
+    url TEXT,
+    abstract TEXT,
+    oa_url TEXT
+);
+CREATE INDEX IF NOT EXISTS papers_doi ON papers (lower(doi));
+CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+    title, abstract, content = 'papers', content_rowid = 'corpusid',
+    tokenize = 'porter unicode61'
+);
+"""
+
+
+class PaperNotFoundError(LookupError):
+    """ストアに存在しない論文を問い合わせた (API の 404 に相当)"""
+
+
+def read_jsonl(paths: Iterable[Path]) -> Iterator[dict[str, Any]]:
+    """JSONL (拡張子 .gz なら gzip 圧縮) のシャードを1行ずつ読み込む"""
+    for path in paths:
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _batched(records: Iterable[Any], size: int) -> Iterator[list[Any]]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _key_counts(keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """ソート済みのキーの値ごとの件数"""
+    import numpy as np
+
+    if len(keys) == 0:
+        return keys, keys
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    return keys[starts], np.diff(np.r_[starts, len(keys)])
+
+
+def build_csr(
+    edges: np.ndarray, n_rows: int, key_col: int, out_dir: Path, name: str, chunk: int
+) -> None:
+    """(行, 行) の組の配列から、key_col の行ごとの隣接リスト (CSR) を作って保存する
+
+    辺の配列全体をソートせず、件数の集計と配置の2回の走査 (計数ソート) で作るため、
+    メモリに載るのは行ごとのオフセットと1チャンク分の辺のみ。隣接リストは
+    メモリマップしたファイルに直接書き込む。
+    """
+    import numpy as np
+
+    counts = np.zeros(n_rows, dtype=np.int64)
+    for start in range(0, len(edges), chunk):
+        keys, n = _key_counts(np.sort(edges[start : start + chunk, key_col]))
+        counts[keys] += n
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    np.save(out_dir / f"{name}_indptr.npy", indptr)
+
+    indices = np.lib.format.open_memmap(
+        out_dir / f"{name}_indices.npy", mode="w+", dtype=np.int32, shape=(len(edges),)
+    )
+    cursor = indptr[:-1].copy()
+    for start in range(0, len(edges), chunk):
+        part = np.asarray(edges[start : start + chunk])
+        order = np.argsort(part[:, key_col], kind="stable")
+        keys, values = part[order, key_col], part[order, 1 - key_col]
+        # チャンク内で同じ行の何番目の辺か
+        rank = np.arange(len(keys)) - np.searchsorted(keys, keys, side="left")
+        indices[cursor[keys] + rank] = values
+        uniq, n = _key_counts(keys)
+        cursor[uniq] += n
+    indices.flush()
+    del indices
+
+
+def _date_range(value: str | None) -> tuple[str | None, str | None]:
+    """publicationDateOrYear (例: 2020-06-01:、2019:2021) を日付の範囲に変換する"""
+    if not value:
+        return None, None
+    start, _, end = value.partition(":")
+    low = (start + "-01-01" if len(start) == 4 else start) or None
+    high = (end + "-12-31" if len(end) == 4 else end) or None
+    return low, high
+
+
+def _split_fields(fields: str) -> tuple[list[str], dict[str, list[str]]]:
+    """fields 引数を論文の項目と references・citations の項目に分ける"""
+    plain: list[str] = []
+    nested: dict[str, list[str]] = {}
+    for field in filter(None, fields.split(",")):
+        kind, _, sub = field.partition(".")
+        if sub and kind in ("references", "citations"):
+            nested.setdefault(kind, []).append(sub)
+        else:
+            plain.append(field)
+    return plain, nested
+
+
+def _to_paper(row: sqlite3.Row, fields: list[str]) -> dict[str, Any]:
+    """ストアの行を S2 の API の応答と同じ形式にする (指定された項目のみ)"""
+    external_ids: dict[str, Any] = {"CorpusId": row["corpusid"]}
+    if row["doi"]:
+        external_ids["DOI"] = row["doi"]
+    if row["arxiv"]:
+        external_ids["ArXiv"] = row["arxiv"]
+    values = {
+        "title": row["title"],
+        "year": row["year"],
+        "publicationDate": row["publicationdate"],
+        "citationCount": row["citationcount"],
+        "referenceCount": row["referencecount"],
+        "abstract": row["abstract"],
+        "externalIds": external_ids,
+        "url": row["url"],
+        "openAccessPdf": {"url": row["oa_url"]} if row["oa_url"] else None,
+    }
+    paper = {"paperId": str(row["corpusid"])}
+    paper.update((f, values[f]) for f in fields if f in values)
+    return paper
+
+
+class S2Store:
+    """バルクデータから取り込んだ論文のメタデータと引用グラフ"""
+
+    def __init__(self, path: Path = S2_STORE_DIR):
+        self.path = path
+        self.db_path = path / "papers.sqlite"
+        self._graph: dict[str, np.ndarray] | None = None
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:  # 正常終了時に commit、例外時に rollback
+                yield conn
+        finally:
+            conn.close()
+
+    def exists(self) -> bool:
+        return self.db_path.exists() and (self.path / "ids.npy").exists()
+
+    # --- 取り込み ---
+
+    def ingest(
+        self,
+        papers: Iterable[Path],
+        abstracts: Iterable[Path] = (),
+        citations: Iterable[Path] = (),
+        batch_size: int = 10_000,
+        chunk_edges: int = 5_000_000,
+    ) -> dict[str, int]:
+        """バルクデータのシャードを読み込み、ストアを作り直す
+
+        papers (メタデータ)、abstracts (抄録とオープンアクセスの URL)、citations
+        (引用関係) の順に、シャードを1行ずつストリームで処理する。ストアにない
+        論文との引用関係は保存しない。取り込んだ件数を返す。
+        """
+        # 指定されたディレクトリ自体は消さず、ストアのファイルのみを作り直す
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._graph = None
+        for file in [self.db_path, *(self.path / f"{n}.npy" for n in GRAPH_FILES)]:
+            file.unlink(missing_ok=True)
+        stats = {"papers": 0, "abstracts": 0, "citations": 0}
+
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            for batch in _batched(read_jsonl(papers), batch_size):
+                conn.executemany(
+                    "INSERT OR REPLACE INTO papers VALUES "
+                    "(?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, NULL)",
+                    [_paper_values(record) for record in batch],
+                )
+                stats["papers"] += len(batch)
+            logger.info(f"Ingested {stats['papers']} papers")
+
+            for batch in _batched(read_jsonl(abstracts), batch_size):
+                cursor = conn.executemany(
+                    "UPDATE papers SET abstract = ?, oa_url = ? WHERE corpusid = ?",
+                    [
+                        (
+                            record.get("abstract"),
+                            (record.get("openaccessinfo") or {}).get("url"),
+                            record["corpusid"],
+                        )
+                        for record in batch
+                    ],
+                )
+                stats["abstracts"] += cursor.rowcount
+            logger.info(f"Ingested {stats['abstracts']} abstracts")
+            conn.execute("INSERT INTO papers_fts (papers_fts) VALUES ('rebuild')")
+
+        stats["citations"] = self._ingest_citations(citations, batch_size, chunk_edges)
+        logger.info(f"Ingested {stats['citations']} citations into {self.path}")
+        return stats
+
+    def _ingest_citations(
+        self, citations: Iterable[Path], batch_size: int, chunk_edges: int
+    ) -> int:
+        import numpy as np
+
+        with self._connect() as conn:
+            rows = conn.execute("SELECT corpusid FROM papers ORDER BY corpusid")
+            ids = np.fromiter((row[0] for row in rows), dtype=np.int64)
+        np.save(self.path / "ids.npy", ids)
+
+        # 引用関係を論文の行番号の組に変換して一時ファイルに書き出す
+        spill_path = self.path / "edges.tmp"
+        n_edges = 0
+        with open(spill_path, "wb") as spill:
+            for batch in _batched(read_jsonl(citations), batch_size * 10):
+                if len(ids) == 0:
+                    break
+                pairs = np.array(
+                    [
+                        (r.get("citingcorpusid") or -1, r.get("citedcorpusid") or -1)
+                        for r in batch
+                    ],
+                    dtype=np.int64,
+                ).reshape(-1, 2)
+                pos = np.searchsorted(ids, pairs).clip(0, len(ids) - 1)
+                known = (ids[pos] == pairs).all(axis=1)
+                pos[known].astype(np.int32).tofile(spill)
+                n_edges += int(known.sum())
+
+        edges = (
+            np.memmap(spill_path, dtype=np.int32, mode="r", shape=(n_edges, 2))
+            if n_edges
+            else np.empty((0, 2), dtype=np.int32)
+        )
+        build_csr(edges, len(ids), 0, self.path, "ref", chunk_edges)
+        build_csr(edges, len(ids), 1, self.path, "cite", chunk_edges)
+        del edges
+        spill_path.unlink()
+        return n_edges
+
+    # --- 問い合わせ ---
+
+    def graph(self) -> dict[str, np.ndarray]:
+        """引用グラフの配列をメモリマップで読み込む (ファイル全体は読み込まない)"""
+        import numpy as np
+
+        if self._graph is None:
+            self._graph = {
+                name: np.load(self.path / f"{name}.npy", mmap_mode="r")
+                for name in GRAPH_FILES
+            }
+        return self._graph
+
+    def lookup_doi(self, doi: str) -> sqlite3.Row | None:
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT * FROM papers WHERE lower(doi) = ?", (doi.lower(),)
+            ).fetchone()
+
+    def get_papers(self, corpus_ids: list[int]) -> list[sqlite3.Row]:
+        """corpus_ids の順に論文を返す"""
+        found: dict[int, sqlite3.Row] = {}
+        with self._connect() as conn:
+            for start in range(0, len(corpus_ids), _SQL_CHUNK):
+                chunk = corpus_ids[start : start + _SQL_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                for row in conn.execute(
+                    f"SELECT * FROM papers WHERE corpusid IN ({placeholders})", chunk
+                ):
+                    found[row["corpusid"]] = row
+        return [found[i] for i in corpus_ids if i in found]
+
+    def related(self, corpus_id: int, kind: str) -> list[int]:
+        """参考文献 (kind="references") または被引用 (kind="citations") の corpusid"""
+        import numpy as np
+
+        graph = self.graph()
+        ids = graph["ids"]
+        i = int(np.searchsorted(ids, corpus_id))
+        if i >= len(ids) or ids[i] != corpus_id:
+            return []
+        prefix = "ref" if kind == "references" else "cite"
+        indptr = graph[f"{prefix}_indptr"]
+        rows = graph[f"{prefix}_indices"][indptr[i] : indptr[i + 1]]
+        return ids[rows].tolist()
+
+    def search(
+        self,
+        query: str,
+        limit: int = 100,
+        publication_date: str | None = None,
+    ) -> tuple[int, list[sqlite3.Row]]:
+        """タイトル・抄録の BM25 で検索し、ヒット件数と上位 limit 件を返す"""
+        match = _to_match_query(query)
+        if match is None:
+            return 0, []
+        low, high = _date_range(publication_date)
+        published = "COALESCE(p.publicationdate, printf('%04d-01-01', p.year))"
+        conditions, params = ["papers_fts MATCH ?"], [match]
+        if low:
+            conditions.append(f"{published} >= ?")
+            params.append(low)
+        if high:
+            conditions.append(f"{published} <= ?")
+            params.append(high)
+        where = " AND ".join(conditions)
+        source = "papers_fts JOIN papers p ON p.corpusid = papers_fts.rowid"
+        with self._connect() as conn:
+            total = conn.execute(
+                f"SELECT COUNT(*) FROM {source} WHERE {where}", params
+            ).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT p.* FROM {source} WHERE {where} "
+                "ORDER BY bm25(papers_fts, 3.0, 1.0) LIMIT ?",
+                [*params, limit],
+            ).fetchall()
+        return total, rows
+
+
+def _to_match_query(query: str) -> str | None:
+    """検索語をいずれかの語を含む論文の MATCH 式にする (語がなければ None)
+
+    papers_fts は papers の列をそのまま unicode61 で分割した索引のため、
+    search の索引と異なり日本語を bigram にせず、語をそのまま引用符で囲む。
+    """
+    words = dict.fromkeys(f'"{word}"' for word in _WORD_RE.findall(query))
+    return " OR ".join(words) or None
+
+
+def _paper_values(record: dict[str, Any]) -> tuple[Any, ...]:
+    external_ids = record.get("externalids") or {}
+    return (
+        record["corpusid"],
+        external_ids.get("DOI"),
+        external_ids.get("ArXiv"),
+        record.get("title"),
+        record.get("year"),
+        record.get("publicationdate"),
+        record.get("citationcount"),
+        record.get("referencecount"),
+        record.get("url"),
+    )
+
+
+class OfflineS2Collector(S2Collector):
+    """S2Store に問い合わせる S2Collector (API を呼び出さず、レート制限もない)
+
+    S2Collector の各メソッドが使う _get を置き換え、paper/search と
+    paper/DOI:{doi} (references・citations の項目指定を含む) に答える。
+    抄録はバルクデータのものを使い、ArXiv での補完は行わない。
+    """
+
+    def __init__(self, store: S2Store | Path, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.store = store if isinstance(store, S2Store) else S2Store(store)
+        if not self.store.exists():
+            raise FileNotFoundError(f"S2 store not found: {self.store.path}")
+
+    def _get(self, endpoint: str, params: dict[str, Any]) -> dict[str, Any]:
+        plain, nested = _split_fields(params.get("fields", ""))
+        if endpoint == "paper/search":
+            total, rows = self.store.search(
+                params.get("query", ""),
+                limit=int(params.get("limit", 10)),
+                publication_date=params.get("publicationDateOrYear"),
+            )
+            return {"total": total, "data": [_to_paper(r, plain) for r in rows]}
+
+        if not endpoint.startswith("paper/DOI:"):
+            raise ValueError(f"Unsupported endpoint for the offline store: {endpoint}")
+        doi = endpoint.removeprefix("paper/DOI:")
+        row = self.store.lookup_doi(doi)
+        if row is None:
+            raise PaperNotFoundError(f"Paper not found in the S2 store: {doi}")
+        paper = _to_paper(row, plain)
+        for kind, fields in nested.items():
+            related = self.store.get_papers(self.store.related(row["corpusid"], kind))
+            paper[kind] = [_to_paper(r, fields) for r in related]
+        return paper
+
+    def _fill_missing_abstracts_with_arxiv(self, df: pd.DataFrame) -> pd.DataFrame:
+        return df
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--papers", type=Path, nargs="+", required=True)
+    parser.add_argument("--abstracts", type=Path, nargs="*", default=[])
+    parser.add_argument("--citations", type=Path, nargs="*", default=[])
+    parser.add_argument("--out", type=Path, default=S2_STORE_DIR)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    start = time.perf_counter()
+    stats = S2Store(args.out).ingest(args.papers, args.abstracts, args.citations)
+    print(
+        f"Ingested {stats['papers']} papers, {stats['abstracts']} abstracts and "
+        f"{stats['citations']} citations in {time.perf_counter() - start:.1f} s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
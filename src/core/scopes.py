@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from pydantic import BaseModel, Field, create_model
+
+from src.models.models import ResearchScope
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# スコープごとのスコアの列名の接頭辞
+SCORE_PREFIX = "score_"
+
+
+def score_column(scope: ResearchScope) -> str:
+    return f"{SCORE_PREFIX}{scope.name}"
+
+
+def format_scopes(scopes: list[ResearchScope]) -> str:
+    """プロンプトに埋め込む形式 (1行に1スコープ) に整形する"""
+    return "\n".join(f"- {scope.name}: {scope.query}" for scope in scopes)
+
+
+def build_multi_scope_model(scopes: list[ResearchScope]) -> type[BaseModel]:
+    """スコープごとのスコア・理由・要約を持つ応答スキーマを作る"""
+    scores = {
+        score_column(scope): (
+            int,
+            Field(description=f"Score from 0 to 10 for the scope '{scope.name}'."),
+        )
+        for scope in scopes
+    }
+    return create_model(
+        "MultiScopeScreeningResult",
+        **scores,
+        relevance_reason=(
+            str,
+            Field(description="Brief reason for the scores (in Japanese)."),
+        ),
+        summary=(
+            str,
+            Field(description="A 1-2 sentence summary of the paper in Japanese."),
+        ),
+    )
+
+
+def combine_scores(
+    result: dict[str, Any], scopes: list[ResearchScope]
+) -> dict[str, Any]:
+    """最大のスコアを relevance_score、そのスコープ名を best_scope とする"""
+    scores = {scope.name: result.get(score_column(scope)) for scope in scopes}
+    scores = {name: s for name, s in scores.items() if s is not None}
+    if not scores:
+        return {**result, "relevance_score": 0, "best_scope": None}
+    best = max(scores, key=scores.get)
+    return {**result, "relevance_score": scores[best], "best_scope": best}
+
+
+def snowball_scores(
+    df: pd.DataFrame, scopes: list[ResearchScope], threshold: int
+) -> pd.Series:
+    """スコープごとのしきい値でスノーボール対象を選ぶためのスコア
+
+    各スコープについて (スコア - そのスコープのしきい値) を求め、その最大値に
+    threshold を足したものを返す。この値が threshold 以上であることは、いずれかの
+    スコープでしきい値以上であることと同じになる。スコープのスコアがない論文
+    (2段階スクリーニングで1段目に不採用となった論文等) は relevance_score を使う。
+    """
+    import pandas as pd
+
+    margins = []
+    for scope in scopes:
+        column = score_column(scope)
+        score = (
+            df[column] if column in df.columns else pd.Series(float("nan"), df.index)
+        )
+        score = score.fillna(df["relevance_score"])
+        scope_threshold = threshold if scope.threshold is None else scope.threshold
+        margins.append(score - scope_threshold)
+    return pd.concat(margins, axis=1).max(axis=1) + threshold
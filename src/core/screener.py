@@ -1,32 +1,125 @@
+from __future__ import annotations
+
 import logging
+import time
+from collections.abc import Callable
 from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any
 
-import pandas as pd
-from google import genai
-
-from src.models.models import ScreeningResult
+from src.core.active_learning import (
+    SKIPPED_REASON,
+    UNLABELED_REASONS,
+    ActiveLearner,
+)
+from src.core.llm import LLMBackend, create_backend
+from src.core.prompts import BuiltPrompt, build_prompt
+from src.core.scopes import build_multi_scope_model, combine_scores, format_scopes
+from src.core.usage import UsageTracker, summarize_cascade
+from src.models.models import (
+    ActiveLearningSettings,
+    BudgetSettings,
+    LLMBackendSettings,
+    ResearchScope,
+    ScreeningResult,
+    TriageResult,
+)
 from src.utils.constants import APP_LOGGER_NAME
 from src.utils.io_utils import ProgressTracker, get_prompt
+from src.utils.logging_config import log_context
+from src.utils.metrics import get_metrics
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from pydantic import BaseModel
 
 logger = logging.getLogger(f"{APP_LOGGER_NAME}.screener")
 
 
+EMPTY_USAGE = {
+    "prompt_tokens": 0,
+    "output_tokens": 0,
+    "total_tokens": 0,
+    "llm_latency_s": 0.0,
+    "prompt_est_tokens": 0,
+    "abstract_truncated_tokens": 0,
+    "cached_tokens": 0,
+}
+
+
 class PaperScreener:
-    def __init__(self, api_key: str, model_name: str, max_workers: int = 5):
-        self.client = genai.Client(api_key=api_key)
+    def __init__(
+        self,
+        api_key: str,
+        model_name: str,
+        max_workers: int = 5,
+        budget: BudgetSettings | None = None,
+        triage_model: str | None = None,
+        threshold: int = 7,
+        cascade_margin: int = 2,
+        backend: LLMBackend | LLMBackendSettings | None = None,
+        max_abstract_tokens: int | None = None,
+        active_learning: ActiveLearningSettings | None = None,
+    ):
+        # backend には設定 (llm_settings.backend) も渡せる。設定はシャード並列時に
+        # ワーカープロセスへ渡せるよう、インスタンス生成時にバックエンドに変換する
+        if backend is None or isinstance(backend, LLMBackendSettings):
+            backend = create_backend(backend, api_key)
+        self.backend = backend
         self.model_name = model_name
         self.max_workers = max_workers
+        # 抄録をこの見積もりトークン数までに切り詰める (None は切り詰めない)
+        self.max_abstract_tokens = max_abstract_tokens
         self.prompt_template = get_prompt("screening")
+        self.multi_template = get_prompt("screening_multi")
+        # 複数スコープの応答スキーマ (スコープの組み合わせごとに作成する)
+        self._multi_models: dict[tuple[str, ...], type[BaseModel]] = {}
+        # triage_model を指定すると2段階スクリーニングを行う。1段目のスコアが
+        # escalate_min 未満の論文は、2段目 (理由・要約の生成) を行わずに不採用とする
+        self.triage_model = triage_model
+        self.escalate_min = threshold - cascade_margin
+        self.triage_template = get_prompt("triage") if triage_model else None
+        self.usage = UsageTracker(budget)
+        # active_learning を有効にすると、判定結果から学習した分類器が不採用と
+        # 予測した論文は LLM を呼ばずに不採用とする
+        self.learner = (
+            ActiveLearner(active_learning, threshold)
+            if active_learning is not None and active_learning.enabled
+            else None
+        )
+        # 予算超過で判定できなかった論文 (screen_papers の呼び出しごとに更新)
+        self.pending_df: pd.DataFrame | None = None
+
+    def screen_papers(
+        self,
+        df: pd.DataFrame,
+        research_scope: str | list[ResearchScope],
+        on_result: Callable[[pd.Series, dict], None] | None = None,
+    ) -> pd.DataFrame:
+        """論文をLLMで並列にスクリーニングする
+
+        on_result を指定すると、1件の判定が終わるたびに (行, 結果) で呼び出される。
+        呼び出しはワーカースレッドから行われるため、コールバック側で排他制御すること。
+
+        トークン・コストの予算に達した場合、残りの論文は判定せずに self.pending_df に
+        格納し、判定済みの論文のみを返す。
+
+        research_scope にスコープのリストを渡すと、1回の呼び出しで全スコープの
+        スコア (score_<name> 列) を判定し、その最大値を relevance_score とする。
+        """
+        import pandas as pd
 
-    def screen_papers(self, df: pd.DataFrame, research_scope: str) -> pd.DataFrame:
-        """論文をLLMで並列にスクリーニングする"""
         logger.info(
             f"Starting parallel screening for {len(df)} papers with {self.max_workers} workers"
         )
 
-        progress = ProgressTracker(total=len(df), prefix="Screening")
+        progress = ProgressTracker(total=len(df), prefix="Screening", stage="screening")
+        metrics = get_metrics()
+
+        def screen_row(row):
+            if self.usage.exhausted():
+                progress.update()
+                return None
 
-        def process_row(row):
             title = row.get("title", "No Title")
             abstract = row.get("abstract", "")
 
@@ -34,59 +127,251 @@ class PaperScreener:
                 "relevance_score": 0,
                 "relevance_reason": "No abstract available",
                 "summary": "",
+                **EMPTY_USAGE,
             }
             if not abstract:
                 logger.warning(
                     f"Skipping screening for {title} due to missing abstract"
                 )
             else:
+                skip, prob = False, None
                 try:
-                    score_data = self._call_llm(title, abstract, research_scope)
-                    if score_data:
-                        result = score_data.model_dump()
-                    else:
-                        logger.warning(f"LLM returned None for paper {title}")
+                    if self.learner:
+                        skip, prob = self._should_skip(row)
+                    if skip:
                         result = {
                             "relevance_score": 0,
-                            "relevance_reason": "LLM returned invalid response",
+                            "relevance_reason": SKIPPED_REASON,
                             "summary": "",
+                            **EMPTY_USAGE,
                         }
+                    elif self.triage_model:
+                        result = self._screen_cascade(title, abstract, research_scope)
+                    else:
+                        result = self._screen_full(title, abstract, research_scope)
                 except Exception:
+                    metrics.incr("llm.errors")
                     logger.exception(f"Error screening paper {title}")
                     result = {
                         "relevance_score": 0,
                         "relevance_reason": "LLM Error occurred",
                         "summary": "",
+                        **EMPTY_USAGE,
                     }
+                if self.learner:
+                    result["classifier_prob"] = prob
+                    if result["relevance_reason"] not in UNLABELED_REASONS:
+                        self.learner.observe(row, result["relevance_score"])
+
+            logger.debug(f"Screened {title}: score={result['relevance_score']}")
+            if on_result is not None:
+                on_result(row, result)
 
             progress.update()
             return result
 
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+        def process_row(row):
+            # ワーカースレッドには文脈が引き継がれないため、行ごとに指定する
+            with log_context(stage="screening", paper_id=row.get("doi")):
+                return screen_row(row)
+
+        with (
+            metrics.span("screening", rows_in=len(df)) as span,
+            ThreadPoolExecutor(max_workers=self.max_workers) as executor,
+        ):
             results = list(executor.map(lambda x: process_row(x[1]), df.iterrows()))
+            span.set(rows_out=sum(r is not None for r in results))
 
         progress.close()
 
+        df = df.reset_index(drop=True)
+        screened = pd.Series([r is not None for r in results], dtype=bool)
+        self.pending_df = df[~screened].reset_index(drop=True)
+        if not self.pending_df.empty:
+            logger.warning(
+                f"LLM budget exhausted ({self.usage.total_tokens} tokens, "
+                f"${self.usage.cost_usd:.4f}). "
+                f"{len(self.pending_df)} papers were left unscreened."
+            )
+
         # 元のDataFrameに結果を結合
-        results_df = pd.DataFrame(results)
-        df = pd.concat([df.reset_index(drop=True), results_df], axis=1)
+        results_df = pd.DataFrame([r for r in results if r is not None])
+        df = pd.concat([df[screened].reset_index(drop=True), results_df], axis=1)
 
+        cascade = summarize_cascade(df)
+        if cascade is not None:
+            logger.info(
+                f"Cascade screening: {cascade['tier1_only']} rejected by triage, "
+                f"{cascade['escalated']} escalated, "
+                f"~{cascade['estimated_saved_tokens']} tokens saved"
+            )
         return df
 
+    def _should_skip(self, row: pd.Series) -> tuple[bool, float | None]:
+        """分類器の予測 (失敗した場合は省略せずに LLM で判定する)"""
+        try:
+            return self.learner.should_skip(row)
+        except Exception:
+            get_metrics().incr("classifier.errors")
+            logger.exception(f"Classifier failed on {row.get('title', 'No Title')}")
+            return False, None
+
+    def close(self) -> None:
+        """バックエンドが作ったリソース (コンテキストキャッシュ等) を解放する"""
+        self.backend.close()
+
+    def _screen_full(
+        self, title: str, abstract: str, research_scope: str | list[ResearchScope]
+    ) -> dict[str, Any]:
+        """screening.txt で判定し、スコア・理由・要約と使用量を返す"""
+        metrics = get_metrics()
+        metrics.incr("llm.calls")
+        start = time.perf_counter()
+        score_data, usage = self._call_llm(title, abstract, research_scope)
+        latency = time.perf_counter() - start
+        metrics.incr("llm.latency_s", latency)
+        metrics.incr("llm.prompt_tokens", usage["prompt_tokens"])
+        metrics.incr("llm.output_tokens", usage["output_tokens"])
+        self.usage.add(usage["prompt_tokens"], usage["output_tokens"])
+        usage = {**usage, "llm_latency_s": round(latency, 3)}
+        return self._screening_result(score_data, usage, research_scope, title)
+
+    def _screening_result(
+        self,
+        score_data: BaseModel | None,
+        usage: dict[str, Any],
+        research_scope: str | list[ResearchScope],
+        title: str,
+    ) -> dict[str, Any]:
+        """判定結果 (応答が不正なら None) と使用量から結果の行を作る"""
+        if score_data:
+            result = score_data.model_dump()
+            if isinstance(research_scope, list):
+                result = combine_scores(result, research_scope)
+            return {**result, **usage}
+        get_metrics().incr("llm.invalid_responses")
+        logger.warning(f"LLM returned None for paper {title}")
+        return {
+            "relevance_score": 0,
+            "relevance_reason": "LLM returned invalid response",
+            "summary": "",
+            **usage,
+        }
+
+    def _screen_cascade(
+        self, title: str, abstract: str, research_scope: str | list[ResearchScope]
+    ) -> dict[str, Any]:
+        """安価なモデルでスコアのみを判定し、境界付近以上の論文だけを本判定する"""
+        metrics = get_metrics()
+        metrics.incr("llm.calls")
+        metrics.incr("cascade.tier1_calls")
+        start = time.perf_counter()
+        triage, usage = self._call_triage(title, abstract, research_scope)
+        latency = time.perf_counter() - start
+        metrics.incr("llm.latency_s", latency)
+        metrics.incr("cascade.tier1_latency_s", latency)
+        metrics.incr("llm.prompt_tokens", usage["prompt_tokens"])
+        metrics.incr("llm.output_tokens", usage["output_tokens"])
+        self.usage.add(usage["prompt_tokens"], usage["output_tokens"])
+        triage_columns = {
+            "triage_score": triage.relevance_score if triage else None,
+            "triage_prompt_tokens": usage["prompt_tokens"],
+            "triage_output_tokens": usage["output_tokens"],
+            "triage_latency_s": round(latency, 3),
+        }
+
+        # 1段目の応答が不正な場合は、見落としを避けるため本判定に回す
+        if triage is not None and triage.relevance_score < self.escalate_min:
+            return {
+                "relevance_score": triage.relevance_score,
+                "relevance_reason": "Rejected by triage",
+                "summary": "",
+                **usage,
+                "llm_latency_s": round(latency, 3),
+                "screening_tier": 1,
+                **triage_columns,
+            }
+
+        metrics.incr("cascade.escalated")
+        start = time.perf_counter()
+        result = self._screen_full(title, abstract, research_scope)
+        metrics.incr("cascade.tier2_latency_s", time.perf_counter() - start)
+        # 使用量の列は両方の段階の合計とする (予算・コストの集計に使うため)
+        for key in ("prompt_tokens", "output_tokens", "total_tokens"):
+            result[key] += usage[key]
+        result["llm_latency_s"] = round(result["llm_latency_s"] + latency, 3)
+        return {**result, "screening_tier": 2, **triage_columns}
+
     def _call_llm(
-        self, title: str, abstract: str, research_scope: str
-    ) -> ScreeningResult:
-        prompt = self.prompt_template.format(
-            research_scope=research_scope, title=title, abstract=abstract
+        self, title: str, abstract: str, research_scope: str | list[ResearchScope]
+    ) -> tuple[BaseModel | None, dict[str, int]]:
+        """LLM を呼び出し、判定結果とトークン使用量 (プロンプトの大きさを含む) を返す"""
+        prompt, schema = self._screening_prompt(title, abstract, research_scope)
+        return self._generate(self.model_name, prompt, schema)
+
+    def _screening_prompt(
+        self, title: str, abstract: str, research_scope: str | list[ResearchScope]
+    ) -> tuple[BuiltPrompt, type[BaseModel]]:
+        """本判定のプロンプトと応答スキーマを返す"""
+        if isinstance(research_scope, list):
+            prompt = build_prompt(
+                self.multi_template,
+                title,
+                abstract,
+                self.max_abstract_tokens,
+                research_scopes=format_scopes(research_scope),
+            )
+            return prompt, self._multi_scope_model(research_scope)
+        prompt = build_prompt(
+            self.prompt_template,
+            title,
+            abstract,
+            self.max_abstract_tokens,
+            research_scope=research_scope,
+        )
+        return prompt, ScreeningResult
+
+    def _call_triage(
+        self, title: str, abstract: str, research_scope: str | list[ResearchScope]
+    ) -> tuple[TriageResult | None, dict[str, int]]:
+        """1段目の LLM を呼び出し、スコアとトークン使用量を返す
+
+        複数スコープの場合は、いずれかのスコープとの関連度を1つのスコアで判定する。
+        """
+        if isinstance(research_scope, list):
+            research_scope = format_scopes(research_scope)
+        prompt = build_prompt(
+            self.triage_template,
+            title,
+            abstract,
+            self.max_abstract_tokens,
+            research_scope=research_scope,
         )
+        return self._generate(self.triage_model, prompt, TriageResult)
 
-        response = self.client.models.generate_content(
-            model=self.model_name,
-            contents=prompt,
-            config={
-                "response_mime_type": "application/json",
-                "response_schema": ScreeningResult,
-            },
+    def _generate(
+        self, model: str, prompt: BuiltPrompt, schema: type[BaseModel]
+    ) -> tuple[BaseModel | None, dict[str, int]]:
+        """共通の前半を分けて LLM を呼び出し、プロンプトの大きさを使用量に加える"""
+        parsed, usage = self.backend.generate_with_prefix(
+            model, prompt.prefix, prompt.suffix, schema
         )
+        usage = {
+            **usage,
+            "prompt_est_tokens": prompt.est_tokens,
+            "abstract_truncated_tokens": prompt.truncated_tokens,
+            "cached_tokens": usage.get("cached_tokens", 0),
+        }
+        metrics = get_metrics()
+        metrics.incr("prompt.est_tokens", prompt.est_tokens)
+        metrics.incr("prompt.cached_tokens", usage["cached_tokens"])
+        if prompt.truncated_tokens:
+            metrics.incr("prompt.truncated")
+            metrics.incr("prompt.truncated_tokens", prompt.truncated_tokens)
+        return parsed, usage
 
-        return response.parsed
+    def _multi_scope_model(self, scopes: list[ResearchScope]) -> type[BaseModel]:
+        key = tuple(scope.name for scope in scopes)
+        if key not in self._multi_models:
+            self._multi_models[key] = build_multi_scope_model(scopes)
+        return self._multi_models[key]
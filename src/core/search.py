@@ -0,0 +1,249 @@
+import logging
+import re
+import sqlite3
+import unicodedata
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+from pydantic import BaseModel
+
+from src.utils.constants import APP_LOGGER_NAME, DATA_DIR
+
+logger = logging.getLogger(f"{APP_LOGGER_NAME}.search")
+
+SEARCH_INDEX_PATH = DATA_DIR / "search_index.sqlite"
+# 検索対象の列と BM25 の重み (タイトルの一致を重視する)
+SEARCH_FIELDS = {
+    "title": 3.0,
+    "abstract": 1.0,
+    "summary": 1.5,
+    "relevance_reason": 0.5,
+}
+
+# 英数字は単語単位、日本語 (かな・漢字) は文字 bigram に分割する
+_TOKEN_RE = re.compile(r"[a-z0-9]+|[\u3040-\u30ff\u3400-\u9fff\uf900-\ufaff]+")
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS papers (
+    id INTEGER PRIMARY KEY,
+    doc_key TEXT UNIQUE NOT NULL,
+    run_id TEXT NOT NULL,
+    doi TEXT,
+    title TEXT,
+    year INTEGER,
+    relevance_score REAL,
+    summary TEXT,
+    relevance_reason TEXT,
+    url TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+    {", ".join(SEARCH_FIELDS)}, tokenize = 'porter unicode61'
+);
+CREATE TABLE IF NOT EXISTS indexed_runs (
+    run_id TEXT PRIMARY KEY,
+    indexed_at TEXT NOT NULL,
+    papers INTEGER NOT NULL
+);
+"""
+
+
+def _split(text: str) -> list[list[str]]:
+    """語ごとのトークン列に分割する (日本語の語は文字 bigram の列になる)"""
+    words = []
+    normalized = unicodedata.normalize("NFKC", text).lower()
+    for match in _TOKEN_RE.finditer(normalized):
+        word = match.group()
+        if word.isascii() or len(word) == 1:
+            words.append([word])
+        else:
+            words.append([word[i : i + 2] for i in range(len(word) - 1)])
+    return words
+
+
+def tokenize(text: str) -> list[str]:
+    """検索用のトークン列に分割する
+
+    SQLite FTS5 の unicode61 は日本語を単語に分割できないため、あらかじめ
+    日本語を文字 bigram に分割し、空白区切りのトークン列として索引に格納する。
+    英単語の語幹処理 (porter) は FTS5 側で行う。
+    """
+    return [token for word in _split(text) for token in word]
+
+
+def _to_match_query(query: str, operator: str) -> str | None:
+    """検索語を FTS5 の MATCH 式にする (語を operator で結ぶ。語がなければ None)
+
+    tokenize で分割してから格納した papers_fts の検索に使う。
+    """
+    # 日本語の語は bigram のフレーズとして検索し、語を構成する文字の並びに一致させる。
+    # 引用符で囲むことで、トークンが FTS5 の演算子として解釈されないようにする
+    terms = dict.fromkeys(f'"{" ".join(word)}"' for word in _split(query))
+    if not terms:
+        return None
+    return f" {operator} ".join(terms)
+
+
+class SearchHit(BaseModel):
+    run_id: str
+    doi: str | None = None
+    title: str | None = None
+    year: int | None = None
+    relevance_score: float | None = None
+    summary: str | None = None
+    relevance_reason: str | None = None
+    url: str | None = None
+    rank: float
+
+
+class SearchIndex:
+    """スクリーニング済みの論文の全文検索インデックス (SQLite FTS5 による BM25)
+
+    論文は DOI (DOI がなければタイトル) 単位で1件として登録し、同じ論文が
+    複数の実行に現れた場合は後から登録した実行の判定結果で上書きする。
+    """
+
+    def __init__(self, path: Path = SEARCH_INDEX_PATH):
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:  # 正常終了時に commit、例外時に rollback
+                yield conn
+        finally:
+            conn.close()
+
+    def indexed_runs(self) -> set[str]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT run_id FROM indexed_runs").fetchall()
+        return {row["run_id"] for row in rows}
+
+    def __len__(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+
+    def add_run(self, run_dir: Path, force: bool = False) -> int:
+        """実行の最終結果を索引に追加し、追加した論文数を返す"""
+        import pandas as pd
+
+        run_id = run_dir.name
+        final_csv = run_dir / "final" / "final_review_matrix.csv"
+        if not final_csv.exists() or (not force and run_id in self.indexed_runs()):
+            return 0
+
+        df = pd.read_csv(final_csv)
+        df = df.astype(object).where(df.notna(), None)
+        count = 0
+        with self._connect() as conn:
+            for row in df.to_dict(orient="records"):
+                doc_key = row.get("doi") or row.get("title")
+                if not doc_key:
+                    continue
+                old = conn.execute(
+                    "SELECT id FROM papers WHERE doc_key = ?", (doc_key,)
+                ).fetchone()
+                if old is not None:
+                    conn.execute("DELETE FROM papers WHERE id = ?", (old["id"],))
+                    conn.execute("DELETE FROM papers_fts WHERE rowid = ?", (old["id"],))
+                cursor = conn.execute(
+                    "INSERT INTO papers (doc_key, run_id, doi, title, year,"
+                    " relevance_score, summary, relevance_reason, url)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        doc_key,
+                        run_id,
+                        row.get("doi"),
+                        row.get("title"),
+                        _to_int(row.get("year")),
+                        row.get("relevance_score"),
+                        row.get("summary"),
+                        row.get("relevance_reason"),
+                        row.get("url"),
+                    ),
+                )
+                conn.execute(
+                    f"INSERT INTO papers_fts (rowid, {', '.join(SEARCH_FIELDS)})"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (
+                        cursor.lastrowid,
+                        *(
+                            " ".join(tokenize(str(row.get(field) or "")))
+                            for field in SEARCH_FIELDS
+                        ),
+                    ),
+                )
+                count += 1
+            conn.execute(
+                "INSERT OR REPLACE INTO indexed_runs VALUES (?, ?, ?)",
+                (run_id, datetime.now().isoformat(timespec="seconds"), count),
+            )
+        logger.info(f"Indexed {count} papers from {run_id}")
+        return count
+
+    def sync(self, run_dirs: list[Path]) -> int:
+        """未登録の実行を実行順に索引へ追加し、追加した実行数を返す"""
+        indexed = self.indexed_runs()
+        added = 0
+        for run_dir in sorted(run_dirs, key=lambda d: d.name):
+            if run_dir.name in indexed:
+                continue
+            try:
+                if self.add_run(run_dir):
+                    added += 1
+            except Exception as e:
+                logger.warning(f"Failed to index {run_dir}: {e}")
+        return added
+
+    def search(self, query: str, limit: int = 20) -> list[SearchHit]:
+        """BM25 のスコア順に論文を返す
+
+        すべての語を含む論文を優先し、該当がなければいずれかの語を含む論文を返す。
+        """
+        weights = ", ".join(str(w) for w in SEARCH_FIELDS.values())
+        # 上位 limit 件の rowid を索引だけで求めてから、表示用の列を結合する
+        sql = (
+            "SELECT p.*, hits.rank FROM ("
+            "  SELECT rowid, bm25(papers_fts, {weights}) AS rank FROM papers_fts"
+            "  WHERE papers_fts MATCH ? ORDER BY rank LIMIT ?"
+            ") AS hits JOIN papers p ON p.id = hits.rowid ORDER BY hits.rank"
+        ).format(weights=weights)
+        with self._connect() as conn:
+            for operator in ("AND", "OR"):
+                match_query = _to_match_query(query, operator)
+                if match_query is None:
+                    return []
+                rows = conn.execute(sql, (match_query, limit)).fetchall()
+                if rows:
+                    break
+        return [
+            SearchHit(**{k: v for k, v in dict(row).items() if v is not None})
+            for row in rows
+        ]
+
+
+def _to_int(value) -> int | None:
+    try:
+        return int(float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def format_hits(hits: list[SearchHit]) -> str:
+    """CLI 表示用に検索結果を整形する"""
+    if not hits:
+        return "No matching papers."
+    lines = []
+    for i, hit in enumerate(hits, 1):
+        score = "-" if hit.relevance_score is None else f"{hit.relevance_score:g}"
+        lines.append(f"{i:>3}. [{score}] {hit.title} ({hit.year or '-'})")
+        lines.append(f"     {hit.doi or hit.url or ''}  run: {hit.run_id}")
+        if hit.summary:
+            lines.append(f"     {hit.summary}")
+    return "\n".join(lines)
@@ -0,0 +1,401 @@
+from __future__ import annotations
+
+import json
+import logging
+import multiprocessing as mp
+import threading
+from collections import Counter, deque
+from multiprocessing.connection import wait
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from src.core.screener import PaperScreener
+from src.core.usage import UsageTracker
+from src.models.models import BudgetSettings, ResearchScope
+from src.utils.constants import APP_LOGGER_NAME
+from src.utils.io_utils import ProgressTracker
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(f"{APP_LOGGER_NAME}.sharding")
+
+FAILED_SHARD_RESULT = {
+    "relevance_score": 0,
+    "relevance_reason": "Sharded screening failed",
+    "summary": "",
+}
+
+
+def split_into_shards(df: pd.DataFrame, shard_size: int) -> list[pd.DataFrame]:
+    """DataFrame を shard_size 件ずつのシャードに分割する"""
+    shard_size = max(1, shard_size)
+    return [
+        df.iloc[start : start + shard_size].reset_index(drop=True)
+        for start in range(0, len(df), shard_size)
+    ]
+
+
+def read_shard_results(path: Path) -> dict[str, dict[str, Any]]:
+    """シャードの結果ファイル (JSONL) を DOI をキーにした辞書として読み込む
+
+    ワーカーが書き込み途中で強制終了した場合に備え、壊れた行は読み飛ばす。
+    """
+    results: dict[str, dict[str, Any]] = {}
+    if not path.exists():
+        return results
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            doi = record.pop("doi", None)
+            if doi:
+                results[doi] = record
+    return results
+
+
+def _ends_with_newline(path: Path) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, 2)
+        return f.read(1) == b"\n"
+
+
+def screen_shard(
+    screener: PaperScreener,
+    shard_df: pd.DataFrame,
+    research_scope: str | list[ResearchScope],
+    output_path: Path,
+) -> int:
+    """1シャード分をスクリーニングし、結果を1件ずつ JSONL に追記する
+
+    既に結果ファイルに存在する DOI はスキップするため、再実行時は途中から再開される。
+    スクリーナーの予算に達して判定できなかった論文の数を返す。
+    """
+    done = read_shard_results(output_path)
+    pending = shard_df[~shard_df["doi"].isin(done)]
+    if pending.empty:
+        return 0
+
+    lock = threading.Lock()
+    with open(output_path, "a", encoding="utf-8") as f:
+        # 強制終了で途中まで書かれた行があれば、次のレコードと連結しないよう改行する
+        if output_path.stat().st_size and not _ends_with_newline(output_path):
+            f.write("\n")
+
+        def write_result(row: pd.Series, result: dict) -> None:
+            record = {"doi": row["doi"], **result}
+            with lock:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                f.flush()
+
+        screener.screen_papers(pending, research_scope, on_result=write_result)
+    left = getattr(screener, "pending_df", None)
+    return 0 if left is None else len(left)
+
+
+def _worker_main(
+    conn,
+    screener_factory,
+    factory_kwargs: dict[str, Any],
+    research_scope: str | list[ResearchScope],
+    log_dir: str | None,
+    log_level: str,
+    log_format: str = "text",
+) -> None:
+    """ワーカープロセスのエントリーポイント。コーディネーターからシャードを受け取り処理する"""
+    from src.utils.logging_config import setup_logging, shutdown_logging
+
+    if log_dir:
+        setup_logging(Path(log_dir), level=log_level, fmt=log_format)
+
+    screener = screener_factory(**factory_kwargs)
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+        shard_id, input_path, output_path = task
+        try:
+            import pandas as pd
+
+            shard_df = pd.read_pickle(input_path)
+            left = screen_shard(screener, shard_df, research_scope, Path(output_path))
+            # ワーカーの予算に達した場合、シャードの残りは未判定のまま返す
+            conn.send(("exhausted" if left else "done", shard_id, None))
+        except Exception as e:
+            logger.exception(f"Worker failed on shard {shard_id}")
+            conn.send(("failed", shard_id, str(e)))
+    screener.close()
+    conn.close()
+    # キューに残ったログを書き出してから終了する
+    shutdown_logging()
+
+
+class ShardedScreener:
+    """候補集合をシャードに分割し、複数のワーカープロセスでスクリーニングする
+
+    コーディネーター (このクラス) が作業キューを保持し、空いたワーカーに
+    シャードを1つずつ割り当てる。ワーカーが異常終了した場合、処理中だった
+    シャードはキューに戻され、代わりのワーカーが起動される。
+
+    予算を指定すると、各ワーカーのスクリーナーに残りの予算をプロセス数で
+    等分して渡す。ワーカーは自身の予算に達した時点で判定を止めるため、
+    シャードの完了を待たずに止まり、超過は実行中の呼び出し分に収まる。
+    いずれかのワーカーが予算に達したら、以降のシャードは割り当てない。
+    """
+
+    def __init__(
+        self,
+        api_keys: list[str],
+        model_name: str,
+        work_dir: Path,
+        num_processes: int = 2,
+        shard_size: int = 200,
+        max_workers: int = 5,
+        max_shard_attempts: int = 3,
+        log_dir: Path | None = None,
+        log_level: str = "INFO",
+        log_format: str = "text",
+        screener_factory=PaperScreener,
+        factory_kwargs: dict[str, Any] | None = None,
+        budget: BudgetSettings | None = None,
+        screener_options: dict[str, Any] | None = None,
+    ):
+        if not api_keys:
+            raise ValueError("At least one API key is required for sharded screening")
+        self.api_keys = api_keys
+        self.model_name = model_name
+        self.work_dir = Path(work_dir)
+        self.num_processes = max(1, num_processes)
+        self.shard_size = shard_size
+        self.max_workers = max_workers
+        self.max_shard_attempts = max_shard_attempts
+        self.log_dir = log_dir
+        self.log_level = log_level
+        self.log_format = log_format
+        self.screener_factory = screener_factory
+        self.factory_kwargs = factory_kwargs
+        # PaperScreener に渡す追加の引数 (2段階スクリーニングの設定等)
+        self.screener_options = screener_options or {}
+        self._batch_count = 0
+        # 完了したシャードのトークン数を集計する (ワーカーの予算の配分に使う)
+        self.usage = UsageTracker(budget)
+        # いずれかのワーカーが予算に達したかどうか (screen_papers の呼び出しごと)
+        self.budget_stopped = False
+        self.pending_df: pd.DataFrame | None = None
+
+    def _kwargs_for_worker(self, worker_id: int) -> dict[str, Any]:
+        if self.factory_kwargs is not None:
+            kwargs = dict(self.factory_kwargs)
+        else:
+            # API キーはワーカーごとにラウンドロビンで割り当てる
+            kwargs = {
+                "api_key": self.api_keys[worker_id % len(self.api_keys)],
+                "model_name": self.model_name,
+                "max_workers": self.max_workers,
+                **self.screener_options,
+            }
+        budget = self._worker_budget()
+        if budget is not None:
+            kwargs["budget"] = budget
+        return kwargs
+
+    def _worker_budget(self) -> BudgetSettings | None:
+        """ワーカー1つ分の予算 (残りをプロセス数で等分する。上限がなければ None)"""
+        budget = self.usage.budget
+        share: dict[str, Any] = {}
+        if budget.max_total_tokens is not None:
+            left = max(0, budget.max_total_tokens - self.usage.total_tokens)
+            share["max_total_tokens"] = left // self.num_processes
+        if budget.max_cost_usd is not None:
+            left_usd = max(0.0, budget.max_cost_usd - self.usage.cost_usd)
+            share["max_cost_usd"] = left_usd / self.num_processes
+        return budget.model_copy(update=share) if share else None
+
+    def screen_papers(
+        self, df: pd.DataFrame, research_scope: str | list[ResearchScope]
+    ) -> pd.DataFrame:
+        """PaperScreener.screen_papers と同じ入出力でシャード並列スクリーニングを行う"""
+        import pandas as pd
+
+        df = df.reset_index(drop=True)
+        self.pending_df = df.iloc[0:0]
+        self.budget_stopped = False
+        if df.empty:
+            return df
+
+        self._batch_count += 1
+        batch_dir = self.work_dir / f"batch_{self._batch_count:03d}"
+        batch_dir.mkdir(parents=True, exist_ok=True)
+
+        shards = split_into_shards(df, self.shard_size)
+        tasks = {}
+        for shard_id, shard_df in enumerate(shards):
+            input_path = batch_dir / f"shard_{shard_id:04d}.pkl"
+            output_path = batch_dir / f"shard_{shard_id:04d}.jsonl"
+            shard_df.to_pickle(input_path)
+            tasks[shard_id] = (shard_id, str(input_path), str(output_path))
+
+        logger.info(
+            f"Screening {len(df)} papers in {len(shards)} shards "
+            f"with {self.num_processes} processes"
+        )
+        failed = self._run_coordinator(tasks, research_scope)
+        if failed:
+            logger.error(f"Giving up on shards after repeated failures: {failed}")
+
+        # DOI をキーに各シャードの結果をマージする
+        merged: dict[str, dict[str, Any]] = {}
+        for _, _, output_path in tasks.values():
+            merged.update(read_shard_results(Path(output_path)))
+
+        if self.budget_stopped or self.usage.exhausted():
+            # 予算超過で判定しなかった論文 (未割り当てのシャードを含む) は未判定とする
+            screened = df["doi"].isin(merged)
+            self.pending_df = df[~screened].reset_index(drop=True)
+            df = df[screened].reset_index(drop=True)
+            logger.warning(
+                f"LLM budget exhausted. {len(self.pending_df)} papers were left "
+                "unscreened."
+            )
+
+        results = [merged.get(doi, FAILED_SHARD_RESULT) for doi in df["doi"]]
+        results_df = pd.DataFrame(results)
+        return pd.concat([df, results_df], axis=1)
+
+    def close(self) -> None:
+        """各ワーカーは終了時に自身のスクリーナーを閉じるため、ここでは何もしない"""
+
+    def _add_shard_usage(self, output_path: Path) -> None:
+        for record in read_shard_results(output_path).values():
+            self.usage.add(
+                record.get("prompt_tokens", 0), record.get("output_tokens", 0)
+            )
+
+    def _run_coordinator(
+        self,
+        tasks: dict[int, tuple[int, str, str]],
+        research_scope: str | list[ResearchScope],
+    ) -> list[int]:
+        ctx = mp.get_context("spawn")
+        log_dir = str(self.log_dir) if self.log_dir else None
+
+        pending = deque(tasks)
+        remaining = set(tasks)
+        attempts: Counter[int] = Counter()
+        failed: list[int] = []
+        workers: dict[int, tuple[Any, Any]] = {}
+        in_flight: dict[int, int] = {}
+        next_worker_id = 0
+
+        progress = ProgressTracker(
+            total=len(tasks), prefix="Screening shards", stage="screening_shards"
+        )
+
+        def start_worker() -> None:
+            nonlocal next_worker_id
+            worker_id = next_worker_id
+            next_worker_id += 1
+            parent_conn, child_conn = ctx.Pipe()
+            proc = ctx.Process(
+                target=_worker_main,
+                args=(
+                    child_conn,
+                    self.screener_factory,
+                    self._kwargs_for_worker(worker_id),
+                    research_scope,
+                    log_dir,
+                    self.log_level,
+                    self.log_format,
+                ),
+                daemon=True,
+            )
+            proc.start()
+            child_conn.close()
+            workers[worker_id] = (proc, parent_conn)
+            assign(worker_id)
+
+        def assign(worker_id: int) -> None:
+            _, conn = workers[worker_id]
+            if pending:
+                shard_id = pending.popleft()
+                attempts[shard_id] += 1
+                in_flight[worker_id] = shard_id
+                conn.send(tasks[shard_id])
+            else:
+                conn.send(None)
+
+        def requeue(shard_id: int, reason: str) -> None:
+            if attempts[shard_id] < self.max_shard_attempts:
+                logger.warning(f"Requeueing shard {shard_id}: {reason}")
+                pending.appendleft(shard_id)
+            else:
+                failed.append(shard_id)
+                remaining.discard(shard_id)
+                progress.update()
+
+        for _ in range(min(self.num_processes, len(tasks))):
+            start_worker()
+
+        try:
+            while remaining:
+                waitables = {}
+                for worker_id, (proc, conn) in workers.items():
+                    waitables[conn] = worker_id
+                    waitables[proc.sentinel] = worker_id
+
+                for ready in wait(list(waitables), timeout=1.0):
+                    worker_id = waitables[ready]
+                    if worker_id not in workers:
+                        continue
+                    proc, conn = workers[worker_id]
+                    try:
+                        status, shard_id, error = conn.recv()
+                    except (EOFError, OSError):
+                        # ワーカー終了: 異常終了なら処理中のシャードを戻し代替を起動
+                        proc.join()
+                        del workers[worker_id]
+                        shard_id = in_flight.pop(worker_id, None)
+                        if proc.exitcode != 0:
+                            logger.warning(
+                                f"Screening worker {worker_id} exited with code "
+                                f"{proc.exitcode}"
+                            )
+                        if shard_id is not None:
+                            requeue(shard_id, "worker exited")
+                        if pending:
+                            start_worker()
+                        continue
+
+                    in_flight.pop(worker_id, None)
+                    if status in ("done", "exhausted"):
+                        remaining.discard(shard_id)
+                        progress.update()
+                        self._add_shard_usage(Path(tasks[shard_id][2]))
+                        if status == "exhausted":
+                            self.budget_stopped = True
+                        if (self.budget_stopped or self.usage.exhausted()) and pending:
+                            for skipped in pending:
+                                remaining.discard(skipped)
+                            pending.clear()
+                    else:
+                        requeue(shard_id, error)
+                    assign(worker_id)
+
+                if pending and not workers:
+                    start_worker()
+        finally:
+            for _, conn in workers.values():
+                try:
+                    conn.send(None)
+                except (BrokenPipeError, OSError):
+                    pass
+            for proc, _ in workers.values():
+                proc.join(timeout=5)
+                if proc.is_alive():
+                    proc.terminate()
+            progress.close()
+
+        return failed
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import TYPE_CHECKING, Any
+
+from src.models.models import BudgetSettings
+from src.utils.constants import APP_LOGGER_NAME
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(f"{APP_LOGGER_NAME}.usage")
+
+# スクリーニング結果に付与するトークン・レイテンシのカラム
+USAGE_COLUMNS = ["prompt_tokens", "output_tokens", "total_tokens", "llm_latency_s"]
+
+
+def _to_int(value: Any) -> int:
+    return value if isinstance(value, int) else 0
+
+
+def extract_usage(response: Any) -> dict[str, int]:
+    """Gemini のレスポンスから usage_metadata のトークン数を取り出す"""
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = _to_int(getattr(usage, "prompt_token_count", None))
+    output_tokens = _to_int(getattr(usage, "candidates_token_count", None))
+    total_tokens = _to_int(getattr(usage, "total_token_count", None))
+    return {
+        "prompt_tokens": prompt_tokens,
+        "output_tokens": output_tokens,
+        "total_tokens": total_tokens or prompt_tokens + output_tokens,
+    }
+
+
+def estimate_cost(
+    prompt_tokens: float, output_tokens: float, budget: BudgetSettings
+) -> float:
+    """トークン数から概算コスト (USD) を計算する"""
+    return (
+        prompt_tokens * budget.input_price_per_million
+        + output_tokens * budget.output_price_per_million
+    ) / 1_000_000
+
+
+class UsageTracker:
+    """LLM 呼び出しのトークン消費を集計し、予算超過を判定する (スレッドセーフ)"""
+
+    def __init__(self, budget: BudgetSettings | None = None):
+        self.budget = budget or BudgetSettings()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self._lock = threading.Lock()
+
+    def add(self, prompt_tokens: int, output_tokens: int) -> None:
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.output_tokens += output_tokens
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.output_tokens
+
+    @property
+    def cost_usd(self) -> float:
+        return estimate_cost(self.prompt_tokens, self.output_tokens, self.budget)
+
+    def exhausted(self) -> bool:
+        """トークンまたはコストの上限に達したかどうか"""
+        if (
+            self.budget.max_total_tokens is not None
+            and self.total_tokens >= self.budget.max_total_tokens
+        ):
+            return True
+        if (
+            self.budget.max_cost_usd is not None
+            and self.cost_usd >= self.budget.max_cost_usd
+        ):
+            return True
+        return False
+
+
+def summarize_usage(df: pd.DataFrame, budget: BudgetSettings) -> dict[str, Any]:
+    """スクリーニング結果のトークン・レイテンシ列を集計する"""
+    if df.empty or "total_tokens" not in df.columns:
+        return {
+            "calls": 0,
+            "prompt_tokens": 0,
+            "output_tokens": 0,
+            "total_tokens": 0,
+            "cost_usd": 0.0,
+            "latency_s_total": 0.0,
+            "latency_s_mean": 0.0,
+        }
+
+    called = df[df["total_tokens"].fillna(0) > 0]
+    prompt_tokens = int(df["prompt_tokens"].fillna(0).sum())
+    output_tokens = int(df["output_tokens"].fillna(0).sum())
+    latency = called["llm_latency_s"].fillna(0)
+    return {
+        "calls": len(called),
+        "prompt_tokens": prompt_tokens,
+        "output_tokens": output_tokens,
+        "total_tokens": int(df["total_tokens"].fillna(0).sum()),
+        "cost_usd": round(estimate_cost(prompt_tokens, output_tokens, budget), 6),
+        "latency_s_total": round(float(latency.sum()), 3),
+        "latency_s_mean": round(float(latency.mean()), 3) if len(called) else 0.0,
+    }
+
+
+def summarize_cascade(
+    df: pd.DataFrame, budget: BudgetSettings | None = None
+) -> dict[str, Any] | None:
+    """2段階スクリーニングの段階ごとの件数・レイテンシ・トークン数と削減量を集計する
+
+    削減量は、1段目で不採用になった論文を本判定した場合の平均トークン数から
+    1段目に使ったトークン数を差し引いて見積もる。2段階でなければ None を返す。
+    """
+    if df.empty or "screening_tier" not in df.columns:
+        return None
+    budget = budget or BudgetSettings()
+    tier = df["screening_tier"]
+    tier1, tier2 = df[tier == 1], df[tier == 2]
+
+    triage_prompt = int(df["triage_prompt_tokens"].fillna(0).sum())
+    triage_output = int(df["triage_output_tokens"].fillna(0).sum())
+    # 本判定の使用量は、合計から1段目の分を差し引いたもの
+    full_prompt = tier2["prompt_tokens"] - tier2["triage_prompt_tokens"].fillna(0)
+    full_output = tier2["output_tokens"] - tier2["triage_output_tokens"].fillna(0)
+    full_latency = tier2["llm_latency_s"] - tier2["triage_latency_s"].fillna(0)
+
+    saved_prompt = saved_output = 0.0
+    if len(tier2):
+        saved_prompt = len(tier1) * full_prompt.mean() - triage_prompt
+        saved_output = len(tier1) * full_output.mean() - triage_output
+    return {
+        "tier1_calls": int(df["triage_prompt_tokens"].notna().sum()),
+        "tier1_only": len(tier1),
+        "escalated": len(tier2),
+        "tier1_latency_s_mean": round(float(df["triage_latency_s"].mean()), 3),
+        "tier2_latency_s_mean": (
+            round(float(full_latency.mean()), 3) if len(tier2) else 0.0
+        ),
+        "tier1_tokens": triage_prompt + triage_output,
+        "tier2_tokens": int(full_prompt.sum() + full_output.sum()),
+        "estimated_saved_tokens": int(saved_prompt + saved_output),
+        "estimated_saved_cost_usd": round(
+            estimate_cost(saved_prompt, saved_output, budget), 6
+        ),
+    }
+
+
+def summarize_prompts(df: pd.DataFrame) -> dict[str, Any] | None:
+    """プロンプトの見積もりの大きさ・抄録の切り詰め・キャッシュしたトークン数を集計
+
+    判定前にプロンプトを組み立てていない結果 (列がない場合) は None を返す。
+    """
+    if df.empty or "prompt_est_tokens" not in df.columns:
+        return None
+    est = df["prompt_est_tokens"].fillna(0)
+    est = est[est > 0]
+    truncated = df["abstract_truncated_tokens"].fillna(0)
+    return {
+        "prompt_est_tokens_mean": round(float(est.mean()), 1) if len(est) else 0.0,
+        "prompt_est_tokens_p95": int(est.quantile(0.95)) if len(est) else 0,
+        "prompt_est_tokens_max": int(est.max()) if len(est) else 0,
+        "truncated_papers": int((truncated > 0).sum()),
+        "truncated_tokens": int(truncated.sum()),
+        "cached_tokens": int(df["cached_tokens"].fillna(0).sum()),
+    }
+
+
+def top_cost_papers(df: pd.DataFrame, n: int = 10) -> list[dict[str, Any]]:
+    """トークン消費の大きい論文 (長いアブストラクト等) を返す"""
+    if df.empty or "total_tokens" not in df.columns:
+        return []
+    top = df.sort_values(by="total_tokens", ascending=False).head(n)
+    columns = [c for c in ["doi", "title", "prompt_tokens", "total_tokens"] if c in top]
+    return top[columns].to_dict(orient="records")
@@ -1,9 +1,29 @@
-from pydantic import BaseModel, Field
+from typing import Literal
+
+from pydantic import BaseModel, Field, field_validator
+
+
+class ResearchScope(BaseModel):
+    """1回の判定で同時に評価するサブトピック (スコープ)"""
+
+    # 結果の列名 score_<name> に使う
+    name: str
+    query: str
+    # snowball_scope_mode が per_scope の場合のしきい値 (None なら screening_threshold)
+    threshold: int | None = None
+
+    @field_validator("name")
+    @classmethod
+    def _check_name(cls, value: str) -> str:
+        if not value.isidentifier():
+            raise ValueError(f"Scope name must be an identifier: {value!r}")
+        return value
 
 
 class SearchCriteria(BaseModel):
     keywords: list[str]
-    natural_language_query: str = ""
+    # 文字列、または名前付きスコープのリスト (各スコープのスコアを1回の呼び出しで判定)
+    natural_language_query: str | list[ResearchScope] = ""
     seed_paper_dois: list[str] = Field(default_factory=list)
     keyword_search_limit: int = 100
     max_related_papers: int = -1
@@ -14,15 +34,162 @@ class SearchCriteria(BaseModel):
     iterations: int = 1
     top_n_for_snowball: int = 5
     max_retries: int = 10
+    # S2AG のバルクデータから作ったストア (src.core.s2_store) のディレクトリ。
+    # 指定すると S2 の API を使わずにストアから収集する
+    s2_store: str | None = None
+    # 複数スコープ時のスノーボール対象の選び方
+    # max: 最大スコアを screening_threshold と比較する
+    # per_scope: いずれかのスコープのスコアがそのスコープのしきい値以上
+    snowball_scope_mode: Literal["max", "per_scope"] = "max"
+
+    @field_validator("natural_language_query")
+    @classmethod
+    def _check_unique_scopes(cls, value):
+        if isinstance(value, list):
+            names = [scope.name for scope in value]
+            if len(set(names)) != len(names):
+                raise ValueError(f"Duplicate scope names: {names}")
+            if not value:
+                return ""
+        return value
 
 
 class LoggingConfig(BaseModel):
     level: str = "INFO"
+    # text: app.log に1行ずつ、
+    # json: app.jsonl に JSON Lines (run_id・stage・paper_id 付き)
+    format: Literal["text", "json"] = "text"
+    # ループ内の DEBUG ログを呼び出し箇所ごとに出力する最小間隔 (秒、0 なら間引かない)
+    debug_interval_s: float = 1.0
+    # cProfile で計測する区間名 (例: ["screening", "arxiv_fill"])
+    profile_stages: list[str] = Field(default_factory=list)
+
+
+class LLMBackendSettings(BaseModel):
+    # gemini: Gemini API
+    # local: OpenAI 互換 API (Ollama・vLLM・llama.cpp server 等の自前のモデル)
+    # fake: 決定的な応答を返す負荷試験用のバックエンド (API を呼び出さない)
+    type: Literal["gemini", "local", "fake"] = "gemini"
+    # local の接続先 (/chat/completions の手前まで) と API キー (不要なら None)
+    base_url: str = "http://localhost:11434/v1"
+    api_key: str | None = None
+    timeout_s: float = 120.0
+    # generate_batch で同時に送るリクエスト数
+    batch_concurrency: int = 8
+    # fake の1回の呼び出しの所要時間 (ミリ秒)
+    fake_latency_ms: float = 0.0
+    # gemini: プロンプトの前半 (スコープ・指示) を明示的なコンテキストキャッシュに
+    # 載せる。前半の見積もりトークン数が cache_min_tokens 未満 (モデルの最小値未満)
+    # の場合は使わない
+    context_cache: bool = True
+    cache_min_tokens: int = 1024
+    cache_ttl_s: int = 3600
+
+
+class BatchSettings(BaseModel):
+    # スクリーニングを Gemini の Batch API でまとめて行う (数時間以内に完了し、
+    # 料金は同期呼び出しの約半額)。2段階スクリーニング (cascade) とは併用できない
+    enabled: bool = False
+    # ジョブの状態を確認する間隔 (秒)
+    poll_interval_s: float = 60.0
+    # Gemini API の接続先 (None は既定。ローカルの代替サーバーで試す場合に指定する)
+    base_url: str | None = None
+
+
+class ActiveLearningSettings(BaseModel):
+    # LLM の判定結果から分類器を逐次学習し、較正が target_recall を満たした後は
+    # 不採用と予測した論文の LLM 呼び出しを省く (シャード並列・Batch API とは併用不可)
+    enabled: bool = False
+    # 省略を始めるまでに学習に使う判定結果の最小件数
+    min_labels: int = 200
+    # 較正用の採用論文のうち、省略せずに LLM に回す割合の目標
+    target_recall: float = Field(default=0.95, gt=0, le=1)
+    # 常に LLM で判定し、学習せずに較正に使う論文の割合
+    holdout_fraction: float = Field(default=0.1, gt=0, lt=1)
+    # 較正に必要な較正用の採用論文の最小件数
+    min_holdout_positives: int = 10
+    # 特徴量のハッシュの次元数
+    n_features: int = 2**18
+    # この件数の判定結果ごとにしきい値を較正し直す
+    calibrate_every: int = 20
 
 
 class LLMSettings(BaseModel):
     model_screening: str = "gemini-2.0-flash-lite"
     max_screening_workers: int = 5
+    # 1 より大きい場合はシャード単位でマルチプロセス・スクリーニングを行う
+    screening_processes: int = 1
+    screening_shard_size: int = 200
+    # 2段階スクリーニング: 安価なモデルでスコアのみを判定し、境界付近
+    # (screening_threshold - cascade_margin 以上) の論文だけを
+    # model_screening で判定する
+    cascade: bool = False
+    model_triage: str = "gemini-2.0-flash-lite"
+    cascade_margin: int = 2
+    # 抄録をこの見積もりトークン数までに切り詰める (None は切り詰めない)
+    max_abstract_tokens: int | None = 1000
+    backend: LLMBackendSettings = Field(default_factory=LLMBackendSettings)
+    batch: BatchSettings = Field(default_factory=BatchSettings)
+    active_learning: ActiveLearningSettings = Field(
+        default_factory=ActiveLearningSettings
+    )
+
+
+class BudgetSettings(BaseModel):
+    # None の場合は無制限。上限に達するとスクリーニングを中断し、
+    # 再開可能な状態で保存する
+    max_total_tokens: int | None = None
+    max_cost_usd: float | None = None
+    # ドライランの見積もり所要時間がこれを超える場合に警告する
+    max_wall_time_minutes: float | None = None
+    # 100万トークンあたりの単価 (USD)。デフォルトは gemini-2.0-flash-lite の料金
+    input_price_per_million: float = 0.075
+    output_price_per_million: float = 0.30
+
+
+class ExtractionSettings(BaseModel):
+    """最終結果の論文から手法・結果などを抽出する段階 (Phase 3) の設定"""
+
+    enabled: bool = False
+    # None の場合はスクリーニングと同じモデルを使う
+    model: str | None = None
+    max_workers: int = 5
+    # 一度に投入する論文数。バッチごとに予算を確認し、進捗をキャッシュに書き出す
+    batch_size: int = 50
+    # 抽出する項目名と説明 (LLM の応答スキーマになり、最終結果の列として追加される)
+    fields: dict[str, str] = Field(
+        default_factory=lambda: {
+            "method": "Proposed method or approach, in 1-2 sentences in Japanese.",
+            "results": "Main results or findings, in 1-2 sentences in Japanese.",
+            "datasets": "Datasets or benchmarks used, comma-separated (empty if none).",
+            "one_line_summary": "One-line summary of the paper in Japanese.",
+        }
+    )
+
+    @field_validator("fields")
+    @classmethod
+    def _check_field_names(cls, value: dict[str, str]) -> dict[str, str]:
+        invalid = [name for name in value if not name.isidentifier()]
+        if invalid:
+            raise ValueError(f"Invalid extraction field names: {invalid}")
+        if not value:
+            raise ValueError("At least one extraction field is required")
+        return value
+
+
+class FullTextSettings(BaseModel):
+    """しきい値以上の論文のオープンアクセス PDF を取得し、本文を抽出する段階の設定"""
+
+    enabled: bool = False
+    # 同時にダウンロードする PDF の数
+    max_downloads: int = 8
+    # 本文抽出のプロセス数
+    text_processes: int = 2
+    max_pdf_mb: float = 50.0
+    # 1論文あたりに本文を抽出する最大ページ数
+    max_pages: int = 50
+    timeout_s: float = 60.0
+    arxiv_pdf_url: str = "https://arxiv.org/pdf/{arxiv_id}"
 
 
 class UISettings(BaseModel):
@@ -50,6 +217,15 @@ class Config(BaseModel):
     search_criteria: SearchCriteria
     logging: LoggingConfig = Field(default_factory=LoggingConfig)
     llm_settings: LLMSettings
+    budget: BudgetSettings = Field(default_factory=BudgetSettings)
+    extraction: ExtractionSettings = Field(default_factory=ExtractionSettings)
+    fulltext: FullTextSettings = Field(default_factory=FullTextSettings)
+
+
+class TriageResult(BaseModel):
+    relevance_score: int = Field(
+        description="Score from 0 to 10 indicating relevance to the research theme."
+    )
 
 
 class ScreeningResult(BaseModel):
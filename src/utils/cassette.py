@@ -0,0 +1,238 @@
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable
+
+from src.utils.constants import APP_LOGGER_NAME
+
+logger = logging.getLogger(f"{APP_LOGGER_NAME}.cassette")
+
+CASSETTE_FILE_NAME = "cassette.jsonl"
+
+
+class CassetteMissError(LookupError):
+    """再生モードで、記録にないリクエストが行われた"""
+
+
+class RecordedError(RuntimeError):
+    """記録時に例外となったリクエストを再生した"""
+
+
+def request_key(kind: str, request: dict[str, Any]) -> str:
+    """リクエストを識別するキー (辞書の順序によらず同じ値になる)"""
+    return kind + ":" + json.dumps(request, sort_keys=True, ensure_ascii=False)
+
+
+class Cassette:
+    """外部サービス (S2・ArXiv・Gemini) との通信を記録・再生する
+
+    記録モード ("record") では、リクエストごとに応答と所要時間を JSONL に1行ずつ
+    追記する。再生モード ("replay") では、同じリクエストに記録順で応答を返し、
+    記録時の所要時間を speed で割った時間だけ待つ (speed=0 なら待たない)。
+    同じリクエストが複数回記録されている場合 (リトライ等) は順に返し、使い切った
+    後は最後の応答を返し続ける。
+    """
+
+    def __init__(self, path: Path, mode: str = "record", speed: float = 1.0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._entries: dict[str, deque[dict[str, Any]]] = defaultdict(deque)
+        self._last: dict[str, dict[str, Any]] = {}
+        if mode == "replay":
+            self._load()
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def _load(self) -> None:
+        count = 0
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # 強制終了で途中まで書かれた行
+                self._entries[entry["key"]].append(entry)
+                count += 1
+        logger.info(f"Loaded {count} recorded requests from {self.path}")
+
+    def call(
+        self,
+        kind: str,
+        request: dict[str, Any],
+        func: Callable[[], Any],
+        encode: Callable[[Any], Any],
+        decode: Callable[[Any], Any],
+    ) -> Any:
+        """記録モードでは func を呼び出して応答を記録し、再生モードでは記録を返す
+
+        encode は応答を JSON に変換できる値に、decode はその値を応答に戻す。
+        func が例外を送出した場合は、例外の種類とメッセージを記録して再送出する。
+        """
+        key = request_key(kind, request)
+        if self.replaying:
+            return self._replay(key, decode)
+
+        start = time.perf_counter()
+        entry: dict[str, Any] = {"key": key, "kind": kind, "request": request}
+        try:
+            response = func()
+        except Exception as e:
+            entry["error"] = f"{type(e).__name__}: {e}"
+            raise
+        else:
+            entry["response"] = encode(response)
+            return response
+        finally:
+            entry["elapsed_s"] = round(time.perf_counter() - start, 6)
+            self._write(entry)
+
+    def pause(self, seconds: float) -> None:
+        """リクエスト間の待機 (レート制限への配慮)。再生時は speed に応じて短縮する"""
+        if not self.replaying:
+            time.sleep(seconds)
+        elif self.speed > 0:
+            time.sleep(seconds / self.speed)
+
+    def _replay(self, key: str, decode: Callable[[Any], Any]) -> Any:
+        with self._lock:
+            queue = self._entries.get(key)
+            if queue:
+                entry = queue.popleft()
+                self._last[key] = entry
+            else:
+                entry = self._last.get(key)
+        if entry is None:
+            raise CassetteMissError(f"Request not found in cassette: {key[:200]}")
+        if self.speed > 0:
+            time.sleep(entry["elapsed_s"] / self.speed)
+        if "error" in entry:
+            raise RecordedError(entry["error"])
+        return decode(entry["response"])
+
+    def _write(self, entry: dict[str, Any]) -> None:
+        line = json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+
+def encode_http_response(response: Any) -> dict[str, Any]:
+    """requests.Response を記録する値に変換する (エラー応答も含めて記録する)"""
+    return {
+        "status": response.status_code,
+        "headers": dict(response.headers),
+        "body": response.content.decode("utf-8", errors="replace"),
+    }
+
+
+def decode_http_response(value: dict[str, Any]) -> Any:
+    """記録した値から requests.Response を作る (raise_for_status・json が使える)"""
+    import requests
+
+    response = requests.Response()
+    response.status_code = value["status"]
+    response.headers.update(value["headers"])
+    response._content = value["body"].encode("utf-8")
+    return response
+
+
+class CassetteModels:
+    """genai.Client.models の代わりに generate_content を記録・再生する"""
+
+    def __init__(self, models: Any, cassette: Cassette):
+        self._models = models
+        self._cassette = cassette
+
+    def generate_content(self, model: str, contents: str, config: dict[str, Any]):
+        schema = config.get("response_schema")
+        request = {
+            "model": model,
+            "contents": contents,
+            "schema": getattr(schema, "__name__", str(schema)),
+        }
+
+        def call():
+            return self._models.generate_content(
+                model=model, contents=contents, config=config
+            )
+
+        def decode(value: dict[str, Any]) -> SimpleNamespace:
+            parsed = value["parsed"]
+            if parsed is not None and schema is not None:
+                parsed = schema.model_validate(parsed)
+            return SimpleNamespace(
+                parsed=parsed,
+                usage_metadata=SimpleNamespace(**value["usage"]),
+            )
+
+        return self._cassette.call("gemini", request, call, _encode_gemini, decode)
+
+
+class CassetteClient:
+    """記録・再生時に genai.Client の代わりに使うクライアント"""
+
+    def __init__(self, client: Any, cassette: Cassette):
+        self.models = CassetteModels(client.models if client else None, cassette)
+
+
+def _encode_gemini(response: Any) -> dict[str, Any]:
+    parsed = getattr(response, "parsed", None)
+    usage = getattr(response, "usage_metadata", None)
+    return {
+        "parsed": parsed.model_dump() if hasattr(parsed, "model_dump") else parsed,
+        "usage": {
+            name: getattr(usage, name, None)
+            for name in (
+                "prompt_token_count",
+                "candidates_token_count",
+                "total_token_count",
+            )
+        },
+    }
+
+
+def gemini_client(api_key: str) -> Any:
+    """Gemini のクライアントを作る。カセットが有効なら記録・再生用に包む
+
+    再生時は API に接続しないため genai.Client を作らない。
+    """
+    cassette = get_cassette()
+    if cassette is not None and cassette.replaying:
+        return CassetteClient(None, cassette)
+
+    # google.genai は読み込みに時間がかかるため、呼び出し時まで遅延する
+    from google import genai
+
+    client = genai.Client(api_key=api_key)
+    if cassette is None:
+        return client
+    return CassetteClient(client, cassette)
+
+
+_cassette: Cassette | None = None
+
+
+def get_cassette() -> Cassette | None:
+    """現在の実行のカセットを返す (記録・再生をしない場合は None)"""
+    return _cassette
+
+
+def init_cassette(
+    path: Path | None, mode: str = "record", speed: float = 1.0
+) -> Cassette | None:
+    """カセットを設定する。path が None なら記録・再生を無効にする"""
+    global _cassette
+    _cassette = Cassette(path, mode=mode, speed=speed) if path else None
+    return _cassette
@@ -7,6 +7,7 @@ DATA_DIR = Path("data")
 PROMPTS_DIR = Path("prompts")
 ASSETS_DIR = Path("assets")
 CSS_FILE = ASSETS_DIR / "css" / "style.css"
+RUN_STATE_FILE = "run_state.json"
 
 CANDIDATE_COLUMNS = [
     "relevance_score",
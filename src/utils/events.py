@@ -0,0 +1,215 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any
+
+EVENTS_FILE_NAME = "events.jsonl"
+# 進捗イベントを書き出す最小間隔 (秒)。完了時は間隔によらず書き出す
+PROGRESS_INTERVAL_S = 0.5
+
+
+class EventWriter:
+    """進捗イベント (段階の開始・終了、進捗、警告・エラー) を JSONL に追記する
+
+    ダッシュボードはこのファイルを `EventTail` で差分読み込みして進捗を表示する。
+    出力先が None の場合は何も書き出さない。
+    """
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        progress_interval_s: float = PROGRESS_INTERVAL_S,
+    ):
+        self.path = path
+        self.progress_interval_s = progress_interval_s
+        self._lock = threading.Lock()
+        self._progress: dict[str, dict[str, Any]] = {}
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+
+    def emit(self, event_type: str, **fields: Any) -> None:
+        if self.path is None:
+            return
+        record = {"ts": round(time.time(), 3), "type": event_type, **fields}
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            # 読み手が途中の行を読まないよう、1行ずつ書き込んでフラッシュする
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def start_progress(self, stage: str, total: int) -> None:
+        with self._lock:
+            self._progress[stage] = {
+                "done": 0,
+                "total": total,
+                "start": time.perf_counter(),
+                "last_emit": 0.0,
+            }
+        self._emit_progress(stage, force=True)
+
+    def advance(self, stage: str, n: int = 1) -> None:
+        with self._lock:
+            state = self._progress.get(stage)
+            if state is None:
+                return
+            state["done"] += n
+        self._emit_progress(stage)
+
+    def finish_progress(self, stage: str) -> None:
+        self._emit_progress(stage, force=True)
+        with self._lock:
+            self._progress.pop(stage, None)
+
+    def _emit_progress(self, stage: str, force: bool = False) -> None:
+        now = time.perf_counter()
+        with self._lock:
+            state = self._progress.get(stage)
+            if state is None:
+                return
+            done, total = state["done"], state["total"]
+            if not force and done < total:
+                if now - state["last_emit"] < self.progress_interval_s:
+                    return
+            state["last_emit"] = now
+            elapsed = now - state["start"]
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta_s = (total - done) / rate if rate > 0 else None
+        self.emit(
+            "progress",
+            stage=stage,
+            done=done,
+            total=total,
+            rate=round(rate, 3),
+            eta_s=round(eta_s, 1) if eta_s is not None else None,
+        )
+
+    def on_span(self, phase: str, span: Any) -> None:
+        """MetricsRecorder の区間の開始・終了を段階イベントとして書き出す"""
+        if phase == "start":
+            self.emit("stage_start", stage=span.name, parent=span.parent, **span.attrs)
+        else:
+            self.emit(
+                "stage_end",
+                stage=span.name,
+                duration_s=round(span.duration_s, 3),
+                **span.attrs,
+            )
+
+
+class EventLogHandler(logging.Handler):
+    """警告・エラーのログを進捗イベントとしても書き出すハンドラー"""
+
+    def __init__(self, writer: EventWriter, level: int = logging.WARNING):
+        super().__init__(level)
+        self.writer = writer
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.writer.emit(
+                "log",
+                level=record.levelname,
+                logger=record.name,
+                message=record.getMessage(),
+            )
+        except Exception:
+            self.handleError(record)
+
+
+class EventTail:
+    """イベントファイルを前回の読み込み位置から差分で読み、最新の状態だけを保持する
+
+    段階ごとの最新の進捗、直近のスループット、直近の警告・エラーのみを保持するため、
+    実行が長くなってもメモリ使用量は一定に収まる。
+    """
+
+    def __init__(self, path: Path, max_points: int = 300, max_messages: int = 50):
+        self.path = Path(path)
+        self.offset = 0
+        self._partial = b""
+        self.run: dict[str, Any] = {}
+        self.stages: dict[str, dict[str, Any]] = {}
+        self.throughput: deque[dict[str, Any]] = deque(maxlen=max_points)
+        self.messages: deque[dict[str, Any]] = deque(maxlen=max_messages)
+        self._last_progress: dict[str, tuple[float, int]] = {}
+
+    @property
+    def finished(self) -> bool:
+        return "status" in self.run
+
+    def poll(self, max_bytes: int = 1 << 20) -> int:
+        """追記された分を読み込み、処理したイベント数を返す"""
+        if not self.path.exists():
+            return 0
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            chunk = f.read(max_bytes)
+        self.offset += len(chunk)
+        lines = (self._partial + chunk).split(b"\n")
+        # 書き込み途中の行は次回に持ち越す
+        self._partial = lines.pop()
+        count = 0
+        for line in lines:
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            self._apply(event)
+            count += 1
+        return count
+
+    def _apply(self, event: dict[str, Any]) -> None:
+        event_type = event.get("type")
+        stage = event.get("stage")
+        if event_type == "run_start":
+            self.run.update(event)
+        elif event_type == "run_end":
+            self.run["status"] = event.get("status")
+            self.run["end"] = event["ts"]
+        elif event_type == "stage_start":
+            self.stages.setdefault(stage, {}).update(
+                {"stage": stage, "state": "running", "start": event["ts"]}
+            )
+        elif event_type == "stage_end":
+            self.stages.setdefault(stage, {"stage": stage}).update(
+                {"state": "done", "duration_s": event.get("duration_s")}
+            )
+        elif event_type == "progress":
+            self.stages.setdefault(stage, {"stage": stage, "state": "running"}).update(
+                {
+                    "done": event["done"],
+                    "total": event["total"],
+                    "rate": event.get("rate"),
+                    "eta_s": event.get("eta_s"),
+                }
+            )
+            # 前回の進捗イベントとの差分から、その区間のスループットを求める
+            last = self._last_progress.get(stage)
+            self._last_progress[stage] = (event["ts"], event["done"])
+            if last is not None and event["ts"] > last[0]:
+                self.throughput.append(
+                    {
+                        "ts": event["ts"],
+                        "stage": stage,
+                        "rate": (event["done"] - last[1]) / (event["ts"] - last[0]),
+                    }
+                )
+        elif event_type == "log":
+            self.messages.append(event)
+
+
+_events = EventWriter()
+
+
+def get_events() -> EventWriter:
+    """現在の実行の進捗イベントの出力先を返す (未初期化の場合は何も書き出さない)"""
+    return _events
+
+
+def init_events(path: Path | None) -> EventWriter:
+    """進捗イベントを path に書き出す出力先を設定する"""
+    global _events
+    _events = EventWriter(path)
+    return _events
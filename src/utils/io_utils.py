@@ -1,9 +1,9 @@
+import json
 import shutil
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
-import pandas as pd
 import yaml
 
 from src.models.models import Config, LayoutConfig
@@ -12,6 +12,7 @@ from src.utils.constants import (
     DEFAULT_CONFIG_PATH,
     LAYOUT_CONFIG_PATH,
     PROMPTS_DIR,
+    RUN_STATE_FILE,
 )
 
 
@@ -76,6 +77,8 @@ def create_run_directory(project_name: str) -> Path:
 
 def save_checkpoint(data: Any, path: Path) -> None:
     """中間データを保存する (CSV または pickle)"""
+    import pandas as pd
+
     if isinstance(data, pd.DataFrame):
         if path.suffix == ".csv":
             data.to_csv(path, index=False, encoding="utf-8-sig")
@@ -90,6 +93,8 @@ def save_checkpoint(data: Any, path: Path) -> None:
 
 def load_checkpoint(path: Path) -> Any:
     """中間データを読み込む"""
+    import pandas as pd
+
     if path.suffix == ".csv":
         return pd.read_csv(path)
     if path.suffix == ".pkl":
@@ -101,16 +106,40 @@ def load_checkpoint(path: Path) -> Any:
             return pickle.load(f)
 
 
+def save_run_state(run_dir: Path, state: dict[str, Any]) -> None:
+    """中断時の再開に必要な状態を interim/run_state.json に保存する"""
+    path = run_dir / "interim" / RUN_STATE_FILE
+    path.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def load_run_state(run_dir: Path) -> dict[str, Any] | None:
+    """保存された実行状態を読み込む (存在しない場合は None)"""
+    path = run_dir / "interim" / RUN_STATE_FILE
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
 class ProgressTracker:
-    """ThreadPoolExecutor 等の進捗を管理するためのシンプルなカウンタ"""
+    """ThreadPoolExecutor 等の進捗を管理するためのシンプルなカウンタ
 
-    def __init__(self, total: int, prefix: str = "Progress"):
+    tqdm のプログレスバーに加え、stage 名で進捗イベント (events.jsonl) を書き出す。
+    """
+
+    def __init__(self, total: int, prefix: str = "Progress", stage: str | None = None):
         from tqdm import tqdm
 
+        from src.utils.events import get_events
+
         self.pbar = tqdm(total=total, desc=prefix)
+        self.stage = stage or prefix
+        self.events = get_events()
+        self.events.start_progress(self.stage, total)
 
     def update(self, n: int = 1):
         self.pbar.update(n)
+        self.events.advance(self.stage, n)
 
     def close(self):
         self.pbar.close()
+        self.events.finish_progress(self.stage)
@@ -1,25 +1,169 @@
+import atexit
+import copy
+import json
 import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
+from typing import Any, Iterator
 
 from src.utils.constants import APP_LOGGER_NAME
 
+# 各ログに付ける文脈 (段階・論文)。スレッドごと (contextvars) に保持する
+_context: ContextVar[dict[str, Any] | None] = ContextVar("log_context", default=None)
+# JSON 形式で出力する文脈の項目 (extra で個別に指定することもできる)
+CONTEXT_FIELDS = ("run_id", "stage", "paper_id")
+# 同じ箇所の DEBUG ログを出力する最小間隔 (秒)
+DEBUG_INTERVAL_S = 1.0
+
+_listener: QueueListener | None = None
+_run_id: str | None = None
+
+
+@contextmanager
+def log_context(**fields: Any) -> Iterator[None]:
+    """with ブロック内のログに文脈 (stage・paper_id 等) を付ける
+
+    ThreadPoolExecutor のワーカースレッドには引き継がれないため、ワーカー側で
+    改めて指定する。
+    """
+    token = _context.set({**(_context.get() or {}), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """レコードに run_id・stage・paper_id を付ける (extra で指定された値を優先する)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = {"run_id": _run_id, **(_context.get() or {})}
+        for name in CONTEXT_FIELDS:
+            if not hasattr(record, name):
+                setattr(record, name, context.get(name))
+        return True
+
+
+class DebugRateLimitFilter(logging.Filter):
+    """ループ内の DEBUG ログを、呼び出し箇所ごとに interval_s に1件まで通す
+
+    間引いた件数は、次に通したレコードの suppressed に記録する。
+    INFO 以上のログは間引かない。
+    """
+
+    def __init__(self, interval_s: float = DEBUG_INTERVAL_S):
+        super().__init__()
+        self.interval_s = interval_s
+        self._lock = threading.Lock()
+        # 呼び出し箇所 -> (最後に通した時刻, 間引いた件数)
+        self._sites: dict[tuple[str, int], tuple[float, int]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.interval_s <= 0:
+            return True
+        site = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            last, suppressed = self._sites.get(site, (float("-inf"), 0))
+            if now - last < self.interval_s:
+                self._sites[site] = (last, suppressed + 1)
+                return False
+            self._sites[site] = (now, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """1レコードを1行の JSON にする (機械的な集計・分析用)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for name in CONTEXT_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                data[name] = value
+        if getattr(record, "suppressed", 0):
+            data["suppressed"] = record.suppressed
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(QueueHandler):
+    """メッセージの組み立てのみを呼び出し元で行い、整形は書き込みスレッドに任せる
+
+    標準の QueueHandler.prepare は呼び出し元で整形まで行うため、出力側の
+    フォーマッター (JSON 等) が例外の情報を別の項目として扱えない。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(
+    log_dir: Path,
+    level: str = "INFO",
+    fmt: str = "text",
+    run_id: str | None = None,
+    debug_interval_s: float = DEBUG_INTERVAL_S,
+) -> None:
+    """ロギングの設定を行う (ルートロガーではなく 'review' ロガーを親にする)
+
+    ログはキューを介して専用のスレッドがファイルと標準エラー出力に書き込むため、
+    ログを出力するスレッドはファイルの I/O やハンドラーのロックを待たない。
+    fmt="json" では app.jsonl に JSON Lines (run_id・stage・paper_id 付き) で出力する。
+    """
+    global _listener, _run_id
+    shutdown_logging()
 
-def setup_logging(log_dir: Path, level: str = "INFO") -> None:
-    """ロギングの設定を行う (ルートロガーではなく 'review' ロガーを親にする)"""
     log_dir.mkdir(parents=True, exist_ok=True)
-    log_file = log_dir / "app.log"
+    log_file = log_dir / ("app.jsonl" if fmt == "json" else "app.log")
+    _run_id = run_id or log_dir.name
 
     numeric_level = getattr(logging, level.upper(), logging.INFO)
 
-    formatter = logging.Formatter(
+    text_formatter = logging.Formatter(
         "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     )
 
-    file_handler = logging.FileHandler(log_file, encoding="utf-8-sig")
-    file_handler.setFormatter(formatter)
+    if fmt == "json":
+        # JSON Lines は BOM を付けない (1行目も JSON として読めるように)
+        file_handler = logging.FileHandler(log_file, encoding="utf-8")
+        file_handler.setFormatter(JsonFormatter())
+    else:
+        file_handler = logging.FileHandler(log_file, encoding="utf-8-sig")
+        file_handler.setFormatter(text_formatter)
 
     stream_handler = logging.StreamHandler()
-    stream_handler.setFormatter(formatter)
+    stream_handler.setFormatter(text_formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    queue_handler.addFilter(DebugRateLimitFilter(debug_interval_s))
 
     # アプリケーション固有の親ロガーを取得
     app_logger = logging.getLogger(APP_LOGGER_NAME)
@@ -32,5 +176,30 @@ def setup_logging(log_dir: Path, level: str = "INFO") -> None:
     if app_logger.hasHandlers():
         app_logger.handlers.clear()
 
-    app_logger.addHandler(file_handler)
-    app_logger.addHandler(stream_handler)
+    app_logger.addHandler(queue_handler)
+    _listener = QueueListener(
+        log_queue, file_handler, stream_handler, respect_handler_level=True
+    )
+    _listener.start()
+
+
+def add_log_handler(handler: logging.Handler) -> None:
+    """ログの書き込みスレッドにハンドラーを追加する (設定前は 'review' ロガーに追加)"""
+    if _listener is None:
+        logging.getLogger(APP_LOGGER_NAME).addHandler(handler)
+    else:
+        _listener.handlers = (*_listener.handlers, handler)
+
+
+def shutdown_logging() -> None:
+    """キューに残ったログを書き出し、書き込みスレッドとハンドラーを終了する"""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+atexit.register(shutdown_logging)
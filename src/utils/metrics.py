@@ -0,0 +1,212 @@
+import cProfile
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from src.utils.constants import APP_LOGGER_NAME
+from src.utils.logging_config import log_context
+
+logger = logging.getLogger(f"{APP_LOGGER_NAME}.metrics")
+
+METRICS_FILE_NAME = "metrics.jsonl"
+PROFILES_DIR_NAME = "profiles"
+
+
+class Span:
+    """計測区間。with ブロックの中で属性 (rows_in, rows_out 等) を追加できる"""
+
+    def __init__(self, name: str, attrs: dict[str, Any], parent: str | None):
+        self.name = name
+        self.attrs = dict(attrs)
+        self.parent = parent
+        self.start = time.time()
+        self._start_perf = time.perf_counter()
+        self.duration_s = 0.0
+        self.counters: dict[str, float] = {}
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def to_record(self) -> dict[str, Any]:
+        return {
+            "type": "span",
+            "name": self.name,
+            "parent": self.parent,
+            "start": self.start,
+            "duration_s": round(self.duration_s, 6),
+            "pid": os.getpid(),
+            "thread": threading.get_ident(),
+            "attrs": self.attrs,
+            "counters": self.counters,
+        }
+
+
+class MetricsRecorder:
+    """パイプライン各段の所要時間・カウンタを記録し、metrics.jsonl に出力する
+
+    - `span(name)` で区間を計測する。区間の間に増えたカウンタの差分も併せて記録される。
+    - `incr(name, n)` でリクエスト数・リトライ数・転送バイト数などを加算する。
+    - `profile_stages` に含まれる区間は cProfile で計測し、`profiles/<name>_<n>.prof`
+      (pstats 形式) に保存する。py-spy で外部から計測する場合は、span レコードの
+      pid / thread / start と突き合わせて区間を特定できる。
+    """
+
+    def __init__(
+        self,
+        output_dir: Path | None = None,
+        profile_stages: list[str] | None = None,
+    ):
+        self.output_path = output_dir / METRICS_FILE_NAME if output_dir else None
+        self.profile_dir = output_dir / PROFILES_DIR_NAME if output_dir else None
+        self.profile_stages = set(profile_stages or [])
+        self.counters: Counter[str] = Counter()
+        self.spans: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiling = False
+        self._profile_counts: Counter[str] = Counter()
+        self._listeners: list[Callable[[str, Span], None]] = []
+
+    def add_listener(self, listener: Callable[[str, Span], None]) -> None:
+        """区間の開始 ("start") と終了 ("end") の通知先を追加する"""
+        self._listeners.append(listener)
+
+    def _notify(self, phase: str, span: Span) -> None:
+        for listener in self._listeners:
+            try:
+                listener(phase, span)
+            except Exception as e:
+                logger.debug(f"Metrics listener failed: {e}")
+
+    def incr(self, name: str, n: float = 1) -> None:
+        with self._lock:
+            self.counters[name] += n
+
+    def _stack(self) -> list[Span]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[Span]:
+        stack = self._stack()
+        span = Span(name, attrs, parent=stack[-1].name if stack else None)
+        with self._lock:
+            counters_before = dict(self.counters)
+        stack.append(span)
+        self._notify("start", span)
+
+        profiler = self._start_profiler(name)
+        try:
+            with log_context(stage=name):
+                yield span
+        except Exception as e:
+            span.set(error=type(e).__name__)
+            raise
+        finally:
+            if profiler is not None:
+                self._stop_profiler(name, profiler)
+            stack.pop()
+            span.duration_s = time.perf_counter() - span._start_perf
+            with self._lock:
+                span.counters = {
+                    k: v - counters_before.get(k, 0)
+                    for k, v in self.counters.items()
+                    if v != counters_before.get(k, 0)
+                }
+            self._emit(span.to_record())
+            self._notify("end", span)
+
+    def _start_profiler(self, name: str) -> cProfile.Profile | None:
+        if name not in self.profile_stages or self.profile_dir is None:
+            return None
+        with self._lock:
+            # cProfile は同時に1つしか有効にできないため、入れ子の区間では計測しない
+            if self._profiling:
+                return None
+            self._profiling = True
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def _stop_profiler(self, name: str, profiler: cProfile.Profile) -> None:
+        profiler.disable()
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self._profile_counts[name] += 1
+            path = self.profile_dir / f"{name}_{self._profile_counts[name]}.prof"
+            self._profiling = False
+        profiler.dump_stats(path)
+        logger.info(f"Saved profile for stage '{name}' to {path}")
+
+    def _emit(self, record: dict[str, Any]) -> None:
+        with self._lock:
+            if record["type"] == "span":
+                self.spans.append(record)
+            if self.output_path is None:
+                return
+            with open(self.output_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    def summarize(self) -> list[dict[str, Any]]:
+        """区間名ごとに回数・合計時間・行数・カウンタを集計する"""
+        summary: dict[str, dict[str, Any]] = {}
+        for record in self.spans:
+            row = summary.setdefault(
+                record["name"],
+                {"stage": record["name"], "count": 0, "duration_s": 0.0},
+            )
+            row["count"] += 1
+            row["duration_s"] += record["duration_s"]
+            for key in ("rows_in", "rows_out"):
+                if isinstance(record["attrs"].get(key), int):
+                    row[key] = row.get(key, 0) + record["attrs"][key]
+            counters = row.setdefault("counters", defaultdict(float))
+            for key, value in record["counters"].items():
+                counters[key] += value
+        return list(summary.values())
+
+    def summary_table(self) -> str:
+        """実行終了時にログへ出力するための集計表を作成する"""
+        header = (
+            f"{'stage':<24}{'count':>6}{'time[s]':>10}{'rows_in':>9}{'rows_out':>9}"
+        )
+        lines = [header, "-" * len(header)]
+        for row in self.summarize():
+            lines.append(
+                f"{row['stage']:<24}{row['count']:>6}{row['duration_s']:>10.2f}"
+                f"{row.get('rows_in', ''):>9}{row.get('rows_out', ''):>9}"
+            )
+            for key, value in sorted(row["counters"].items()):
+                lines.append(f"    {key:<36}{value:>14,.2f}")
+        return "\n".join(lines)
+
+    def write_summary(self) -> None:
+        """集計結果を metrics.jsonl に追記し、集計表をログに出力する"""
+        with self._lock:
+            totals = dict(self.counters)
+        self._emit({"type": "summary", "stages": self.summarize(), "totals": totals})
+        logger.info("Run metrics summary:\n" + self.summary_table())
+
+
+_metrics = MetricsRecorder()
+
+
+def get_metrics() -> MetricsRecorder:
+    """現在の実行のメトリクス記録先を返す (未初期化の場合はメモリ上のみに記録する)"""
+    return _metrics
+
+
+def init_metrics(
+    output_dir: Path | None, profile_stages: list[str] | None = None
+) -> MetricsRecorder:
+    """実行ディレクトリに metrics.jsonl を出力する記録先を設定する"""
+    global _metrics
+    _metrics = MetricsRecorder(output_dir, profile_stages=profile_stages)
+    return _metrics
@@ -0,0 +1,144 @@
+import random
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+
+from src.core.active_learning import SKIPPED_REASON, ActiveLearner, featurize
+from src.core.screener import PaperScreener
+from src.models.models import ActiveLearningSettings, ScreeningResult
+
+SETTINGS = ActiveLearningSettings(
+    enabled=True,
+    min_labels=60,
+    target_recall=0.9,
+    holdout_fraction=0.2,
+    min_holdout_positives=5,
+    n_features=2**12,
+    calibrate_every=10,
+)
+
+RELEVANT = ["retrieval", "augmented", "generation", "dense", "passages", "reader"]
+OTHER = ["protein", "folding", "galaxy", "soil", "bridge", "traffic", "cell", "wind"]
+
+
+def make_df(n=500, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        relevant = rng.random() < 0.3
+        vocab = RELEVANT + OTHER[:2] if relevant else OTHER
+        words = [rng.choice(vocab) for _ in range(30)]
+        rows.append(
+            {
+                "title": " ".join(words[:5]),
+                "abstract": " ".join(words),
+                "doi": f"10.1/{i}",
+                "relevant": relevant,
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def fake_generate(model, prefix, prompt, schema):
+    score = 9 if "retrieval" in prompt or "augmented" in prompt else 1
+    result = ScreeningResult(relevance_score=score, relevance_reason="R", summary="S")
+    return result, {"prompt_tokens": 10, "output_tokens": 1, "total_tokens": 11}
+
+
+def make_screener(settings=SETTINGS):
+    backend = MagicMock(generate_with_prefix=MagicMock(side_effect=fake_generate))
+    screener = PaperScreener(
+        "key", "m", max_workers=1, backend=backend, active_learning=settings
+    )
+    return screener, backend
+
+
+def test_featurize_is_normalized_and_weights_title():
+    indices, values = featurize("Dense retrieval", "We study dense retrieval.", 2**10)
+
+    assert np.isclose(np.linalg.norm(values), 1.0)
+    again = featurize("Dense retrieval", "We study dense retrieval.", 2**10)
+    assert list(indices) == list(again[0])
+    assert featurize("", "", 2**10)[0].size == 0
+
+
+def test_screener_skips_confident_negatives_after_calibration():
+    df = make_df()
+    screener, backend = make_screener()
+
+    result = screener.screen_papers(df, "RAG")
+
+    skipped = result["relevance_reason"] == SKIPPED_REASON
+    assert backend.generate_with_prefix.call_count == len(df) - skipped.sum()
+    assert skipped.sum() > 100
+    # 学習に十分な判定結果が集まるまでは省略しない
+    assert not skipped[: SETTINGS.min_labels].any()
+    # 較正用の論文は常に LLM で判定する
+    holdout = result.apply(screener.learner.is_holdout, axis=1)
+    assert not (skipped & holdout).any()
+    # 採用論文の見落としは目標の範囲内
+    missed = (skipped & result["relevant"]).sum()
+    assert missed <= (1 - SETTINGS.target_recall) * result["relevant"].sum()
+    report = screener.learner.report()
+    assert report["active"]
+    assert report["calls_avoided"] == skipped.sum()
+    assert report["holdout_recall"] >= SETTINGS.target_recall
+    assert report["estimated_recall_loss"] <= 1 - SETTINGS.target_recall
+    assert result["classifier_prob"][SETTINGS.min_labels :].notna().all()
+
+
+def test_screener_without_active_learning_calls_llm_for_every_paper():
+    df = make_df(50)
+    screener, backend = make_screener(ActiveLearningSettings())
+
+    result = screener.screen_papers(df, "RAG")
+
+    assert screener.learner is None
+    assert backend.generate_with_prefix.call_count == 50
+    assert "classifier_prob" not in result.columns
+
+
+def test_observe_frame_restores_learner_on_resume():
+    screener, _ = make_screener()
+    screened = screener.screen_papers(make_df(), "RAG")
+
+    learner = ActiveLearner(SETTINGS, threshold=7)
+    learner.observe_frame(screened)
+
+    report = learner.report()
+    assert report["active"]
+    assert report["calls_avoided"] == screener.learner.report()["calls_avoided"]
+    # 分類器が省略した論文は学習しない
+    assert report["labels_train"] + report["labels_holdout"] == (
+        len(screened) - report["calls_avoided"]
+    )
+
+
+def test_error_rows_are_not_learned():
+    df = make_df(20)
+    screened = df.assign(
+        relevance_score=0,
+        relevance_reason=["LLM Error occurred"] * 10
+        + ["LLM returned invalid response"] * 5
+        + ["R"] * 5,
+    )
+
+    learner = ActiveLearner(SETTINGS, threshold=7)
+    learner.observe_frame(screened)
+
+    report = learner.report()
+    assert report["labels_train"] + report["labels_holdout"] == 5
+    assert report["calls_avoided"] == 0
+
+
+def test_screener_calls_llm_when_classifier_fails():
+    screener, backend = make_screener()
+    screener.learner.n_train = 1
+    screener.learner.predict = MagicMock(side_effect=ValueError("bad features"))
+
+    result = screener.screen_papers(make_df(5), "RAG")
+
+    assert backend.generate_with_prefix.call_count == 5
+    assert (result["relevance_reason"] == "R").all()
+    assert result["classifier_prob"].isna().all()
@@ -0,0 +1,206 @@
+import json
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from benchmarks.gemini_batch_mock import MockBatchServer
+from main import run_pipeline
+from src.core.batch import EST_OUTPUT_TOKENS, BatchJobError, BatchScreener
+from src.models.models import BudgetSettings, Config, ScreeningResult
+
+
+@pytest.fixture
+def server():
+    server = MockBatchServer(job_latency_s=0.2)
+    server.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_screener(server, work_dir, budget=None):
+    return BatchScreener(
+        "key",
+        "gemini-2.0-flash-lite",
+        work_dir,
+        poll_interval_s=0.02,
+        base_url=server.base_url,
+        budget=budget,
+    )
+
+
+def make_df(n=4):
+    return pd.DataFrame(
+        {
+            "title": [f"Paper {i}" for i in range(n)],
+            "abstract": [f"Abstract {i}" for i in range(n - 1)] + [None],
+            "doi": [f"10.1/{i}" for i in range(n)],
+        }
+    )
+
+
+def test_batch_screening_returns_screener_columns(server, tmp_path):
+    screener = make_screener(server, tmp_path)
+
+    df = screener.screen_papers(make_df(), "RAG")
+
+    assert len(df) == 4
+    assert df["relevance_score"].between(0, 10).all()
+    assert list(df["summary"][:3]) == ["Fake summary"] * 3
+    assert df.loc[3, "relevance_reason"] == "No abstract available"
+    assert (df["total_tokens"][:3] > 0).all()
+    assert screener.usage.total_tokens == df["total_tokens"].sum()
+    assert screener.pending_df.empty
+    # 応答スキーマを付けて3件のリクエストを1つのファイルで投入する
+    (request_file,) = tmp_path.glob("requests_*.jsonl")
+    lines = [json.loads(line) for line in request_file.read_text().splitlines()]
+    assert [line["key"] for line in lines] == ["0", "1", "2"]
+    schema = lines[0]["request"]["generationConfig"]["responseJsonSchema"]
+    assert schema == ScreeningResult.model_json_schema()
+    assert server.stats["batches"] == 1
+
+
+def test_batch_submits_only_requests_within_budget(server, tmp_path):
+    df = make_df()
+    with patch("src.core.screener.create_backend", side_effect=AssertionError):
+        probe = make_screener(server, tmp_path / "probe")
+    est = [
+        probe._screening_prompt(row["title"], row["abstract"], "RAG")[0].est_tokens
+        for _, row in df[:2].iterrows()
+    ]
+    budget = BudgetSettings(max_total_tokens=sum(est) + 2 * EST_OUTPUT_TOKENS)
+    screener = make_screener(server, tmp_path, budget=budget)
+
+    result = screener.screen_papers(df, "RAG")
+
+    # 見積もりで予算に収まる2件のみを投入し、残りは再開時に判定する
+    assert list(result["doi"]) == ["10.1/0", "10.1/1"]
+    assert list(screener.pending_df["doi"]) == ["10.1/2", "10.1/3"]
+    (request_file,) = tmp_path.glob("requests_*.jsonl")
+    assert len(request_file.read_text().splitlines()) == 2
+
+
+def test_restart_while_polling_resumes_the_submitted_job(server, tmp_path):
+    with (
+        patch("src.core.batch.time.sleep", side_effect=KeyboardInterrupt),
+        pytest.raises(KeyboardInterrupt),
+    ):
+        make_screener(server, tmp_path).screen_papers(make_df(), "RAG")
+    (checkpoint,) = tmp_path.glob("job_*.json")
+    assert "job" in json.loads(checkpoint.read_text())
+
+    df = make_screener(server, tmp_path).screen_papers(make_df(), "RAG")
+
+    assert len(df) == 4
+    assert server.stats["uploads"] == 1
+    assert server.stats["batches"] == 1
+    # 取り込み済みの結果はダウンロードし直さない
+    make_screener(server, tmp_path).screen_papers(make_df(), "RAG")
+    assert server.stats["downloads"] == 1
+
+
+def test_failed_requests_become_invalid_responses(tmp_path):
+    server = MockBatchServer(job_latency_s=0, error_rate=1.0)
+    server.start()
+    try:
+        df = make_screener(server, tmp_path).screen_papers(make_df(), "RAG")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert set(df["relevance_reason"][:3]) == {"LLM returned invalid response"}
+    assert (df["relevance_score"] == 0).all()
+
+
+def test_failed_job_is_resubmitted_on_rerun(server, tmp_path):
+    server.fail_jobs = True
+    with pytest.raises(BatchJobError):
+        make_screener(server, tmp_path).screen_papers(make_df(), "RAG")
+
+    server.fail_jobs = False
+    df = make_screener(server, tmp_path).screen_papers(make_df(), "RAG")
+
+    assert len(df) == 4
+    assert server.stats["batches"] == 2
+
+
+@patch("main.S2Collector.get_snowball_candidates", return_value=[])
+@patch("main.S2Collector.collect_initial")
+def test_pipeline_resumes_batch_job_after_restart(
+    mock_collect, mock_snowball, server, tmp_path
+):
+    mock_collect.return_value = [
+        {
+            "title": f"P{i}",
+            "year": 2020,
+            "citationCount": 10,
+            "abstract": "A",
+            "externalIds": {"DOI": f"10.1/{i}"},
+        }
+        for i in range(5)
+    ]
+    run_dir = tmp_path / "run"
+    for sub in ["raw", "interim", "final"]:
+        (run_dir / sub).mkdir(parents=True)
+    config = Config(
+        project_name="batch",
+        search_criteria={"keywords": ["kw"], "iterations": 1, "min_citations": 0},
+        llm_settings={
+            "batch": {
+                "enabled": True,
+                "poll_interval_s": 0.02,
+                "base_url": server.base_url,
+            }
+        },
+    )
+
+    # ジョブの完了を待つ間に終了する
+    with (
+        patch("src.core.batch.time.sleep", side_effect=KeyboardInterrupt),
+        pytest.raises(KeyboardInterrupt),
+    ):
+        run_pipeline(config, run_dir, ["key"])
+    state = json.loads((run_dir / "interim" / "run_state.json").read_text())
+    assert state["status"] == "batch_running"
+
+    mock_collect.reset_mock()
+    run_pipeline(config, run_dir, ["key"], resume=True)
+
+    mock_collect.assert_not_called()
+    assert server.stats["batches"] == 1
+    final_df = pd.read_csv(run_dir / "final" / "final_review_matrix.csv")
+    assert sorted(final_df["doi"]) == [f"10.1/{i}" for i in range(5)]
+
+
+@patch("main.S2Collector.get_snowball_candidates", return_value=[])
+@patch("main.S2Collector.collect_initial")
+def test_pipeline_screens_per_call_with_non_gemini_backend(
+    mock_collect, mock_snowball, server, tmp_path
+):
+    mock_collect.return_value = [
+        {
+            "title": "P0",
+            "year": 2020,
+            "citationCount": 10,
+            "abstract": "A",
+            "externalIds": {"DOI": "10.1/0"},
+        }
+    ]
+    run_dir = tmp_path / "run"
+    for sub in ["raw", "interim", "final"]:
+        (run_dir / sub).mkdir(parents=True)
+    config = Config(
+        project_name="batch",
+        search_criteria={"keywords": ["kw"], "iterations": 1, "min_citations": 0},
+        llm_settings={
+            "backend": {"type": "fake"},
+            "batch": {"enabled": True, "base_url": server.base_url},
+        },
+    )
+
+    assert run_pipeline(config, run_dir, ["unused"]) == 0
+
+    assert server.stats["uploads"] == 0
+    final_df = pd.read_csv(run_dir / "final" / "final_review_matrix.csv")
+    assert final_df["relevance_score"].between(0, 10).all()
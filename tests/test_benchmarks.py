@@ -0,0 +1,61 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.hotpaths import (
+    BASELINES_PATH,
+    BenchResult,
+    find_regressions,
+    load_baselines,
+    make_papers,
+)
+
+
+def test_make_papers_is_deterministic():
+    papers = make_papers(200)
+
+    assert papers == make_papers(200)
+    assert any(p["abstract"] == "" for p in papers)
+    assert any("DOI" not in p["externalIds"] for p in papers)
+
+
+def test_find_regressions_uses_tolerance():
+    baselines = {
+        "tolerance": {"throughput": 0.5, "peak_mb": 0.25},
+        "results": {"bench": {"1000": {"throughput": 1000.0, "peak_mb": 10.0}}},
+    }
+
+    ok = BenchResult("bench", 1000, 2.0, throughput=600.0, peak_mb=12.0)
+    slow = BenchResult("bench", 1000, 4.0, throughput=400.0, peak_mb=10.0)
+    large = BenchResult("bench", 1000, 1.0, throughput=1000.0, peak_mb=13.0)
+    # 小さな値は PEAK_MB_SLACK まで許容する
+    tiny = {"results": {"bench": {"1000": {"throughput": 1.0, "peak_mb": 0.0}}}}
+    small = BenchResult("bench", 1000, 1.0, throughput=1.0, peak_mb=0.5)
+    new = BenchResult("other", 1000, 1.0, throughput=1.0, peak_mb=100.0)
+
+    assert find_regressions([ok, new], baselines) == []
+    assert len(find_regressions([slow], baselines)) == 1
+    assert "peak memory" in find_regressions([large], baselines)[0]
+    assert find_regressions([small], tiny) == []
+
+
+@pytest.mark.benchmark
+def test_hotpaths_within_baseline(tmp_path):
+    """1k 件の計測値が基準値から許容範囲を超えて悪化していないこと
+
+    カバレッジ計測の影響を受けないよう、別のインタプリタで計測する。
+    """
+    assert "1000" in load_baselines()["results"]["pipeline"], BASELINES_PATH
+    output = tmp_path / "results.json"
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.hotpaths", "--sizes", "1000"]
+        + ["--json", str(output)],
+        cwd=BASELINES_PATH.parent.parent,
+        capture_output=True,
+        text=True,
+    )
+
+    assert proc.returncode == 0, proc.stdout + proc.stderr
+    assert len(json.loads(output.read_text())) == 5
@@ -0,0 +1,87 @@
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+import pytest
+import requests
+
+from src.core.collector import S2Collector, _search_arxiv
+from src.core.screener import PaperScreener
+from src.models.models import ScreeningResult
+from src.utils.cassette import CassetteMissError, init_cassette
+
+
+@pytest.fixture(autouse=True)
+def reset_cassette():
+    yield
+    init_cassette(None)
+
+
+def http_response(status, body):
+    response = requests.Response()
+    response.status_code = status
+    response._content = body.encode("utf-8")
+    response.headers["Content-Type"] = "application/json"
+    return response
+
+
+def fake_s2(url, params=None, **kwargs):
+    if url.endswith("paper/search"):
+        return http_response(200, '{"data": [{"title": "P1"}]}')
+    return http_response(404, '{"error": "Paper not found"}')
+
+
+def test_s2_requests_are_replayed_without_network(tmp_path):
+    cassette = tmp_path / "cassette.jsonl"
+    init_cassette(cassette, mode="record")
+    with patch("requests.get", side_effect=fake_s2):
+        recorded = S2Collector(max_retries=1).search_by_keywords(["kw"])
+        assert S2Collector(max_retries=1).get_papers_by_dois(["10.1/x"]) == []
+
+    init_cassette(cassette, mode="replay", speed=0)
+    with patch("requests.get", side_effect=AssertionError("network access")):
+        collector = S2Collector(max_retries=1)
+        assert collector.search_by_keywords(["kw"]) == recorded == [{"title": "P1"}]
+        # エラー応答 (404) も記録どおりに再生する
+        assert collector.get_papers_by_dois(["10.1/x"]) == []
+        with pytest.raises(CassetteMissError):
+            collector.search_by_keywords(["other"])
+
+
+def test_gemini_calls_are_replayed_without_client(tmp_path):
+    cassette = tmp_path / "cassette.jsonl"
+    df = pd.DataFrame([{"title": "T1", "abstract": "A1"}])
+    response = MagicMock()
+    response.parsed = ScreeningResult(
+        relevance_score=8, relevance_reason="Relevant", summary="Summary"
+    )
+    response.usage_metadata.prompt_token_count = 100
+    response.usage_metadata.candidates_token_count = 20
+    response.usage_metadata.total_token_count = 120
+
+    init_cassette(cassette, mode="record")
+    with patch("google.genai.Client") as mock_client_cls:
+        mock_client_cls.return_value.models.generate_content.return_value = response
+        recorded = PaperScreener("key", "model").screen_papers(df, "scope")
+
+    init_cassette(cassette, mode="replay", speed=0)
+    with patch("google.genai.Client", side_effect=AssertionError("client created")):
+        replayed = PaperScreener("key", "model").screen_papers(df, "scope")
+
+    columns = ["relevance_score", "relevance_reason", "summary", "total_tokens"]
+    assert replayed[columns].equals(recorded[columns])
+
+
+def test_arxiv_results_are_replayed(tmp_path):
+    cassette = tmp_path / "cassette.jsonl"
+    result = MagicMock()
+    result.title = "Paper Title"
+    result.summary = "ArXiv Abstract"
+    client = MagicMock()
+    client.results.return_value = iter([result])
+
+    init_cassette(cassette, mode="record")
+    _search_arxiv(client, 'ti:"Paper Title"')
+
+    init_cassette(cassette, mode="replay", speed=0)
+    [replayed] = _search_arxiv(None, 'ti:"Paper Title"')
+    assert (replayed.title, replayed.summary) == ("Paper Title", "ArXiv Abstract")
@@ -0,0 +1,77 @@
+import json
+
+import pandas as pd
+
+from src.core.catalog import RunCatalog, build_run_record, summarize_runs
+from src.models.models import Config
+from src.utils.io_utils import save_config, save_run_state
+
+
+def make_run(data_dir, name, keywords, status="completed"):
+    run_dir = data_dir / name
+    for sub in ["raw", "interim", "final"]:
+        (run_dir / sub).mkdir(parents=True)
+    config = Config(
+        project_name="proj",
+        search_criteria={"keywords": keywords},
+        llm_settings={"model_screening": "fake"},
+    )
+    save_config(config, run_dir / "config.yml")
+    pd.DataFrame({"doi": ["a", "b", "c", "a"], "iteration": [1, 1, 2, 2]}).to_csv(
+        run_dir / "interim" / "screened_papers_cumulative.csv", index=False
+    )
+    pd.DataFrame({"doi": ["a", "b", "c"], "relevance_score": [9, 9, 3]}).to_csv(
+        run_dir / "final" / "final_review_matrix.csv", index=False
+    )
+    summary = {
+        "type": "summary",
+        "stages": [{"stage": "pipeline", "duration_s": 12.5}],
+        "totals": {"llm.calls": 4, "s2.requests": 3, "arxiv.requests": 1},
+    }
+    (run_dir / "metrics.jsonl").write_text(json.dumps(summary) + "\n")
+    (run_dir / "final" / "llm_usage_summary.json").write_text(
+        json.dumps({"total": {"total_tokens": 480, "cost_usd": 0.01}})
+    )
+    if status:
+        save_run_state(run_dir, {"status": status})
+    return run_dir
+
+
+def test_build_run_record(tmp_path):
+    run_dir = make_run(tmp_path, "20250101_120000_proj", ["llm"])
+
+    record = build_run_record(run_dir)
+
+    assert record.project == "proj"
+    assert record.started_at == "2025-01-01T12:00:00"
+    assert record.status == "completed"
+    assert record.papers_total == 3
+    assert record.papers_per_iteration == {"1": 2, "2": 2}
+    assert record.score_histogram == {"3": 1, "9": 2}
+    assert record.duration_s == 12.5
+    assert (record.llm_calls, record.total_tokens) == (4, 480)
+    assert (record.s2_requests, record.arxiv_requests) == (3, 1)
+
+
+def test_catalog_sync_list_and_search(tmp_path):
+    data_dir = tmp_path / "data"
+    make_run(data_dir, "20250101_120000_proj", ["llm"])
+    make_run(data_dir, "20250102_120000_proj", ["graph"], status=None)
+    (data_dir / "not_a_run").mkdir()
+    catalog = RunCatalog(tmp_path / "catalog.sqlite")
+
+    assert catalog.sync(data_dir) == 2
+    # 登録済みの完了した実行は再読み込みしない。実行中だった実行は登録し直す
+    assert catalog.sync(data_dir) == 1
+
+    records = catalog.list_runs(project="proj")
+    assert [r.run_id for r in records] == [
+        "20250102_120000_proj",
+        "20250101_120000_proj",
+    ]
+    assert records[0].status == "incomplete"
+    assert [r.run_id for r in catalog.list_runs(search="graph")] == [
+        "20250102_120000_proj"
+    ]
+    assert catalog.get("20250101_120000_proj").score_histogram == {"3": 1, "9": 2}
+    assert summarize_runs(records)["papers_total"] == 6
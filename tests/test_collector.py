@@ -12,7 +12,7 @@ def collector():
     return S2Collector()
 
 
-@patch("src.core.collector.requests.get")
+@patch("requests.get")
 def test_search_by_keywords(mock_get, collector):
     # Mock Response
     mock_response = MagicMock()
@@ -101,7 +101,7 @@ def test_get_snowball_candidates_threshold(mock_get_related, collector):
     mock_get_related.reset_mock()
 
 
-@patch("src.core.collector.requests.get")
+@patch("requests.get")
 def test_get_related_papers(mock_get, collector):
     mock_response = MagicMock()
     mock_response.status_code = 200
@@ -118,7 +118,7 @@ def test_get_related_papers(mock_get, collector):
     assert related[1]["title"] == "Cit1"
 
 
-@patch("src.core.collector.requests.get")
+@patch("requests.get")
 def test_get_papers_by_dois(mock_get, collector):
     mock_response = MagicMock()
     mock_response.status_code = 200
@@ -145,7 +145,7 @@ def test_collect_initial(mock_get_dois, mock_search, collector):
     assert results[1]["title"] == "S1"
 
 
-@patch("src.core.collector.arxiv.Client")
+@patch("arxiv.Client")
 def test_fill_missing_abstracts_with_arxiv(mock_client_cls, collector):
     # Mock arXiv client and search results
     mock_client = mock_client_cls.return_value
@@ -175,7 +175,7 @@ def test_fill_missing_abstracts_no_op(collector):
     )
 
     # Should return immediately without calling arxiv
-    with patch("src.core.collector.arxiv.Client") as mock_client:
+    with patch("arxiv.Client") as mock_client:
         df_filled = collector._fill_missing_abstracts_with_arxiv(df)
         mock_client.assert_not_called()
         assert df_filled.iloc[0]["abstract"] == "Existing Abstract"
@@ -218,6 +218,26 @@ def test_get_related_papers_edge_cases(mock_get, collector):
     assert len(res_limit) == 2
 
 
+@patch("src.core.collector.S2Collector._get")
+def test_get_related_papers_records_citation_edges(mock_get, collector):
+    mock_get.return_value = {
+        "references": [
+            {"title": "R1", "externalIds": {"DOI": "10.1/r1"}},
+            {"title": "R2", "externalIds": None},
+        ],
+        "citations": [{"title": "C1", "externalIds": {"DOI": "10.1/c1"}}],
+    }
+
+    collector.get_related_papers("10.1/main", limit=1)
+
+    # 件数の制限によらず、DOI のある全ての引用関係を記録する
+    assert collector.pop_citation_edges() == [
+        ("10.1/main", "10.1/r1"),
+        ("10.1/c1", "10.1/main"),
+    ]
+    assert collector.pop_citation_edges() == []
+
+
 @patch("src.core.collector.S2Collector._get")
 def test_get_papers_by_dois_edge_cases(mock_get, collector):
     # Empty input
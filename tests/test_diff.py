@@ -0,0 +1,82 @@
+import pandas as pd
+import pytest
+
+from src.core.diff import (
+    RunDiff,
+    align_runs,
+    diff_runs,
+    precompute_diff_with_previous,
+    spearman,
+)
+
+
+def make_run(data_dir, name, scores):
+    run_dir = data_dir / name
+    (run_dir / "final").mkdir(parents=True)
+    pd.DataFrame(
+        [{"doi": doi, "title": doi.upper(), "relevance_score": s} for doi, s in scores]
+    ).to_csv(run_dir / "final" / "final_review_matrix.csv", index=False)
+    return run_dir
+
+
+def test_compute_diff_by_doi():
+    base = pd.DataFrame(
+        {"doi": ["10.1/A", "10.1/b", "10.1/c"], "relevance_score": [9, 5, 2]}
+    )
+    other = pd.DataFrame(
+        {
+            "doi": ["10.1/a", "10.1/b", "10.1/d", "10.1/d"],
+            "relevance_score": [9, 8, 4, 6],
+        }
+    )
+
+    diff = RunDiff.compute(base, other)
+
+    # DOI は大文字・小文字を区別せずに突き合わせる
+    assert list(diff.added.index) == ["10.1/d"]
+    assert diff.added.loc["10.1/d", "relevance_score"] == 6
+    assert list(diff.removed.index) == ["10.1/c"]
+    assert list(diff.changed.index) == ["10.1/b"]
+    assert diff.changed.loc["10.1/b", "score_delta"] == 3
+    summary = diff.summary()
+    assert (summary["added"], summary["removed"], summary["common"]) == (1, 1, 2)
+
+
+def test_compute_diff_without_scores_fails_clearly(tmp_path):
+    scored = pd.DataFrame({"doi": ["10.1/a"], "relevance_score": [9]})
+    unscored = pd.DataFrame({"doi": ["10.1/a"], "title": ["A"]})
+
+    with pytest.raises(ValueError, match="old_run have no relevance_score"):
+        RunDiff.compute(unscored, scored, base_run="old_run", other_run="new_run")
+
+    run_dir = tmp_path / "20250101_000000_p"
+    (run_dir / "final").mkdir(parents=True)
+    unscored.to_csv(run_dir / "final" / "final_review_matrix.csv", index=False)
+    with pytest.raises(ValueError, match="relevance_score"):
+        align_runs([run_dir])
+
+
+def test_spearman():
+    a = pd.Series([1, 2, 3, 4])
+    assert spearman(a, pd.Series([10, 20, 30, 40])) == pytest.approx(1.0)
+    assert spearman(a, pd.Series([4, 3, 2, 1])) == pytest.approx(-1.0)
+    assert spearman(a, pd.Series([5, 5, 5, 5])) is None
+
+
+def test_diff_runs_is_cached_and_aligns_multiple_runs(tmp_path):
+    run1 = make_run(tmp_path, "20250101_000000_p", [("a", 9), ("b", 5)])
+    run2 = make_run(tmp_path, "20250201_000000_p", [("a", 7), ("c", 6)])
+    run3 = make_run(tmp_path, "20250301_000000_p", [("c", 1)])
+    cache_dir = tmp_path / "diffs"
+
+    diff = precompute_diff_with_previous(run2, [run1, run3], cache_dir=cache_dir)
+    assert diff.base_run == run1.name
+    assert (cache_dir / f"{run1.name}__{run2.name}.pkl").exists()
+
+    cached = diff_runs(run1, run2, cache_dir=cache_dir)
+    assert cached.summary() == diff.summary()
+
+    aligned = align_runs([run1, run2, run3])
+    assert list(aligned.columns) == ["title", run1.name, run2.name, run3.name]
+    assert aligned.loc["c", run3.name] == 1
+    assert pd.isna(aligned.loc["c", run1.name])
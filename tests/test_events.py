@@ -0,0 +1,80 @@
+import json
+import logging
+
+from src.utils.events import EventLogHandler, EventTail, EventWriter
+from src.utils.metrics import MetricsRecorder
+
+
+def read_events(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_progress_events_are_throttled(tmp_path):
+    path = tmp_path / "events.jsonl"
+    writer = EventWriter(path, progress_interval_s=60)
+
+    writer.start_progress("screening", total=100)
+    for _ in range(100):
+        writer.advance("screening")
+    writer.finish_progress("screening")
+
+    progress = [e for e in read_events(path) if e["type"] == "progress"]
+    # 開始時と完了時 (+ finish) のみ書き出される
+    assert [e["done"] for e in progress] == [0, 100, 100]
+    assert progress[-1]["eta_s"] == 0
+
+
+def test_span_and_log_events(tmp_path):
+    path = tmp_path / "events.jsonl"
+    writer = EventWriter(path)
+    metrics = MetricsRecorder()
+    metrics.add_listener(writer.on_span)
+    logger = logging.getLogger("review.test_events")
+    handler = EventLogHandler(writer)
+    logger.addHandler(handler)
+    try:
+        with metrics.span("snowball", iteration=1):
+            logger.info("not forwarded")
+            logger.warning("rate limited")
+    finally:
+        logger.removeHandler(handler)
+
+    events = read_events(path)
+    assert [e["type"] for e in events] == ["stage_start", "log", "stage_end"]
+    assert events[0]["iteration"] == 1
+    assert events[1]["message"] == "rate limited"
+
+
+def test_tail_reads_incrementally_with_bounded_memory(tmp_path):
+    path = tmp_path / "events.jsonl"
+    tail = EventTail(path, max_points=3)
+    assert tail.poll() == 0
+
+    lines = [
+        {"ts": 1.0, "type": "run_start", "run_dir": "data/x"},
+        {"ts": 1.0, "type": "stage_start", "stage": "screening"},
+    ] + [
+        {
+            "ts": 2.0 + i,
+            "type": "progress",
+            "stage": "screening",
+            "done": i * 10,
+            "total": 100,
+            "rate": 10.0,
+            "eta_s": 1.0,
+        }
+        for i in range(6)
+    ]
+    text = "".join(json.dumps(line) + "\n" for line in lines)
+    # 書き込み途中の行は次回の読み込みに持ち越される
+    path.write_text(text + '{"ts": 9.0, "type": "run_e')
+    assert tail.poll() == len(lines)
+    assert not tail.finished
+    assert tail.stages["screening"]["done"] == 50
+    assert len(tail.throughput) == 3
+    assert tail.throughput[-1]["rate"] == 10.0
+
+    with open(path, "a") as f:
+        f.write('nd", "status": "completed"}\n')
+    assert tail.poll() == 1
+    assert tail.finished and tail.run["status"] == "completed"
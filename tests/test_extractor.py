@@ -0,0 +1,125 @@
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+import pytest
+from pydantic import ValidationError
+
+from main import run_extraction
+from src.core.extractor import (
+    ExtractionCache,
+    PaperExtractor,
+    build_extraction_model,
+)
+from src.models.models import BudgetSettings, Config, ExtractionSettings
+
+FIELDS = {"method": "Method", "results": "Results"}
+
+
+def make_response(model, i=0):
+    response = MagicMock()
+    response.parsed = model(method=f"M{i}", results=f"R{i}")
+    response.usage_metadata.prompt_token_count = 100
+    response.usage_metadata.candidates_token_count = 20
+    response.usage_metadata.total_token_count = 120
+    return response
+
+
+@pytest.fixture
+def client():
+    with patch("google.genai.Client") as mock_client_cls:
+        client = mock_client_cls.return_value
+        client.models.generate_content.return_value = make_response(
+            build_extraction_model(FIELDS)
+        )
+        yield client
+
+
+def make_extractor(tmp_path, budget=None, **settings):
+    return PaperExtractor(
+        "fake_key",
+        "fake_model",
+        settings=ExtractionSettings(fields=FIELDS, **settings),
+        budget=budget,
+        cache=ExtractionCache(tmp_path / "cache.sqlite"),
+    )
+
+
+def test_extract_papers_adds_fields_and_reuses_cache(tmp_path, client):
+    df = pd.DataFrame(
+        {
+            "title": ["T1", "T2", "T3"],
+            "abstract": ["A1", "A2", None],
+            "doi": ["10.1/1", "10.1/2", "10.1/3"],
+        }
+    )
+
+    result = make_extractor(tmp_path).extract_papers(df)
+
+    assert list(result.columns) == ["title", "abstract", "doi", "method", "results"]
+    assert list(result["method"][:2]) == ["M0", "M0"]
+    # 抄録のない論文は抽出しない
+    assert pd.isna(result.loc[2, "method"])
+    assert client.models.generate_content.call_count == 2
+
+    # キャッシュ済みの論文は LLM を呼び出さない
+    client.models.generate_content.reset_mock()
+    again = make_extractor(tmp_path).extract_papers(df)
+    client.models.generate_content.assert_not_called()
+    assert again["results"].tolist()[:2] == ["R0", "R0"]
+
+
+def test_extract_papers_stops_batches_when_budget_is_exhausted(tmp_path, client):
+    df = pd.DataFrame({"title": [f"T{i}" for i in range(5)], "abstract": "A"})
+    budget = BudgetSettings(max_total_tokens=240)
+    extractor = make_extractor(tmp_path, budget=budget, batch_size=2, max_workers=1)
+
+    result = extractor.extract_papers(df)
+
+    assert client.models.generate_content.call_count == 2
+    assert result["method"].notna().sum() == 2
+
+
+def test_extract_papers_skips_failed_calls(tmp_path, client):
+    client.models.generate_content.side_effect = Exception("API Error")
+    df = pd.DataFrame({"title": ["T1"], "abstract": ["A1"]})
+    extractor = make_extractor(tmp_path)
+
+    result = extractor.extract_papers(df)
+
+    assert pd.isna(result.loc[0, "method"])
+    assert len(extractor.cache) == 0
+
+
+def test_extraction_settings_rejects_invalid_field_names():
+    with pytest.raises(ValidationError):
+        ExtractionSettings(fields={"not a name": "desc"})
+    with pytest.raises(ValidationError):
+        ExtractionSettings(fields={})
+
+
+def test_run_extraction_only_targets_papers_above_threshold(
+    tmp_path, client, monkeypatch
+):
+    (tmp_path / "final").mkdir()
+    final_csv = tmp_path / "final" / "final_review_matrix.csv"
+    pd.DataFrame(
+        {"relevance_score": [9, 8, 3], "title": ["T1", "T2", "T3"], "abstract": "A"}
+    ).to_csv(final_csv, index=False)
+    config = Config(
+        project_name="test",
+        search_criteria={"keywords": ["kw"], "screening_threshold": 7},
+        llm_settings={"model_screening": "fake"},
+        extraction={"fields": FIELDS},
+    )
+
+    monkeypatch.setattr(
+        "src.core.extractor.ExtractionCache",
+        lambda: ExtractionCache(tmp_path / "cache.sqlite"),
+    )
+
+    run_extraction(config, tmp_path, "key")
+
+    final_df = pd.read_csv(final_csv)
+    assert client.models.generate_content.call_count == 2
+    assert final_df["method"].tolist()[:2] == ["M0", "M0"]
+    assert pd.isna(final_df.loc[2, "method"])
@@ -0,0 +1,128 @@
+import sys
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from src.core.fulltext import FullTextFetcher, PdfStore, pdf_urls
+from src.models.models import FullTextSettings
+
+PDF_BYTES = b"%PDF-1.4\n" + b"0" * 200_000 + b"\n%%EOF\n"
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    requests_seen: list[str] = []
+
+    def do_GET(self):
+        self.requests_seen.append(self.path)
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def file_server(tmp_path):
+    """オープンアクセス PDF の配信元の代わりにするローカルのファイルサーバー"""
+    root = tmp_path / "www"
+    root.mkdir()
+    (root / "a.pdf").write_bytes(PDF_BYTES)
+    (root / "2101.00001.pdf").write_bytes(PDF_BYTES)
+    (root / "page.html").write_text("<html>Paywall</html>")
+    QuietHandler.requests_seen = []
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0), partial(QuietHandler, directory=str(root))
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def make_fetcher(tmp_path, base_url, **settings):
+    return FullTextFetcher(
+        FullTextSettings(arxiv_pdf_url=base_url + "/{arxiv_id}.pdf", **settings),
+        store=PdfStore(tmp_path / "store"),
+    )
+
+
+def test_pdf_urls_from_csv_values():
+    paper = {
+        "openAccessPdf": "{'url': 'https://example.org/a.pdf', 'status': 'GREEN'}",
+        "externalIds": "{'ArXiv': '2101.00001', 'DOI': '10.1/a'}",
+    }
+
+    assert pdf_urls(paper, "https://arxiv.org/pdf/{arxiv_id}") == [
+        "https://example.org/a.pdf",
+        "https://arxiv.org/pdf/2101.00001",
+    ]
+    assert pdf_urls({"openAccessPdf": None, "externalIds": float("nan")}, "") == []
+
+
+def test_fetch_deduplicates_and_remembers_results(tmp_path, file_server):
+    df = pd.DataFrame(
+        {
+            "doi": ["10.1/a", "10.1/b", "10.1/c", "10.1/d", "10.1/e"],
+            "openAccessPdf": [
+                {"url": f"{file_server}/a.pdf"},
+                None,
+                {"url": f"{file_server}/page.html"},
+                {"url": f"{file_server}/missing.pdf"},
+                None,
+            ],
+            "externalIds": [None, {"ArXiv": "2101.00001"}, None, None, None],
+        }
+    )
+    fetcher = make_fetcher(tmp_path, file_server, max_downloads=4)
+
+    digests = fetcher.fetch(df)
+
+    # 同じ内容の PDF は1つのファイルとして保存する
+    assert set(digests) == {"10.1/a", "10.1/b"}
+    assert digests["10.1/a"] == digests["10.1/b"]
+    assert fetcher.store.pdf_path(digests["10.1/a"]).read_bytes() == PDF_BYTES
+    assert len(list((tmp_path / "store").glob("*/*.pdf"))) == 1
+    assert not list((tmp_path / "store").glob("*.part"))
+
+    # 取得済み・PDF のない論文は再取得せず、通信エラーの論文のみ再試行する
+    QuietHandler.requests_seen = []
+    again = make_fetcher(tmp_path, file_server).fetch(df)
+    assert again == digests
+    assert QuietHandler.requests_seen == ["/missing.pdf"]
+
+
+def test_fetch_skips_pdfs_over_the_size_limit(tmp_path, file_server):
+    df = pd.DataFrame(
+        {"doi": ["10.1/a"], "openAccessPdf": [{"url": f"{file_server}/a.pdf"}]}
+    )
+    fetcher = make_fetcher(tmp_path, file_server, max_pdf_mb=0.1)
+
+    assert fetcher.fetch(df) == {}
+    assert fetcher.store.lookup(["10.1/a"])["10.1/a"]["status"] == "unavailable"
+
+
+def test_extract_texts_without_pypdf(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "pypdf", None)
+    fetcher = FullTextFetcher(store=PdfStore(tmp_path / "store"))
+
+    assert fetcher.extract_texts(["0" * 64]) == {}
+
+
+def test_extract_texts_writes_text_per_digest(tmp_path):
+    pypdf = pytest.importorskip("pypdf")
+    writer = pypdf.PdfWriter()
+    writer.add_blank_page(width=72, height=72)
+    pdf_path = tmp_path / "blank.pdf"
+    with open(pdf_path, "wb") as f:
+        writer.write(f)
+    store = PdfStore(tmp_path / "store")
+    digest = "ab" * 32
+    store.add_file(pdf_path, digest)
+
+    chars = FullTextFetcher(store=store).extract_texts([digest])
+
+    assert chars == {digest: 0}
+    assert store.read_text(digest) is not None
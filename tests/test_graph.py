@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+from src.core.graph import (
+    CitationGraph,
+    append_edges,
+    build_citation_graph,
+    compute_layout,
+    load_citation_graph,
+)
+
+
+def make_run(tmp_path, dois, edges):
+    run_dir = tmp_path / "20250101_000000_test"
+    (run_dir / "final").mkdir(parents=True)
+    (run_dir / "interim").mkdir()
+    pd.DataFrame(
+        {
+            "doi": dois,
+            "title": [f"Paper {i}" for i in range(len(dois))],
+            "relevance_score": list(range(len(dois))),
+        }
+    ).to_csv(run_dir / "final" / "final_review_matrix.csv", index=False)
+    append_edges(run_dir, edges)
+    return run_dir
+
+
+def test_build_citation_graph_keeps_edges_within_final_results(tmp_path):
+    run_dir = make_run(
+        tmp_path,
+        ["10.1/a", "10.1/B", "10.1/c"],
+        [("10.1/A", "10.1/b"), ("10.1/b", "10.9/outside"), ("10.1/c", "10.1/a")],
+    )
+    append_edges(run_dir, [("10.1/a", "10.1/b"), ("10.1/c", "10.1/c")])
+
+    nodes, edges = build_citation_graph(run_dir)
+
+    assert list(nodes["doi"]) == ["10.1/a", "10.1/b", "10.1/c"]
+    # 最終結果外への引用・重複・自己引用は除く
+    assert sorted(map(tuple, edges.to_numpy().tolist())) == [(0, 1), (2, 0)]
+
+
+def test_compute_layout_separates_components():
+    # 2つの連結成分 (0-4 の環、5-8 の経路) と孤立ノード 9
+    edges = pd.DataFrame(
+        {"source": [0, 1, 2, 3, 4, 5, 6, 7], "target": [1, 2, 3, 4, 0, 6, 7, 8]}
+    )
+    pos = compute_layout(10, edges)
+
+    assert pos.shape == (10, 2)
+    assert not np.isnan(pos).any()
+    assert np.abs(pos).max() <= 1.0 + 1e-9
+    # 同じ成分のノードは別の成分のノードより互いに近い
+    ring_center = pos[:5].mean(axis=0)
+    assert np.linalg.norm(pos[:5] - ring_center, axis=1).max() < np.linalg.norm(
+        pos[5:9].mean(axis=0) - ring_center
+    )
+
+
+def test_decimate_keeps_high_scores_and_their_edges():
+    nodes = pd.DataFrame(
+        {"relevance_score": [9, 1, 8, 2], "x": [0.0] * 4, "y": [0.0] * 4}
+    )
+    edges = pd.DataFrame({"source": [0, 0, 1, 2], "target": [2, 1, 3, 3]})
+
+    shown = CitationGraph(nodes, edges).decimate(max_nodes=2, max_edges=10)
+
+    assert list(shown.nodes.index) == [0, 2]
+    assert shown.edges.to_numpy().tolist() == [[0, 2]]
+    assert len(shown.edge_segments()) == 1
+
+
+def test_decimate_without_scores_keeps_edge_order():
+    nodes = pd.DataFrame({"x": [0.0] * 3, "y": [0.0] * 3})
+    edges = pd.DataFrame({"source": [0, 1, 0], "target": [1, 2, 2]})
+
+    shown = CitationGraph(nodes, edges).decimate(max_nodes=3, max_edges=2)
+
+    assert shown.edges.to_numpy().tolist() == [[0, 1], [1, 2]]
+
+
+def test_load_citation_graph_caches_layout(tmp_path, monkeypatch):
+    run_dir = make_run(tmp_path, ["10.1/a", "10.1/b"], [("10.1/a", "10.1/b")])
+
+    graph = load_citation_graph(run_dir)
+    assert {"x", "y"} <= set(graph.nodes.columns)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("layout should be loaded from the cache")
+
+    monkeypatch.setattr("src.core.graph.compute_layout", fail)
+    cached = load_citation_graph(run_dir)
+    assert cached.nodes[["x", "y"]].equals(graph.nodes[["x", "y"]])
+
+    # 引用関係が追記されたら再計算する
+    monkeypatch.undo()
+    append_edges(run_dir, [("10.1/b", "10.1/a")])
+    assert len(load_citation_graph(run_dir).edges) == 2
+
+
+def test_load_citation_graph_without_compute(tmp_path):
+    run_dir = make_run(tmp_path, ["10.1/a"], [])
+
+    assert load_citation_graph(run_dir, compute=False) is None
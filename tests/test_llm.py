@@ -0,0 +1,132 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from src.core.llm import BaseBackend, FakeBackend, LocalBackend, create_backend
+from src.core.scopes import build_multi_scope_model
+from src.core.screener import PaperScreener, ScreeningResult
+from src.models.models import LLMBackendSettings, ResearchScope
+
+
+class ChatHandler(BaseHTTPRequestHandler):
+    """OpenAI 互換の /v1/chat/completions の代わりにするハンドラー"""
+
+    content = ""
+    payloads: list[dict] = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        type(self).payloads.append(json.loads(body))
+        data = json.dumps(
+            {
+                "choices": [{"message": {"content": self.content}}],
+                "usage": {"prompt_tokens": 30, "completion_tokens": 10},
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def chat_server():
+    ChatHandler.payloads = []
+    ChatHandler.content = json.dumps(
+        {"relevance_score": 7, "relevance_reason": "R", "summary": "S"}
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ChatHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/v1"
+    server.shutdown()
+    server.server_close()
+
+
+def test_fake_backend_is_deterministic_for_any_schema():
+    backend = FakeBackend()
+    schema = build_multi_scope_model(
+        [ResearchScope(name="a", query="A"), ResearchScope(name="b", query="B")]
+    )
+
+    first = backend.generate("m", "prompt", schema)
+    second = backend.generate_batch("m", ["prompt", "other"], schema)
+
+    assert first == second[0]
+    assert 0 <= first.parsed.score_a <= 10
+    assert first.usage["total_tokens"] > 0
+
+
+def test_backend_without_generate_fails_on_construction():
+    class Incomplete(BaseBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_fake_backend_async_matches_sync():
+    backend = FakeBackend(latency_ms=1)
+
+    result = asyncio.run(backend.agenerate("m", "prompt", ScreeningResult))
+
+    assert result == backend.generate("m", "prompt", ScreeningResult)
+
+
+def test_local_backend_requests_json_schema(chat_server):
+    backend = LocalBackend(chat_server, api_key="secret")
+
+    parsed, usage = backend.generate("llama", "Is this relevant?", ScreeningResult)
+
+    assert parsed == ScreeningResult(
+        relevance_score=7, relevance_reason="R", summary="S"
+    )
+    assert usage == {"prompt_tokens": 30, "output_tokens": 10, "total_tokens": 40}
+    payload = ChatHandler.payloads[0]
+    assert payload["model"] == "llama"
+    assert payload["messages"][0]["content"] == "Is this relevant?"
+    schema = payload["response_format"]["json_schema"]["schema"]
+    assert "relevance_score" in schema["properties"]
+
+
+def test_local_backend_returns_none_for_invalid_output(chat_server):
+    ChatHandler.content = "not json"
+    backend = create_backend(LLMBackendSettings(type="local", base_url=chat_server))
+
+    results = backend.generate_batch("llama", ["a", "b"], ScreeningResult)
+
+    assert [r.parsed for r in results] == [None, None]
+    assert len(ChatHandler.payloads) == 2
+
+
+def test_screener_uses_backend_from_settings(chat_server):
+    screener = PaperScreener(
+        "unused",
+        "llama",
+        backend=LLMBackendSettings(type="local", base_url=chat_server),
+    )
+    df = pd.DataFrame([{"title": "T1", "abstract": "A1"}])
+
+    result_df = screener.screen_papers(df, "RAG")
+
+    assert result_df.iloc[0]["relevance_score"] == 7
+    assert screener.usage.total_tokens == 40
+
+
+def test_screener_with_fake_backend_needs_no_api():
+    screener = PaperScreener("unused", "m", backend=LLMBackendSettings(type="fake"))
+    df = pd.DataFrame([{"title": f"T{i}", "abstract": f"A{i}"} for i in range(5)])
+
+    first = screener.screen_papers(df, "RAG")
+    second = screener.screen_papers(df, "RAG")
+
+    assert first["relevance_score"].tolist() == second["relevance_score"].tolist()
+    assert first["relevance_score"].between(0, 10).all()
@@ -0,0 +1,113 @@
+import json
+import logging
+import threading
+
+import pytest
+
+from src.utils.constants import APP_LOGGER_NAME
+from src.utils.logging_config import (
+    add_log_handler,
+    log_context,
+    setup_logging,
+    shutdown_logging,
+)
+from src.utils.metrics import MetricsRecorder
+
+logger = logging.getLogger(f"{APP_LOGGER_NAME}.test")
+
+
+@pytest.fixture(autouse=True)
+def stop_logging():
+    yield
+    shutdown_logging()
+    logging.getLogger(APP_LOGGER_NAME).handlers.clear()
+
+
+def read_jsonl(log_dir):
+    lines = (log_dir / "app.jsonl").read_text(encoding="utf-8").splitlines()
+    return [json.loads(line) for line in lines]
+
+
+def test_json_lines_carry_run_stage_and_paper(tmp_path):
+    setup_logging(tmp_path, fmt="json", run_id="run-1")
+    metrics = MetricsRecorder()
+
+    logger.info("before")
+    with metrics.span("screening"):
+        with log_context(paper_id="10.1/a"):
+            logger.warning("inside %s", "span")
+    shutdown_logging()
+
+    before, inside = read_jsonl(tmp_path)
+    assert before["run_id"] == "run-1"
+    assert "stage" not in before
+    assert inside["message"] == "inside span"
+    assert inside["stage"] == "screening"
+    assert inside["paper_id"] == "10.1/a"
+    assert inside["level"] == "WARNING"
+
+
+def test_exception_is_a_separate_field(tmp_path):
+    setup_logging(tmp_path, fmt="json")
+
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("failed")
+    shutdown_logging()
+
+    (record,) = read_jsonl(tmp_path)
+    assert record["message"] == "failed"
+    assert "ValueError: boom" in record["exc"]
+
+
+def test_debug_records_from_a_loop_are_rate_limited(tmp_path):
+    setup_logging(tmp_path, level="DEBUG", fmt="json", debug_interval_s=3600)
+
+    for i in range(5):
+        logger.debug(f"row {i}")
+    logger.info("not limited")
+    logger.info("not limited")
+    shutdown_logging()
+
+    records = read_jsonl(tmp_path)
+    assert [r["message"] for r in records] == [
+        "row 0",
+        "not limited",
+        "not limited",
+    ]
+
+
+def test_suppressed_count_is_reported_on_next_record(tmp_path):
+    setup_logging(tmp_path, level="DEBUG", fmt="json", debug_interval_s=60)
+    filt = logging.getLogger(APP_LOGGER_NAME).handlers[0].filters[-1]
+
+    def tick():
+        logger.debug("tick")
+
+    for _ in range(3):
+        tick()
+    # 間隔が過ぎたものとして扱う
+    filt._sites = {k: (v[0] - filt.interval_s, v[1]) for k, v in filt._sites.items()}
+    tick()
+    shutdown_logging()
+
+    records = read_jsonl(tmp_path)
+    assert len(records) == 2
+    assert records[1]["suppressed"] == 2
+
+
+def test_handlers_run_on_the_writer_thread(tmp_path):
+    setup_logging(tmp_path)
+    seen = []
+
+    class Recorder(logging.Handler):
+        def emit(self, record):
+            seen.append(threading.current_thread())
+
+    add_log_handler(Recorder())
+    logger.info("hello")
+    shutdown_logging()
+
+    assert seen and seen[0] is not threading.current_thread()
+    assert "hello" in (tmp_path / "app.log").read_text(encoding="utf-8-sig")
@@ -0,0 +1,113 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+import pytest
+
+from main import run_pipeline
+from src.models.models import Config, ScreeningResult
+
+
+@pytest.fixture
+def run_dir(tmp_path):
+    for sub in ["raw", "interim", "final"]:
+        (tmp_path / sub).mkdir()
+    return tmp_path
+
+
+def make_config(**budget):
+    return Config(
+        project_name="test",
+        search_criteria={"keywords": ["kw"], "iterations": 2, "min_citations": 0},
+        llm_settings={"model_screening": "fake", "max_screening_workers": 1},
+        budget=budget,
+    )
+
+
+def make_response():
+    response = MagicMock()
+    response.parsed = ScreeningResult(
+        relevance_score=8, relevance_reason="Reason", summary="Summary"
+    )
+    response.usage_metadata.prompt_token_count = 100
+    response.usage_metadata.candidates_token_count = 20
+    response.usage_metadata.total_token_count = 120
+    return response
+
+
+@patch("main.S2Collector.get_snowball_candidates", return_value=[])
+@patch("main.S2Collector.collect_initial")
+@patch("google.genai.Client")
+def test_run_pipeline_resumes_after_budget_stop(
+    mock_client_cls, mock_collect, mock_snowball, run_dir
+):
+    mock_client_cls.return_value.models.generate_content.return_value = make_response()
+    mock_collect.return_value = [
+        {
+            "title": f"P{i}",
+            "year": 2020,
+            "citationCount": 10,
+            "abstract": "A",
+            "externalIds": {"DOI": f"10.1/{i}"},
+        }
+        for i in range(5)
+    ]
+
+    # 1回目: 240 トークンで上限に達し、2件のみ判定して中断する
+    run_pipeline(make_config(max_total_tokens=240), run_dir, ["key"])
+
+    state = json.loads((run_dir / "interim" / "run_state.json").read_text())
+    assert state["status"] == "budget_exhausted"
+    assert state["iteration"] == 1
+    assert len(pd.read_csv(run_dir / "final" / "final_review_matrix.csv")) == 2
+    summary = json.loads((run_dir / "final" / "llm_usage_summary.json").read_text())
+    assert summary["partial"] is True
+    assert summary["total"]["total_tokens"] == 240
+    mock_snowball.assert_not_called()
+
+    # 2回目: 未判定の3件のみを判定して完了する
+    mock_collect.reset_mock()
+    run_pipeline(make_config(), run_dir, ["key"], resume=True)
+
+    mock_collect.assert_not_called()
+    state = json.loads((run_dir / "interim" / "run_state.json").read_text())
+    assert state["status"] == "completed"
+    final_df = pd.read_csv(run_dir / "final" / "final_review_matrix.csv")
+    assert sorted(final_df["doi"]) == [f"10.1/{i}" for i in range(5)]
+    # 中断したイテレーションの全論文 (再開前の2件を含む) からスノーボールする
+    assert len(mock_snowball.call_args[0][0]) == 5
+    usage_df = pd.read_csv(run_dir / "interim" / "llm_usage.csv")
+    assert list(usage_df["iteration"]) == [1]
+    assert list(usage_df["calls"]) == [3]
+
+
+@patch("main.S2Collector.get_snowball_candidates", return_value=[])
+@patch("main.S2Collector.collect_initial")
+@patch("google.genai.Client")
+def test_run_pipeline_refuses_to_resume_completed_run(
+    mock_client_cls, mock_collect, mock_snowball, run_dir
+):
+    mock_client_cls.return_value.models.generate_content.return_value = make_response()
+    mock_collect.return_value = [
+        {
+            "title": "P0",
+            "year": 2020,
+            "citationCount": 10,
+            "abstract": "A",
+            "externalIds": {"DOI": "10.1/0"},
+        }
+    ]
+    assert run_pipeline(make_config(), run_dir, ["key"]) == 0
+    state = json.loads((run_dir / "interim" / "run_state.json").read_text())
+    assert state == {"status": "completed"}
+    final_csv = run_dir / "final" / "final_review_matrix.csv"
+    before = final_csv.read_bytes()
+
+    # 再開する状態がないため、何も収集・判定せずに終了する
+    mock_collect.reset_mock()
+    calls = mock_client_cls.return_value.models.generate_content.call_count
+    assert run_pipeline(make_config(), run_dir, ["key"], resume=True) == 1
+
+    mock_collect.assert_not_called()
+    assert mock_client_cls.return_value.models.generate_content.call_count == calls
+    assert final_csv.read_bytes() == before
@@ -0,0 +1,76 @@
+import json
+import pstats
+
+import pytest
+
+from src.utils.metrics import MetricsRecorder, get_metrics, init_metrics
+
+
+def read_records(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_span_records_duration_attrs_and_counter_deltas(tmp_path):
+    metrics = MetricsRecorder(tmp_path)
+    metrics.incr("s2.requests", 5)
+
+    with metrics.span("pipeline"):
+        with metrics.span("process_papers", rows_in=10) as span:
+            metrics.incr("s2.requests", 2)
+            metrics.incr("s2.bytes", 1024)
+            span.set(rows_out=4)
+
+    records = read_records(tmp_path / "metrics.jsonl")
+    assert [r["name"] for r in records] == ["process_papers", "pipeline"]
+    inner = records[0]
+    assert inner["parent"] == "pipeline"
+    assert inner["attrs"] == {"rows_in": 10, "rows_out": 4}
+    # span 開始前のカウンタは含まれない
+    assert inner["counters"] == {"s2.requests": 2, "s2.bytes": 1024}
+    assert inner["duration_s"] >= 0
+
+
+def test_span_marks_error_and_reraises():
+    metrics = MetricsRecorder()
+    with pytest.raises(ValueError):
+        with metrics.span("screening"):
+            raise ValueError("boom")
+    assert metrics.spans[0]["attrs"]["error"] == "ValueError"
+
+
+def test_write_summary_aggregates_stages(tmp_path):
+    metrics = MetricsRecorder(tmp_path)
+    for i in range(2):
+        with metrics.span("process_papers", iteration=i + 1, rows_in=10, rows_out=3):
+            metrics.incr("arxiv.requests")
+
+    metrics.write_summary()
+
+    summary = read_records(tmp_path / "metrics.jsonl")[-1]
+    assert summary["type"] == "summary"
+    stage = summary["stages"][0]
+    assert stage["count"] == 2
+    assert stage["rows_in"] == 20
+    assert stage["rows_out"] == 6
+    assert stage["counters"] == {"arxiv.requests": 2}
+    assert "process_papers" in metrics.summary_table()
+
+
+def test_profile_hook_writes_pstats(tmp_path):
+    metrics = MetricsRecorder(tmp_path, profile_stages=["screening"])
+    with metrics.span("screening"):
+        sum(range(1000))
+    with metrics.span("snowball"):
+        pass
+
+    profiles = list((tmp_path / "profiles").iterdir())
+    assert [p.name for p in profiles] == ["screening_1.prof"]
+    pstats.Stats(str(profiles[0]))
+
+
+def test_init_metrics_replaces_global_recorder(tmp_path):
+    recorder = init_metrics(tmp_path)
+    try:
+        assert get_metrics() is recorder
+    finally:
+        init_metrics(None)
@@ -0,0 +1,130 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from src.core.collector import S2Collector
+from src.core.planner import RunPlanner, format_plan, load_history
+from src.models.models import Config
+
+
+def make_config(**budget):
+    return Config(
+        project_name="test",
+        search_criteria={
+            "keywords": ["kw"],
+            "seed_paper_dois": ["10.1/seed"],
+            "iterations": 2,
+            "keyword_search_limit": 100,
+            "top_n_for_snowball": 5,
+            "max_related_papers": -1,
+        },
+        llm_settings={"model_screening": "fake", "max_screening_workers": 2},
+        budget=budget,
+    )
+
+
+def make_collector():
+    collector = MagicMock()
+    collector.count_keyword_results.return_value = 1000
+    collector.get_paper_counts.return_value = {
+        "citationCount": 30,
+        "referenceCount": 10,
+    }
+    return collector
+
+
+def test_plan_uses_probes_and_caches_them(tmp_path):
+    collector = make_collector()
+    cache_path = tmp_path / "planner_cache.json"
+
+    plan = RunPlanner(collector, cache_path=cache_path).plan(make_config())
+
+    # キーワード検索は keyword_search_limit で頭打ちになる
+    assert plan.iterations[0].candidates == 101
+    assert plan.iterations[0].screened == 51
+    assert plan.iterations[0].snowball_seeds == 11
+    assert plan.iterations[1].candidates == 11 * 40
+    assert plan.llm_calls == sum(it.screened for it in plan.iterations)
+    assert plan.total_tokens > 0 and plan.wall_time_s > 0
+    assert not plan.over_budget
+
+    # 2回目はキャッシュから読み込み、S2 へのリクエストを送らない
+    collector.reset_mock()
+    RunPlanner(collector, cache_path=cache_path).plan(make_config())
+    collector.count_keyword_results.assert_not_called()
+    collector.get_paper_counts.assert_not_called()
+    assert json.loads(cache_path.read_text())["search:kw"]["value"] == 1000
+
+    # 有効期間を過ぎた件数は取得し直す
+    RunPlanner(collector, cache_path=cache_path, cache_ttl_s=0).plan(make_config())
+    collector.count_keyword_results.assert_called_once()
+
+
+def test_plan_treats_failed_probes_as_unknown(tmp_path):
+    collector = make_collector()
+    collector.count_keyword_results.return_value = None
+    collector.get_paper_counts.return_value = None
+    cache_path = tmp_path / "planner_cache.json"
+
+    plan = RunPlanner(collector, cache_path=cache_path).plan(make_config())
+
+    # ヒット数は keyword_search_limit、関連論文数は既定値で代用する
+    assert plan.iterations[0].candidates == 101
+    assert len(plan.unknown) == 2
+    assert not plan.over_budget
+    assert "UNKNOWN: S2 search total" in format_plan(plan)
+    # 取得できなかった件数はキャッシュしない
+    assert json.loads(cache_path.read_text()) == {}
+
+
+def test_count_keyword_results_returns_none_on_network_error():
+    collector = S2Collector(max_retries=1)
+    with patch.object(
+        collector, "_request", side_effect=requests.ConnectionError("offline")
+    ):
+        assert collector.count_keyword_results(["kw"]) is None
+
+
+def test_plan_warns_when_over_budget(tmp_path):
+    planner = RunPlanner(make_collector(), cache_path=tmp_path / "cache.json")
+
+    plan = planner.plan(make_config(max_total_tokens=1000, max_wall_time_minutes=0.1))
+
+    assert plan.over_budget
+    assert len(plan.warnings) == 2
+    assert "WARNING: Estimated tokens" in format_plan(plan)
+
+
+def test_load_history_from_metrics(tmp_path):
+    run_dir = tmp_path / "20250101_000000_test"
+    run_dir.mkdir()
+    summary = {
+        "type": "summary",
+        "stages": [
+            {"stage": "process_papers", "rows_in": 200, "rows_out": 50},
+            {"stage": "arxiv_fill", "rows_in": 20, "rows_out": 10},
+        ],
+        "totals": {
+            "llm.calls": 50,
+            "llm.latency_s": 150.0,
+            "llm.prompt_tokens": 30000,
+            "llm.output_tokens": 5000,
+        },
+    }
+    (run_dir / "metrics.jsonl").write_text(
+        '{"type": "span"}\n' + json.dumps(summary) + "\n", encoding="utf-8"
+    )
+    # 別プロジェクトの実行は対象外
+    other = tmp_path / "20250101_000000_other"
+    other.mkdir()
+    (other / "metrics.jsonl").write_text(json.dumps(summary) + "\n")
+
+    rates = load_history(tmp_path, project_name="test")
+
+    assert rates.runs == 1
+    assert rates.pass_rate == 0.25
+    assert rates.missing_abstract_rate == 0.1
+    assert rates.llm_latency_s == 3.0
+    assert rates.prompt_tokens_per_call == 600
+    assert rates.output_tokens_per_call == 100
@@ -0,0 +1,199 @@
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+import pytest
+from google.genai import errors
+
+from src.core.llm import GeminiBackend
+from src.core.prompts import (
+    TRUNCATION_MARK,
+    build_prompt,
+    estimate_tokens,
+    normalize_text,
+    truncate_to_tokens,
+)
+from src.core.screener import PaperScreener, ScreeningResult
+from src.core.usage import summarize_prompts
+from src.utils.io_utils import get_prompt
+
+
+def test_estimate_tokens_counts_wide_characters_individually():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcdefgh") == 2
+    assert estimate_tokens("検索拡張生成") == 6
+
+
+def test_normalize_text_strips_markup_and_label():
+    raw = (
+        "<jats:title>Abstract</jats:title>"
+        "<jats:p>Dense  retrieval &amp;\n RAG.</jats:p>"
+    )
+
+    assert normalize_text(raw) == "Dense retrieval & RAG."
+    assert normalize_text("Abstract: We study RAG.") == "We study RAG."
+    # 単語の一部は見出しとみなさない
+    assert normalize_text("Abstractive summarization") == "Abstractive summarization"
+
+
+def test_truncate_to_tokens_cuts_at_sentence_boundary():
+    text = " ".join(f"Sentence number {i} is here." for i in range(200))
+
+    short, removed = truncate_to_tokens(text, 100)
+
+    assert estimate_tokens(short) <= 100
+    assert short.endswith("here." + TRUNCATION_MARK)
+    assert removed == estimate_tokens(text) - estimate_tokens(short)
+    assert truncate_to_tokens("Short.", 100) == ("Short.", 0)
+    japanese, _ = truncate_to_tokens("これは文です。" * 50, 30)
+    assert estimate_tokens(japanese) <= 30
+    assert japanese.endswith("。" + TRUNCATION_MARK)
+
+
+def test_build_prompt_puts_scope_and_task_before_paper():
+    long_abstract = "word " * 2000
+
+    prompt = build_prompt(
+        get_prompt("screening"), "T", long_abstract, 50, research_scope="RAG"
+    )
+
+    assert prompt.prefix.startswith("# Research Scope:\nRAG")
+    assert "# Task:" in prompt.prefix and "{" not in prompt.prefix
+    assert prompt.suffix.startswith("# Paper Information:\nTitle: T")
+    assert prompt.truncated_tokens > 0
+    assert prompt.est_tokens == estimate_tokens(prompt.text)
+    # 同じスコープなら論文によらず前半は同じ
+    other = build_prompt(get_prompt("screening"), "U", "x", 50, research_scope="RAG")
+    assert other.prefix == prompt.prefix
+
+
+def make_response():
+    return SimpleNamespace(
+        parsed=ScreeningResult(relevance_score=8, relevance_reason="R", summary="S"),
+        usage_metadata=SimpleNamespace(
+            prompt_token_count=1200,
+            candidates_token_count=20,
+            total_token_count=1220,
+            cached_content_token_count=1100,
+        ),
+    )
+
+
+@patch("google.genai.Client")
+def test_gemini_backend_caches_long_prefix_once(mock_client_cls):
+    client = mock_client_cls.return_value
+    client.caches.create.return_value = SimpleNamespace(name="cachedContents/1")
+    client.models.generate_content.return_value = make_response()
+    backend = GeminiBackend("key", cache_min_tokens=10)
+    prefix = "Scope and instructions. " * 10
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        generations = list(
+            executor.map(
+                lambda i: backend.generate_with_prefix(
+                    "m", prefix, f"paper {i}", ScreeningResult
+                ),
+                range(8),
+            )
+        )
+
+    client.caches.create.assert_called_once()
+    assert client.caches.create.call_args.kwargs["config"]["contents"] == [prefix]
+    kwargs = client.models.generate_content.call_args.kwargs
+    assert kwargs["contents"].startswith("paper ")
+    assert kwargs["config"]["cached_content"] == "cachedContents/1"
+    assert all(g.usage["cached_tokens"] == 1100 for g in generations)
+
+
+@patch("google.genai.Client")
+def test_gemini_backend_sends_full_prompt_without_cache(mock_client_cls):
+    client = mock_client_cls.return_value
+    client.models.generate_content.return_value = make_response()
+
+    # 前半が短い場合はキャッシュしない
+    GeminiBackend("key").generate_with_prefix("m", "scope ", "paper", ScreeningResult)
+    client.caches.create.assert_not_called()
+    assert client.models.generate_content.call_args.kwargs["contents"] == "scope paper"
+
+    # キャッシュを作れない場合は全文を送る
+    client.caches.create.side_effect = Exception("too small")
+    backend = GeminiBackend("key", cache_min_tokens=1)
+    generation = backend.generate_with_prefix("m", "scope ", "paper", ScreeningResult)
+    backend.generate_with_prefix("m", "scope ", "paper", ScreeningResult)
+    assert client.caches.create.call_count == 1
+    kwargs = client.models.generate_content.call_args.kwargs
+    assert kwargs["contents"] == "scope paper"
+    assert "cached_content" not in kwargs["config"]
+    assert generation.parsed.relevance_score == 8
+
+
+@patch("google.genai.Client")
+def test_gemini_backend_recreates_cache_only_when_missing(mock_client_cls):
+    client = mock_client_cls.return_value
+    client.caches.create.side_effect = [
+        SimpleNamespace(name="cachedContents/1"),
+        SimpleNamespace(name="cachedContents/2"),
+    ]
+    backend = GeminiBackend("key", cache_min_tokens=1)
+
+    # レート制限等はキャッシュを作り直さずにそのまま送出する
+    client.models.generate_content.side_effect = errors.ClientError(
+        429, {"error": {"status": "RESOURCE_EXHAUSTED", "message": "Quota"}}
+    )
+    with pytest.raises(errors.ClientError):
+        backend.generate_with_prefix("m", "scope ", "paper", ScreeningResult)
+    assert client.models.generate_content.call_count == 1
+
+    # キャッシュが見つからない場合は全文で送り直し、次回は作り直す
+    client.models.generate_content.side_effect = [
+        errors.ClientError(
+            404,
+            {"error": {"status": "NOT_FOUND", "message": "CachedContent not found"}},
+        ),
+        make_response(),
+        make_response(),
+    ]
+    generation = backend.generate_with_prefix("m", "scope ", "paper", ScreeningResult)
+    assert client.models.generate_content.call_args.kwargs["contents"] == "scope paper"
+    assert generation.parsed.relevance_score == 8
+    backend.generate_with_prefix("m", "scope ", "paper", ScreeningResult)
+    kwargs = client.models.generate_content.call_args.kwargs
+    assert kwargs["config"]["cached_content"] == "cachedContents/2"
+
+    # 作成したキャッシュは close で削除する
+    backend.close()
+    client.caches.delete.assert_called_once_with(name="cachedContents/2")
+
+
+def test_screener_reports_prompt_sizes():
+    screener = PaperScreener(
+        "key",
+        "m",
+        max_workers=1,
+        backend=MagicMock(
+            generate_with_prefix=MagicMock(
+                return_value=(
+                    ScreeningResult(relevance_score=5, relevance_reason="", summary=""),
+                    {"prompt_tokens": 10, "output_tokens": 1, "total_tokens": 11},
+                )
+            )
+        ),
+        max_abstract_tokens=20,
+    )
+    df = pd.DataFrame(
+        [
+            {"title": "Long", "abstract": "token " * 500},
+            {"title": "Short", "abstract": "Brief."},
+            {"title": "Missing", "abstract": ""},
+        ]
+    )
+
+    result = screener.screen_papers(df, "scope")
+
+    assert list(result["abstract_truncated_tokens"] > 0) == [True, False, False]
+    assert result.loc[0, "prompt_est_tokens"] > result.loc[1, "prompt_est_tokens"]
+    assert list(result["cached_tokens"]) == [0, 0, 0]
+    summary = summarize_prompts(result)
+    assert summary["truncated_papers"] == 1
+    assert summary["prompt_est_tokens_max"] == result.loc[0, "prompt_est_tokens"]
@@ -0,0 +1,135 @@
+import json
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+import pytest
+
+from main import run_pipeline
+from src.core.refresh import collect_delta, load_baseline
+from src.models.models import Config
+
+
+def make_config():
+    return Config(
+        project_name="living",
+        search_criteria={
+            "keywords": ["rag"],
+            "iterations": 2,
+            "min_citations": 0,
+            "screening_threshold": 7,
+        },
+        llm_settings={"model_screening": "m", "backend": {"type": "fake"}},
+    )
+
+
+def paper(doi, year=2024, citations=0):
+    return {
+        "title": f"Paper {doi}",
+        "year": year,
+        "citationCount": citations,
+        "abstract": "An abstract.",
+        "externalIds": {"DOI": doi},
+    }
+
+
+@pytest.fixture
+def previous_run(tmp_path):
+    """前回の実行: 10.1/a と 10.1/b を採用、10.1/c は不採用"""
+    run_dir = tmp_path / "20240101_120000_living"
+    (run_dir / "final").mkdir(parents=True)
+    pd.DataFrame(
+        {
+            "doi": ["10.1/a", "10.1/b", "10.1/c"],
+            "title": ["A", "B", "C"],
+            "citationCount": [5, 3, 1],
+            "relevance_score": [9, 7, 2],
+        }
+    ).to_csv(run_dir / "final" / "final_review_matrix.csv", index=False)
+    return run_dir
+
+
+@pytest.fixture
+def run_dir(tmp_path):
+    run_dir = tmp_path / "20240301_120000_living"
+    for sub in ["raw", "interim", "final"]:
+        (run_dir / sub).mkdir(parents=True)
+    return run_dir
+
+
+def test_load_baseline_tracks_included_papers(previous_run):
+    baseline = load_baseline(previous_run, make_config())
+
+    assert baseline.since == date(2024, 1, 1)
+    assert baseline.known_dois == {"10.1/a", "10.1/b", "10.1/c"}
+    assert baseline.citation_counts == {"10.1/a": 5, "10.1/b": 3}
+    assert baseline.version == 1
+
+
+def test_collect_delta_fetches_citations_only_for_grown_papers(previous_run):
+    baseline = load_baseline(previous_run, make_config())
+    collector = MagicMock()
+    collector.search_by_keywords.return_value = [paper("10.1/new")]
+    collector.get_paper_counts.side_effect = lambda doi: {
+        "citationCount": {"10.1/a": 7, "10.1/b": 3}[doi],
+        "referenceCount": 0,
+    }
+    collector.get_citing_papers.return_value = [
+        paper("10.1/citing"),
+        paper("10.1/old", year=2019),
+    ]
+
+    candidates = collect_delta(collector, make_config(), baseline)
+
+    assert collector.search_by_keywords.call_args.kwargs["published_since"] == date(
+        2024, 1, 1
+    )
+    collector.get_citing_papers.assert_called_once_with("10.1/a")
+    assert [p["externalIds"]["DOI"] for p in candidates] == [
+        "10.1/new",
+        "10.1/citing",
+    ]
+
+
+@patch("main.S2Collector.get_snowball_candidates", return_value=[])
+@patch("main.S2Collector.get_citing_papers", return_value=[])
+@patch("main.S2Collector.get_paper_counts", return_value=None)
+@patch("main.S2Collector.search_by_keywords")
+def test_refresh_screens_only_the_delta(
+    mock_search, mock_counts, mock_citing, mock_snowball, previous_run, run_dir
+):
+    # 判定済みの 10.1/c は再判定しない
+    mock_search.return_value = [paper("10.1/c"), paper("10.1/d"), paper("10.1/e")]
+    config = make_config()
+
+    run_pipeline(config, run_dir, ["key"], baseline=load_baseline(previous_run, config))
+
+    screened = pd.read_csv(run_dir / "interim" / "screened_papers_cumulative.csv")
+    assert sorted(screened["doi"]) == ["10.1/d", "10.1/e"]
+    final_df = pd.read_csv(run_dir / "final" / "final_review_matrix.csv")
+    assert sorted(final_df["doi"]) == ["10.1/a", "10.1/b", "10.1/c", "10.1/d", "10.1/e"]
+    assert final_df["relevance_score"].is_monotonic_decreasing
+
+    info = json.loads((run_dir / "final" / "refresh.json").read_text())
+    assert info["previous_run"] == str(previous_run)
+    assert info["version"] == 2
+    assert info["papers_screened"] == 2
+    state = json.loads((run_dir / "interim" / "run_state.json").read_text())
+    assert state == {"status": "completed", "previous_run": str(previous_run)}
+
+
+@patch("main.S2Collector.get_paper_counts", return_value=None)
+@patch("main.S2Collector.search_by_keywords", return_value=[])
+def test_refresh_without_new_papers_keeps_previous_final(
+    mock_search, mock_counts, previous_run, run_dir
+):
+    config = make_config()
+
+    run_pipeline(config, run_dir, ["key"], baseline=load_baseline(previous_run, config))
+
+    final_df = pd.read_csv(run_dir / "final" / "final_review_matrix.csv")
+    assert len(final_df) == 3
+    info = json.loads((run_dir / "final" / "refresh.json").read_text())
+    assert info["papers_screened"] == 0
+    # 次回の差分更新はこの実行を起点にバージョンを進める
+    assert load_baseline(run_dir, config).version == 2
@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.core.results import ResultsQuery, ResultsTable, load_results_frame
+
+
+def make_df(n=100):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "doi": [f"10.1/{i}" for i in range(n)],
+            "title": [f"Paper {i}" for i in range(n)],
+            "relevance_score": rng.integers(0, 11, n),
+            "year": rng.integers(2000, 2025, n),
+            "citationCount": rng.integers(0, 500, n),
+        }
+    )
+
+
+def test_query_filters_sorts_and_pages():
+    df = make_df()
+    table = ResultsTable(df)
+
+    query = ResultsQuery(
+        score_range=(5, 10),
+        year_range=(2010, 2020),
+        sort_by="citationCount",
+        columns=["doi", "citationCount"],
+        page=2,
+        page_size=5,
+    )
+    page = table.query(query)
+
+    expected = df[
+        df["relevance_score"].between(5, 10) & df["year"].between(2010, 2020)
+    ].sort_values("citationCount", ascending=False, kind="stable")
+    assert page.total == len(expected)
+    assert list(page.rows.columns) == ["doi", "citationCount"]
+    assert list(page.rows["doi"]) == list(expected["doi"].iloc[5:10])
+    assert (page.start, page.end) == (6, 10)
+
+
+def test_query_clamps_page_and_puts_missing_last():
+    df = pd.DataFrame({"doi": ["a", "b", "c"], "year": [2001, None, 2003]})
+    table = ResultsTable(df.astype({"year": "Int64"}))
+
+    page = table.query(ResultsQuery(sort_by="year", ascending=True, page=9))
+
+    assert page.page == 1
+    assert list(page.rows["doi"]) == ["a", "c", "b"]
+    # 範囲フィルタでは欠損値は除外される
+    assert table.query(ResultsQuery(year_range=(2000, 2010))).total == 2
+
+
+def test_load_results_frame_uses_columnar_copy(tmp_path):
+    csv_path = tmp_path / "final_review_matrix.csv"
+    make_df(10).assign(year=["2020.0"] * 10).to_csv(csv_path, index=False)
+
+    df = load_results_frame(csv_path)
+    cache_path = tmp_path / "final_review_matrix.csv.columns.pkl"
+    assert cache_path.exists()
+    assert str(df["year"].dtype) == "Int64"
+    pd.testing.assert_frame_equal(load_results_frame(csv_path), df)
+
+    # CSV が更新されたらコピーを作り直す
+    make_df(3).to_csv(csv_path, index=False)
+    os.utime(csv_path, ns=(cache_path.stat().st_mtime_ns + 10**9,) * 2)
+    assert len(load_results_frame(csv_path)) == 3
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+import requests
+
+from benchmarks.s2_mock import FaultConfig, MockS2Server, SyntheticGraph
+from src.core.collector import S2Collector, retry_after_seconds
+from src.utils.metrics import init_metrics
+
+
+@pytest.fixture
+def graph():
+    return SyntheticGraph(2_000, refs_per_paper=8, seed=1)
+
+
+@pytest.fixture
+def server(graph):
+    server = MockS2Server(graph, seed=1)
+    server.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_collector(server, **kwargs):
+    return S2Collector(
+        base_url=server.base_url, min_backoff_s=0.01, max_backoff_s=0.05, **kwargs
+    )
+
+
+def test_synthetic_graph_is_scale_free_and_acyclic(graph):
+    for i in (1, 500, 1999):
+        refs = graph.references(i)
+        assert (refs < i).all()
+        assert len(np.unique(refs)) == len(refs)
+    assert graph.citation_counts.sum() == len(graph.ref_indices)
+    # 被引用数は少数の論文に集中する
+    counts = np.sort(graph.citation_counts)[::-1]
+    assert counts[:20].sum() > counts[-1000:].sum()
+
+
+def test_collector_reads_the_mock_api(server, graph):
+    collector = make_collector(server)
+
+    papers = collector.search_by_keywords(["rag"], limit=20)
+    assert len(papers) == 20
+    assert {"title", "abstract", "externalIds"} <= set(papers[0])
+
+    doi = graph.doi(100)
+    related = collector.get_related_papers(doi)
+    assert len(related) == len(graph.references(100)) + len(graph.citations(100))
+    assert len(collector.pop_citation_edges()) == len(related)
+    assert collector.get_paper_counts(doi) == {
+        "citationCount": int(graph.citation_counts[100]),
+        "referenceCount": len(graph.references(100)),
+    }
+    assert collector.get_papers_by_dois(["10.1/unknown"]) == []
+
+
+def test_collector_retries_injected_faults(server, graph):
+    server.faults = FaultConfig(
+        rate_limit=0.3, retry_after_s=0, error_burst=0.05, burst_length=3, truncate=0.1
+    )
+    metrics = init_metrics(None)
+    collector = make_collector(server, max_retries=50)
+
+    results = [collector.get_paper_counts(graph.doi(i)) for i in range(40)]
+
+    assert all(r is not None for r in results)
+    assert server.stats["429"] > 0
+    assert server.stats["5xx"] > 0
+    assert server.stats["truncated"] > 0
+    assert metrics.counters["s2.retries"] == (
+        server.stats["429"] + server.stats["5xx"] + server.stats["truncated"]
+    )
+
+
+def test_retry_after_header_is_honoured():
+    response = requests.Response()
+    response.status_code = 429
+    response.headers["Retry-After"] = "3"
+    error = requests.exceptions.HTTPError(response=response)
+
+    assert retry_after_seconds(error) == 3.0
+    response.headers["Retry-After"] = "Wed, 21 Oct 2015 07:28:00 GMT"
+    assert retry_after_seconds(error) is None
+    assert retry_after_seconds(ValueError()) is None
@@ -0,0 +1,125 @@
+import json
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+
+from benchmarks.s2_mock import SyntheticGraph, corpus_id, write_bulk_shards
+from src.core.s2_store import OfflineS2Collector, PaperNotFoundError, S2Store
+
+
+@pytest.fixture(scope="module")
+def graph():
+    return SyntheticGraph(300, refs_per_paper=5, seed=1)
+
+
+@pytest.fixture(scope="module")
+def store(graph, tmp_path_factory):
+    shards = write_bulk_shards(graph, tmp_path_factory.mktemp("bulk"), n_shards=3)
+    store = S2Store(tmp_path_factory.mktemp("store"))
+    # 小さなチャンクで、計数ソートがチャンクをまたぐ場合を確認する
+    stats = store.ingest(
+        shards["papers"], shards["abstracts"], shards["citations"], chunk_edges=97
+    )
+    assert stats["papers"] == 300
+    assert stats["citations"] == len(graph.ref_indices)
+    return store
+
+
+def test_ingested_graph_matches_source(graph, store):
+    for i in [0, 1, 7, 150, 299]:
+        expected_refs = sorted(corpus_id(int(j)) for j in graph.references(i))
+        expected_cites = sorted(corpus_id(int(j)) for j in graph.citations(i))
+        assert sorted(store.related(corpus_id(i), "references")) == expected_refs
+        assert sorted(store.related(corpus_id(i), "citations")) == expected_cites
+    assert store.related(10_000, "citations") == []
+
+
+def test_offline_collector_answers_related_papers(graph, store):
+    collector = OfflineS2Collector(store)
+    i = int(graph.citation_counts.argmax())
+
+    related = collector.get_related_papers(graph.doi(i))
+
+    dois = {p["externalIds"]["DOI"] for p in related}
+    assert dois == {
+        graph.doi(int(j)) for j in [*graph.references(i), *graph.citations(i)]
+    }
+    assert all("abstract" in p and "citationCount" in p for p in related)
+    assert len(collector.pop_citation_edges()) == len(related)
+
+
+def test_offline_collector_doi_lookup_and_counts(graph, store):
+    collector = OfflineS2Collector(store)
+
+    papers = collector.get_papers_by_dois([graph.doi(5).upper(), "10.1/missing"])
+    counts = collector.get_paper_counts(graph.doi(5))
+
+    assert [p["externalIds"]["DOI"] for p in papers] == [graph.doi(5)]
+    assert counts == {
+        "citationCount": int(graph.citation_counts[5]),
+        "referenceCount": len(graph.references(5)),
+    }
+    with pytest.raises(PaperNotFoundError):
+        collector._get("paper/DOI:10.1/missing", {"fields": "title"})
+
+
+def test_offline_search_filters_by_publication_date(graph, store):
+    collector = OfflineS2Collector(store)
+
+    hits = collector.search_by_keywords(["retrieval", "graph"], limit=20)
+    recent = collector.search_by_keywords(
+        ["retrieval", "graph"], limit=500, published_since=date(2020, 1, 1)
+    )
+
+    assert 0 < len(hits) <= 20
+    assert set(hits[0]) >= {"paperId", "title", "abstract", "externalIds"}
+    assert recent and all(p["year"] >= 2020 for p in recent)
+    assert collector.count_keyword_results(["retrieval"]) >= len(hits)
+
+
+def test_store_search_matches_japanese_words(tmp_path):
+    papers = tmp_path / "papers.jsonl"
+    papers.write_text(
+        "\n".join(
+            json.dumps({"corpusid": i, "title": title}, ensure_ascii=False)
+            for i, title in enumerate(["検索拡張生成 の評価", "Dense retrieval"], 1)
+        ),
+        encoding="utf-8",
+    )
+    store = S2Store(tmp_path / "store")
+    store.ingest([papers])
+
+    total, _ = store.search("検索拡張生成 retrieval")
+
+    assert total == 2
+    assert [row["corpusid"] for row in store.search("検索拡張生成")[1]] == [1]
+    assert store.search("「」") == (0, [])
+
+
+def test_offline_process_papers_skips_arxiv(graph, store):
+    collector = OfflineS2Collector(store)
+    papers = collector.get_related_papers(graph.doi(100))
+
+    with patch("src.core.collector._search_arxiv", side_effect=AssertionError):
+        df = collector.process_papers(papers, set(), 0, [1900, 2100])
+
+    assert df["abstract"].notna().all()
+
+
+def test_offline_collector_requires_store(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        OfflineS2Collector(tmp_path / "missing")
+
+
+def test_make_collector_uses_store_from_config(store):
+    from main import make_collector
+    from src.models.models import Config
+
+    config = Config(
+        project_name="offline",
+        search_criteria={"keywords": ["rag"], "s2_store": str(store.path)},
+        llm_settings={},
+    )
+
+    assert isinstance(make_collector(config), OfflineS2Collector)
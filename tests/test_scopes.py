@@ -0,0 +1,71 @@
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+import pytest
+from pydantic import ValidationError
+
+from src.core.scopes import build_multi_scope_model, snowball_scores
+from src.core.screener import PaperScreener
+from src.models.models import ResearchScope, SearchCriteria
+
+SCOPES = [
+    ResearchScope(name="retrieval", query="Dense retrieval", threshold=6),
+    ResearchScope(name="eval", query="Evaluation of RAG"),
+]
+
+
+@pytest.fixture
+def screener():
+    with patch("google.genai.Client") as mock_client_cls:
+        mock_client = mock_client_cls.return_value
+        yield PaperScreener("fake_key", "fake_model"), mock_client
+
+
+def test_screen_papers_scores_every_scope_in_one_call(screener):
+    screener_instance, mock_client = screener
+    model = build_multi_scope_model(SCOPES)
+    mock_response = MagicMock()
+    mock_response.parsed = model(
+        score_retrieval=4, score_eval=9, relevance_reason="R", summary="S"
+    )
+    mock_client.models.generate_content.return_value = mock_response
+
+    df = pd.DataFrame([{"title": "T1", "abstract": "A1"}])
+    result_df = screener_instance.screen_papers(df, SCOPES)
+
+    assert mock_client.models.generate_content.call_count == 1
+    prompt = mock_client.models.generate_content.call_args.kwargs["contents"]
+    assert "- retrieval: Dense retrieval" in prompt
+    assert "- eval: Evaluation of RAG" in prompt
+    row = result_df.iloc[0]
+    assert (row["score_retrieval"], row["score_eval"]) == (4, 9)
+    assert row["relevance_score"] == 9
+    assert row["best_scope"] == "eval"
+
+
+def test_snowball_scores_use_per_scope_thresholds():
+    df = pd.DataFrame(
+        {
+            "relevance_score": [6, 7, 3],
+            "score_retrieval": [6, 2, None],
+            "score_eval": [1, 7, None],
+        }
+    )
+
+    scores = snowball_scores(df, SCOPES, threshold=8)
+
+    # retrieval はしきい値 6 で採用、eval は既定のしきい値 8 に届かない
+    assert (scores >= 8).tolist() == [True, False, False]
+
+
+def test_search_criteria_rejects_duplicate_scope_names():
+    with pytest.raises(ValidationError):
+        SearchCriteria(
+            keywords=["kw"],
+            natural_language_query=[
+                {"name": "a", "query": "x"},
+                {"name": "a", "query": "y"},
+            ],
+        )
+    with pytest.raises(ValidationError):
+        ResearchScope(name="not a name", query="x")
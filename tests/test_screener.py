@@ -4,13 +4,13 @@ import pandas as pd
 import pytest
 
 from src.core.screener import PaperScreener
-from src.models.models import ScreeningResult
+from src.models.models import BudgetSettings, ScreeningResult, TriageResult
 
 
 @pytest.fixture
 def screener():
     # Mocking genai.Client in constructor
-    with patch("src.core.screener.genai.Client") as mock_client_cls:
+    with patch("google.genai.Client") as mock_client_cls:
         mock_client = mock_client_cls.return_value
         yield PaperScreener("fake_key", "fake_model"), mock_client
 
@@ -57,3 +57,85 @@ def test_screen_papers_error(screener):
 
     assert result_df.iloc[0]["relevance_score"] == 0
     assert result_df.iloc[0]["relevance_reason"] == "LLM Error occurred"
+
+
+def make_response(score, prompt_tokens=100, output_tokens=20):
+    response = MagicMock()
+    response.parsed = ScreeningResult(
+        relevance_score=score, relevance_reason="Reason", summary="Summary"
+    )
+    response.usage_metadata.prompt_token_count = prompt_tokens
+    response.usage_metadata.candidates_token_count = output_tokens
+    response.usage_metadata.total_token_count = prompt_tokens + output_tokens
+    return response
+
+
+def test_screen_papers_records_token_usage(screener):
+    screener_instance, mock_client = screener
+    mock_client.models.generate_content.return_value = make_response(8)
+
+    df = pd.DataFrame(
+        [{"title": "T1", "abstract": "A1"}, {"title": "T2", "abstract": ""}]
+    )
+    result_df = screener_instance.screen_papers(df, "scope")
+
+    assert list(result_df["prompt_tokens"]) == [100, 0]
+    assert list(result_df["total_tokens"]) == [120, 0]
+    assert result_df.iloc[0]["llm_latency_s"] >= 0
+    assert screener_instance.usage.calls == 1
+    assert screener_instance.usage.total_tokens == 120
+
+
+def test_screen_papers_stops_when_budget_exhausted():
+    with patch("google.genai.Client") as mock_client_cls:
+        mock_client = mock_client_cls.return_value
+        mock_client.models.generate_content.return_value = make_response(8)
+        screener_instance = PaperScreener(
+            "fake_key",
+            "fake_model",
+            max_workers=1,
+            budget=BudgetSettings(max_total_tokens=200),
+        )
+
+    df = pd.DataFrame([{"title": f"T{i}", "abstract": "A"} for i in range(5)])
+    result_df = screener_instance.screen_papers(df, "scope")
+
+    # 120 トークン x 2 件で上限 (200) に達し、残り 3 件は未判定として保留される
+    assert len(result_df) == 2
+    assert list(screener_instance.pending_df["title"]) == ["T2", "T3", "T4"]
+    assert "relevance_score" not in screener_instance.pending_df.columns
+
+
+def test_screen_papers_cascade_escalates_only_borderline_papers():
+    def generate_content(model, contents, config):
+        # 1段目はタイトルの数字をスコアとして返す
+        if model == "cheap":
+            response = make_response(0, prompt_tokens=50, output_tokens=2)
+            response.parsed = TriageResult(relevance_score=int(contents[-1]))
+            return response
+        return make_response(9)
+
+    with patch("google.genai.Client") as mock_client_cls:
+        mock_client = mock_client_cls.return_value
+        mock_client.models.generate_content.side_effect = lambda **kwargs: (
+            generate_content(**kwargs)
+        )
+        screener_instance = PaperScreener(
+            "fake_key",
+            "strong",
+            max_workers=1,
+            triage_model="cheap",
+            threshold=7,
+            cascade_margin=2,
+        )
+        screener_instance.triage_template = "{research_scope}{title}{abstract}"
+
+    df = pd.DataFrame([{"title": "T", "abstract": str(s)} for s in (1, 4, 5, 8)])
+    result_df = screener_instance.screen_papers(df, "scope")
+
+    # しきい値 7 - 幅 2 = 5 以上のみ本判定する
+    assert list(result_df["screening_tier"]) == [1, 1, 2, 2]
+    assert list(result_df["relevance_score"]) == [1, 4, 9, 9]
+    assert list(result_df["summary"]) == ["", "", "Summary", "Summary"]
+    assert list(result_df["total_tokens"]) == [52, 52, 172, 172]
+    assert screener_instance.usage.calls == 6
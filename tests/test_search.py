@@ -0,0 +1,74 @@
+import pandas as pd
+
+from src.core.search import SearchIndex, tokenize
+
+
+def make_run(data_dir, name, rows):
+    run_dir = data_dir / name
+    (run_dir / "final").mkdir(parents=True)
+    pd.DataFrame(rows).to_csv(
+        run_dir / "final" / "final_review_matrix.csv", index=False
+    )
+    return run_dir
+
+
+def paper(doi, title, summary="", score=5, abstract=""):
+    return {
+        "doi": doi,
+        "title": title,
+        "abstract": abstract,
+        "summary": summary,
+        "relevance_reason": "",
+        "relevance_score": score,
+        "year": 2024.0,
+    }
+
+
+def test_tokenize_splits_japanese_into_bigrams():
+    assert tokenize("Deep Learning による強化学習") == [
+        "deep",
+        "learning",
+        "によ",
+        "よる",
+        "る強",
+        "強化",
+        "化学",
+        "学習",
+    ]
+
+
+def test_search_ranks_with_bm25_and_updates_incrementally(tmp_path):
+    run1 = make_run(
+        tmp_path,
+        "20250101_000000_p",
+        [
+            paper("10.1/a", "Reward shaping for reinforcement learning"),
+            paper("10.1/b", "Graph neural networks", abstract="reinforcement"),
+            paper("10.1/c", "Vision transformers", summary="強化学習を用いた手法"),
+        ],
+    )
+    index = SearchIndex(tmp_path / "index.sqlite")
+    assert index.sync([run1]) == 1
+    assert index.sync([run1]) == 0
+
+    hits = index.search("reinforcement")
+    # タイトルでの一致を優先する
+    assert [h.doi for h in hits] == ["10.1/a", "10.1/b"]
+    assert hits[0].year == 2024
+    # 英単語は語幹で一致する
+    assert [h.doi for h in index.search("shaped rewards")] == ["10.1/a"]
+    assert [h.doi for h in index.search("強化学習")] == ["10.1/c"]
+    # すべての語を含む論文がなければ、いずれかの語を含む論文を返す
+    assert {h.doi for h in index.search("graph vision")} == {"10.1/b", "10.1/c"}
+    assert index.search("!!") == []
+
+    # 後の実行で同じ論文が判定し直された場合は上書きされる
+    run2 = make_run(
+        tmp_path,
+        "20250201_000000_p",
+        [paper("10.1/b", "Graph neural networks", score=9)],
+    )
+    index.sync([run1, run2])
+    hits = index.search("graph")
+    assert [(h.run_id, h.relevance_score) for h in hits] == [(run2.name, 9.0)]
+    assert len(index) == 3
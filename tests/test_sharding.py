@@ -0,0 +1,140 @@
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from src.core.sharding import (
+    ShardedScreener,
+    read_shard_results,
+    screen_shard,
+    split_into_shards,
+)
+from src.core.usage import UsageTracker
+from src.models.models import BudgetSettings
+
+
+class FakeScreener:
+    """ワーカー用のダミー (spawn で pickle できるようモジュール直下に定義)"""
+
+    def __init__(self, crash_marker: str | None = None, budget=None):
+        self.crash_marker = crash_marker
+        self.usage = UsageTracker(budget)
+        self.pending_df = None
+
+    def screen_papers(self, df, research_scope, on_result=None):
+        self.pending_df = df.iloc[0:0]
+        for i, (_, row) in enumerate(df.iterrows()):
+            if self.usage.exhausted():
+                self.pending_df = df.iloc[i:]
+                return df.iloc[:i]
+            if row["doi"] == "crash" and self.crash_marker:
+                marker = Path(self.crash_marker)
+                if not marker.exists():
+                    marker.touch()
+                    os._exit(1)
+            result = {
+                "relevance_score": len(row["title"]),
+                "relevance_reason": research_scope,
+                "summary": "",
+                "prompt_tokens": 10,
+                "output_tokens": 0,
+            }
+            self.usage.add(10, 0)
+            if on_result is not None:
+                on_result(row, result)
+        return df
+
+    def close(self):
+        pass
+
+
+def make_df(n):
+    return pd.DataFrame(
+        [{"doi": f"10.1/{i}", "title": "T" * (i % 10 + 1)} for i in range(n)]
+    )
+
+
+def test_split_into_shards():
+    shards = split_into_shards(make_df(5), 2)
+    assert [len(s) for s in shards] == [2, 2, 1]
+
+
+def test_screen_shard_resumes_from_existing_results(tmp_path):
+    output_path = tmp_path / "shard.jsonl"
+    output_path.write_text(
+        '{"doi": "10.1/0", "relevance_score": 9, "relevance_reason": "done",'
+        ' "summary": ""}\n{"doi": "10.1/1", "relev',
+        encoding="utf-8",
+    )
+
+    screen_shard(FakeScreener(), make_df(3), "scope", output_path)
+
+    results = read_shard_results(output_path)
+    assert set(results) == {"10.1/0", "10.1/1", "10.1/2"}
+    # 既存の結果は再スクリーニングされない
+    assert results["10.1/0"]["relevance_reason"] == "done"
+    assert results["10.1/2"]["relevance_reason"] == "scope"
+
+
+def test_sharded_screener_merges_by_doi(tmp_path):
+    df = make_df(7)
+    screener = ShardedScreener(
+        api_keys=["k1", "k2"],
+        model_name="fake",
+        work_dir=tmp_path,
+        num_processes=2,
+        shard_size=3,
+        screener_factory=FakeScreener,
+        factory_kwargs={},
+    )
+
+    result_df = screener.screen_papers(df, "scope")
+
+    assert len(result_df) == 7
+    assert list(result_df["doi"]) == list(df["doi"])
+    assert list(result_df["relevance_score"]) == [len(t) for t in df["title"]]
+
+
+def test_sharded_screener_requeues_killed_worker_shard(tmp_path):
+    df = pd.concat(
+        [make_df(4), pd.DataFrame([{"doi": "crash", "title": "TT"}])],
+        ignore_index=True,
+    )
+    screener = ShardedScreener(
+        api_keys=["k1"],
+        model_name="fake",
+        work_dir=tmp_path / "shards",
+        num_processes=2,
+        shard_size=2,
+        screener_factory=FakeScreener,
+        factory_kwargs={"crash_marker": str(tmp_path / "crashed")},
+    )
+
+    result_df = screener.screen_papers(df, "scope")
+
+    assert (tmp_path / "crashed").exists()
+    assert result_df.set_index("doi").loc["crash", "relevance_score"] == 2
+    assert (result_df["relevance_reason"] == "scope").all()
+
+
+def test_sharded_screener_workers_stop_at_their_budget_share(tmp_path):
+    df = make_df(40)
+    screener = ShardedScreener(
+        api_keys=["k1"],
+        model_name="fake",
+        work_dir=tmp_path,
+        num_processes=2,
+        shard_size=8,
+        screener_factory=FakeScreener,
+        factory_kwargs={},
+        budget=BudgetSettings(max_total_tokens=100),
+    )
+
+    result_df = screener.screen_papers(df, "scope")
+
+    # 各ワーカーは残りの予算の半分 (5件分) で止まり、シャード単位では超過しない
+    assert len(result_df) <= 10
+    assert screener.usage.total_tokens <= 100
+    assert screener.budget_stopped
+    assert len(result_df) + len(screener.pending_df) == 40
+    assert set(screener.pending_df["doi"]).isdisjoint(result_df["doi"])
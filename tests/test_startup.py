@@ -0,0 +1,28 @@
+import pytest
+
+from benchmarks.startup import (
+    FORBIDDEN_AT_STARTUP,
+    STARTUP_BUDGETS_MS,
+    STARTUP_TARGETS,
+    measure_startup,
+    parse_importtime,
+)
+
+
+def test_parse_importtime():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   _io\n"
+        "import time:      2500 |       2620 | main\n"
+    )
+    modules = parse_importtime(stderr)
+    assert modules == {"_io": 0.12, "main": 2.5}
+
+
+@pytest.mark.parametrize("target", list(STARTUP_TARGETS))
+def test_startup_within_budget(target):
+    report = measure_startup(target)
+
+    loaded_heavy = [m for m in FORBIDDEN_AT_STARTUP[target] if m in report.modules]
+    assert loaded_heavy == [], f"{target} imports heavy modules at startup"
+    assert report.total_ms <= STARTUP_BUDGETS_MS[target], report.slowest(5)
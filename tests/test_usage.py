@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+
+import pandas as pd
+
+from src.core.usage import (
+    UsageTracker,
+    estimate_cost,
+    extract_usage,
+    summarize_cascade,
+    summarize_usage,
+    top_cost_papers,
+)
+from src.models.models import BudgetSettings
+
+
+def test_extract_usage():
+    response = SimpleNamespace(
+        usage_metadata=SimpleNamespace(
+            prompt_token_count=300, candidates_token_count=50, total_token_count=350
+        )
+    )
+    assert extract_usage(response) == {
+        "prompt_tokens": 300,
+        "output_tokens": 50,
+        "total_tokens": 350,
+    }
+    # usage_metadata がないレスポンスは 0 として扱う
+    assert extract_usage(SimpleNamespace())["total_tokens"] == 0
+
+
+def test_usage_tracker_budget():
+    budget = BudgetSettings(
+        max_cost_usd=1.0, input_price_per_million=1.0, output_price_per_million=4.0
+    )
+    tracker = UsageTracker(budget)
+    tracker.add(500_000, 100_000)
+    assert tracker.cost_usd == estimate_cost(500_000, 100_000, budget) == 0.9
+    assert not tracker.exhausted()
+
+    tracker.add(100_000, 0)
+    assert tracker.exhausted()
+
+
+def test_usage_tracker_unlimited_by_default():
+    tracker = UsageTracker()
+    tracker.add(10**9, 10**9)
+    assert not tracker.exhausted()
+
+
+def test_summarize_usage_and_top_cost_papers():
+    df = pd.DataFrame(
+        {
+            "doi": ["d1", "d2", "d3"],
+            "title": ["short", "long", "no abstract"],
+            "prompt_tokens": [100, 5000, 0],
+            "output_tokens": [20, 30, 0],
+            "total_tokens": [120, 5030, 0],
+            "llm_latency_s": [0.5, 1.5, 0.0],
+        }
+    )
+    summary = summarize_usage(df, BudgetSettings())
+    assert summary["calls"] == 2
+    assert summary["total_tokens"] == 5150
+    assert summary["latency_s_mean"] == 1.0
+
+    assert top_cost_papers(df, n=1)[0]["doi"] == "d2"
+    assert summarize_usage(pd.DataFrame(), BudgetSettings())["calls"] == 0
+
+
+def test_summarize_cascade():
+    df = pd.DataFrame(
+        {
+            "screening_tier": [1, 1, 1, 2],
+            "prompt_tokens": [50, 50, 50, 150],
+            "output_tokens": [2, 2, 2, 22],
+            "total_tokens": [52, 52, 52, 172],
+            "llm_latency_s": [0.1, 0.1, 0.1, 1.1],
+            "triage_prompt_tokens": [50, 50, 50, 50],
+            "triage_output_tokens": [2, 2, 2, 2],
+            "triage_latency_s": [0.1, 0.1, 0.1, 0.1],
+        }
+    )
+
+    summary = summarize_cascade(df)
+
+    assert summary["tier1_only"] == 3
+    assert summary["escalated"] == 1
+    assert summary["tier2_latency_s_mean"] == 1.0
+    assert summary["tier1_tokens"] == 208
+    assert summary["tier2_tokens"] == 120
+    # 1段目で不採用の3件を本判定した場合 (120 x 3) から1段目の 208 を差し引く
+    assert summary["estimated_saved_tokens"] == 152
+    assert summarize_cascade(df.drop(columns="screening_tier")) is None